@@ -2,6 +2,11 @@ export interface StoredTrade extends Trade {
   readonly trade_id: string;
 }
 
+export interface StoredTrades {
+  readonly entries: StoredTrade[];
+  readonly entries_found: number;
+}
+
 export interface TradePayload extends Trade {
   readonly trade_id?: string;
 }
@@ -13,7 +13,7 @@ import { Messages } from '@/model/messages';
 import { PeriodicClientQueryResult } from '@/model/periodic_client_query_result';
 import { NetvalueDataResult } from '@/model/query-netvalue-data-result';
 import { SingleAssetBalance } from '@/model/single-asset-balance';
-import { StoredTrade, Trade } from '@/model/stored-trade';
+import { StoredTrade, StoredTrades, Trade } from '@/model/stored-trade';
 import { VersionCheck } from '@/model/version-check';
 import { BalancesApi } from '@/services/balances/balances-api';
 import { DefiApi } from '@/services/defi/defi-api';
@@ -154,11 +154,12 @@ export class RotkehlchenApi {
 
   queryExternalTrades(): Promise<StoredTrade[]> {
     return this.axios
-      .get<ActionResult<StoredTrade[]>>('/trades', {
+      .get<ActionResult<StoredTrades>>('/trades', {
         params: { location: 'external' },
         validateStatus: validStatus
       })
-      .then(handleResponse);
+      .then(handleResponse)
+      .then(result => result.entries);
   }
 
   ignoredAssets(): Promise<string[]> {
@@ -39,6 +39,15 @@ if %errorlevel% neq 0 (
 
 for /f %%i in ('python setup.py --version') do set ROTKEHLCHEN_VERSION=%%i
 
+@echo on
+Rem Generate the precompiled assets index that is bundled along with the assets file
+python -c "from rotkehlchen.assets.resolver import write_assets_index; write_assets_index()"
+@echo off
+if %errorlevel% neq 0 (
+   echo "package.bat - ERROR - Generating the assets index failed"
+   exit /b %errorlevel%
+)
+
 @echo on
 Rem Use pyinstaller to package the python app
 IF EXIST build rmdir build /s /Q
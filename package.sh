@@ -48,6 +48,13 @@ else
     exit 1
 fi
 
+# Generate the precompiled assets index that is bundled along with the assets file
+python -c "from rotkehlchen.assets.resolver import write_assets_index; write_assets_index()"
+if [[ $? -ne 0 ]]; then
+    echo "package.sh - ERROR: Generating the assets index failed"
+    exit 1
+fi
+
 # Use pyinstaller to package the python app
 rm -rf build rotkehlchen_py_dist
 pyinstaller --noconfirm --clean --distpath rotkehlchen_py_dist rotkehlchen.spec
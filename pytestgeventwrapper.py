@@ -5,5 +5,7 @@ import sys
 
 import pytest
 
-exit_code = pytest.main()
-sys.exit(exit_code)
+if __name__ == '__main__':
+    # Worker processes that are spawned by the tests import this module again
+    exit_code = pytest.main()
+    sys.exit(exit_code)
@@ -1,6 +1,7 @@
 from gevent import monkey  # isort:skip # noqa
 monkey.patch_all()  # isort:skip # noqa
 import logging
+import multiprocessing
 
 from rotkehlchen.errors import SystemPermissionError
 
@@ -8,6 +9,9 @@ logger = logging.getLogger(__name__)
 
 
 def main() -> None:
+    # History processing runs in a worker process which in the packaged
+    # executable is started by running the executable itself
+    multiprocessing.freeze_support()
     import traceback
     import sys
     from rotkehlchen.server import RotkehlchenServer
@@ -1,14 +1,26 @@
+import hashlib
 import logging
+import multiprocessing
+from itertools import islice, takewhile
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple, Union, cast
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
 
 import gevent
+from gevent.event import AsyncResult
 
-from rotkehlchen.accounting.events import TaxableEvents
+from rotkehlchen.accounting.processor import Checkpoint, HistoryProcessor, hash_next_action
 from rotkehlchen.accounting.structures import DefiEvent
+from rotkehlchen.accounting.worker import (
+    WORKER_CHECKPOINT,
+    WORKER_DONE,
+    WORKER_MESSAGE,
+    WORKER_PROGRESS,
+    WORKER_RATE_QUERY,
+    ProcessingSnapshot,
+    process_history_in_worker,
+)
 from rotkehlchen.assets.asset import Asset
 from rotkehlchen.constants.assets import A_BTC, A_ETH
-from rotkehlchen.csv_exporter import CSVExporter
 from rotkehlchen.db.dbhandler import DBHandler
 from rotkehlchen.db.settings import DBSettings
 from rotkehlchen.errors import (
@@ -27,25 +39,37 @@ from rotkehlchen.exchanges.data_structures import (
     TradeType,
 )
 from rotkehlchen.fval import FVal
+from rotkehlchen.greenlets import TaskProgress, current_task_progress
 from rotkehlchen.history import PriceHistorian
 from rotkehlchen.inquirer import Inquirer
 from rotkehlchen.logging import RotkehlchenLogsAdapter
 from rotkehlchen.transactions import EthereumTransaction
-from rotkehlchen.typing import Fee, Timestamp
+from rotkehlchen.typing import Price, Timestamp
 from rotkehlchen.user_messages import MessagesAggregator
 from rotkehlchen.utils.accounting import (
     TaxableAction,
     action_get_assets,
     action_get_timestamp,
-    action_get_type,
+    merge_actions_by_timestamp,
+    sort_actions_by_timestamp,
 )
-from rotkehlchen.utils.misc import timestamp_to_date
 
 logger = logging.getLogger(__name__)
 log = RotkehlchenLogsAdapter(logger)
 
+# Histories with fewer actions left to process than this are processed in the API
+# process since that takes less time than starting the worker process would
+PROCESSING_WORKER_MIN_ACTIONS = 1000
+# Bump this whenever the processing logic or the checkpointed state changes so
+# that checkpoints taken by an older version are no longer used
+CHECKPOINT_VERSION = 3
+# During history processing the state is checkpointed in the DB every so many
+# actions so that a later run can skip the part of the history that did not change
+CHECKPOINT_MIN_INTERVAL = 500
+CHECKPOINT_MAX_NUMBER = 10
+
 
-class Accountant():
+class Accountant(HistoryProcessor):
 
     def __init__(
             self,
@@ -55,201 +79,204 @@ class Accountant():
             create_csv: bool,
     ) -> None:
         log.debug('Initializing Accountant')
+        super().__init__(
+            profit_currency=db.get_main_currency(),
+            user_directory=user_directory,
+            create_csv=create_csv,
+        )
         self.db = db
-        profit_currency = db.get_main_currency()
         self.msg_aggregator = msg_aggregator
-        self.csvexporter = CSVExporter(profit_currency, user_directory, create_csv)
-        self.events = TaxableEvents(self.csvexporter, profit_currency)
-
-        self.asset_movement_fees = FVal(0)
-        self.last_gas_price = FVal(0)
-
-        self.started_processing_timestamp = Timestamp(-1)
-        self.currently_processing_timestamp = Timestamp(-1)
+        # The progress and the checkpoints of the history processing that runs now
+        self.progress = TaskProgress()
+        self.checkpoints: List[Checkpoint] = []
 
     def __del__(self) -> None:
         del self.events
         del self.csvexporter
 
-    @property
-    def general_trade_pl(self) -> FVal:
-        return self.events.general_trade_profit_loss
-
-    @property
-    def taxable_trade_pl(self) -> FVal:
-        return self.events.taxable_trade_profit_loss
-
-    def _customize(self, settings: DBSettings) -> None:
-        """Customize parameters after pulling DBSettings"""
-        if settings.include_crypto2crypto is not None:
-            self.events.include_crypto2crypto = settings.include_crypto2crypto
+    def _give_message(self, message_type: str, msg: str) -> None:
+        if message_type == 'warning':
+            self.msg_aggregator.add_warning(msg)
+        else:
+            self.msg_aggregator.add_error(msg)
 
-        if settings.taxfree_after_period is not None:
-            given_taxfree_after_period: Optional[int] = settings.taxfree_after_period
-            if given_taxfree_after_period == -1:
-                # That means user requested to disable taxfree_after_period
-                given_taxfree_after_period = None
+    def _action_processed(self) -> None:
+        self.progress.advance()
 
-            self.events.taxfree_after_period = given_taxfree_after_period
+    def _add_checkpoint(self, checkpoint: Checkpoint) -> None:
+        self.checkpoints.append(checkpoint)
 
-        self.profit_currency = settings.main_currency
-        self.events.profit_currency = settings.main_currency
-        self.csvexporter.profit_currency = settings.main_currency
+    def _rate_queries_for_actions(
+            self,
+            actions: Iterable[TaxableAction],
+            end_ts: Timestamp,
+            db_settings: DBSettings,
+    ) -> Iterator[Tuple[Asset, Timestamp]]:
+        """Yields the (asset, timestamp) combinations whose rate in profit currency
+        processing the given actions will most probably need"""
+        for action in actions:
+            timestamp = action_get_timestamp(action)
+            if timestamp > end_ts:
+                break
 
-    def get_fee_in_profit_currency(self, trade: Trade) -> Fee:
-        """Get the profit_currency rate of the fee of the given trade
+            try:
+                asset1, asset2 = action_get_assets(action)
+            except (UnknownAsset, UnsupportedAsset, DeserializationError):
+                continue  # will be skipped with a proper message during processing
+            if asset1 in self.ignored_assets or asset2 in self.ignored_assets:
+                continue
 
-        May raise:
-        - PriceQueryUnknownFromAsset if the from asset is known to miss from cryptocompare
-        - NoPriceForGivenTimestamp if we can't find a price for the asset in the given
-        timestamp from the price oracle
-        - RemoteError if there is a problem reaching the price oracle server
-        or with reading the response returned by the server
-        """
-        fee_rate = PriceHistorian().query_historical_price(
-            from_asset=trade.fee_currency,
-            to_asset=self.profit_currency,
-            timestamp=trade.timestamp,
+            if isinstance(action, Trade):
+                yield action.fee_currency, timestamp
+                if action.trade_type == TradeType.SETTLEMENT_BUY:
+                    yield A_BTC, timestamp
+                    continue
+                assert asset2 is not None, 'trades always have two assets'
+                yield asset2, timestamp
+                if self.events.include_crypto2crypto and not asset2.is_fiat():
+                    yield asset1, timestamp
+            elif isinstance(action, AssetMovement):
+                if timestamp >= self.start_ts and action.asset.identifier != 'KFEE':
+                    yield action.fee_asset, timestamp
+            elif isinstance(action, EthereumTransaction):
+                if timestamp >= self.start_ts and db_settings.include_gas_costs:
+                    yield A_ETH, timestamp
+            else:
+                yield asset1, timestamp
+
+    def _settings_hash(self, start_ts: Timestamp, db_settings: DBSettings) -> str:
+        """Hash of everything apart from the actions themselves that affects the
+        state of history processing. Checkpoints are only valid for the same hash."""
+        settings = (
+            CHECKPOINT_VERSION,
+            start_ts,
+            self.profit_currency.identifier,
+            self.events.include_crypto2crypto,
+            self.events.taxfree_after_period,
+            self.events.count_profit_for_settlements,
+            str(self.events.cost_basis_method),
+            db_settings.include_gas_costs,
+            self.csvexporter.create_csv,
+            sorted(asset.identifier for asset in self.ignored_assets),
         )
-        return Fee(fee_rate * trade.fee)
+        return hashlib.sha256(repr(settings).encode()).hexdigest()
 
-    def add_asset_movement_to_events(self, movement: AssetMovement) -> None:
-        """
-        Adds the given asset movement to the processed events
-
-        May raise:
-        - PriceQueryUnknownFromAsset if the from asset is known to miss from cryptocompare
-        - NoPriceForGivenTimestamp if we can't find a price for the asset in the given
-        timestamp from cryptocompare
-        - RemoteError if there is a problem reaching the price oracle server
-        or with reading the response returned by the server
+    def _restore_checkpoint(
+            self,
+            actions: Iterable[TaxableAction],
+            end_ts: Timestamp,
+            settings_hash: str,
+    ) -> Tuple[int, str]:
+        """Restores the state of the latest checkpoint that is still valid for the
+        given actions, which means that none of the actions before it has changed.
+        The messages that processing these actions gave are given again.
+
+        Returns the number of actions already processed in the restored state and
+        the hash of these actions so that processing can continue from there.
         """
-        timestamp = movement.timestamp
-        if timestamp < self.start_ts:
-            return
-
-        if movement.asset.identifier == 'KFEE':
-            # There is no reason to process deposits of KFEE for kraken as it has only value
-            # internal to kraken and KFEE has no value and will error at cryptocompare price query
-            return
-
-        fee_rate = self.events.get_rate_in_profit_currency(movement.fee_asset, timestamp)
-        cost = movement.fee * fee_rate
-        self.asset_movement_fees += cost
-        log.debug(
-            'Accounting for asset movement',
-            sensitive_log=True,
-            category=movement.category,
-            asset=movement.asset,
-            cost_in_profit_currency=cost,
-            timestamp=timestamp,
-            exchange_name=movement.location,
-        )
+        checkpoint_hashes = self.db.get_accounting_checkpoint_hashes(settings_hash)
+        actions_hash = ''
+        resume_index, resume_hash = 0, actions_hash
+        last_checkpoint = max(checkpoint_hashes, default=0)
+        for index, action in enumerate(islice(actions, last_checkpoint), start=1):
+            if action_get_timestamp(action) > end_ts:
+                break
 
-        self.csvexporter.add_asset_movement(
-            exchange=movement.location,
-            category=movement.category,
-            asset=movement.asset,
-            fee=movement.fee,
-            rate=fee_rate,
-            timestamp=timestamp,
-        )
+            actions_hash = hash_next_action(actions_hash, action)
+            checkpoint_hash = checkpoint_hashes.get(index)
+            if checkpoint_hash is None:
+                continue
+            if checkpoint_hash != actions_hash:
+                # Something changed before this checkpoint so no later one is valid either
+                break
+            resume_index, resume_hash = index, actions_hash
 
-    def account_for_gas_costs(
-            self,
-            transaction: EthereumTransaction,
-            include_gas_costs: bool,
-    ) -> None:
-        """
-        Accounts for the gas costs of the given ethereum transaction
-
-        May raise:
-        - PriceQueryUnknownFromAsset if the from asset is known to miss from cryptocompare
-        - NoPriceForGivenTimestamp if we can't find a price for the asset in the given
-        timestamp from cryptocompare
-        - RemoteError if there is a problem reaching the price oracle server
-        or with reading the response returned by the server
-        """
-        if not include_gas_costs:
-            return
-        if transaction.timestamp < self.start_ts:
-            return
+        if resume_index == 0:
+            return 0, resume_hash
 
-        if transaction.gas_price == -1:
-            gas_price = self.last_gas_price
-        else:
-            gas_price = transaction.gas_price
-            self.last_gas_price = transaction.gas_price
-
-        rate = self.events.get_rate_in_profit_currency(A_ETH, transaction.timestamp)
-        eth_burned_as_gas = (transaction.gas_used * gas_price) / FVal(10 ** 18)
-        cost = eth_burned_as_gas * rate
-        self.eth_transactions_gas_costs += cost
-
-        log.debug(
-            'Accounting for ethereum transaction gas cost',
-            sensitive_log=True,
-            gas_used=transaction.gas_used,
-            gas_price=gas_price,
-            timestamp=transaction.timestamp,
-        )
+        state_data = self.db.get_accounting_checkpoint_state(settings_hash, resume_index)
+        if state_data is None or not self._apply_state(state_data):
+            return 0, ''
 
-        self.csvexporter.add_tx_gas_cost(
-            transaction_hash=transaction.tx_hash,
-            eth_burned_as_gas=eth_burned_as_gas,
-            rate=rate,
-            timestamp=transaction.timestamp,
-        )
+        for message_type, msg in self.processing_messages:
+            self._give_message(message_type, msg)
 
-    def trade_add_to_sell_events(self, trade: Trade, loan_settlement: bool) -> None:
-        """
-        Adds the given trade to the sell events
-
-        May raise:
-        - PriceQueryUnknownFromAsset if the from asset is known to miss from cryptocompare
-        - NoPriceForGivenTimestamp if we can't find a price for the asset in the given
-        timestamp from cryptocompare
-        - RemoteError if there is a problem reaching the price oracle server
-        or with reading the response returned by the server
+        log.info('Resuming history processing from checkpoint', actions_processed=resume_index)
+        return resume_index, resume_hash
+
+    @staticmethod
+    def _query_rate_for_worker(
+            from_asset: Asset,
+            to_asset: Asset,
+            timestamp: Timestamp,
+    ) -> Tuple[Optional[Price], Optional[Exception]]:
+        try:
+            return PriceHistorian().query_historical_price(from_asset, to_asset, timestamp), None
+        except (PriceQueryUnknownFromAsset, NoPriceForGivenTimestamp, RemoteError) as e:
+            return None, e
+
+    def _process_actions_in_worker(self, snapshot: ProcessingSnapshot) -> None:
+        """Processes the actions of the given snapshot in a worker process
+
+        Only the calling greenlet waits for the worker so the API stays responsive.
+        The messages, progress and checkpoints of the worker are taken over as they
+        come, the rates it misses are queried for it and in the end its state
+        becomes the state of the accountant.
         """
-        selling_asset = trade.base_asset
-        receiving_asset = trade.quote_asset
-        receiving_asset_rate = self.events.get_rate_in_profit_currency(
-            receiving_asset,
-            trade.timestamp,
+        context = multiprocessing.get_context('spawn')
+        results_reader, results_writer = context.Pipe(duplex=False)
+        rates_reader, rates_writer = context.Pipe(duplex=False)
+        worker = context.Process(
+            target=process_history_in_worker,
+            args=(snapshot, results_writer, rates_reader),
+            name='rotki history processing',
+            daemon=True,
         )
-        selling_rate = receiving_asset_rate * trade.rate
-        fee_in_profit_currency = self.get_fee_in_profit_currency(trade)
-        gain_in_profit_currency = selling_rate * trade.amount
-
-        if not loan_settlement:
-            self.events.add_sell_and_corresponding_buy(
-                location=trade.location,
-                selling_asset=selling_asset,
-                selling_amount=trade.amount,
-                receiving_asset=receiving_asset,
-                receiving_amount=trade.amount * trade.rate,
-                gain_in_profit_currency=gain_in_profit_currency,
-                total_fee_in_profit_currency=fee_in_profit_currency,
-                trade_rate=trade.rate,
-                rate_in_profit_currency=selling_rate,
-                timestamp=trade.timestamp,
-            )
-        else:
-            self.events.add_sell(
-                location=trade.location,
-                selling_asset=selling_asset,
-                selling_amount=trade.amount,
-                receiving_asset=None,
-                receiving_amount=None,
-                gain_in_profit_currency=gain_in_profit_currency,
-                total_fee_in_profit_currency=fee_in_profit_currency,
-                trade_rate=trade.rate,
-                rate_in_profit_currency=selling_rate,
-                timestamp=trade.timestamp,
-                loan_settlement=True,
-                is_virtual=False,
-            )
+        worker.start()
+        # Only the worker should have these ends open so that its exit is noticed
+        results_writer.close()
+        rates_reader.close()
+
+        threadpool = gevent.get_hub().threadpool
+        pending_recv: Optional[AsyncResult] = None
+        finished = False
+        try:
+            while not finished:
+                # Wait in a thread so that the other greenlets can run in the meantime
+                pending_recv = threadpool.spawn(results_reader.recv)
+                try:
+                    message = pending_recv.get()
+                except EOFError:
+                    raise RuntimeError('The history processing worker exited unexpectedly')
+                pending_recv = None
+
+                kind = message[0]
+                if kind == WORKER_PROGRESS:
+                    self.progress.advance(message[1])
+                    self.currently_processing_timestamp = message[2]
+                elif kind == WORKER_MESSAGE:
+                    self.processing_messages.append((message[1], message[2]))
+                    self._give_message(message[1], message[2])
+                elif kind == WORKER_RATE_QUERY:
+                    rates_writer.send(self._query_rate_for_worker(*message[1:]))
+                elif kind == WORKER_CHECKPOINT:
+                    self._add_checkpoint(message[1])
+                elif kind == WORKER_DONE:
+                    applied = self._apply_state(message[1])
+                    assert applied, 'The state given by the worker should always be valid'
+                    finished = True
+                else:
+                    raise RuntimeError(f'The history processing worker failed: {message[1]}')
+        finally:
+            if not finished:
+                # For example if the task processing the history got killed
+                worker.terminate()
+            worker.join()
+            if pending_recv is not None:
+                # The worker has exited so the pending receive returns right away
+                pending_recv.wait()
+            results_reader.close()
+            rates_writer.close()
 
     def process_history(
             self,
@@ -268,6 +295,10 @@ class Accountant():
         start_ts here is the timestamp at which to start taking trades and other
         taxable events into account. Not where processing starts from. Processing
         always starts from the very first event we find in the history.
+
+        If the state after some of the first actions has been checkpointed by a
+        previous run with the same settings and none of these actions has changed
+        since then, processing continues from that checkpoint instead.
         """
         log.info(
             'Start of history processing',
@@ -279,6 +310,7 @@ class Accountant():
         self.start_ts = start_ts
         self.eth_transactions_gas_costs = FVal(0)
         self.asset_movement_fees = FVal(0)
+        self.processing_messages = []
         self.csvexporter.reset_csv_lists()
 
         # Ask the DB for the settings once at the start of processing so we got the
@@ -286,85 +318,79 @@ class Accountant():
         db_settings = self.db.get_settings()
         self._customize(db_settings)
 
-        actions: List[TaxableAction] = list(trade_history)
-        # If we got loans, we need to interleave them with the full history and re-sort
-        if len(loan_history) != 0:
-            actions.extend(loan_history)
-
-        if len(asset_movements) != 0:
-            actions.extend(asset_movements)
-
-        if len(eth_transactions) != 0:
-            actions.extend(eth_transactions)
-
-        if len(defi_events) != 0:
-            actions.extend(defi_events)
-
-        actions.sort(
-            key=lambda action: action_get_timestamp(action),
+        # Each source of actions is already sorted by timestamp, or is sorted by itself
+        # here, and the sources are then lazily merged every time they are traversed
+        given_sources: Tuple[Sequence[TaxableAction], ...] = (
+            trade_history,
+            loan_history,
+            asset_movements,
+            eth_transactions,
+            defi_events,
         )
+        sources = [sort_actions_by_timestamp(source) for source in given_sources]
+        actions_number = sum(len(source) for source in sources)
         # The first ts is the ts of the first action we have in history or 0 for empty history
-        first_ts = Timestamp(0) if len(actions) == 0 else action_get_timestamp(actions[0])
+        first_action = next(iter(merge_actions_by_timestamp(sources)), None)
+        first_ts = Timestamp(0) if first_action is None else action_get_timestamp(first_action)
         self.currently_processing_timestamp = first_ts
         self.started_processing_timestamp = first_ts
 
-        prev_time = Timestamp(0)
-        count = 0
-        for action in actions:
-            try:
-                (
-                    should_continue,
-                    prev_time,
-                ) = self.process_action(action, end_ts, prev_time, db_settings)
-            except PriceQueryUnknownFromAsset as e:
-                ts = action_get_timestamp(action)
-                self.msg_aggregator.add_error(
-                    f'Skipping action at '
-                    f' {timestamp_to_date(ts, formatstr="%d/%m/%Y, %H:%M:%S")} '
-                    f'during history processing due to an asset unknown to '
-                    f'cryptocompare being involved. Check logs for details',
-                )
-                log.error(
-                    f'Skipping action {str(action)} during history processing due to '
-                    f'cryptocompare not supporting an involved asset: {str(e)}',
-                )
-                continue
-            except NoPriceForGivenTimestamp as e:
-                ts = action_get_timestamp(action)
-                self.msg_aggregator.add_error(
-                    f'Skipping action at '
-                    f' {timestamp_to_date(ts, formatstr="%d/%m/%Y, %H:%M:%S")} '
-                    f'during history processing due to inability to find a price '
-                    f'at that point in time: {str(e)}. Check the logs for more details',
-                )
-                log.error(
-                    f'Skipping action {str(action)} during history processing due to '
-                    f'inability to query a price at that time: {str(e)}',
-                )
-                continue
-            except RemoteError as e:
-                ts = action_get_timestamp(action)
-                self.msg_aggregator.add_error(
-                    f'Skipping action at '
-                    f' {timestamp_to_date(ts, formatstr="%d/%m/%Y, %H:%M:%S")} '
-                    f'during history processing due to inability to reach an external '
-                    f'service at that point in time: {str(e)}. Check the logs for more details',
-                )
-                log.error(
-                    f'Skipping action {str(action)} during history processing due to '
-                    f'inability to reach an external service at that time: {str(e)}',
-                )
-                continue
-
-            if not should_continue:
-                break
+        self.ignored_assets = self.db.get_ignored_assets()
+        settings_hash = self._settings_hash(start_ts, db_settings)
+        resume_index, actions_hash = self._restore_checkpoint(
+            actions=merge_actions_by_timestamp(sources),
+            end_ts=end_ts,
+            settings_hash=settings_hash,
+        )
 
-            if count % 500 == 0:
-                # This loop can take a very long time depending on the amount of actions
-                # to process. We need to yield to other greenlets or else calls to the
-                # API may time out
-                gevent.sleep(0.5)
-            count += 1
+        # Look up all the rates we will need in batch instead of one by one in the loop
+        self.events.prefetch_rates_in_profit_currency(self._rate_queries_for_actions(
+            actions=islice(merge_actions_by_timestamp(sources), resume_index, None),
+            end_ts=end_ts,
+            db_settings=db_settings,
+        ))
+
+        checkpoint_interval = max(CHECKPOINT_MIN_INTERVAL, actions_number // CHECKPOINT_MAX_NUMBER)
+        self.checkpoints = []
+        self.progress = current_task_progress()
+        self.progress.set_stage('Processing history', total=actions_number - resume_index)
+        actions = islice(merge_actions_by_timestamp(sources), resume_index, None)
+        if actions_number - resume_index < PROCESSING_WORKER_MIN_ACTIONS:
+            self._process_actions(
+                actions=actions,
+                end_ts=end_ts,
+                db_settings=db_settings,
+                actions_processed=resume_index,
+                actions_hash=actions_hash,
+                checkpoint_interval=checkpoint_interval,
+            )
+        else:
+            # The processing of a long history runs in a worker process so that
+            # it does not hold up the rest of the application while it runs
+            self._process_actions_in_worker(ProcessingSnapshot(
+                start_ts=start_ts,
+                end_ts=end_ts,
+                db_settings=db_settings,
+                count_profit_for_settlements=self.events.count_profit_for_settlements,
+                user_directory=self.csvexporter.user_directory,
+                create_csv=self.csvexporter.create_csv,
+                ignored_assets=self.ignored_assets,
+                prefetched_rates=self.events.prefetched_rates,
+                state=self._checkpoint_state(),
+                actions_processed=resume_index,
+                actions_hash=actions_hash,
+                actions=list(takewhile(
+                    lambda action: action_get_timestamp(action) <= end_ts,
+                    actions,
+                )),
+                checkpoint_interval=checkpoint_interval,
+            ))
+
+        self.db.update_accounting_checkpoints(
+            settings_hash=settings_hash,
+            valid_actions=resume_index,
+            checkpoints=self.checkpoints,
+        )
 
         self.events.calculate_asset_details()
         Inquirer().save_historical_forex_data()
@@ -396,163 +422,3 @@ class Accountant():
             },
             'all_events': self.csvexporter.all_events,
         }
-
-    def process_action(
-            self,
-            action: TaxableAction,
-            end_ts: Timestamp,
-            prev_time: Timestamp,
-            db_settings: DBSettings,
-    ) -> Tuple[bool, Timestamp]:
-        """Processes each individual action and returns whether we should continue
-        looping through the rest of the actions or not
-
-        May raise:
-        - PriceQueryUnknownFromAsset if the from asset is known to miss from cryptocompare
-        - NoPriceForGivenTimestamp if we can't find a price for the asset in the given
-        timestamp from cryptocompare
-        - RemoteError if there is a problem reaching the price oracle server
-        or with reading the response returned by the server
-        """
-        ignored_assets = self.db.get_ignored_assets()
-
-        # Assert we are sorted in ascending time order.
-        timestamp = action_get_timestamp(action)
-        assert timestamp >= prev_time, (
-            "During history processing the trades/loans are not in ascending order"
-        )
-        prev_time = timestamp
-
-        if timestamp > end_ts:
-            return False, prev_time
-
-        self.currently_processing_timestamp = timestamp
-
-        action_type = action_get_type(action)
-
-        try:
-            asset1, asset2 = action_get_assets(action)
-        except UnknownAsset as e:
-            self.msg_aggregator.add_warning(
-                f'At history processing found trade with unknown asset {e.asset_name}. '
-                f'Ignoring the trade.',
-            )
-            return True, prev_time
-        except UnsupportedAsset as e:
-            self.msg_aggregator.add_warning(
-                f'At history processing found trade with unsupported asset {e.asset_name}. '
-                f'Ignoring the trade.',
-            )
-            return True, prev_time
-        except DeserializationError:
-            self.msg_aggregator.add_error(
-                'At history processing found trade with non string asset type. '
-                'Ignoring the trade.',
-            )
-            return True, prev_time
-
-        if asset1 in ignored_assets or asset2 in ignored_assets:
-            log.debug(
-                'Ignoring action with ignored asset',
-                action_type=action_type,
-                asset1=asset1,
-                asset2=asset2,
-            )
-
-            return True, prev_time
-
-        if action_type == 'loan':
-            action = cast(Loan, action)
-            self.events.add_loan_gain(
-                location=action.location,
-                gained_asset=action.currency,
-                lent_amount=action.amount_lent,
-                gained_amount=action.earned,
-                fee_in_asset=action.fee,
-                open_time=action.open_time,
-                close_time=timestamp,
-            )
-            return True, prev_time
-        elif action_type == 'asset_movement':
-            action = cast(AssetMovement, action)
-            self.add_asset_movement_to_events(action)
-            return True, prev_time
-        elif action_type == 'margin_position':
-            action = cast(MarginPosition, action)
-            self.events.add_margin_position(margin=action)
-            return True, prev_time
-        elif action_type == 'ethereum_transaction':
-            action = cast(EthereumTransaction, action)
-            self.account_for_gas_costs(action, db_settings.include_gas_costs)
-            return True, prev_time
-        elif action_type == 'defi_event':
-            action = cast(DefiEvent, action)
-            self.events.add_defi_event(action)
-            return True, prev_time
-
-        # if we get here it's a trade
-        trade = cast(Trade, action)
-        # When you buy, you buy with the cost_currency and receive the other one
-        # When you sell, you sell the amount in non-cost_currency and receive
-        # costs in cost_currency
-        if trade.trade_type == TradeType.BUY:
-            self.events.add_buy_and_corresponding_sell(
-                location=trade.location,
-                bought_asset=trade.base_asset,
-                bought_amount=trade.amount,
-                paid_with_asset=trade.quote_asset,
-                trade_rate=trade.rate,
-                fee_in_profit_currency=self.get_fee_in_profit_currency(trade),
-                fee_currency=trade.fee_currency,
-                timestamp=trade.timestamp,
-            )
-        elif trade.trade_type == TradeType.SELL:
-            self.trade_add_to_sell_events(trade, False)
-        elif trade.trade_type == TradeType.SETTLEMENT_SELL:
-            # in poloniex settlements sell some asset to get BTC to repay a loan
-            self.trade_add_to_sell_events(trade, True)
-        elif trade.trade_type == TradeType.SETTLEMENT_BUY:
-            # in poloniex settlements you buy some asset with BTC to repay a loan
-            # so in essense you sell BTC to repay the loan
-            selling_asset = A_BTC
-            selling_asset_rate = self.events.get_rate_in_profit_currency(
-                selling_asset,
-                trade.timestamp,
-            )
-            selling_rate = selling_asset_rate * trade.rate
-            fee_in_profit_currency = self.get_fee_in_profit_currency(trade)
-            gain_in_profit_currency = selling_rate * trade.amount
-            # Since the original trade is a buy of some asset with BTC, then the
-            # when we invert the sell, the sold amount of BTC should be the cost
-            # (amount*rate) of the original buy
-            selling_amount = trade.rate * trade.amount
-            self.events.add_sell(
-                location=trade.location,
-                selling_asset=selling_asset,
-                selling_amount=selling_amount,
-                receiving_asset=None,
-                receiving_amount=None,
-                gain_in_profit_currency=gain_in_profit_currency,
-                total_fee_in_profit_currency=fee_in_profit_currency,
-                trade_rate=trade.rate,
-                rate_in_profit_currency=selling_asset_rate,
-                timestamp=trade.timestamp,
-                loan_settlement=True,
-            )
-        else:
-            # Should never happen
-            raise AssertionError(f'Unknown trade type "{trade.trade_type}" encountered')
-
-        return True, prev_time
-
-    def get_calculated_asset_amount(self, asset: Asset) -> Optional[FVal]:
-        """Get the amount of asset accounting has calculated we should have after
-        the history has been processed
-        """
-        if asset not in self.events.events:
-            return None
-
-        amount = FVal(0)
-        for buy_event in self.events.events[asset].buys:
-            amount += buy_event.amount
-        return amount
@@ -0,0 +1,336 @@
+import heapq
+from collections import deque
+from enum import Enum
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Tuple, Type, TypeVar
+
+from rotkehlchen.constants.misc import ZERO
+from rotkehlchen.errors import DeserializationError
+from rotkehlchen.exchanges.data_structures import BuyEvent, deserialize_buy_event
+from rotkehlchen.fval import FVal
+from rotkehlchen.typing import Timestamp
+
+
+class CostBasisMethod(Enum):
+    """The method with which to choose which buys a sell uses up"""
+    FIFO = 0  # first in first out
+    LIFO = 1  # last in first out
+    HIFO = 2  # highest (buy rate) in first out
+    ACB = 3  # average cost basis
+
+    def __str__(self) -> str:
+        if self == CostBasisMethod.FIFO:
+            return 'fifo'
+        elif self == CostBasisMethod.LIFO:
+            return 'lifo'
+        elif self == CostBasisMethod.HIFO:
+            return 'hifo'
+        elif self == CostBasisMethod.ACB:
+            return 'acb'
+
+        raise RuntimeError(f'Corrupt value {self} for CostBasisMethod -- Should never happen')
+
+    def serialize(self) -> str:
+        return str(self)
+
+    @staticmethod
+    def deserialize(symbol: str) -> 'CostBasisMethod':
+        if symbol == 'fifo':
+            return CostBasisMethod.FIFO
+        elif symbol == 'lifo':
+            return CostBasisMethod.LIFO
+        elif symbol == 'hifo':
+            return CostBasisMethod.HIFO
+        elif symbol == 'acb':
+            return CostBasisMethod.ACB
+
+        raise DeserializationError(f'Tried to deserialize invalid cost basis method: {symbol}')
+
+
+T = TypeVar('T', bound='LotStore')
+
+
+class LotStore():
+    """The buys (lots) of an asset that have not been sold yet
+
+    Each cost basis method has its own lot store which decides which lot a sell
+    uses up next. The next lot can be used up entirely with pop_next() or partially
+    with reduce_next(). The sum of the amounts and of the costs (amount * rate) of
+    all lots is kept up to date so that it does not need to be recomputed.
+    The lots in the store should only be modified through the store's methods.
+    """
+    __slots__ = ('total_amount', 'total_cost')
+
+    def __init__(self, buys: Iterable[BuyEvent] = ()) -> None:
+        self.total_amount = ZERO
+        self.total_cost = ZERO
+        for buy in buys:
+            self.append(buy)
+
+    def __len__(self) -> int:
+        raise NotImplementedError('__len__() should only be implemented by subclasses')
+
+    def __iter__(self) -> Iterator[BuyEvent]:
+        raise NotImplementedError('__iter__() should only be implemented by subclasses')
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({list(self)!r})'
+
+    def _add_to_totals(self, amount: FVal, rate: FVal) -> None:
+        self.total_amount += amount
+        self.total_cost += amount * rate
+
+    def _remove_from_totals(self, amount: FVal, rate: FVal) -> None:
+        if len(self) == 0:
+            # Start from scratch so that no rounding errors accumulate in the sums
+            self.total_amount = ZERO
+            self.total_cost = ZERO
+        else:
+            self.total_amount -= amount
+            self.total_cost -= amount * rate
+
+    def append(self, buy: BuyEvent) -> None:
+        """Adds a new buy. Buys should be added in chronological order"""
+        raise NotImplementedError('append() should only be implemented by subclasses')
+
+    def peek_next(self) -> BuyEvent:
+        """Returns the lot that a sell would use up next. Raises IndexError if empty"""
+        raise NotImplementedError('peek_next() should only be implemented by subclasses')
+
+    def pop_next(self) -> BuyEvent:
+        """Removes and returns the next lot. Raises IndexError if empty"""
+        raise NotImplementedError('pop_next() should only be implemented by subclasses')
+
+    def reduce_next(self, amount: FVal) -> None:
+        """Reduces the amount of the next lot by the given amount
+
+        The amount should be less than the amount of the next lot.
+        Raises IndexError if empty.
+        """
+        raise NotImplementedError('reduce_next() should only be implemented by subclasses')
+
+    def amount_bought_before(self, timestamp: Timestamp) -> FVal:
+        """Returns the amount of all lots bought before the given timestamp"""
+        amount = ZERO
+        for buy in self:
+            if buy.timestamp < timestamp:
+                amount += buy.amount
+        return amount
+
+    def _lots_in_order_added(self) -> Iterable[BuyEvent]:
+        return self
+
+    def serialize(self) -> Dict[str, Any]:
+        """Serializes the store into a JSON compatible dict for deserialize()
+
+        The sums are kept as they are instead of being recalculated from the lots
+        so that the deserialized store gives exactly the same results.
+        """
+        return {
+            'total_amount': str(self.total_amount),
+            'total_cost': str(self.total_cost),
+            'lots': [buy.serialize() for buy in self._lots_in_order_added()],
+        }
+
+    @classmethod
+    def deserialize(cls: Type[T], data: Dict[str, Any]) -> T:
+        """Recreates a store of this class from the dict created by serialize()"""
+        store = cls(deserialize_buy_event(lot) for lot in data['lots'])
+        store.total_amount = FVal(data['total_amount'])
+        store.total_cost = FVal(data['total_cost'])
+        return store
+
+
+class _DequeLotStore(LotStore):
+    """Lots kept in chronological order and used up from one of the two ends
+
+    Used up lots are popped from their end and a partially used lot is reduced
+    in place, so a sell costs the same no matter how many lots are kept.
+    """
+    __slots__ = ('_buys',)
+
+    def __init__(self, buys: Iterable[BuyEvent] = ()) -> None:
+        self._buys: Deque[BuyEvent] = deque()
+        super().__init__(buys)
+
+    def __len__(self) -> int:
+        return len(self._buys)
+
+    def __iter__(self) -> Iterator[BuyEvent]:
+        return iter(self._buys)
+
+    def __getitem__(self, index: int) -> BuyEvent:
+        return self._buys[index]
+
+    def append(self, buy: BuyEvent) -> None:
+        self._buys.append(buy)
+        self._add_to_totals(buy.amount, buy.rate)
+
+    def amount_bought_before(self, timestamp: Timestamp) -> FVal:
+        # The lots are in chronological order so the old ones come first
+        amount = ZERO
+        for buy in self._buys:
+            if buy.timestamp >= timestamp:
+                break
+            amount += buy.amount
+        return amount
+
+
+class FIFOLotStore(_DequeLotStore):
+    """The oldest lot is used up first"""
+    __slots__ = ()
+
+    def peek_next(self) -> BuyEvent:
+        return self._buys[0]
+
+    def pop_next(self) -> BuyEvent:
+        buy = self._buys.popleft()
+        self._remove_from_totals(buy.amount, buy.rate)
+        return buy
+
+    def reduce_next(self, amount: FVal) -> None:
+        buy = self._buys[0]
+        buy.amount -= amount
+        self._remove_from_totals(amount, buy.rate)
+
+
+class LIFOLotStore(_DequeLotStore):
+    """The newest lot is used up first"""
+    __slots__ = ()
+
+    def peek_next(self) -> BuyEvent:
+        return self._buys[-1]
+
+    def pop_next(self) -> BuyEvent:
+        buy = self._buys.pop()
+        self._remove_from_totals(buy.amount, buy.rate)
+        return buy
+
+    def reduce_next(self, amount: FVal) -> None:
+        buy = self._buys[-1]
+        buy.amount -= amount
+        self._remove_from_totals(amount, buy.rate)
+
+
+class HIFOLotStore(LotStore):
+    """Lots kept in a heap so that the one with the highest rate is used up first
+
+    Lots with the same rate are used up in chronological order.
+    """
+    __slots__ = ('_heap', '_counter')
+
+    def __init__(self, buys: Iterable[BuyEvent] = ()) -> None:
+        self._heap: List[Tuple[FVal, int, BuyEvent]] = []
+        self._counter = 0
+        super().__init__(buys)
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def __iter__(self) -> Iterator[BuyEvent]:
+        return (entry[2] for entry in self._heap)
+
+    def _lots_in_order_added(self) -> Iterable[BuyEvent]:
+        # Adding the lots back in the same order keeps ties between equal rates
+        return (entry[2] for entry in sorted(self._heap, key=lambda entry: entry[1]))
+
+    def append(self, buy: BuyEvent) -> None:
+        # The counter breaks ties between equal rates without ever comparing the buys
+        heapq.heappush(self._heap, (-buy.rate, self._counter, buy))
+        self._counter += 1
+        self._add_to_totals(buy.amount, buy.rate)
+
+    def peek_next(self) -> BuyEvent:
+        return self._heap[0][2]
+
+    def pop_next(self) -> BuyEvent:
+        buy = heapq.heappop(self._heap)[2]
+        self._remove_from_totals(buy.amount, buy.rate)
+        return buy
+
+    def reduce_next(self, amount: FVal) -> None:
+        # The heap is ordered by rate so reducing the amount keeps it valid
+        buy = self._heap[0][2]
+        buy.amount -= amount
+        self._remove_from_totals(amount, buy.rate)
+
+
+class AverageCostLotStore(LotStore):
+    """All lots are merged into a single lot at the average cost of all buys
+
+    The merged lot has the average buy rate and fee rate of all the buys and the
+    timestamp of the latest buy, so it is tax free only if every buy it contains is.
+    """
+    __slots__ = ('_total_fee', '_latest_timestamp')
+
+    def __init__(self, buys: Iterable[BuyEvent] = ()) -> None:
+        self._total_fee = ZERO
+        self._latest_timestamp = Timestamp(0)
+        super().__init__(buys)
+
+    def __len__(self) -> int:
+        return 0 if self.total_amount == ZERO else 1
+
+    def __iter__(self) -> Iterator[BuyEvent]:
+        if self.total_amount != ZERO:
+            yield self.peek_next()
+
+    def serialize(self) -> Dict[str, Any]:
+        return {
+            'total_amount': str(self.total_amount),
+            'total_cost': str(self.total_cost),
+            'total_fee': str(self._total_fee),
+            'latest_timestamp': self._latest_timestamp,
+        }
+
+    @classmethod
+    def deserialize(
+            cls: Type['AverageCostLotStore'],
+            data: Dict[str, Any],
+    ) -> 'AverageCostLotStore':
+        store = cls()
+        store.total_amount = FVal(data['total_amount'])
+        store.total_cost = FVal(data['total_cost'])
+        store._total_fee = FVal(data['total_fee'])
+        store._latest_timestamp = Timestamp(data['latest_timestamp'])
+        return store
+
+    def append(self, buy: BuyEvent) -> None:
+        if buy.amount == ZERO:
+            return
+
+        self._add_to_totals(buy.amount, buy.rate)
+        self._total_fee += buy.amount * buy.fee_rate
+        self._latest_timestamp = max(self._latest_timestamp, buy.timestamp)
+
+    def peek_next(self) -> BuyEvent:
+        if self.total_amount == ZERO:
+            raise IndexError('peek from an empty lot store')
+
+        return BuyEvent(
+            timestamp=self._latest_timestamp,
+            amount=self.total_amount,
+            rate=self.total_cost / self.total_amount,
+            fee_rate=self._total_fee / self.total_amount,
+        )
+
+    def pop_next(self) -> BuyEvent:
+        buy = self.peek_next()
+        self.total_amount = ZERO
+        self.total_cost = ZERO
+        self._total_fee = ZERO
+        self._latest_timestamp = Timestamp(0)
+        return buy
+
+    def reduce_next(self, amount: FVal) -> None:
+        buy = self.peek_next()
+        self.total_amount -= amount
+        self.total_cost -= amount * buy.rate
+        self._total_fee -= amount * buy.fee_rate
+
+
+LOT_STORES: Dict[CostBasisMethod, Type[LotStore]] = {
+    CostBasisMethod.FIFO: FIFOLotStore,
+    CostBasisMethod.LIFO: LIFOLotStore,
+    CostBasisMethod.HIFO: HIFOLotStore,
+    CostBasisMethod.ACB: AverageCostLotStore,
+}
@@ -1,17 +1,19 @@
 import logging
-from typing import Dict, Optional, Tuple
+from typing import Callable, Dict, Iterable, Optional, Tuple
 
+from rotkehlchen.accounting.cost_basis import LOT_STORES, LotStore
 from rotkehlchen.accounting.structures import DefiEvent, DefiEventType
 from rotkehlchen.assets.asset import Asset
-from rotkehlchen.constants import BTC_BCH_FORK_TS, ETH_DAO_FORK_TS, ZERO
+from rotkehlchen.constants import BTC_BCH_FORK_TS, ETH_DAO_FORK_TS, ONE, ZERO
 from rotkehlchen.constants.assets import A_BCH, A_BTC, A_ETC, A_ETH
 from rotkehlchen.csv_exporter import CSVExporter
+from rotkehlchen.db.settings import DEFAULT_COST_BASIS_METHOD
 from rotkehlchen.errors import NoPriceForGivenTimestamp, PriceQueryUnknownFromAsset
 from rotkehlchen.exchanges.data_structures import BuyEvent, Events, MarginPosition, SellEvent
 from rotkehlchen.fval import FVal
 from rotkehlchen.history import PriceHistorian
 from rotkehlchen.logging import RotkehlchenLogsAdapter
-from rotkehlchen.typing import Fee, Location, Timestamp
+from rotkehlchen.typing import Fee, Location, Price, Timestamp
 from rotkehlchen.utils.misc import taxable_gain_for_sell, timestamp_to_date, ts_now
 
 logger = logging.getLogger(__name__)
@@ -20,10 +22,17 @@ log = RotkehlchenLogsAdapter(logger)
 
 class TaxableEvents():
 
-    def __init__(self, csv_exporter: CSVExporter, profit_currency: Asset) -> None:
+    def __init__(
+            self,
+            csv_exporter: CSVExporter,
+            profit_currency: Asset,
+            query_historical_price: Optional[Callable[[Asset, Asset, Timestamp], Price]] = None,
+    ) -> None:
         self.events: Dict[Asset, Events] = {}
         self.csv_exporter = csv_exporter
         self.profit_currency = profit_currency
+        # Queries the rates that were not prefetched. If not given the price historian does
+        self.query_historical_price = query_historical_price
 
         # If this flag is True when your asset is being forcefully sold as a
         # loan/margin settlement then profit/loss is also calculated before the entire
@@ -32,9 +41,12 @@ class TaxableEvents():
 
         self._taxfree_after_period: Optional[int] = None
         self._include_crypto2crypto: Optional[bool] = None
+        self.cost_basis_method = DEFAULT_COST_BASIS_METHOD
+        self.prefetched_rates: Dict[Tuple[Asset, Timestamp], FVal] = {}
 
     def reset(self, start_ts: Timestamp, end_ts: Timestamp) -> None:
         self.events = {}
+        self.prefetched_rates = {}
         self.query_start_ts = start_ts
         self.query_end_ts = end_ts
         self.general_trade_profit_loss = ZERO
@@ -63,6 +75,9 @@ class TaxableEvents():
         assert is_valid, 'set taxfree_after_period should only get int or None'
         self._taxfree_after_period = value
 
+    def _new_lot_store(self) -> LotStore:
+        return LOT_STORES[self.cost_basis_method]()
+
     def calculate_asset_details(self) -> Dict[Asset, Tuple[FVal, FVal]]:
         """ Calculates what amount of all assets has been untouched for a year and
         is hence tax-free and also the average buy price for each asset"""
@@ -70,19 +85,18 @@ class TaxableEvents():
         now = ts_now()
         for asset, events in self.events.items():
             tax_free_amount_left = ZERO
-            amount_sum = ZERO
-            average = ZERO
-            for buy_event in events.buys:
-                if self.taxfree_after_period is not None:
-                    if buy_event.timestamp + self.taxfree_after_period < now:
-                        tax_free_amount_left += buy_event.amount
-                amount_sum += buy_event.amount
-                average += buy_event.amount * buy_event.rate
-
-            if amount_sum == ZERO:
+            if self.taxfree_after_period is not None:
+                tax_free_amount_left = events.buys.amount_bought_before(
+                    Timestamp(now - self.taxfree_after_period),
+                )
+
+            if events.buys.total_amount == ZERO:
                 self.details[asset] = (ZERO, ZERO)
             else:
-                self.details[asset] = (tax_free_amount_left, average / amount_sum)
+                self.details[asset] = (
+                    tax_free_amount_left,
+                    events.buys.total_cost / events.buys.total_amount,
+                )
 
         return self.details
 
@@ -97,7 +111,11 @@ class TaxableEvents():
         or with reading the response returned by the server
         """
         if asset == self.profit_currency:
-            rate = FVal(1)
+            rate = ONE
+        elif (asset, timestamp) in self.prefetched_rates:
+            rate = self.prefetched_rates[(asset, timestamp)]
+        elif self.query_historical_price is not None:
+            rate = self.query_historical_price(asset, self.profit_currency, timestamp)
         else:
             rate = PriceHistorian().query_historical_price(
                 from_asset=asset,
@@ -106,6 +124,28 @@ class TaxableEvents():
             )
         return rate
 
+    def prefetch_rates_in_profit_currency(
+            self,
+            queries: Iterable[Tuple[Asset, Timestamp]],
+    ) -> None:
+        """Query in batch the profit_currency prices of the given assets at the given
+        timestamps so that get_rate_in_profit_currency() finds them ready.
+
+        Rates that can't be found in batch are simply queried one by one when needed.
+        """
+        price_queries = [
+            (asset, self.profit_currency, timestamp)
+            for asset, timestamp in queries
+            if asset != self.profit_currency
+        ]
+        # Query all the missing price histories concurrently before looking up the rates
+        PriceHistorian().warm_price_histories(price_queries)
+        prices = PriceHistorian().query_historical_prices(price_queries)
+        self.prefetched_rates = {
+            (asset, timestamp): price for (asset, _, timestamp), price in prices.items()
+        }
+        log.debug('Prefetched rates in profit currency', number=len(self.prefetched_rates))
+
     def reduce_asset_amount(self, asset: Asset, amount: FVal) -> bool:
         """Searches all buy events for asset and reduces them by amount
         Returns True if enough buy events to reduce the asset by amount were
@@ -118,28 +158,18 @@ class TaxableEvents():
         if asset not in self.events or len(self.events[asset].buys) == 0:
             return False
 
-        remaining_amount_from_last_buy = FVal('-1')
+        buys = self.events[asset].buys
         remaining_amount = amount
-        for idx, buy_event in enumerate(self.events[asset].buys):
-            if remaining_amount < buy_event.amount:
-                stop_index = idx
-                remaining_amount_from_last_buy = buy_event.amount - remaining_amount
-                # stop iterating since we found all buys to satisfy reduction
-                break
-            else:
-                remaining_amount -= buy_event.amount
-                if idx == len(self.events[asset].buys) - 1:
-                    stop_index = idx + 1
-
-        # Otherwise, delete all the used up buys from the list
-        del self.events[asset].buys[:stop_index]
-        # and modify the amount of the buy where we stopped if there is one
-        if remaining_amount_from_last_buy != FVal('-1'):
-            self.events[asset].buys[0].amount = remaining_amount_from_last_buy
-        elif remaining_amount != ZERO:
-            return False
+        while len(buys) != 0:
+            if remaining_amount < buys.peek_next().amount:
+                buys.reduce_next(remaining_amount)
+                return True
+
+            remaining_amount -= buys.pop_next().amount
+            if remaining_amount == ZERO:
+                return True
 
-        return True
+        return False
 
     def handle_prefork_asset_buys(
             self,
@@ -326,7 +356,7 @@ class TaxableEvents():
         )
 
         if bought_asset not in self.events:
-            self.events[bought_asset] = Events([], [])
+            self.events[bought_asset] = Events(self._new_lot_store(), [])
 
         gross_cost = bought_amount * buy_rate
         cost_in_profit_currency = gross_cost + fee_in_profit_currency
@@ -463,7 +493,7 @@ class TaxableEvents():
         """
 
         if selling_asset not in self.events:
-            self.events[selling_asset] = Events([], [])
+            self.events[selling_asset] = Events(self._new_lot_store(), [])
 
         self.events[selling_asset].sells.append(
             SellEvent(
@@ -610,9 +640,10 @@ class TaxableEvents():
     ) -> Tuple[FVal, FVal, FVal]:
         """
         When selling `selling_amount` of `selling_asset` at `timestamp` this function
-        calculates using the first-in-first-out rule the corresponding buy/s from
-        which to do profit calculation. Also applies the one year rule after which
-        a sell is not taxable in Germany.
+        finds the corresponding buy/s from which to do profit calculation. Which
+        buys are used up first is decided by the LotStore of the configured cost
+        basis method. Also applies the one year rule after which a sell is not
+        taxable in Germany.
 
         Returns a tuple of 3 values:
             - `taxable_amount`: The amount out of `selling_amount` that is taxable,
@@ -622,14 +653,26 @@ class TaxableEvents():
             - `taxfree_bought_cost`: How much it cost in `profit_currency` to buy
                                      the taxfree_amount (selling_amount - taxable_amount)
         """
+        buys = self.events[selling_asset].buys
+        if len(buys) == 0:
+            log.critical(
+                'No documented buy found for "{}" before {}'.format(
+                    selling_asset,
+                    timestamp_to_date(timestamp, formatstr='%d/%m/%Y %H:%M:%S'),
+                ),
+            )
+            # That means we had no documented buy for that asset. This is not good
+            # because we can't prove a corresponding buy and as such we are burdened
+            # calculating the entire sell as profit which needs to be taxed
+            return selling_amount, ZERO, ZERO
+
         remaining_sold_amount = selling_amount
-        stop_index = -1
         taxfree_bought_cost = ZERO
         taxable_bought_cost = ZERO
         taxable_amount = ZERO
         taxfree_amount = ZERO
-        remaining_amount_from_last_buy = FVal('-1')
-        for idx, buy_event in enumerate(self.events[selling_asset].buys):
+        while len(buys) != 0:
+            buy_event = buys.peek_next()
             if self.taxfree_after_period is None:
                 at_taxfree_period = False
             else:
@@ -638,7 +681,6 @@ class TaxableEvents():
                 )
 
             if remaining_sold_amount < buy_event.amount:
-                stop_index = idx
                 buying_cost = remaining_sold_amount.fma(
                     buy_event.rate,
                     (buy_event.fee_rate * remaining_sold_amount),
@@ -651,7 +693,6 @@ class TaxableEvents():
                     taxable_amount += remaining_sold_amount
                     taxable_bought_cost += buying_cost
 
-                remaining_amount_from_last_buy = buy_event.amount - remaining_sold_amount
                 log.debug(
                     'Sell uses up part of historical buy',
                     sensitive_log=True,
@@ -663,54 +704,40 @@ class TaxableEvents():
                     profit_currency=self.profit_currency,
                     trade_timestamp=buy_event.timestamp,
                 )
+                # modify the amount of the buy where we stopped
+                buys.reduce_next(remaining_sold_amount)
+                remaining_sold_amount = ZERO
                 # stop iterating since we found all buys to satisfy this sell
                 break
-            else:
-                buying_cost = buy_event.amount.fma(
-                    buy_event.rate,
-                    (buy_event.fee_rate * buy_event.amount),
-                )
-                remaining_sold_amount -= buy_event.amount
-                if at_taxfree_period:
-                    taxfree_amount += buy_event.amount
-                    taxfree_bought_cost += buying_cost
-                else:
-                    taxable_amount += buy_event.amount
-                    taxable_bought_cost += buying_cost
-
-                log.debug(
-                    'Sell uses up entire historical buy',
-                    sensitive_log=True,
-                    tax_status='TAX-FREE' if at_taxfree_period else 'TAXABLE',
-                    bought_amount=buy_event.amount,
-                    asset=selling_asset,
-                    trade_buy_rate=buy_event.rate,
-                    profit_currency=self.profit_currency,
-                    trade_timestamp=buy_event.timestamp,
-                )
 
-                # If the sell used up the last historical buy
-                if idx == len(self.events[selling_asset].buys) - 1:
-                    stop_index = idx + 1
+            buying_cost = buy_event.amount.fma(
+                buy_event.rate,
+                (buy_event.fee_rate * buy_event.amount),
+            )
+            remaining_sold_amount -= buy_event.amount
+            if at_taxfree_period:
+                taxfree_amount += buy_event.amount
+                taxfree_bought_cost += buying_cost
+            else:
+                taxable_amount += buy_event.amount
+                taxable_bought_cost += buying_cost
 
-        if len(self.events[selling_asset].buys) == 0:
-            log.critical(
-                'No documented buy found for "{}" before {}'.format(
-                    selling_asset,
-                    timestamp_to_date(timestamp, formatstr='%d/%m/%Y %H:%M:%S'),
-                ),
+            log.debug(
+                'Sell uses up entire historical buy',
+                sensitive_log=True,
+                tax_status='TAX-FREE' if at_taxfree_period else 'TAXABLE',
+                bought_amount=buy_event.amount,
+                asset=selling_asset,
+                trade_buy_rate=buy_event.rate,
+                profit_currency=self.profit_currency,
+                trade_timestamp=buy_event.timestamp,
             )
-            # That means we had no documented buy for that asset. This is not good
-            # because we can't prove a corresponding buy and as such we are burdened
-            # calculating the entire sell as profit which needs to be taxed
-            return selling_amount, ZERO, ZERO
+            # the used up buy is removed from the lot store
+            buys.pop_next()
+            if remaining_sold_amount == ZERO:
+                break
 
-        # Otherwise, delete all the used up buys from the list
-        del self.events[selling_asset].buys[:stop_index]
-        # and modify the amount of the buy where we stopped if there is one
-        if remaining_amount_from_last_buy != FVal('-1'):
-            self.events[selling_asset].buys[0].amount = remaining_amount_from_last_buy
-        elif remaining_sold_amount != ZERO:
+        if remaining_sold_amount != ZERO:
             # if we still have sold amount but no buys to satisfy it then we only
             # found buys to partially satisfy the sell
             adjusted_amount = selling_amount - taxfree_amount
@@ -750,7 +777,7 @@ class TaxableEvents():
         rate = self.get_rate_in_profit_currency(gained_asset, timestamp)
 
         if gained_asset not in self.events:
-            self.events[gained_asset] = Events([], [])
+            self.events[gained_asset] = Events(self._new_lot_store(), [])
 
         net_gain_amount = gained_amount - fee_in_asset
         gain_in_profit_currency = net_gain_amount * rate
@@ -799,9 +826,9 @@ class TaxableEvents():
         or with reading the response returned by the server
         """
         if margin.pl_currency not in self.events:
-            self.events[margin.pl_currency] = Events([], [])
+            self.events[margin.pl_currency] = Events(self._new_lot_store(), [])
         if margin.fee_currency not in self.events:
-            self.events[margin.fee_currency] = Events([], [])
+            self.events[margin.fee_currency] = Events(self._new_lot_store(), [])
 
         pl_currency_rate = self.get_rate_in_profit_currency(margin.pl_currency, margin.close_time)
         fee_currency_rate = self.get_rate_in_profit_currency(margin.pl_currency, margin.close_time)
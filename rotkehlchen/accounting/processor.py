@@ -0,0 +1,598 @@
+import hashlib
+import logging
+from pathlib import Path
+from typing import Callable, Iterable, List, Optional, Tuple, cast
+
+from rotkehlchen.accounting.cost_basis import LOT_STORES
+from rotkehlchen.accounting.events import TaxableEvents
+from rotkehlchen.accounting.structures import DefiEvent
+from rotkehlchen.assets.asset import Asset
+from rotkehlchen.constants.assets import A_BTC, A_ETH
+from rotkehlchen.csv_exporter import CSVExporter
+from rotkehlchen.db.settings import DBSettings
+from rotkehlchen.errors import (
+    DeserializationError,
+    NoPriceForGivenTimestamp,
+    PriceQueryUnknownFromAsset,
+    RemoteError,
+    UnknownAsset,
+    UnsupportedAsset,
+)
+from rotkehlchen.exchanges.data_structures import (
+    AssetMovement,
+    Events,
+    Loan,
+    MarginPosition,
+    Trade,
+    TradeType,
+    deserialize_sell_event,
+)
+from rotkehlchen.fval import FVal
+from rotkehlchen.logging import RotkehlchenLogsAdapter
+from rotkehlchen.transactions import EthereumTransaction
+from rotkehlchen.typing import Fee, Price, Timestamp
+from rotkehlchen.utils.accounting import (
+    TaxableAction,
+    action_get_assets,
+    action_get_timestamp,
+    action_get_type,
+)
+from rotkehlchen.utils.misc import timestamp_to_date
+from rotkehlchen.utils.serialization import rlk_jsondumps, rlk_jsonloads_exact_dict
+
+logger = logging.getLogger(__name__)
+log = RotkehlchenLogsAdapter(logger)
+
+CHECKPOINT_EVENTS_ATTRIBUTES = (
+    'general_trade_profit_loss',
+    'taxable_trade_profit_loss',
+    'loan_profit',
+    'defi_profit_loss',
+    'settlement_losses',
+    'margin_positions_profit_loss',
+)
+CHECKPOINT_ACCOUNTANT_ATTRIBUTES = (
+    'last_gas_price',
+    'eth_transactions_gas_costs',
+    'asset_movement_fees',
+)
+CHECKPOINT_CSV_ATTRIBUTES = (
+    'trades_csv',
+    'loan_profits_csv',
+    'asset_movements_csv',
+    'tx_gas_costs_csv',
+    'margin_positions_csv',
+    'loan_settlements_csv',
+    'defi_events_csv',
+    'all_events_csv',
+    'all_events',
+)
+
+# (actions_processed, actions_hash, state) of a checkpoint of history processing
+Checkpoint = Tuple[int, str, bytes]
+
+
+def hash_next_action(actions_hash: str, action: TaxableAction) -> str:
+    """Returns the hash of all actions up to the given one out of the hash of all
+    the actions before it. The hash of no actions is the empty string."""
+    return hashlib.sha256((actions_hash + repr(action)).encode()).hexdigest()
+
+
+class HistoryProcessor():
+    """Processes the actions of the history one after the other to determine the
+    price and time at which every asset was obtained and the profit/loss
+
+    Needs neither the DB nor the network, apart from querying the rates that were
+    not prefetched, so that it can also run in a worker process. What should happen
+    with the messages, progress and checkpoints of processing is up to the subclasses.
+    """
+
+    def __init__(
+            self,
+            profit_currency: Asset,
+            user_directory: Path,
+            create_csv: bool,
+            query_historical_price: Optional[Callable[[Asset, Asset, Timestamp], Price]] = None,
+    ) -> None:
+        self.profit_currency = profit_currency
+        self.csvexporter = CSVExporter(profit_currency, user_directory, create_csv)
+        self.events = TaxableEvents(self.csvexporter, profit_currency, query_historical_price)
+
+        self.start_ts = Timestamp(0)
+        self.ignored_assets: List[Asset] = []
+        self.asset_movement_fees = FVal(0)
+        self.eth_transactions_gas_costs = FVal(0)
+        self.last_gas_price = FVal(0)
+        # The (type, message) of all the messages processing the history gave so far
+        # so that they can be given again when processing resumes from a checkpoint
+        self.processing_messages: List[Tuple[str, str]] = []
+
+        self.started_processing_timestamp = Timestamp(-1)
+        self.currently_processing_timestamp = Timestamp(-1)
+
+    @property
+    def general_trade_pl(self) -> FVal:
+        return self.events.general_trade_profit_loss
+
+    @property
+    def taxable_trade_pl(self) -> FVal:
+        return self.events.taxable_trade_profit_loss
+
+    def _customize(self, settings: DBSettings) -> None:
+        """Customize parameters after pulling DBSettings"""
+        if settings.include_crypto2crypto is not None:
+            self.events.include_crypto2crypto = settings.include_crypto2crypto
+
+        if settings.taxfree_after_period is not None:
+            given_taxfree_after_period: Optional[int] = settings.taxfree_after_period
+            if given_taxfree_after_period == -1:
+                # That means user requested to disable taxfree_after_period
+                given_taxfree_after_period = None
+
+            self.events.taxfree_after_period = given_taxfree_after_period
+
+        self.events.cost_basis_method = settings.cost_basis_method
+        self.profit_currency = settings.main_currency
+        self.events.profit_currency = settings.main_currency
+        self.csvexporter.profit_currency = settings.main_currency
+
+    def _give_message(self, message_type: str, msg: str) -> None:
+        """Gives a warning or error message of history processing to the user"""
+        raise NotImplementedError('_give_message() should only be implemented by subclasses')
+
+    def _action_processed(self) -> None:
+        """Called before each action is processed so that progress can be reported"""
+        raise NotImplementedError('_action_processed() should only be implemented by subclasses')
+
+    def _add_checkpoint(self, checkpoint: Checkpoint) -> None:
+        """Called with each checkpoint of the state taken during processing"""
+        raise NotImplementedError('_add_checkpoint() should only be implemented by subclasses')
+
+    def _add_processing_message(self, message_type: str, msg: str) -> None:
+        self.processing_messages.append((message_type, msg))
+        self._give_message(message_type, msg)
+
+    def get_fee_in_profit_currency(self, trade: Trade) -> Fee:
+        """Get the profit_currency rate of the fee of the given trade
+
+        May raise:
+        - PriceQueryUnknownFromAsset if the from asset is known to miss from cryptocompare
+        - NoPriceForGivenTimestamp if we can't find a price for the asset in the given
+        timestamp from the price oracle
+        - RemoteError if there is a problem reaching the price oracle server
+        or with reading the response returned by the server
+        """
+        fee_rate = self.events.get_rate_in_profit_currency(trade.fee_currency, trade.timestamp)
+        return Fee(fee_rate * trade.fee)
+
+    def add_asset_movement_to_events(self, movement: AssetMovement) -> None:
+        """
+        Adds the given asset movement to the processed events
+
+        May raise:
+        - PriceQueryUnknownFromAsset if the from asset is known to miss from cryptocompare
+        - NoPriceForGivenTimestamp if we can't find a price for the asset in the given
+        timestamp from cryptocompare
+        - RemoteError if there is a problem reaching the price oracle server
+        or with reading the response returned by the server
+        """
+        timestamp = movement.timestamp
+        if timestamp < self.start_ts:
+            return
+
+        if movement.asset.identifier == 'KFEE':
+            # There is no reason to process deposits of KFEE for kraken as it has only value
+            # internal to kraken and KFEE has no value and will error at cryptocompare price query
+            return
+
+        fee_rate = self.events.get_rate_in_profit_currency(movement.fee_asset, timestamp)
+        cost = movement.fee * fee_rate
+        self.asset_movement_fees += cost
+        log.debug(
+            'Accounting for asset movement',
+            sensitive_log=True,
+            category=movement.category,
+            asset=movement.asset,
+            cost_in_profit_currency=cost,
+            timestamp=timestamp,
+            exchange_name=movement.location,
+        )
+
+        self.csvexporter.add_asset_movement(
+            exchange=movement.location,
+            category=movement.category,
+            asset=movement.asset,
+            fee=movement.fee,
+            rate=fee_rate,
+            timestamp=timestamp,
+        )
+
+    def account_for_gas_costs(
+            self,
+            transaction: EthereumTransaction,
+            include_gas_costs: bool,
+    ) -> None:
+        """
+        Accounts for the gas costs of the given ethereum transaction
+
+        May raise:
+        - PriceQueryUnknownFromAsset if the from asset is known to miss from cryptocompare
+        - NoPriceForGivenTimestamp if we can't find a price for the asset in the given
+        timestamp from cryptocompare
+        - RemoteError if there is a problem reaching the price oracle server
+        or with reading the response returned by the server
+        """
+        if not include_gas_costs:
+            return
+        if transaction.timestamp < self.start_ts:
+            return
+
+        if transaction.gas_price == -1:
+            gas_price = self.last_gas_price
+        else:
+            gas_price = transaction.gas_price
+            self.last_gas_price = transaction.gas_price
+
+        rate = self.events.get_rate_in_profit_currency(A_ETH, transaction.timestamp)
+        eth_burned_as_gas = (transaction.gas_used * gas_price) / FVal(10 ** 18)
+        cost = eth_burned_as_gas * rate
+        self.eth_transactions_gas_costs += cost
+
+        log.debug(
+            'Accounting for ethereum transaction gas cost',
+            sensitive_log=True,
+            gas_used=transaction.gas_used,
+            gas_price=gas_price,
+            timestamp=transaction.timestamp,
+        )
+
+        self.csvexporter.add_tx_gas_cost(
+            transaction_hash=transaction.tx_hash,
+            eth_burned_as_gas=eth_burned_as_gas,
+            rate=rate,
+            timestamp=transaction.timestamp,
+        )
+
+    def trade_add_to_sell_events(self, trade: Trade, loan_settlement: bool) -> None:
+        """
+        Adds the given trade to the sell events
+
+        May raise:
+        - PriceQueryUnknownFromAsset if the from asset is known to miss from cryptocompare
+        - NoPriceForGivenTimestamp if we can't find a price for the asset in the given
+        timestamp from cryptocompare
+        - RemoteError if there is a problem reaching the price oracle server
+        or with reading the response returned by the server
+        """
+        selling_asset = trade.base_asset
+        receiving_asset = trade.quote_asset
+        receiving_asset_rate = self.events.get_rate_in_profit_currency(
+            receiving_asset,
+            trade.timestamp,
+        )
+        selling_rate = receiving_asset_rate * trade.rate
+        fee_in_profit_currency = self.get_fee_in_profit_currency(trade)
+        gain_in_profit_currency = selling_rate * trade.amount
+
+        if not loan_settlement:
+            self.events.add_sell_and_corresponding_buy(
+                location=trade.location,
+                selling_asset=selling_asset,
+                selling_amount=trade.amount,
+                receiving_asset=receiving_asset,
+                receiving_amount=trade.amount * trade.rate,
+                gain_in_profit_currency=gain_in_profit_currency,
+                total_fee_in_profit_currency=fee_in_profit_currency,
+                trade_rate=trade.rate,
+                rate_in_profit_currency=selling_rate,
+                timestamp=trade.timestamp,
+            )
+        else:
+            self.events.add_sell(
+                location=trade.location,
+                selling_asset=selling_asset,
+                selling_amount=trade.amount,
+                receiving_asset=None,
+                receiving_amount=None,
+                gain_in_profit_currency=gain_in_profit_currency,
+                total_fee_in_profit_currency=fee_in_profit_currency,
+                trade_rate=trade.rate,
+                rate_in_profit_currency=selling_rate,
+                timestamp=trade.timestamp,
+                loan_settlement=True,
+                is_virtual=False,
+            )
+
+    def _checkpoint_state(self) -> bytes:
+        state = {
+            'asset_events': {
+                asset.identifier: {
+                    'buys': events.buys.serialize(),
+                    'sells': [sell.serialize() for sell in events.sells],
+                } for asset, events in self.events.events.items()
+            },
+            'events': {x: getattr(self.events, x) for x in CHECKPOINT_EVENTS_ATTRIBUTES},
+            'accountant': {x: getattr(self, x) for x in CHECKPOINT_ACCOUNTANT_ATTRIBUTES},
+            'csv': {
+                x: getattr(self.csvexporter, x) for x in CHECKPOINT_CSV_ATTRIBUTES
+                if hasattr(self.csvexporter, x)
+            },
+            'messages': self.processing_messages,
+        }
+        return rlk_jsondumps(state).encode()
+
+    def _apply_state(self, state_data: bytes) -> bool:
+        """Sets the state of processing to the one given by _checkpoint_state()
+
+        Returns False and leaves the state as it is if the given state can't be read.
+        """
+        lot_store_type = LOT_STORES[self.events.cost_basis_method]
+        try:
+            state = rlk_jsonloads_exact_dict(state_data.decode())
+            asset_events = {
+                Asset(identifier): Events(
+                    buys=lot_store_type.deserialize(events['buys']),
+                    sells=[deserialize_sell_event(x) for x in events['sells']],
+                ) for identifier, events in state['asset_events'].items()
+            }
+            events_state = state['events']
+            accountant_state = state['accountant']
+            csv_state = state['csv']
+            messages = [(message_type, msg) for message_type, msg in state['messages']]
+        except (AssertionError, KeyError, TypeError, ValueError, UnknownAsset) as e:
+            log.error(f'Could not load accounting state due to {str(e)}. Ignoring it')
+            return False
+
+        self.events.events = asset_events
+        for name, value in events_state.items():
+            setattr(self.events, name, value)
+        for name, value in accountant_state.items():
+            setattr(self, name, value)
+        for name, value in csv_state.items():
+            setattr(self.csvexporter, name, value)
+        self.processing_messages = messages
+        return True
+
+    def _process_actions(
+            self,
+            actions: Iterable[TaxableAction],
+            end_ts: Timestamp,
+            db_settings: DBSettings,
+            actions_processed: int,
+            actions_hash: str,
+            checkpoint_interval: int,
+    ) -> None:
+        """Processes the given actions up to end_ts. They should come right after the
+        given number of already processed actions whose hash is given.
+
+        The state is checkpointed every checkpoint_interval actions and at the end.
+        """
+        last_checkpoint = actions_processed
+        # Skipping an action due to a problem that may go away in a later run
+        # means that the state from there on should not be checkpointed
+        can_checkpoint = True
+        prev_time = Timestamp(0)
+        for action in actions:
+            if action_get_timestamp(action) > end_ts:
+                break
+
+            actions_hash = hash_next_action(actions_hash, action)
+            actions_processed += 1
+            self._action_processed()
+            try:
+                (
+                    should_continue,
+                    prev_time,
+                ) = self.process_action(action, end_ts, prev_time, db_settings)
+            except PriceQueryUnknownFromAsset as e:
+                ts = action_get_timestamp(action)
+                self._add_processing_message(
+                    'error',
+                    f'Skipping action at '
+                    f' {timestamp_to_date(ts, formatstr="%d/%m/%Y, %H:%M:%S")} '
+                    f'during history processing due to an asset unknown to '
+                    f'cryptocompare being involved. Check logs for details',
+                )
+                log.error(
+                    f'Skipping action {str(action)} during history processing due to '
+                    f'cryptocompare not supporting an involved asset: {str(e)}',
+                )
+                continue
+            except NoPriceForGivenTimestamp as e:
+                ts = action_get_timestamp(action)
+                self._add_processing_message(
+                    'error',
+                    f'Skipping action at '
+                    f' {timestamp_to_date(ts, formatstr="%d/%m/%Y, %H:%M:%S")} '
+                    f'during history processing due to inability to find a price '
+                    f'at that point in time: {str(e)}. Check the logs for more details',
+                )
+                log.error(
+                    f'Skipping action {str(action)} during history processing due to '
+                    f'inability to query a price at that time: {str(e)}',
+                )
+                can_checkpoint = False
+                continue
+            except RemoteError as e:
+                ts = action_get_timestamp(action)
+                self._add_processing_message(
+                    'error',
+                    f'Skipping action at '
+                    f' {timestamp_to_date(ts, formatstr="%d/%m/%Y, %H:%M:%S")} '
+                    f'during history processing due to inability to reach an external '
+                    f'service at that point in time: {str(e)}. Check the logs for more details',
+                )
+                log.error(
+                    f'Skipping action {str(action)} during history processing due to '
+                    f'inability to reach an external service at that time: {str(e)}',
+                )
+                can_checkpoint = False
+                continue
+
+            if not should_continue:
+                break
+
+            if can_checkpoint and actions_processed % checkpoint_interval == 0:
+                self._add_checkpoint((actions_processed, actions_hash, self._checkpoint_state()))
+                last_checkpoint = actions_processed
+
+        if can_checkpoint and actions_processed != last_checkpoint:
+            self._add_checkpoint((actions_processed, actions_hash, self._checkpoint_state()))
+
+    def process_action(
+            self,
+            action: TaxableAction,
+            end_ts: Timestamp,
+            prev_time: Timestamp,
+            db_settings: DBSettings,
+    ) -> Tuple[bool, Timestamp]:
+        """Processes each individual action and returns whether we should continue
+        looping through the rest of the actions or not
+
+        May raise:
+        - PriceQueryUnknownFromAsset if the from asset is known to miss from cryptocompare
+        - NoPriceForGivenTimestamp if we can't find a price for the asset in the given
+        timestamp from cryptocompare
+        - RemoteError if there is a problem reaching the price oracle server
+        or with reading the response returned by the server
+        """
+        # Assert we are sorted in ascending time order.
+        timestamp = action_get_timestamp(action)
+        assert timestamp >= prev_time, (
+            "During history processing the trades/loans are not in ascending order"
+        )
+        prev_time = timestamp
+
+        if timestamp > end_ts:
+            return False, prev_time
+
+        self.currently_processing_timestamp = timestamp
+
+        action_type = action_get_type(action)
+
+        try:
+            asset1, asset2 = action_get_assets(action)
+        except UnknownAsset as e:
+            self._add_processing_message(
+                'warning',
+                f'At history processing found trade with unknown asset {e.asset_name}. '
+                f'Ignoring the trade.',
+            )
+            return True, prev_time
+        except UnsupportedAsset as e:
+            self._add_processing_message(
+                'warning',
+                f'At history processing found trade with unsupported asset {e.asset_name}. '
+                f'Ignoring the trade.',
+            )
+            return True, prev_time
+        except DeserializationError:
+            self._add_processing_message(
+                'error',
+                'At history processing found trade with non string asset type. '
+                'Ignoring the trade.',
+            )
+            return True, prev_time
+
+        if asset1 in self.ignored_assets or asset2 in self.ignored_assets:
+            log.debug(
+                'Ignoring action with ignored asset',
+                action_type=action_type,
+                asset1=asset1,
+                asset2=asset2,
+            )
+
+            return True, prev_time
+
+        if action_type == 'loan':
+            action = cast(Loan, action)
+            self.events.add_loan_gain(
+                location=action.location,
+                gained_asset=action.currency,
+                lent_amount=action.amount_lent,
+                gained_amount=action.earned,
+                fee_in_asset=action.fee,
+                open_time=action.open_time,
+                close_time=timestamp,
+            )
+            return True, prev_time
+        elif action_type == 'asset_movement':
+            action = cast(AssetMovement, action)
+            self.add_asset_movement_to_events(action)
+            return True, prev_time
+        elif action_type == 'margin_position':
+            action = cast(MarginPosition, action)
+            self.events.add_margin_position(margin=action)
+            return True, prev_time
+        elif action_type == 'ethereum_transaction':
+            action = cast(EthereumTransaction, action)
+            self.account_for_gas_costs(action, db_settings.include_gas_costs)
+            return True, prev_time
+        elif action_type == 'defi_event':
+            action = cast(DefiEvent, action)
+            self.events.add_defi_event(action)
+            return True, prev_time
+
+        # if we get here it's a trade
+        trade = cast(Trade, action)
+        # When you buy, you buy with the cost_currency and receive the other one
+        # When you sell, you sell the amount in non-cost_currency and receive
+        # costs in cost_currency
+        if trade.trade_type == TradeType.BUY:
+            self.events.add_buy_and_corresponding_sell(
+                location=trade.location,
+                bought_asset=trade.base_asset,
+                bought_amount=trade.amount,
+                paid_with_asset=trade.quote_asset,
+                trade_rate=trade.rate,
+                fee_in_profit_currency=self.get_fee_in_profit_currency(trade),
+                fee_currency=trade.fee_currency,
+                timestamp=trade.timestamp,
+            )
+        elif trade.trade_type == TradeType.SELL:
+            self.trade_add_to_sell_events(trade, False)
+        elif trade.trade_type == TradeType.SETTLEMENT_SELL:
+            # in poloniex settlements sell some asset to get BTC to repay a loan
+            self.trade_add_to_sell_events(trade, True)
+        elif trade.trade_type == TradeType.SETTLEMENT_BUY:
+            # in poloniex settlements you buy some asset with BTC to repay a loan
+            # so in essense you sell BTC to repay the loan
+            selling_asset = A_BTC
+            selling_asset_rate = self.events.get_rate_in_profit_currency(
+                selling_asset,
+                trade.timestamp,
+            )
+            selling_rate = selling_asset_rate * trade.rate
+            fee_in_profit_currency = self.get_fee_in_profit_currency(trade)
+            gain_in_profit_currency = selling_rate * trade.amount
+            # Since the original trade is a buy of some asset with BTC, then the
+            # when we invert the sell, the sold amount of BTC should be the cost
+            # (amount*rate) of the original buy
+            selling_amount = trade.rate * trade.amount
+            self.events.add_sell(
+                location=trade.location,
+                selling_asset=selling_asset,
+                selling_amount=selling_amount,
+                receiving_asset=None,
+                receiving_amount=None,
+                gain_in_profit_currency=gain_in_profit_currency,
+                total_fee_in_profit_currency=fee_in_profit_currency,
+                trade_rate=trade.rate,
+                rate_in_profit_currency=selling_asset_rate,
+                timestamp=trade.timestamp,
+                loan_settlement=True,
+            )
+        else:
+            # Should never happen
+            raise AssertionError(f'Unknown trade type "{trade.trade_type}" encountered')
+
+        return True, prev_time
+
+    def get_calculated_asset_amount(self, asset: Asset) -> Optional[FVal]:
+        """Get the amount of asset accounting has calculated we should have after
+        the history has been processed
+        """
+        if asset not in self.events.events:
+            return None
+
+        return self.events.events[asset].buys.total_amount
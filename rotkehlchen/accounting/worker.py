@@ -0,0 +1,160 @@
+import logging
+import time
+import traceback
+from multiprocessing.connection import Connection
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Tuple
+
+from rotkehlchen.accounting.processor import Checkpoint, HistoryProcessor
+from rotkehlchen.assets.asset import Asset
+from rotkehlchen.db.settings import DBSettings
+from rotkehlchen.fval import FVal
+from rotkehlchen.logging import RotkehlchenLogsAdapter
+from rotkehlchen.typing import Price, Timestamp
+from rotkehlchen.utils.accounting import TaxableAction
+
+logger = logging.getLogger(__name__)
+log = RotkehlchenLogsAdapter(logger)
+
+# How often in seconds the worker process reports the progress of processing
+WORKER_PROGRESS_INTERVAL = 0.1
+
+# The kinds of messages the worker process sends to the API process
+# (WORKER_PROGRESS, number of actions processed since the last report, current timestamp)
+WORKER_PROGRESS = 'progress'
+# (WORKER_MESSAGE, 'warning' or 'error', message for the user)
+WORKER_MESSAGE = 'message'
+# (WORKER_RATE_QUERY, from_asset, to_asset, timestamp) for a rate that was not prefetched.
+# The API process answers with (rate, None) or (None, the exception querying it raised)
+WORKER_RATE_QUERY = 'rate_query'
+# (WORKER_CHECKPOINT, checkpoint)
+WORKER_CHECKPOINT = 'checkpoint'
+# (WORKER_DONE, state after processing all actions)
+WORKER_DONE = 'done'
+# (WORKER_FAILED, traceback of the unexpected exception)
+WORKER_FAILED = 'failed'
+
+
+class ProcessingSnapshot(NamedTuple):
+    """All that the worker process needs in order to process the history
+
+    It is pickled to be given to the worker process.
+    """
+    start_ts: Timestamp
+    end_ts: Timestamp
+    db_settings: DBSettings
+    count_profit_for_settlements: bool
+    user_directory: Path
+    create_csv: bool
+    ignored_assets: List[Asset]
+    prefetched_rates: Dict[Tuple[Asset, Timestamp], FVal]
+    # The state to continue processing from as given by HistoryProcessor._checkpoint_state()
+    state: bytes
+    actions_processed: int
+    actions_hash: str
+    # The actions after the already processed ones up to end_ts
+    actions: List[TaxableAction]
+    checkpoint_interval: int
+
+
+class WorkerHistoryProcessor(HistoryProcessor):
+    """Processes the history in the worker process and sends the messages, progress
+    and checkpoints of processing to the API process as they come"""
+
+    def __init__(
+            self,
+            snapshot: ProcessingSnapshot,
+            results_conn: Connection,
+            rates_conn: Connection,
+    ) -> None:
+        super().__init__(
+            profit_currency=snapshot.db_settings.main_currency,
+            user_directory=snapshot.user_directory,
+            create_csv=snapshot.create_csv,
+            query_historical_price=self._query_historical_price,
+        )
+        self.snapshot = snapshot
+        self.results_conn = results_conn
+        self.rates_conn = rates_conn
+        self.unreported_actions = 0
+        self.last_report_time = time.monotonic()
+
+    def _give_message(self, message_type: str, msg: str) -> None:
+        self.results_conn.send((WORKER_MESSAGE, message_type, msg))
+
+    def _action_processed(self) -> None:
+        self.unreported_actions += 1
+        if time.monotonic() - self.last_report_time >= WORKER_PROGRESS_INTERVAL:
+            self._report_progress()
+
+    def _report_progress(self) -> None:
+        self.results_conn.send(
+            (WORKER_PROGRESS, self.unreported_actions, self.currently_processing_timestamp),
+        )
+        self.unreported_actions = 0
+        self.last_report_time = time.monotonic()
+
+    def _add_checkpoint(self, checkpoint: Checkpoint) -> None:
+        self.results_conn.send((WORKER_CHECKPOINT, checkpoint))
+
+    def _query_historical_price(
+            self,
+            from_asset: Asset,
+            to_asset: Asset,
+            timestamp: Timestamp,
+    ) -> Price:
+        """Asks the API process for a rate that was not prefetched
+
+        May raise what querying the price raised in the API process:
+        - PriceQueryUnknownFromAsset
+        - NoPriceForGivenTimestamp
+        - RemoteError
+        """
+        self.results_conn.send((WORKER_RATE_QUERY, from_asset, to_asset, timestamp))
+        rate, error = self.rates_conn.recv()
+        if error is not None:
+            raise error
+
+        return rate
+
+    def run(self) -> bytes:
+        """Processes the actions of the snapshot and returns the state after them"""
+        snapshot = self.snapshot
+        self.events.reset(snapshot.start_ts, snapshot.end_ts)
+        self._customize(snapshot.db_settings)
+        self.events.count_profit_for_settlements = snapshot.count_profit_for_settlements
+        self.start_ts = snapshot.start_ts
+        self.ignored_assets = snapshot.ignored_assets
+        applied = self._apply_state(snapshot.state)
+        assert applied, 'The state given to the worker should always be valid'
+        self.events.prefetched_rates = snapshot.prefetched_rates
+
+        self._process_actions(
+            actions=snapshot.actions,
+            end_ts=snapshot.end_ts,
+            db_settings=snapshot.db_settings,
+            actions_processed=snapshot.actions_processed,
+            actions_hash=snapshot.actions_hash,
+            checkpoint_interval=snapshot.checkpoint_interval,
+        )
+        self._report_progress()
+        return self._checkpoint_state()
+
+
+def process_history_in_worker(
+        snapshot: ProcessingSnapshot,
+        results_conn: Connection,
+        rates_conn: Connection,
+) -> None:
+    """Entry point of the history processing worker process
+
+    The results are sent through results_conn and the answers to the rate
+    queries are received through rates_conn.
+    """
+    try:
+        state = WorkerHistoryProcessor(snapshot, results_conn, rates_conn).run()
+    except Exception:  # pylint: disable=broad-except
+        log.error('History processing worker failed')
+        results_conn.send((WORKER_FAILED, traceback.format_exc()))
+    else:
+        results_conn.send((WORKER_DONE, state))
@@ -4,7 +4,7 @@ import traceback
 from functools import wraps
 from http import HTTPStatus
 from pathlib import Path
-from typing import Any, Callable, Dict, List, Optional, Union
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
 
 import gevent
 from flask import Response, make_response
@@ -12,6 +12,7 @@ from gevent.event import Event
 from gevent.lock import Semaphore
 from typing_extensions import Literal
 
+from rotkehlchen.api.task_results import StoredTaskResult, TaskResultStore
 from rotkehlchen.api.v1.encoding import TradeSchema
 from rotkehlchen.assets.asset import Asset
 from rotkehlchen.assets.resolver import AssetResolver
@@ -38,7 +39,8 @@ from rotkehlchen.errors import (
     TagConstraintError,
 )
 from rotkehlchen.exchanges.data_structures import Trade
-from rotkehlchen.exchanges.manager import SUPPORTED_EXCHANGES
+from rotkehlchen.exchanges.manager import EXCHANGE_BALANCES_QUERY_TIMEOUT, SUPPORTED_EXCHANGES
+from rotkehlchen.greenlets import TaskProgress
 from rotkehlchen.inquirer import Inquirer
 from rotkehlchen.logging import RotkehlchenLogsAdapter
 from rotkehlchen.premium.premium import PremiumCredentials
@@ -101,6 +103,36 @@ def api_response(
     return response
 
 
+def task_outcome_response(stored_result: StoredTaskResult) -> Response:
+    """Creates the response for a completed task out of its stored serialized result
+
+    The result is not deserialized again. Results that were spilled to disk are
+    streamed back in chunks instead of being read into memory at once and their
+    file is deleted when the response is closed, even if it was not fully sent.
+    """
+    prefix = b'{"result": {"status": "completed", "outcome": '
+    suffix = b'}, "message": ""}'
+    log.debug(
+        "Request successful",
+        response=f'<task result of {stored_result.size} bytes>',
+        status_code=HTTPStatus.OK,
+    )
+
+    def generate() -> Iterator[bytes]:
+        yield prefix
+        yield from stored_result.iter_chunks()
+        yield suffix
+
+    response = Response(
+        generate(),
+        status=HTTPStatus.OK,
+        mimetype='application/json',
+        content_type='application/json',
+    )
+    response.call_on_close(stored_result.remove_file)
+    return response
+
+
 def require_loggedin_user() -> Callable:
     """ This is a decorator for the RestAPI class's methods requiring a logged in user.
     """
@@ -169,7 +201,7 @@ class RestAPI():
         self.killable_greenlets: List[gevent.Greenlet] = []
         self.task_lock = Semaphore()
         self.task_id = 0
-        self.task_results: Dict[int, Any] = {}
+        self.task_results = TaskResultStore()
 
         self.trade_schema = TradeSchema()
 
@@ -180,9 +212,29 @@ class RestAPI():
             self.task_id += 1
         return task_id
 
-    def _write_task_result(self, task_id: int, result: Any) -> None:
+    def _write_task_result(self, task_id: int, result: Dict[str, Any]) -> None:
+        # Only the result and message of the original response are kept for the outcome
+        outcome = {'result': result['result'], 'message': result['message']}
         with self.task_lock:
-            self.task_results[task_id] = result
+            evicted_task_ids = self.task_results.put(task_id, outcome)
+            self._forget_tasks(evicted_task_ids)
+            log.debug(
+                'Stored async task result',
+                task_id=task_id,
+                metrics=self.task_results.metrics(),
+            )
+
+    def _forget_tasks(self, task_ids: List[int]) -> None:
+        """Stops tracking the greenlets of tasks whose results got evicted
+
+        Should be called with the task_lock held
+        """
+        if len(task_ids) == 0:
+            return
+
+        self.killable_greenlets[:] = [
+            x for x in self.killable_greenlets if x.task_id not in task_ids
+        ]
 
     def _handle_killed_greenlets(self, greenlet: gevent.Greenlet) -> None:
         if not greenlet.exception:
@@ -228,6 +280,7 @@ class RestAPI():
             **kwargs,
         )
         greenlet.task_id = task_id
+        greenlet.task_progress = TaskProgress()
         greenlet.link_exception(self._handle_killed_greenlets)
         self.killable_greenlets.append(greenlet)
         return api_response(_wrap_in_ok_result({'task_id': task_id}), status_code=HTTPStatus.OK)
@@ -239,6 +292,8 @@ class RestAPI():
         gevent.wait(self.waited_greenlets)
         log.debug('Waited for greenlets. Killing all other greenlets')
         gevent.killall(self.killable_greenlets)
+        with self.task_lock:
+            self.task_results.clear()
         log.debug('Greenlets killed. Killing zerorpc greenlet')
         log.debug('Shutdown completed')
         logging.shutdown()
@@ -265,31 +320,30 @@ class RestAPI():
     def query_tasks_outcome(self, task_id: Optional[int]) -> Response:
         if task_id is None:
             # If no task id is given return list of all pending/completed tasks
-            result = _wrap_in_ok_result([greenlet.task_id for greenlet in self.killable_greenlets])
+            with self.task_lock:
+                self._forget_tasks(self.task_results.evict())
+                task_ids = [greenlet.task_id for greenlet in self.killable_greenlets]
+            result = _wrap_in_ok_result(task_ids)
             return api_response(result=result, status_code=HTTPStatus.OK)
 
         with self.task_lock:
+            self._forget_tasks(self.task_results.evict())
             for idx, greenlet in enumerate(self.killable_greenlets):
                 if greenlet.task_id == task_id:
-                    if task_id in self.task_results:
+                    stored_result = self.task_results.pop(task_id)
+                    if stored_result is not None:
                         # Task has completed and we just got the outcome
-                        function_response = self.task_results.pop(int(task_id), None)
-                        # The result of the original request
-                        result = function_response['result']
-                        # The message of the original request
-                        message = function_response['message']
-                        ret = {'result': result, 'message': message}
-                        result_dict = {
-                            'result': {'status': 'completed', 'outcome': process_result(ret)},
-                            'message': '',
-                        }
                         # Also remove the greenlet from the killable_greenlets
                         self.killable_greenlets.pop(idx)
-                        return api_response(result=result_dict, status_code=HTTPStatus.OK)
+                        return task_outcome_response(stored_result)
                     else:
                         # Task is still pending and the greenlet is running
                         result_dict = {
-                            'result': {'status': 'pending', 'outcome': None},
+                            'result': {
+                                'status': 'pending',
+                                'outcome': None,
+                                'progress': greenlet.task_progress.serialize(),
+                            },
                             'message': f'The task with id {task_id} is still pending',
                         }
                         return api_response(result=result_dict, status_code=HTTPStatus.OK)
@@ -301,6 +355,32 @@ class RestAPI():
         }
         return api_response(result=result_dict, status_code=HTTPStatus.NOT_FOUND)
 
+    @require_loggedin_user()
+    def query_tasks_metrics(self) -> Response:
+        with self.task_lock:
+            self._forget_tasks(self.task_results.evict())
+            metrics = self.task_results.metrics()
+        return api_response(_wrap_in_ok_result(metrics), status_code=HTTPStatus.OK)
+
+    @require_loggedin_user()
+    def cancel_task(self, task_id: int) -> Response:
+        with self.task_lock:
+            for idx, greenlet in enumerate(self.killable_greenlets):
+                if greenlet.task_id == task_id:
+                    self.killable_greenlets.pop(idx)
+                    self.task_results.discard(task_id)
+                    break
+            else:
+                return api_response(
+                    wrap_in_fail_result(f'No task with id {task_id} found'),
+                    status_code=HTTPStatus.NOT_FOUND,
+                )
+
+        # The task gets a GreenletExit raised at the point where it currently waits,
+        # so any cleanup in finally blocks and context managers still runs
+        greenlet.kill()
+        return api_response(OK_RESULT, status_code=HTTPStatus.OK)
+
     @staticmethod
     def get_fiat_exchange_rates(currencies: Optional[List[Asset]]) -> Response:
         if currencies is not None and len(currencies) == 0:
@@ -399,12 +479,17 @@ class RestAPI():
     def _query_all_exchange_balances(self, ignore_cache: bool) -> Dict[str, Any]:
         final_balances = {}
         error_msg = ''
-        for name, exchange_obj in self.rotkehlchen.exchange_manager.connected_exchanges.items():
-            balances, msg = exchange_obj.query_balances(ignore_cache=ignore_cache)
+        results, errors = self.rotkehlchen.exchange_manager.query_exchanges(
+            query=lambda exchange: exchange.query_balances(ignore_cache=ignore_cache),
+            timeout=EXCHANGE_BALANCES_QUERY_TIMEOUT,
+        )
+        for name, (balances, msg) in results.items():
             if balances is None:
                 error_msg += msg
             else:
                 final_balances[name] = balances
+        for msg in errors.values():
+            error_msg += msg
 
         if final_balances == {}:
             result = None
@@ -599,18 +684,33 @@ class RestAPI():
             from_ts: Timestamp,
             to_ts: Timestamp,
             location: Optional[Location],
+            pair: Optional[TradePair],
+            trade_type: Optional[TradeType],
+            order_by: str,
+            ascending: bool,
+            limit: Optional[int],
+            offset: int,
     ) -> Response:
-        trades = self.rotkehlchen.data.db.get_trades(
+        # The page is read here and not while the response is sent, when other
+        # greenlets may already be using or even closing the DB connection
+        trades, entries_found = self.rotkehlchen.data.db.get_trades_page(
             from_ts=from_ts,
             to_ts=to_ts,
             location=location,
+            pair=pair,
+            trade_type=trade_type,
+            order_by=order_by,
+            ascending=ascending,
+            limit=limit,
+            offset=offset,
         )
-        result = []
+        entries = []
         for trade in trades:
             serialized_trade = self.trade_schema.dump(trade)
             serialized_trade['trade_id'] = trade.identifier
-            result.append(serialized_trade)
+            entries.append(serialized_trade)
 
+        result = {'entries': entries, 'entries_found': entries_found}
         return api_response(_wrap_in_ok_result(result), status_code=HTTPStatus.OK)
 
     @require_loggedin_user()
@@ -877,7 +977,7 @@ class RestAPI():
         #   that is going to get complicated fast.
         gevent.killall(self.killable_greenlets)
         with self.task_lock:
-            self.task_results = {}
+            self.task_results.clear()
         self.rotkehlchen.logout()
         result_dict['result'] = True
         return api_response(result_dict, status_code=HTTPStatus.OK)
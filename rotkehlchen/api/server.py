@@ -20,6 +20,7 @@ from rotkehlchen.api.v1.resources import (
     AaveHistoryResource,
     AllAssetsResource,
     AllBalancesResource,
+    AsyncTasksMetricsResource,
     AsyncTasksResource,
     BlockchainBalancesResource,
     BlockchainsAccountsResource,
@@ -79,6 +80,7 @@ URLS_V1: URLS = [
     ('/settings', SettingsResource),
     ('/tasks/', AsyncTasksResource),
     ('/tasks/<int:task_id>', AsyncTasksResource, 'specific_async_tasks_resource'),
+    ('/tasks/metrics', AsyncTasksMetricsResource),
     ('/fiat_exchange_rates', FiatExchangeRatesResource),
     ('/external_services/', ExternalServicesResource),
     ('/exchanges', ExchangesResource),
@@ -0,0 +1,231 @@
+import json
+import logging
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+
+from rotkehlchen.logging import RotkehlchenLogsAdapter
+from rotkehlchen.serialization.serialize import process_result
+
+logger = logging.getLogger(__name__)
+log = RotkehlchenLogsAdapter(logger)
+
+# Maximum number of bytes of serialized results kept in memory
+DEFAULT_MAX_MEMORY_BYTES = 256 * 1024 * 1024
+# Maximum number of bytes of serialized results kept in temporary files
+DEFAULT_MAX_DISK_BYTES = 1024 * 1024 * 1024
+# Seconds after which an unclaimed result is dropped
+DEFAULT_RESULT_TTL = 3600
+# Results bigger than this number of bytes are written to a temporary file
+DEFAULT_SPILL_THRESHOLD = 16 * 1024 * 1024
+# Size of the chunks in which spilled results are read back
+SPILLED_RESULT_CHUNK_SIZE = 64 * 1024
+
+
+class StoredTaskResult(NamedTuple):
+    """The serialized outcome of an async task, kept either in memory or in a file"""
+    size: int
+    stored_at: float
+    data: Optional[bytes]
+    path: Optional[Path]
+
+    def iter_chunks(self) -> Iterator[bytes]:
+        """Yields the serialized result
+
+        The file of a spilled result is not deleted here, since the chunks may not
+        be consumed to the end. Call remove_file() once done with the result.
+        """
+        if self.data is not None:
+            yield self.data
+            return
+
+        assert self.path is not None, 'A stored task result should have either data or path'
+        with open(self.path, 'rb') as f:
+            while True:
+                chunk = f.read(SPILLED_RESULT_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+
+    def remove_file(self) -> None:
+        """Deletes the file of a spilled result. Does nothing for results in memory"""
+        if self.path is not None:
+            _remove_spilled_file(self.path)
+
+
+def _remove_spilled_file(path: Path) -> None:
+    try:
+        path.unlink()
+    except OSError as e:
+        log.warning(f'Could not delete spilled task result file {path}: {str(e)}')
+
+
+class TaskResultStore():
+    """Keeps the results of finished async tasks until they are claimed
+
+    Results are serialized to JSON as soon as they are stored so that their exact
+    size is known. The store is bounded both in time and in size. Results that are
+    not claimed within `ttl` seconds are dropped and, if the results held in memory
+    exceed `max_memory_bytes`, the least recently stored ones are dropped first.
+    Results bigger than `spill_threshold` bytes are written to a temporary file
+    instead of being kept in memory and are streamed back from it when claimed.
+    Spilled results are dropped the same way when their files exceed `max_disk_bytes`.
+    Spilling can be turned off by giving None as the threshold.
+
+    Dropping a result is never silent. All the methods that drop results return
+    the ids of the tasks whose results were dropped.
+
+    The store is not thread/greenlet safe by itself. Callers should serialize access.
+    """
+
+    def __init__(
+            self,
+            max_memory_bytes: int = DEFAULT_MAX_MEMORY_BYTES,
+            max_disk_bytes: int = DEFAULT_MAX_DISK_BYTES,
+            ttl: float = DEFAULT_RESULT_TTL,
+            spill_threshold: Optional[int] = DEFAULT_SPILL_THRESHOLD,
+            spill_directory: Optional[Path] = None,
+    ) -> None:
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.ttl = ttl
+        self.spill_threshold = spill_threshold
+        self.spill_directory = spill_directory
+        self._results: 'OrderedDict[int, StoredTaskResult]' = OrderedDict()
+        self.memory_bytes = 0
+        self.disk_bytes = 0
+        self.evicted_results = 0
+
+    def __contains__(self, task_id: int) -> bool:
+        return task_id in self._results
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def _spill(self, data: bytes) -> Optional[Path]:
+        try:
+            fd, filename = tempfile.mkstemp(
+                prefix='rotki_task_result_',
+                suffix='.json',
+                dir=self.spill_directory,
+            )
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+        except OSError as e:
+            log.warning(f'Could not spill a task result to disk. Keeping it in memory: {str(e)}')
+            return None
+
+        return Path(filename)
+
+    def _remove(self, task_id: int) -> StoredTaskResult:
+        entry = self._results.pop(task_id)
+        if entry.data is not None:
+            self.memory_bytes -= entry.size
+        else:
+            self.disk_bytes -= entry.size
+        return entry
+
+    def _drop(self, task_id: int) -> None:
+        self._remove(task_id).remove_file()
+        self.evicted_results += 1
+
+    def evict(self) -> List[int]:
+        """Drops all expired results and, if the memory or disk cap is exceeded, the
+        least recently stored results held in memory or on disk until it no longer is.
+
+        Returns the ids of the tasks whose results got dropped
+        """
+        evicted = []
+        now = time.monotonic()
+        for task_id, entry in list(self._results.items()):
+            if now - entry.stored_at < self.ttl:
+                # results are ordered by storage time so the rest are not expired
+                break
+            self._drop(task_id)
+            evicted.append(task_id)
+
+        if self.memory_bytes > self.max_memory_bytes:
+            for task_id, entry in list(self._results.items()):
+                if self.memory_bytes <= self.max_memory_bytes:
+                    break
+                if entry.data is None:
+                    continue
+                self._drop(task_id)
+                evicted.append(task_id)
+
+        if self.disk_bytes > self.max_disk_bytes:
+            for task_id, entry in list(self._results.items()):
+                if self.disk_bytes <= self.max_disk_bytes:
+                    break
+                if entry.path is None:
+                    continue
+                self._drop(task_id)
+                evicted.append(task_id)
+
+        if len(evicted) != 0:
+            log.debug('Evicted async task results', task_ids=evicted, metrics=self.metrics())
+        return evicted
+
+    def put(self, task_id: int, result: Dict[str, Any]) -> List[int]:
+        """Serializes and stores the result of a task, replacing any previous one
+
+        Returns the ids of the tasks whose results got evicted to make room
+        """
+        if task_id in self._results:
+            self._drop(task_id)
+
+        data = json.dumps(process_result(result)).encode()
+        path = None
+        if self.spill_threshold is not None and len(data) > self.spill_threshold:
+            path = self._spill(data)
+
+        if path is None:
+            self._results[task_id] = StoredTaskResult(
+                size=len(data),
+                stored_at=time.monotonic(),
+                data=data,
+                path=None,
+            )
+            self.memory_bytes += len(data)
+        else:
+            self._results[task_id] = StoredTaskResult(
+                size=len(data),
+                stored_at=time.monotonic(),
+                data=None,
+                path=path,
+            )
+            self.disk_bytes += len(data)
+
+        return self.evict()
+
+    def pop(self, task_id: int) -> Optional[StoredTaskResult]:
+        """Removes and returns the stored result of a task if it exists
+
+        If the result was spilled to disk the caller should call its
+        remove_file() once done with it so that the file gets deleted.
+        """
+        if task_id not in self._results:
+            return None
+
+        return self._remove(task_id)
+
+    def discard(self, task_id: int) -> None:
+        """Drops the result of a task if it exists"""
+        entry = self.pop(task_id)
+        if entry is not None:
+            entry.remove_file()
+
+    def clear(self) -> None:
+        for task_id in list(self._results.keys()):
+            self.discard(task_id)
+
+    def metrics(self) -> Dict[str, int]:
+        return {
+            'stored_results': len(self._results),
+            'memory_bytes': self.memory_bytes,
+            'disk_bytes': self.disk_bytes,
+            'evicted_results': self.evicted_results,
+        }
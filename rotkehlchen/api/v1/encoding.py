@@ -9,11 +9,13 @@ from marshmallow import Schema, fields, post_load, validates_schema
 from marshmallow.exceptions import ValidationError
 from webargs.compat import MARSHMALLOW_VERSION_INFO
 
+from rotkehlchen.accounting.cost_basis import CostBasisMethod
 from rotkehlchen.assets.asset import Asset, EthereumToken
 from rotkehlchen.balances.manual import ManuallyTrackedBalance
 from rotkehlchen.chain.bitcoin import is_valid_btc_address
 from rotkehlchen.chain.ethereum.manager import EthereumManager
 from rotkehlchen.constants.misc import ZERO
+from rotkehlchen.db.filtering import TRADES_ORDER_BY_COLUMNS
 from rotkehlchen.db.settings import ModifiableDBSettings
 from rotkehlchen.errors import DeserializationError, UnknownAsset
 from rotkehlchen.exchanges.kraken import KrakenAccountType
@@ -173,6 +175,23 @@ class KrakenAccountTypeField(fields.Field):
         return acc_type
 
 
+class CostBasisMethodField(fields.Field):
+
+    def _deserialize(
+            self,
+            value: str,
+            attr: Optional[str],  # pylint: disable=unused-argument
+            data: Optional[Mapping[str, Any]],  # pylint: disable=unused-argument
+            **_kwargs: Any,
+    ) -> CostBasisMethod:
+        try:
+            method = CostBasisMethod.deserialize(value)
+        except DeserializationError:
+            raise ValidationError(f'{value} is not a valid cost basis method')
+
+        return method
+
+
 class AmountField(fields.Field):
 
     @staticmethod
@@ -588,10 +607,29 @@ class AsyncTasksQuerySchema(Schema):
     task_id = fields.Integer(strict=True, missing=None)
 
 
+class AsyncTasksCancelSchema(Schema):
+    task_id = fields.Integer(strict=True, required=True)
+
+
 class TradesQuerySchema(Schema):
     from_timestamp = TimestampField(missing=Timestamp(0))
     to_timestamp = TimestampField(missing=ts_now)
     location = LocationField(missing=None)
+    pair = TradePairField(missing=None)
+    trade_type = TradeTypeField(missing=None)
+    order_by = fields.String(
+        validate=webargs.validate.OneOf(choices=tuple(TRADES_ORDER_BY_COLUMNS)),
+        missing='timestamp',
+    )
+    ascending = fields.Boolean(missing=True)
+    limit = fields.Integer(
+        validate=webargs.validate.Range(min=1, error='The limit of trades should be >= 1'),
+        missing=None,
+    )
+    offset = fields.Integer(
+        validate=webargs.validate.Range(min=0, error='The offset of trades should be >= 0'),
+        missing=0,
+    )
 
 
 class TradeSchema(Schema):
@@ -703,6 +741,7 @@ class ModifiableSettingsSchema(Schema):
     kraken_account_type = KrakenAccountTypeField(missing=None)
     active_modules = fields.List(fields.String(), missing=None)
     frontend_settings = fields.String(missing=None)
+    cost_basis_method = CostBasisMethodField(missing=None)
 
     @validates_schema  # type: ignore
     def validate_settings_schema(  # pylint: disable=no-self-use
@@ -743,6 +782,7 @@ class ModifiableSettingsSchema(Schema):
             kraken_account_type=data['kraken_account_type'],
             active_modules=data['active_modules'],
             frontend_settings=data['frontend_settings'],
+            cost_basis_method=data['cost_basis_method'],
         )
 
 
@@ -15,6 +15,7 @@ from rotkehlchen.api.v1.encoding import (
     AllBalancesQuerySchema,
     AsyncQueryArgumentSchema,
     AsyncQueryResetDBSchema,
+    AsyncTasksCancelSchema,
     AsyncTasksQuerySchema,
     BlockchainAccountsDeleteSchema,
     BlockchainAccountsGetSchema,
@@ -163,11 +164,22 @@ class SettingsResource(BaseResource):
 class AsyncTasksResource(BaseResource):
 
     get_schema = AsyncTasksQuerySchema()
+    delete_schema = AsyncTasksCancelSchema()
 
     @use_kwargs(get_schema, location='view_args')  # type: ignore
     def get(self, task_id: Optional[int]) -> Response:
         return self.rest_api.query_tasks_outcome(task_id=task_id)
 
+    @use_kwargs(delete_schema, location='view_args')  # type: ignore
+    def delete(self, task_id: int) -> Response:
+        return self.rest_api.cancel_task(task_id=task_id)
+
+
+class AsyncTasksMetricsResource(BaseResource):
+
+    def get(self) -> Response:
+        return self.rest_api.query_tasks_metrics()
+
 
 class FiatExchangeRatesResource(BaseResource):
 
@@ -346,11 +358,23 @@ class TradesResource(BaseResource):
             from_timestamp: Timestamp,
             to_timestamp: Timestamp,
             location: Optional[Location],
+            pair: Optional[TradePair],
+            trade_type: Optional[TradeType],
+            order_by: str,
+            ascending: bool,
+            limit: Optional[int],
+            offset: int,
     ) -> Response:
         return self.rest_api.get_trades(
             from_ts=from_timestamp,
             to_ts=to_timestamp,
             location=location,
+            pair=pair,
+            trade_type=trade_type,
+            order_by=order_by,
+            ascending=ascending,
+            limit=limit,
+            offset=offset,
         )
 
     @use_kwargs(put_schema, location='json')  # type: ignore
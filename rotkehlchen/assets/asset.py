@@ -1,11 +1,13 @@
-from dataclasses import dataclass, field
+from dataclasses import FrozenInstanceError
 from functools import total_ordering
-from typing import Any, Optional
+from typing import Any, Optional, Tuple, Type, TypeVar
 
 from rotkehlchen.assets.resolver import AssetResolver
 from rotkehlchen.constants.cryptocompare import WORLD_TO_CRYPTOCOMPARE
 from rotkehlchen.errors import DeserializationError, UnknownAsset, UnsupportedAsset
-from rotkehlchen.typing import AssetType, ChecksumEthAddress, EthTokenInfo, Timestamp
+from rotkehlchen.typing import AssetData, AssetType, ChecksumEthAddress, EthTokenInfo, Timestamp
+
+T = TypeVar('T', bound='Asset')
 
 WORLD_TO_BITTREX = {
     # In Rotkehlchen Bitswift is BITS-2 but in Bittrex it's BITS
@@ -140,38 +142,64 @@ WORLD_TO_BINANCE = {
 
 
 @total_ordering
-@dataclass(init=True, repr=True, eq=False, order=False, unsafe_hash=False, frozen=True)
 class Asset():
+    """An asset known to Rotkehlchen, identified by its canonical identifier
+
+    Assets are immutable and interned. Creating an asset out of an identifier
+    that has already been seen returns the same shared instance out of the
+    AssetResolver's cache instead of resolving the asset data again.
+    """
+    __slots__ = (
+        'identifier',
+        'name',
+        'symbol',
+        'active',
+        'asset_type',
+        'started',
+        'ended',
+        'forked',
+        'swapped_for',
+        '_hash',
+    )
     identifier: str
-    name: str = field(init=False)
-    symbol: str = field(init=False)
-    active: bool = field(init=False)
-    asset_type: AssetType = field(init=False)
-    started: Timestamp = field(init=False)
-    ended: Optional[Timestamp] = field(init=False)
-    forked: Optional[str] = field(init=False)
-    swapped_for: Optional[str] = field(init=False)
-
-    def __post_init__(self) -> None:
+    name: str
+    symbol: str
+    active: bool
+    asset_type: AssetType
+    started: Timestamp
+    ended: Optional[Timestamp]
+    forked: Optional[str]
+    swapped_for: Optional[str]
+    _hash: int
+
+    def __new__(cls: Type[T], identifier: str) -> T:
         """
-        Asset post initialization
-
         The only thing that is given to initialize an asset is a string.
 
         If a non string is given then it's probably a deserialization error or
         invalid data were given to us by the server if an API was queried.
         """
-        if not isinstance(self.identifier, str):
+        if not isinstance(identifier, str):
             raise DeserializationError(
                 'Tried to initialize an asset out of a non-string identifier',
             )
 
-        if not AssetResolver().is_identifier_canonical(self.identifier):
-            raise UnknownAsset(self.identifier)
-        data = AssetResolver().get_asset_data(self.identifier)
+        resolver = AssetResolver()
+        key = (cls, identifier)
+        asset = resolver.interned_assets.get(key)
+        if asset is not None:
+            return asset
+
+        if not resolver.is_identifier_canonical(identifier):
+            raise UnknownAsset(identifier)
 
-        # Ugly hack to set attributes of a frozen data class as post init
-        # https://docs.python.org/3/library/dataclasses.html#frozen-instances
+        asset = object.__new__(cls)
+        asset._set_asset_data(resolver.get_asset_data(identifier))
+        return resolver.interned_assets.setdefault(key, asset)
+
+    def _set_asset_data(self, data: AssetData) -> None:
+        # The asset is immutable so go through object to set its attributes
+        object.__setattr__(self, 'identifier', data.identifier)
         object.__setattr__(self, 'name', data.name)
         object.__setattr__(self, 'symbol', data.symbol)
         object.__setattr__(self, 'active', data.active)
@@ -180,6 +208,17 @@ class Asset():
         object.__setattr__(self, 'ended', data.ended)
         object.__setattr__(self, 'forked', data.forked)
         object.__setattr__(self, 'swapped_for', data.swapped_for)
+        object.__setattr__(self, '_hash', hash(data.identifier))
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise FrozenInstanceError(f'cannot assign to field {name!r}')
+
+    def __delattr__(self, name: str) -> None:
+        raise FrozenInstanceError(f'cannot delete field {name!r}')
+
+    def __reduce__(self) -> Tuple[Type['Asset'], Tuple[str]]:
+        # Pickling and copying go through the constructor so they get the interned instance
+        return self.__class__, (self.identifier,)
 
     def is_fiat(self) -> bool:
         return self.asset_type == AssetType.FIAT
@@ -218,9 +257,11 @@ class Asset():
         return cryptocompare_str.upper()
 
     def __hash__(self) -> int:
-        return hash(self.identifier)
+        return self._hash
 
     def __eq__(self, other: Any) -> bool:
+        if self is other:
+            return True
         if other is None:
             return False
 
@@ -243,27 +284,38 @@ class Asset():
             raise ValueError(f'Invalid comparison of asset with {type(other)}')
 
 
-@dataclass(init=True, repr=True, eq=False, order=False, unsafe_hash=False, frozen=True)
 class HasEthereumToken(Asset):
     """ Marker to denote assets having an Ethereum token address """
-    ethereum_address: ChecksumEthAddress = field(init=False)
-    decimals: int = field(init=False)
-
-    def __post_init__(self) -> None:
-        super().__post_init__()
-        data = AssetResolver().get_asset_data(self.identifier)  # pylint: disable=no-member
+    __slots__ = ('ethereum_address', 'decimals')
+    ethereum_address: ChecksumEthAddress
+    decimals: int
 
+    def _set_asset_data(self, data: AssetData) -> None:
         if not data.ethereum_address:
             raise DeserializationError(
                 'Tried to initialize a non Ethereum asset as Ethereum Token',
             )
 
+        super()._set_asset_data(data)
         object.__setattr__(self, 'ethereum_address', data.ethereum_address)
         object.__setattr__(self, 'decimals', data.decimals)
 
 
-@dataclass(init=True, repr=True, eq=False, order=False, unsafe_hash=False, frozen=True)
 class EthereumToken(HasEthereumToken):
+    __slots__ = ()
+    # Inherited from the slots of the base classes. Declared again since
+    # pylint only looks at the annotations of the class itself
+    identifier: str
+    name: str
+    symbol: str
+    active: bool
+    asset_type: AssetType
+    started: Timestamp
+    ended: Optional[Timestamp]
+    forked: Optional[str]
+    swapped_for: Optional[str]
+    ethereum_address: ChecksumEthAddress
+    decimals: int
 
     def token_info(self) -> EthTokenInfo:
         return EthTokenInfo(
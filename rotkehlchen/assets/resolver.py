@@ -1,9 +1,23 @@
 import json
+import logging
 import os
-from typing import Any, Dict, List, Optional
+import pickle
+import sys
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, DefaultDict, Dict, List, Optional, Tuple, Type
 
+from rotkehlchen.logging import RotkehlchenLogsAdapter
 from rotkehlchen.typing import AssetData, AssetType, ChecksumEthAddress, EthTokenInfo
 
+logger = logging.getLogger(__name__)
+log = RotkehlchenLogsAdapter(logger)
+
+ASSETS_JSON_FILENAME = 'all_assets.json'
+ASSETS_INDEX_FILENAME = 'all_assets.index'
+# Bump this whenever the structure of the index changes so old indices are ignored
+ASSETS_INDEX_VERSION = 2
+
 asset_type_mapping = {
     'fiat': AssetType.FIAT,
     'own chain': AssetType.OWN_CHAIN,
@@ -31,22 +45,116 @@ asset_type_mapping = {
 }
 
 
+def _assets_data_directory() -> Path:
+    return Path(os.path.dirname(os.path.dirname(os.path.realpath(__file__)))) / 'data'
+
+
+def _identifiers_per_type(assets: Dict[str, Dict[str, Any]]) -> Dict[AssetType, List[str]]:
+    result: DefaultDict[AssetType, List[str]] = defaultdict(list)
+    for identifier, asset_data in assets.items():
+        result[asset_type_mapping[asset_data['type']]].append(identifier)
+
+    return dict(result)
+
+
+def _assets_file_stamp(assets_path: Path) -> Tuple[int, int]:
+    """Returns the size and modification time of the assets file
+
+    Cheap to get at every start, unlike a digest of its contents, and
+    changes whenever the file is edited.
+    """
+    stat = assets_path.stat()
+    return stat.st_size, stat.st_mtime_ns
+
+
+def write_assets_index(data_directory: Optional[Path] = None) -> Path:
+    """Generates the precompiled index of the assets file in the given data directory
+
+    The index contains the parsed assets along with the identifiers of each asset
+    type and the size and modification time of the assets file it was generated
+    from, so that it can be detected when it gets stale. It is meant to be
+    generated at build time.
+
+    Returns the path of the written index.
+    """
+    if data_directory is None:
+        data_directory = _assets_data_directory()
+
+    assets_path = data_directory / ASSETS_JSON_FILENAME
+    assets = json.loads(assets_path.read_bytes())
+    index = {
+        'version': ASSETS_INDEX_VERSION,
+        'stamp': _assets_file_stamp(assets_path),
+        'assets': assets,
+        'identifiers_per_type': _identifiers_per_type(assets),
+    }
+    index_path = data_directory / ASSETS_INDEX_FILENAME
+    tmp_path = index_path.with_suffix('.tmp')
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, index_path)
+    return index_path
+
+
+def load_assets(
+        data_directory: Optional[Path] = None,
+) -> Tuple[Dict[str, Dict[str, Any]], Optional[Dict[AssetType, List[str]]]]:
+    """Loads the known assets and if possible the identifiers of each asset type
+
+    The precompiled index is used if it exists and was generated out of the
+    current assets file. Otherwise the assets file is parsed and the identifiers
+    of each asset type are returned as None, to be computed if they are needed.
+
+    In the packaged application the assets file and the index are bundled together
+    and extracting them does not keep their modification times, so there only
+    the size of the assets file is checked.
+    """
+    if data_directory is None:
+        data_directory = _assets_data_directory()
+
+    assets_path = data_directory / ASSETS_JSON_FILENAME
+    index_path = data_directory / ASSETS_INDEX_FILENAME
+    if index_path.is_file():
+        try:
+            with open(index_path, 'rb') as f:
+                index = pickle.load(f)
+            size, mtime = _assets_file_stamp(assets_path)
+            if getattr(sys, 'frozen', False):
+                is_current = index['stamp'][0] == size
+            else:
+                is_current = tuple(index['stamp']) == (size, mtime)
+            if index['version'] == ASSETS_INDEX_VERSION and is_current:
+                return index['assets'], index['identifiers_per_type']
+            log.warning('The precompiled assets index is stale. Using the assets file')
+        except (
+                OSError,
+                EOFError,
+                pickle.UnpicklingError,
+                AttributeError,
+                KeyError,
+                TypeError,
+        ) as e:
+            log.warning(f'Could not read the precompiled assets index due to {str(e)}')
+
+    return json.loads(assets_path.read_bytes()), None
+
+
 class AssetResolver():
     __instance = None
     assets: Dict[str, Dict[str, Any]] = {}
     eth_token_info: Optional[List[EthTokenInfo]] = None
+    # Interned asset instances keyed by (asset class, identifier)
+    interned_assets: Dict[Tuple[Type, str], Any] = {}
+    identifiers_per_type: Optional[Dict[AssetType, List[str]]] = None
 
     def __new__(cls) -> 'AssetResolver':
         if AssetResolver.__instance is not None:
             return AssetResolver.__instance  # type: ignore
 
         AssetResolver.__instance = object.__new__(cls)
-
-        dir_path = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
-        with open(os.path.join(dir_path, 'data', 'all_assets.json'), 'r') as f:
-            assets = json.loads(f.read())
-
+        assets, identifiers_per_type = load_assets()
         AssetResolver.__instance.assets = assets
+        AssetResolver.__instance.identifiers_per_type = identifiers_per_type
         return AssetResolver.__instance
 
     @staticmethod
@@ -75,6 +183,14 @@ class AssetResolver():
         )
         return result
 
+    @staticmethod
+    def get_identifiers_of_type(asset_type: AssetType) -> List[str]:
+        """Get the identifiers of all known assets of the given type"""
+        resolver = AssetResolver()
+        if resolver.identifiers_per_type is None:
+            resolver.identifiers_per_type = _identifiers_per_type(resolver.assets)
+        return resolver.identifiers_per_type.get(asset_type, [])
+
     @staticmethod
     def get_all_eth_token_info() -> List[EthTokenInfo]:
         if AssetResolver().eth_token_info is not None:
@@ -4,8 +4,9 @@ from typing import TYPE_CHECKING, Any, Callable, Dict, List, NamedTuple, Optiona
 from rotkehlchen.accounting.structures import Balance
 from rotkehlchen.assets.asset import Asset, EthereumToken
 from rotkehlchen.chain.ethereum.makerdao.common import RAY
+from rotkehlchen.chain.ethereum.manager import ContractCall
 from rotkehlchen.chain.ethereum.structures import AaveEvent
-from rotkehlchen.chain.ethereum.zerion import DefiProtocolBalances
+from rotkehlchen.chain.ethereum.zerion import DefiBalance, DefiProtocolBalances
 from rotkehlchen.constants.ethereum import (
     AAVE_ETH_RESERVE_ADDRESS,
     AAVE_LENDING_POOL,
@@ -150,16 +151,20 @@ class Aave(EthereumModule):
         balances mapping when executed.
         """
         aave_balances = {}
-        reserve_cache: Dict[str, Tuple[Any, ...]] = {}
 
         if isinstance(given_defi_balances, dict):
             defi_balances = given_defi_balances
         else:
             defi_balances = given_defi_balances()
 
+        # Find the aave balances and the reserves they need data for
+        aave_entries: Dict[
+            ChecksumEthAddress,
+            List[Tuple[DefiProtocolBalances, DefiBalance, ChecksumEthAddress]],
+        ] = {}
+        reserve_addresses: List[ChecksumEthAddress] = []
         for account, balance_entries in defi_balances.items():
-            lending_map = {}
-            borrowing_map = {}
+            account_entries = []
             for balance_entry in balance_entries:
                 if balance_entry.protocol.name != 'Aave':
                     continue
@@ -170,17 +175,28 @@ class Aave(EthereumModule):
                 else:
                     asset = balance_entry.base_balance
                 reserve_address, _ = _get_reserve_address_decimals(asset.token_symbol)
+                if reserve_address not in reserve_addresses:
+                    reserve_addresses.append(reserve_address)
+                account_entries.append((balance_entry, asset, reserve_address))
 
-                reserve_data = reserve_cache.get(reserve_address, None)
-                if reserve_data is None:
-                    reserve_data = self.ethereum.call_contract(
-                        contract_address=AAVE_LENDING_POOL.address,
-                        abi=AAVE_LENDING_POOL.abi,
-                        method_name='getReserveData',
-                        arguments=[reserve_address],
-                    )
-                    reserve_cache[balance_entry.base_balance.token_symbol] = reserve_data
+            aave_entries[account] = account_entries
+
+        # Query the data of all reserves at once
+        reserve_results = self.ethereum.multicall([
+            ContractCall(
+                contract_address=AAVE_LENDING_POOL.address,
+                abi=AAVE_LENDING_POOL.abi,
+                method_name='getReserveData',
+                arguments=[reserve_address],
+            ) for reserve_address in reserve_addresses
+        ])
+        reserve_data_map = dict(zip(reserve_addresses, reserve_results))
 
+        for account, account_entries in aave_entries.items():
+            lending_map = {}
+            borrowing_map = {}
+            for balance_entry, asset, reserve_address in account_entries:
+                reserve_data = reserve_data_map[reserve_address]
                 if balance_entry.balance_type == 'Asset':
                     lending_map[asset.token_symbol] = AaveLendingBalance(
                         balance=asset.balance,
@@ -293,18 +309,14 @@ class Aave(EthereumModule):
             # accrued interest has not been yet paid out
             # TODO: ARCHIVE if to_block is not latest here we should get the balance
             # from the old block. Means using archive node
-            balance = self.ethereum.call_contract(
-                contract_address=token.ethereum_address,
-                abi=ATOKEN_ABI,
-                method_name='balanceOf',
-                arguments=[user_address],
-            )
-            principal_balance = self.ethereum.call_contract(
-                contract_address=token.ethereum_address,
-                abi=ATOKEN_ABI,
-                method_name='principalBalanceOf',
-                arguments=[user_address],
-            )
+            balance, principal_balance = self.ethereum.multicall([
+                ContractCall(
+                    contract_address=token.ethereum_address,
+                    abi=ATOKEN_ABI,
+                    method_name=method_name,
+                    arguments=[user_address],
+                ) for method_name in ('balanceOf', 'principalBalanceOf')
+            ])
 
             if len(events) == 0 and balance == 0 and principal_balance == 0:
                 # Nothing for this aToken for this address
@@ -354,6 +366,9 @@ class Aave(EthereumModule):
             from_block=from_block,
             to_block=to_block,
         )
+        # deposit and withdraw events are shared by all atokens so their timestamps
+        # will be already known for all but the first atoken
+        self.ethereum.prefetch_event_timestamps(mint_events + deposit_events + withdraw_events)
         mint_data = set()
         mint_data_to_log_index = {}
         for event in mint_events:
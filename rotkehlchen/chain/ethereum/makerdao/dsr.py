@@ -13,7 +13,7 @@ from rotkehlchen.chain.ethereum.makerdao.common import (
     RAY,
     MakerDAOCommon,
 )
-from rotkehlchen.chain.ethereum.manager import EthereumManager
+from rotkehlchen.chain.ethereum.manager import ContractCall, EthereumManager
 from rotkehlchen.constants import ZERO
 from rotkehlchen.constants.assets import A_DAI
 from rotkehlchen.constants.ethereum import MAKERDAO_DAI_JOIN, MAKERDAO_POT
@@ -182,32 +182,32 @@ class MakerDAODSR(MakerDAOCommon):
                 current_dai_price = Inquirer().find_usd_price(A_DAI)
             except RemoteError:
                 current_dai_price = Price(FVal(1))
-            for account, proxy in proxy_mappings.items():
-                guy_slice = self.ethereum.call_contract(
+            accounts = list(proxy_mappings.keys())
+            calls = [
+                ContractCall(
                     contract_address=MAKERDAO_POT.address,
                     abi=MAKERDAO_POT.abi,
                     method_name='pie',
-                    arguments=[proxy],
-                )
+                    arguments=[proxy_mappings[account]],
+                ) for account in accounts
+            ]
+            for method_name in ('chi', 'dsr'):
+                calls.append(ContractCall(
+                    contract_address=MAKERDAO_POT.address,
+                    abi=MAKERDAO_POT.abi,
+                    method_name=method_name,
+                ))
+            *guy_slices, chi, current_dsr = self.ethereum.multicall(calls)
+            for account, guy_slice in zip(accounts, guy_slices):
                 if guy_slice == 0:
                     # no current DSR balance for this proxy
                     continue
-                chi = self.ethereum.call_contract(
-                    contract_address=MAKERDAO_POT.address,
-                    abi=MAKERDAO_POT.abi,
-                    method_name='chi',
-                )
                 dai_balance = _dsrdai_to_dai(guy_slice * chi)
                 balances[account] = Balance(
                     amount=dai_balance,
                     usd_value=current_dai_price * dai_balance,
                 )
 
-            current_dsr = self.ethereum.call_contract(
-                contract_address=MAKERDAO_POT.address,
-                abi=MAKERDAO_POT.abi,
-                method_name='dsr',
-            )
             # Calculation is from here:
             # https://docs.makerdao.com/smart-contract-modules/rates-module#a-note-on-setting-rates
             current_dsr_percentage = ((FVal(current_dsr / RAY) ** 31622400) % 1) * 100
@@ -290,6 +290,7 @@ class MakerDAODSR(MakerDAOCommon):
             argument_filters=argument_filters,
             from_block=MAKERDAO_POT.deployed_block,
         )
+        self.ethereum.prefetch_event_timestamps(join_events)
         for join_event in join_events:
             try:
                 wad_val = hex_or_bytes_to_int(join_event['topics'][2])
@@ -349,6 +350,7 @@ class MakerDAODSR(MakerDAOCommon):
             argument_filters=argument_filters,
             from_block=MAKERDAO_POT.deployed_block,
         )
+        self.ethereum.prefetch_event_timestamps(exit_events)
         for exit_event in exit_events:
             try:
                 wad_val = hex_or_bytes_to_int(exit_event['topics'][2])
@@ -1,7 +1,7 @@
 import logging
 from collections import defaultdict
 from enum import Enum
-from typing import Any, Dict, List, NamedTuple, Optional
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
 
 from eth_utils.address import to_checksum_address
 from gevent.lock import Semaphore
@@ -15,7 +15,7 @@ from rotkehlchen.chain.ethereum.makerdao.common import (
     WAD,
     MakerDAOCommon,
 )
-from rotkehlchen.chain.ethereum.manager import EthereumManager, address_to_bytes32
+from rotkehlchen.chain.ethereum.manager import ContractCall, EthereumManager, address_to_bytes32
 from rotkehlchen.constants import ZERO
 from rotkehlchen.constants.assets import A_DAI
 from rotkehlchen.constants.ethereum import (
@@ -83,6 +83,12 @@ def _normalize_amount(asset_symbol: str, amount: int) -> FVal:
     raise AssertionError('should never reach here')
 
 
+def _stability_fee_from_jug_ilk(jug_ilk: Tuple[int, int]) -> FVal:
+    """Calculates the yearly stability fee from the result of the jug contract's ilks()"""
+    # jug_ilk[0] is the duty variable of the ilks in the contract
+    return FVal(jug_ilk[0] / RAY) ** (YEAR_IN_SECONDS) - 1
+
+
 class VaultEventType(Enum):
     DEPOSIT_COLLATERAL = 1
     WITHDRAW_COLLATERAL = 2
@@ -216,9 +222,7 @@ class MakerDAOVaults(MakerDAOCommon):
             method_name='ilks',
             arguments=[ilk],
         )
-        # result[0] is the duty variable of the ilks in the contract
-        stability_fee = FVal(result[0] / RAY) ** (YEAR_IN_SECONDS) - 1
-        return stability_fee
+        return _stability_fee_from_jug_ilk(result)
 
     def _query_vault_data(
             self,
@@ -236,32 +240,40 @@ class MakerDAOVaults(MakerDAOCommon):
             )
             return None
 
-        result = self.ethereum.call_contract(
-            contract_address=MAKERDAO_VAT.address,
-            abi=MAKERDAO_VAT.abi,
-            method_name='urns',
-            arguments=[ilk, urn],
-        )
+        urn_result, vat_ilk_result, spot_ilk_result, jug_ilk_result = self.ethereum.multicall([
+            ContractCall(
+                contract_address=MAKERDAO_VAT.address,
+                abi=MAKERDAO_VAT.abi,
+                method_name='urns',
+                arguments=[ilk, urn],
+            ),
+            ContractCall(
+                contract_address=MAKERDAO_VAT.address,
+                abi=MAKERDAO_VAT.abi,
+                method_name='ilks',
+                arguments=[ilk],
+            ),
+            ContractCall(
+                contract_address=MAKERDAO_SPOT.address,
+                abi=MAKERDAO_SPOT.abi,
+                method_name='ilks',
+                arguments=[ilk],
+            ),
+            ContractCall(
+                contract_address=MAKERDAO_JUG.address,
+                abi=MAKERDAO_JUG.abi,
+                method_name='ilks',
+                arguments=[ilk],
+            ),
+        ])
         # also known as ink in their contract
-        collateral_amount = FVal(result[0] / WAD)
-        normalized_debt = result[1]  # known as art in their contract
-        result = self.ethereum.call_contract(
-            contract_address=MAKERDAO_VAT.address,
-            abi=MAKERDAO_VAT.abi,
-            method_name='ilks',
-            arguments=[ilk],
-        )
-        rate = result[1]  # Accumulated Rates
-        spot = FVal(result[2])  # Price with Safety Margin
+        collateral_amount = FVal(urn_result[0] / WAD)
+        normalized_debt = urn_result[1]  # known as art in their contract
+        rate = vat_ilk_result[1]  # Accumulated Rates
+        spot = FVal(vat_ilk_result[2])  # Price with Safety Margin
         # How many DAI owner needs to pay back to the vault
         debt_value = FVal(((normalized_debt / WAD) * rate) / RAY)
-        result = self.ethereum.call_contract(
-            contract_address=MAKERDAO_SPOT.address,
-            abi=MAKERDAO_SPOT.abi,
-            method_name='ilks',
-            arguments=[ilk],
-        )
-        mat = result[1]
+        mat = spot_ilk_result[1]
         liquidation_ratio = FVal(mat / RAY)
         asset = Asset(asset_symbol)
         price = FVal((spot / RAY) * liquidation_ratio)
@@ -290,7 +302,7 @@ class MakerDAOVaults(MakerDAOCommon):
             collateralization_ratio=collateralization_ratio,
             liquidation_price=liquidation_price,
             urn=urn,
-            stability_fee=self.get_stability_fee(ilk),
+            stability_fee=_stability_fee_from_jug_ilk(jug_ilk_result),
         )
 
     def _query_vault_details(
@@ -378,6 +390,9 @@ class MakerDAOVaults(MakerDAOCommon):
             argument_filters=argument_filters,
             from_block=gemjoin.deployed_block,
         ))
+        self.ethereum.prefetch_event_timestamps(
+            [x for x in events if x['transactionHash'] in frob_event_tx_hashes],
+        )
         deposit_tx_hashes = set()
         for event in events:
             tx_hash = event['transactionHash']
@@ -420,6 +435,9 @@ class MakerDAOVaults(MakerDAOCommon):
             argument_filters=argument_filters,
             from_block=gemjoin.deployed_block,
         )
+        self.ethereum.prefetch_event_timestamps(
+            [x for x in events if x['transactionHash'] in frob_event_tx_hashes],
+        )
         for event in events:
             tx_hash = event['transactionHash']
             if tx_hash not in frob_event_tx_hashes:
@@ -460,6 +478,7 @@ class MakerDAOVaults(MakerDAOCommon):
             argument_filters=argument_filters,
             from_block=MAKERDAO_VAT.deployed_block,
         )
+        self.ethereum.prefetch_event_timestamps(events)
         for event in events:
             given_amount = _shift_num_right_by(hex_or_bytes_to_int(event['topics'][3]), RAY_DIGITS)
             total_dai_wei += given_amount
@@ -494,6 +513,7 @@ class MakerDAOVaults(MakerDAOCommon):
             argument_filters=argument_filters,
             from_block=MAKERDAO_DAI_JOIN.deployed_block,
         )
+        self.ethereum.prefetch_event_timestamps(events)
         for event in events:
             given_amount = hex_or_bytes_to_int(event['topics'][3])
             total_dai_wei -= given_amount
@@ -530,6 +550,7 @@ class MakerDAOVaults(MakerDAOCommon):
             argument_filters=argument_filters,
             from_block=MAKERDAO_CAT.deployed_block,
         )
+        self.ethereum.prefetch_event_timestamps(events)
         sum_liquidation_amount = ZERO
         sum_liquidation_usd = ZERO
         for event in events:
@@ -1,7 +1,10 @@
+import hashlib
+import json
 import logging
 import random
+from collections import OrderedDict, defaultdict
 from enum import Enum
-from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
 from urllib.parse import urlparse
 
 import requests
@@ -10,16 +13,22 @@ from ens.abis import ENS as ENS_ABI, RESOLVER as ENS_RESOLVER_ABI
 from ens.main import ENS_MAINNET_ADDR
 from ens.utils import is_none_or_zero_address, normal_name_to_hash, normalize_name
 from eth_typing import BlockNumber
+from eth_utils import decode_hex
 from eth_utils.address import to_checksum_address
+from gevent.lock import Semaphore
 from typing_extensions import Literal
 from web3 import HTTPProvider, Web3
 from web3._utils.abi import get_abi_output_types
 from web3._utils.contracts import find_matching_event_abi
 from web3._utils.filters import construct_event_filter_params
+from web3.contract import Contract
 from web3.datastructures import MutableAttributeDict
+from web3.exceptions import BadFunctionCallOutput
 from web3.middleware.exception_retry_request import http_retry_request_middleware
+from web3.types import FilterParams
 
-from rotkehlchen.constants.ethereum import ETH_SCAN
+from rotkehlchen.constants.ethereum import ETH_SCAN, MULTICALL
+from rotkehlchen.db.dbhandler import DBHandler
 from rotkehlchen.errors import BlockchainQueryError, RemoteError, UnableToDecryptRemoteData
 from rotkehlchen.externalapis.etherscan import Etherscan
 from rotkehlchen.fval import FVal
@@ -27,18 +36,112 @@ from rotkehlchen.greenlets import GreenletManager
 from rotkehlchen.logging import RotkehlchenLogsAdapter
 from rotkehlchen.typing import ChecksumEthAddress, Timestamp
 from rotkehlchen.user_messages import MessagesAggregator
-from rotkehlchen.utils.misc import from_wei, hex_or_bytes_to_str, request_get_dict
+from rotkehlchen.utils.misc import from_wei, get_chunks, hex_or_bytes_to_str, request_get_dict
 
 logger = logging.getLogger(__name__)
 log = RotkehlchenLogsAdapter(logger)
 
 DEFAULT_ETH_RPC_TIMEOUT = 10
+# Maximum number of contract calls aggregated in a single call to the multicall contract
+MULTICALL_MAX_CALLS = 100
+# Logs of blocks at least this many blocks behind the latest one are considered
+# final and get cached. Logs of newer blocks could still be reorged out.
+LOGS_CACHE_CONFIRMATIONS = 12
+# Number of block timestamps kept in memory. The rest are read from the DB
+BLOCK_TIMESTAMPS_CACHE_SIZE = 8192
+# Maximum number of requests sent to a node in a single JSON-RPC batch
+JSONRPC_BATCH_SIZE = 100
+
+
+class ContractCall(NamedTuple):
+    """A read-only call to an ethereum contract method, as given to multicall()"""
+    contract_address: ChecksumEthAddress
+    abi: List
+    method_name: str
+    arguments: Optional[List[Any]] = None
 
 
 def address_to_bytes32(address: ChecksumEthAddress) -> str:
     return '0x' + 24 * '0' + address.lower()[2:]
 
 
+def _decode_contract_call_output(
+        web3: Web3,
+        contract: Contract,
+        method_name: str,
+        arguments: Optional[List[Any]],
+        data: bytes,
+) -> Any:
+    """Decodes the raw output of a contract call the same way web3 does
+
+    A single return value is returned as is and multiple ones as a tuple
+    """
+    fn_abi = contract._find_matching_fn_abi(
+        fn_identifier=method_name,
+        args=arguments,
+    )
+    output_types = get_abi_output_types(fn_abi)
+    output_data = web3.codec.decode_abi(output_types, data)
+
+    if len(output_data) == 1:
+        return output_data[0]
+    return output_data
+
+
+def _hex_or_bytes_to_hexstr(value: Union[bytes, str]) -> str:
+    if isinstance(value, bytes):
+        return '0x' + bytes(value).hex()
+    return value
+
+
+def _hex_or_int_to_int(value: Union[str, int]) -> int:
+    if isinstance(value, int):
+        return value
+    # etherscan returns '0x' instead of '0x0' for some of the zero values
+    return 0 if value == '0x' else int(value, 16)
+
+
+def _normalize_log(event: Dict[str, Any]) -> Dict[str, Any]:
+    """Turns a log returned either by etherscan or web3 into a json serializable dict
+
+    Hex values are kept as 0x prefixed strings and numbers as integers. Only the
+    keys that are used from the logs are kept.
+    """
+    normalized_log = {
+        'address': to_checksum_address(event['address']),
+        'topics': [_hex_or_bytes_to_hexstr(x) for x in event['topics']],
+        'data': _hex_or_bytes_to_hexstr(event['data']),
+        'blockNumber': _hex_or_int_to_int(event['blockNumber']),
+        'transactionHash': _hex_or_bytes_to_hexstr(event['transactionHash']),
+        'transactionIndex': _hex_or_int_to_int(event['transactionIndex']),
+        'logIndex': _hex_or_int_to_int(event['logIndex']),
+    }
+    if 'timeStamp' in event:
+        # event from etherscan
+        normalized_log['timeStamp'] = event['timeStamp']
+    return normalized_log
+
+
+def _get_logs_filter_args(
+        contract_address: ChecksumEthAddress,
+        abi: List,
+        event_name: str,
+        argument_filters: Dict[str, Any],
+) -> FilterParams:
+    """Creates the eth_getLogs filter params for the given event, without a block range"""
+    event_abi = find_matching_event_abi(abi=abi, event_name=event_name)
+    _, filter_args = construct_event_filter_params(
+        event_abi=event_abi,
+        abi_codec=Web3().codec,
+        contract_address=contract_address,
+        argument_filters=argument_filters,
+    )
+    if event_abi['anonymous']:
+        # web3.py does not handle the anonymous events correctly and adds the first topic
+        filter_args['topics'] = filter_args['topics'][1:]
+    return filter_args
+
+
 def _is_synchronized(current_block: int, latest_block: int) -> Tuple[bool, str]:
     """ Validate that the ethereum node is synchronized
             within 20 blocks of latest block
@@ -124,6 +227,7 @@ class EthereumManager():
             greenlet_manager: GreenletManager,
             connect_at_start: Sequence[NodeName],
             eth_rpc_timeout: int = DEFAULT_ETH_RPC_TIMEOUT,
+            database: Optional[DBHandler] = None,
     ) -> None:
         log.debug(f'Initializing Ethereum Manager with {ethrpc_endpoint}')
         self.greenlet_manager = greenlet_manager
@@ -132,6 +236,11 @@ class EthereumManager():
         self.etherscan = etherscan
         self.msg_aggregator = msg_aggregator
         self.eth_rpc_timeout = eth_rpc_timeout
+        # If given, the logs returned by get_logs() are cached in the DB
+        self.database = database
+        self.logs_cache_locks: Dict[str, Semaphore] = defaultdict(Semaphore)
+        # Least recently used block number to timestamp mappings
+        self.block_timestamps: 'OrderedDict[int, Timestamp]' = OrderedDict()
         for node in connect_at_start:
             self.greenlet_manager.spawn_and_track(
                 task_name=f'Attempt connection to {str(node)} ethereum node',
@@ -498,16 +607,13 @@ class EthereumManager():
                 f' Returned 0x result',
             )
 
-        fn_abi = contract._find_matching_fn_abi(
-            fn_identifier=method_name,
-            args=arguments,
+        return _decode_contract_call_output(
+            web3=web3,
+            contract=contract,
+            method_name=method_name,
+            arguments=arguments,
+            data=bytes.fromhex(result[2:]),
         )
-        output_types = get_abi_output_types(fn_abi)
-        output_data = web3.codec.decode_abi(output_types, bytes.fromhex(result[2:]))
-
-        if len(output_data) == 1:
-            return output_data[0]
-        return output_data
 
     def call_contract(
             self,
@@ -559,6 +665,87 @@ class EthereumManager():
             )
         return result
 
+    def multicall(
+            self,
+            calls: Sequence[ContractCall],
+            call_order: Optional[Sequence[NodeName]] = None,
+    ) -> List[Any]:
+        """Performs many contract calls and returns their decoded results in the given order
+
+        With an ethereum node the calls are aggregated into as few eth_calls to
+        the multicall contract as possible. Etherscan is queried one call at a time.
+        Each result is decoded like call_contract() would.
+
+        May raise:
+        - RemoteError if none of the nodes in the call order could perform all calls
+        """
+        if len(calls) == 0:
+            return []
+
+        return self.query(
+            method=self._multicall,
+            call_order=call_order if call_order is not None else self.default_call_order(),
+            calls=calls,
+        )
+
+    def _multicall(
+            self,
+            web3: Optional[Web3],
+            calls: Sequence[ContractCall],
+    ) -> List[Any]:
+        """Performs the calls via the multicall contract or sequentially via etherscan
+
+        May raise:
+        - RemoteError if etherscan is used and there is a problem with
+        reaching it or with the returned result
+        - BlockchainQueryError if web3 is used and there is a VM execution error,
+        for example if any of the aggregated calls reverts
+        """
+        if web3 is None:
+            return [
+                self._call_contract_etherscan(
+                    contract_address=call.contract_address,
+                    abi=call.abi,
+                    method_name=call.method_name,
+                    arguments=call.arguments,
+                ) for call in calls
+            ]
+
+        multicall = web3.eth.contract(address=MULTICALL.address, abi=MULTICALL.abi)
+        results = []
+        for chunk in get_chunks(list(calls), n=MULTICALL_MAX_CALLS):
+            contracts = [
+                web3.eth.contract(address=call.contract_address, abi=call.abi)
+                for call in chunk
+            ]
+            aggregate_calls = [
+                (
+                    call.contract_address,
+                    decode_hex(contract.encodeABI(
+                        call.method_name,
+                        args=call.arguments if call.arguments else [],
+                    )),
+                ) for call, contract in zip(chunk, contracts)
+            ]
+            try:
+                _, return_data = multicall.caller.aggregate(aggregate_calls)
+            except (ValueError, BadFunctionCallOutput) as e:
+                # BadFunctionCallOutput if the node does not know the multicall contract
+                raise BlockchainQueryError(
+                    f'Error doing multicall of {len(chunk)} contract calls: {str(e)}',
+                )
+
+            for call, contract, data in zip(chunk, contracts, return_data):
+                results.append(_decode_contract_call_output(
+                    web3=web3,
+                    contract=contract,
+                    method_name=call.method_name,
+                    arguments=call.arguments,
+                    data=data,
+                ))
+
+        return results
+
     def get_logs(
             self,
             contract_address: ChecksumEthAddress,
@@ -569,16 +756,116 @@ class EthereumManager():
             to_block: Union[int, Literal['latest']] = 'latest',
             call_order: Sequence[NodeName] = (NodeName.OWN, NodeName.ETHERSCAN),
     ) -> List[Dict[str, Any]]:
-        return self.query(
-            method=self._get_logs,
-            call_order=call_order,
+        """Queries the logs of an ethereum contract event in the given block range
+
+        If the manager has a database the logs are cached in it. For each contract
+        and topics filter the cache covers a single contiguous block range. Only the
+        parts of the requested range not covered yet are queried and the cache is
+        extended by them. A range that is disjoint from the cached one is queried as
+        a whole and not cached, so that the cached range stays contiguous. Logs of
+        the last LOGS_CACHE_CONFIRMATIONS blocks are never cached.
+
+        With the cache all logs are returned in the same form whatever node they
+        came from. Hex values are 0x prefixed strings and numbers are integers.
+
+        May raise:
+        - RemoteError if none of the nodes in the call order could be queried
+        """
+        query_kwargs = {
+            'contract_address': contract_address,
+            'abi': abi,
+            'event_name': event_name,
+            'argument_filters': argument_filters,
+        }
+        if self.database is None:
+            return self.query(
+                method=self._get_logs,
+                call_order=call_order,
+                from_block=from_block,
+                to_block=to_block,
+                **query_kwargs,
+            )
+
+        filter_args = _get_logs_filter_args(
             contract_address=contract_address,
             abi=abi,
             event_name=event_name,
             argument_filters=argument_filters,
+        )
+        query_key = hashlib.sha256(json.dumps(
+            [contract_address, filter_args['topics']],
+        ).encode()).hexdigest()
+        latest_block = self.get_latest_block_number(call_order=call_order)
+        until_block = latest_block if to_block == 'latest' else to_block
+        last_final_block = latest_block - LOGS_CACHE_CONFIRMATIONS
+
+        with self.logs_cache_locks[query_key]:
+            cached_range = self.database.get_ethereum_logs_range(query_key)
+            if cached_range is None:
+                gaps = [(from_block, until_block)]
+                new_range = (from_block, min(until_block, last_final_block))
+            elif from_block > cached_range[1] + 1 or until_block < cached_range[0] - 1:
+                logs = self.query(
+                    method=self._get_logs,
+                    call_order=call_order,
+                    from_block=from_block,
+                    to_block=until_block,
+                    **query_kwargs,
+                )
+                return [_normalize_log(x) for x in logs]
+            else:
+                gaps = []
+                if from_block < cached_range[0]:
+                    gaps.append((from_block, cached_range[0] - 1))
+                if until_block > cached_range[1]:
+                    gaps.append((cached_range[1] + 1, until_block))
+                new_range = (
+                    min(from_block, cached_range[0]),
+                    max(cached_range[1], min(until_block, last_final_block)),
+                )
+
+            new_final_logs = []
+            new_recent_logs = []
+            for gap_start, gap_end in gaps:
+                logs = self.query(
+                    method=self._get_logs,
+                    call_order=call_order,
+                    from_block=gap_start,
+                    to_block=gap_end,
+                    **query_kwargs,
+                )
+                for entry in logs:
+                    normalized_log = _normalize_log(entry)
+                    if normalized_log['blockNumber'] <= last_final_block:
+                        new_final_logs.append(normalized_log)
+                    else:
+                        new_recent_logs.append(normalized_log)
+
+            if cached_range is None and new_range[0] > new_range[1]:
+                # the whole range is too recent to be cached
+                return new_recent_logs
+            if len(gaps) != 0:
+                self.database.add_ethereum_logs(
+                    query_key=query_key,
+                    logs=new_final_logs,
+                    from_block=new_range[0],
+                    to_block=new_range[1],
+                )
+            cached_logs = self.database.get_ethereum_logs(
+                query_key=query_key,
+                from_block=from_block,
+                to_block=until_block,
+            )
+
+        log.debug(
+            'Got contract event logs',
+            event_name=event_name,
             from_block=from_block,
-            to_block=to_block,
+            to_block=until_block,
+            queried_ranges=gaps,
         )
+        # Recent logs are after the end of the cached range so they come last
+        return cached_logs + new_recent_logs
 
     def _get_logs(
             self,
@@ -596,18 +883,12 @@ class EthereumManager():
         - RemoteError if etherscan is used and there is a problem with
         reaching it or with the returned result
         """
-        event_abi = find_matching_event_abi(abi=abi, event_name=event_name)
-        _, filter_args = construct_event_filter_params(
-            event_abi=event_abi,
-            abi_codec=Web3().codec,
+        filter_args = _get_logs_filter_args(
             contract_address=contract_address,
+            abi=abi,
+            event_name=event_name,
             argument_filters=argument_filters,
-            fromBlock=from_block,
-            toBlock=to_block,
         )
-        if event_abi['anonymous']:
-            # web3.py does not handle the anonymous events correctly and adds the first topic
-            filter_args['topics'] = filter_args['topics'][1:]
         events: List[Dict[str, Any]] = []
         start_block = from_block
         if web3 is not None:
@@ -646,11 +927,115 @@ class EthereumManager():
 
         return events
 
+    def _remember_block_timestamps(self, block_timestamps: Dict[int, Timestamp]) -> None:
+        for block_number, timestamp in block_timestamps.items():
+            self.block_timestamps[block_number] = timestamp
+            self.block_timestamps.move_to_end(block_number)
+        while len(self.block_timestamps) > BLOCK_TIMESTAMPS_CACHE_SIZE:
+            self.block_timestamps.popitem(last=False)
+
+    def get_blocks_timestamps(
+            self,
+            block_numbers: List[int],
+            call_order: Optional[Sequence[NodeName]] = None,
+    ) -> Dict[int, Timestamp]:
+        """Gets the timestamps of the given blocks
+
+        Timestamps are looked up in memory first and then in the DB. All blocks
+        not found in either are queried together and the results stored in both.
+
+        May raise:
+        - RemoteError if none of the nodes in the call order could be queried
+        """
+        result = {}
+        missing_blocks = []
+        for block_number in dict.fromkeys(block_numbers):
+            timestamp = self.block_timestamps.get(block_number, None)
+            if timestamp is None:
+                missing_blocks.append(block_number)
+            else:
+                result[block_number] = timestamp
+        if len(missing_blocks) == 0:
+            self._remember_block_timestamps(result)
+            return result
+
+        if self.database is not None:
+            db_timestamps = self.database.get_block_timestamps(missing_blocks)
+            result.update(db_timestamps)
+            missing_blocks = [x for x in missing_blocks if x not in db_timestamps]
+
+        if len(missing_blocks) != 0:
+            queried_timestamps = self.query(
+                method=self._get_blocks_timestamps,
+                call_order=call_order if call_order is not None else self.default_call_order(),
+                block_numbers=missing_blocks,
+            )
+            if self.database is not None:
+                self.database.add_block_timestamps(queried_timestamps)
+            result.update(queried_timestamps)
+
+        self._remember_block_timestamps(result)
+        return result
+
+    def _get_blocks_timestamps(
+            self,
+            web3: Optional[Web3],
+            block_numbers: List[int],
+    ) -> Dict[int, Timestamp]:
+        """Queries the timestamps of the given blocks
+
+        Nodes are sent all block queries in JSON-RPC batches. Etherscan has no
+        batching so it is queried one block at a time.
+
+        May raise:
+        - RemoteError if there is a problem with reaching the node or etherscan
+        or with the returned result
+        """
+        if web3 is None:
+            return {
+                x: Timestamp(self.etherscan.get_block_by_number(x)['timestamp'])
+                for x in block_numbers
+            }
+
+        endpoint = web3.provider.endpoint_uri  # type: ignore
+        result = {}
+        for chunk in get_chunks(block_numbers, n=JSONRPC_BATCH_SIZE):
+            payload = [{
+                'jsonrpc': '2.0',
+                'id': idx,
+                'method': 'eth_getBlockByNumber',
+                'params': [hex(block_number), False],
+            } for idx, block_number in enumerate(chunk)]
+            try:
+                response = requests.post(endpoint, json=payload, timeout=self.eth_rpc_timeout)
+                response.raise_for_status()
+                responses = response.json()
+                for entry in responses:
+                    block_number = chunk[entry['id']]
+                    result[block_number] = Timestamp(int(entry['result']['timestamp'], 16))
+            except (
+                    requests.exceptions.RequestException,
+                    ValueError,
+                    KeyError,
+                    IndexError,
+                    TypeError,
+            ) as e:
+                # ValueError for invalid json, the rest for unexpected responses such
+                # as an error instead of the batch response or a missing block
+                raise RemoteError(
+                    f'Failed to query block timestamps from {endpoint} in a batch: {str(e)}',
+                )
+
+            if any(x not in result for x in chunk):
+                raise RemoteError(f'Batch query of block timestamps to {endpoint} was incomplete')
+
+        return result
+
     def get_event_timestamp(self, event: Dict[str, Any]) -> Timestamp:
         """Reads an event returned either by etherscan or web3 and gets its timestamp
 
         Etherscan events contain a timestamp. Normal web3 events don't so it needs to
-        be queried from the block number
+        be found from the block number
         """
         if 'timeStamp' in event:
             # event from etherscan
@@ -658,5 +1043,15 @@ class EthereumManager():
 
         # event from web3
         block_number = event['blockNumber']
-        block_data = self.get_block_by_number(block_number)
-        return Timestamp(block_data['timestamp'])
+        return self.get_blocks_timestamps([block_number])[block_number]
+
+    def prefetch_event_timestamps(self, events: List[Dict[str, Any]]) -> None:
+        """Finds the timestamps of all the given web3 events in one go, so that the
+        following get_event_timestamp() calls for them don't query each block
+
+        May raise:
+        - RemoteError if none of the nodes could be queried
+        """
+        self.get_blocks_timestamps(
+            [x['blockNumber'] for x in events if 'timeStamp' not in x],
+        )
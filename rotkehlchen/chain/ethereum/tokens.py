@@ -1,6 +1,7 @@
 import logging
 import random
 from collections import defaultdict
+from functools import partial
 from typing import Dict, List, Optional, Sequence, Tuple
 
 from rotkehlchen.assets.asset import EthereumToken
@@ -12,9 +13,10 @@ from rotkehlchen.constants.misc import ZERO
 from rotkehlchen.db.dbhandler import DBHandler
 from rotkehlchen.errors import RemoteError
 from rotkehlchen.fval import FVal
+from rotkehlchen.greenlets import run_concurrently
 from rotkehlchen.inquirer import Inquirer
 from rotkehlchen.logging import RotkehlchenLogsAdapter
-from rotkehlchen.typing import ChecksumEthAddress, EthTokenInfo, Price
+from rotkehlchen.typing import ChecksumEthAddress, EthTokenInfo, Price, Timestamp
 from rotkehlchen.utils.misc import get_chunks, ts_now
 
 logger = logging.getLogger(__name__)
@@ -54,6 +56,8 @@ TokensReturn = Tuple[
 
 ETHERSCAN_MAX_TOKEN_CHUNK_LENGTH = 120
 OTHER_MAX_TOKEN_CHUNK_LENGTH = 590
+# Maximum number of addresses whose token balances are queried at the same time
+TOKEN_BALANCES_QUERY_POOL_SIZE = 4
 
 
 class EthTokens():
@@ -125,31 +129,59 @@ class EthTokens():
         token_usd_price: Dict[EthereumToken, Price] = {}
         result = {}
 
-        for address in addresses:
-            saved_list = self.db.get_tokens_for_address_if_time(address=address, current_time=now)
-            if force_detection or saved_list is None:
-                balances = self.detect_tokens_for_address(
-                    address=address,
-                    token_usd_price=token_usd_price,
-                    etherscan_chunks=etherscan_chunks,
-                    other_chunks=other_chunks,
-                )
-            else:
-                if len(saved_list) == 0:
-                    continue  # Do not query if we know the address has no tokens
+        # The addresses are independent of each other so query them concurrently
+        address_balances = run_concurrently(
+            methods={address: partial(
+                self._query_tokens_for_address,
+                address=address,
+                force_detection=force_detection,
+                now=now,
+                token_usd_price=token_usd_price,
+                etherscan_chunks=etherscan_chunks,
+                other_chunks=other_chunks,
+            ) for address in addresses},
+            pool_size=TOKEN_BALANCES_QUERY_POOL_SIZE,
+        )
+        for address, balances in address_balances.items():
+            if balances is not None:
+                result[address] = balances
 
-                balances = defaultdict(FVal)
-                self._get_tokens_balance_and_price(
-                    address=address,
-                    tokens=[x.token_info() for x in saved_list],
-                    balances=balances,
-                    token_usd_price=token_usd_price,
-                    call_order=None,  # use defaults
-                )
+        return result, token_usd_price
 
-            result[address] = balances
+    def _query_tokens_for_address(
+            self,
+            address: ChecksumEthAddress,
+            force_detection: bool,
+            now: Timestamp,
+            token_usd_price: Dict[EthereumToken, Price],
+            etherscan_chunks: List[List[EthTokenInfo]],
+            other_chunks: List[List[EthTokenInfo]],
+    ) -> Optional[Dict[EthereumToken, FVal]]:
+        """Queries/detects the token balances of a single address
 
-        return result, token_usd_price
+        Returns None if the address is known to have no tokens
+        """
+        saved_list = self.db.get_tokens_for_address_if_time(address=address, current_time=now)
+        if force_detection or saved_list is None:
+            return self.detect_tokens_for_address(
+                address=address,
+                token_usd_price=token_usd_price,
+                etherscan_chunks=etherscan_chunks,
+                other_chunks=other_chunks,
+            )
+
+        if len(saved_list) == 0:
+            return None  # Do not query if we know the address has no tokens
+
+        balances: Dict[EthereumToken, FVal] = defaultdict(FVal)
+        self._get_tokens_balance_and_price(
+            address=address,
+            tokens=[x.token_info() for x in saved_list],
+            balances=balances,
+            token_usd_price=token_usd_price,
+            call_order=None,  # use defaults
+        )
+        return balances
 
     def _get_tokens_balance_and_price(
             self,
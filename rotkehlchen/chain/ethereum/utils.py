@@ -2,4 +2,4 @@ from rotkehlchen.fval import FVal
 
 
 def token_normalized_value(token_amount: int, token_decimals: int) -> FVal:
-    return token_amount / (FVal(10) ** FVal(token_decimals))
+    return FVal.from_scaled_int(token_amount, token_decimals)
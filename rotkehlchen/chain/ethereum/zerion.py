@@ -1,19 +1,23 @@
 import logging
-from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional, Tuple
+from functools import partial
+from typing import TYPE_CHECKING, Any, Dict, List, NamedTuple, Optional, Tuple
 
 from eth_utils.address import to_checksum_address
 from typing_extensions import Literal
 
 from rotkehlchen.accounting.structures import Balance
 from rotkehlchen.assets.asset import Asset
+from rotkehlchen.chain.ethereum.manager import ContractCall
 from rotkehlchen.chain.ethereum.utils import token_normalized_value
 from rotkehlchen.constants.ethereum import ZERION_ABI
 from rotkehlchen.constants.misc import ZERO
-from rotkehlchen.errors import UnknownAsset, UnsupportedAsset
+from rotkehlchen.errors import RemoteError, UnknownAsset, UnsupportedAsset
+from rotkehlchen.greenlets import run_concurrently
 from rotkehlchen.inquirer import Inquirer
 from rotkehlchen.serialization.deserialize import deserialize_ethereum_address
 from rotkehlchen.typing import ChecksumEthAddress, Price
 from rotkehlchen.user_messages import MessagesAggregator
+from rotkehlchen.utils.misc import get_chunks
 
 if TYPE_CHECKING:
     from rotkehlchen.chain.ethereum.manager import EthereumManager
@@ -58,6 +62,13 @@ class DefiProtocolBalances(NamedTuple):
 
 # last known zerion adapter address
 ZERION_ADAPTER_ADDRESS = deserialize_ethereum_address('0x06FE76B2f432fdfEcAEf1a7d4f6C3d41B5861672')
+# How many accounts are queried in a single multicall. getBalances() goes through all
+# protocol adapters so it is expensive and its result is big. Keep this small enough
+# to stay within the gas limit of an eth_call and the response size limits of nodes
+# and etherscan. Chunks that still fail are split in half and retried.
+ZERION_MAX_ACCOUNTS_PER_CALL = 4
+# How many multicalls run at the same time when querying many accounts
+ZERION_CONCURRENT_CALLS = 4
 
 
 def query_zerion_address(
@@ -92,10 +103,8 @@ class Zerion():
 
         if contract_address:
             self.contract_address = contract_address
-            return
-
-        # else
-        self.contract_address = query_zerion_address(ethereum_manager, msg_aggregator)
+        else:
+            self.contract_address = query_zerion_address(ethereum_manager, msg_aggregator)
 
     def all_balances_for_account(self, account: ChecksumEthAddress) -> List[DefiProtocolBalances]:
         """Calls the contract's getBalances() to get all protocol balances for account
@@ -108,6 +117,86 @@ class Zerion():
             method_name='getBalances',
             arguments=[account],
         )
+        return self._process_protocol_balances(result)
+
+    def all_balances_for_accounts(
+            self,
+            accounts: List[ChecksumEthAddress],
+    ) -> Dict[ChecksumEthAddress, List[DefiProtocolBalances]]:
+        """Gets all protocol balances for many accounts
+
+        Instead of one getBalances() call per account the calls are packed in
+        chunks of ZERION_MAX_ACCOUNTS_PER_CALL accounts and each chunk is sent as a
+        single multicall. If a chunk fails, for example by running out of gas, it is
+        split in half and retried. A single account falls back to a plain
+        getBalances() call.
+
+        Returns the balances of each account in the order of the given accounts.
+
+        May raise:
+        - RemoteError if the balances of an account could not be queried
+        """
+        if len(accounts) == 0:
+            return {}
+
+        chunks = list(get_chunks(accounts, n=ZERION_MAX_ACCOUNTS_PER_CALL))
+        chunk_results = run_concurrently(
+            methods={
+                idx: partial(self._query_accounts_chunk, chunk)
+                for idx, chunk in enumerate(chunks)
+            },
+            pool_size=ZERION_CONCURRENT_CALLS,
+        )
+        all_results: Dict[ChecksumEthAddress, Any] = {}
+        for idx in range(len(chunks)):
+            all_results.update(chunk_results[idx])
+
+        return {
+            account: self._process_protocol_balances(all_results[account])
+            for account in accounts
+        }
+
+    def _query_accounts_chunk(
+            self,
+            accounts: List[ChecksumEthAddress],
+    ) -> Dict[ChecksumEthAddress, Any]:
+        """Queries the decoded getBalances() results of the given accounts in one multicall
+
+        May raise:
+        - RemoteError if a single account's query fails
+        """
+        if len(accounts) == 1:
+            result = self.ethereum.call_contract(
+                contract_address=self.contract_address,
+                abi=ZERION_ABI,
+                method_name='getBalances',
+                arguments=[accounts[0]],
+            )
+            return {accounts[0]: result}
+
+        calls = [
+            ContractCall(
+                contract_address=self.contract_address,
+                abi=ZERION_ABI,
+                method_name='getBalances',
+                arguments=[account],
+            ) for account in accounts
+        ]
+        try:
+            results = self.ethereum.multicall(calls)
+        except RemoteError as e:
+            half = len(accounts) // 2
+            log.debug(
+                f'Zerion multicall for {len(accounts)} accounts failed due to {str(e)}. '
+                f'Splitting it in two',
+            )
+            result = self._query_accounts_chunk(accounts[:half])
+            result.update(self._query_accounts_chunk(accounts[half:]))
+            return result
+
+        return dict(zip(accounts, results))
+
+    def _process_protocol_balances(self, result: Any) -> List[DefiProtocolBalances]:
         protocol_balances = []
         for entry in result:
             protocol = DefiProtocol(
@@ -13,7 +13,8 @@ from rotkehlchen.accounting.structures import Balance
 from rotkehlchen.assets.asset import Asset, EthereumToken
 from rotkehlchen.chain.ethereum.aave import Aave
 from rotkehlchen.chain.ethereum.makerdao import MakerDAODSR, MakerDAOVaults
-from rotkehlchen.chain.ethereum.tokens import EthTokens
+from rotkehlchen.chain.ethereum.makerdao.dsr import DSRCurrentBalances
+from rotkehlchen.chain.ethereum.tokens import EthTokens, TokensReturn
 from rotkehlchen.chain.ethereum.zerion import DefiProtocolBalances, Zerion
 from rotkehlchen.constants.assets import A_BTC, A_DAI, A_ETH
 from rotkehlchen.constants.misc import ZERO
@@ -22,7 +23,7 @@ from rotkehlchen.db.queried_addresses import QueriedAddresses
 from rotkehlchen.db.utils import BlockchainAccounts
 from rotkehlchen.errors import EthSyncError, InputError, RemoteError, UnableToDecryptRemoteData
 from rotkehlchen.fval import FVal
-from rotkehlchen.greenlets import GreenletManager
+from rotkehlchen.greenlets import GreenletManager, run_concurrently
 from rotkehlchen.inquirer import Inquirer
 from rotkehlchen.logging import RotkehlchenLogsAdapter
 from rotkehlchen.premium.premium import Premium
@@ -289,10 +290,15 @@ class ChainManager(CacheableObject, LockableQueryObject):
         should_query_eth = not blockchain or blockchain == SupportedBlockchain.ETHEREUM
         should_query_btc = not blockchain or blockchain == SupportedBlockchain.BITCOIN
 
+        # The chains are independent of each other so they are queried concurrently
+        queries: Dict[str, Callable[[], None]] = {}
         if should_query_eth:
-            self.query_ethereum_balances(force_token_detection=force_token_detection)
+            queries['eth'] = lambda: self.query_ethereum_balances(
+                force_token_detection=force_token_detection,
+            )
         if should_query_btc:
-            self.query_btc_balances()
+            queries['btc'] = self.query_btc_balances
+        run_concurrently(queries)
 
         return self.get_balances_update()
 
@@ -637,16 +643,47 @@ class ChainManager(CacheableObject, LockableQueryObject):
 
         return self.get_balances_update()
 
+    def _query_token_balances(
+            self,
+            accounts: List[ChecksumEthAddress],
+            force_detection: bool,
+    ) -> TokensReturn:
+        """Queries the token balances of the given accounts and the tokens' usd prices
+
+        May raise:
+        - RemoteError if an external service such as Etherscan or cryptocompare
+        is queried and there is a problem with its query.
+        - EthSyncError if querying the token balances through a provided ethereum
+        client and the chain is not synced
+        """
+        ethtokens = EthTokens(database=self.database, ethereum=self.ethereum)
+        try:
+            return ethtokens.query_tokens_for_addresses(
+                addresses=accounts,
+                force_detection=force_detection,
+            )
+        except BadFunctionCallOutput as e:
+            log.error(
+                'Assuming unsynced chain. Got web3 BadFunctionCallOutput '
+                'exception: {}'.format(str(e)),
+            )
+            raise EthSyncError(
+                'Tried to use the ethereum chain of the provided client to query '
+                'token balances but the chain is not synced.',
+            )
+
     def _query_ethereum_tokens(
             self,
             action: AccountAction,
             given_accounts: Optional[List[ChecksumEthAddress]] = None,
             force_detection: bool = False,
+            tokens_result: Optional[TokensReturn] = None,
     ) -> None:
         """Queries ethereum token balance via either etherscan or ethereum node
 
         By default queries all accounts but can also be given a specific list of
-        accounts to query.
+        accounts to query. If the token balances of the accounts have already been
+        queried they can be given in `tokens_result` so that they are not queried again.
 
         May raise:
         - RemoteError if an external service such as Etherscan or cryptocompare
@@ -659,21 +696,12 @@ class ChainManager(CacheableObject, LockableQueryObject):
         else:
             accounts = given_accounts
 
-        ethtokens = EthTokens(database=self.database, ethereum=self.ethereum)
-        try:
-            balance_result, token_usd_price = ethtokens.query_tokens_for_addresses(
-                addresses=accounts,
+        if tokens_result is None:
+            tokens_result = self._query_token_balances(
+                accounts=accounts,
                 force_detection=force_detection,
             )
-        except BadFunctionCallOutput as e:
-            log.error(
-                'Assuming unsynced chain. Got web3 BadFunctionCallOutput '
-                'exception: {}'.format(str(e)),
-            )
-            raise EthSyncError(
-                'Tried to use the ethereum chain of the provided client to query '
-                'token balances but the chain is not synced.',
-            )
+        balance_result, token_usd_price = tokens_result
 
         add_or_sub: Optional[Callable[[Any, Any], Any]]
         if action == AccountAction.APPEND:
@@ -727,9 +755,17 @@ class ChainManager(CacheableObject, LockableQueryObject):
                         usd_value=new_usd_value,
                     )
 
-    def query_ethereum_tokens(self, force_detection: bool) -> None:
+    def query_ethereum_tokens(
+            self,
+            force_detection: bool,
+            tokens_result: Optional[TokensReturn] = None,
+            current_dsr_report: Optional[DSRCurrentBalances] = None,
+    ) -> None:
         """Queries the ethereum token balances and populates the state
 
+        The token balances and the current DSR balances can be given if they
+        have already been queried.
+
         May raise:
         - RemoteError if an external service such as Etherscan or cryptocompare
         is queried and there is a problem with its query.
@@ -740,13 +776,18 @@ class ChainManager(CacheableObject, LockableQueryObject):
         # tokens just zero out its balance
         for token in [x for x, _ in self.totals.items() if isinstance(x, EthereumToken)]:
             del self.totals[token]
-        self._query_ethereum_tokens(action=AccountAction.QUERY, force_detection=force_detection)
+        self._query_ethereum_tokens(
+            action=AccountAction.QUERY,
+            force_detection=force_detection,
+            tokens_result=tokens_result,
+        )
 
         # If we have anything in DSR also count it towards total blockchain balances
         eth_balances = self.balances.eth
         if self.makerdao_dsr:
             additional_total = Balance()
-            current_dsr_report = self.makerdao_dsr.get_current_dsr()
+            if current_dsr_report is None:
+                current_dsr_report = self.makerdao_dsr.get_current_dsr()
             for dsr_account, balance_entry in current_dsr_report.balances.items():
 
                 if balance_entry.amount == ZERO:
@@ -773,13 +814,13 @@ class ChainManager(CacheableObject, LockableQueryObject):
         if ts_now() - self.defi_balances_last_query_ts < DEFI_BALANCES_REQUERY_SECONDS:
             return self.defi_balances
 
-        # query zerion for defi balances
-        self.defi_balances = {}
+        # query zerion for defi balances of all accounts in batched multicalls
         zerion = self.get_zerion()
-        for account in self.accounts.eth:
-            balances = zerion.all_balances_for_account(account)
-            if len(balances) != 0:
-                self.defi_balances[account] = balances
+        account_balances = zerion.all_balances_for_accounts(self.accounts.eth)
+        self.defi_balances = {
+            account: balances for account, balances in account_balances.items()
+            if len(balances) != 0
+        }
 
         self.defi_balances_last_query_ts = ts_now()
         return self.defi_balances
@@ -796,10 +837,29 @@ class ChainManager(CacheableObject, LockableQueryObject):
         if len(self.accounts.eth) == 0:
             return
 
-        # Query ethereum ETH balances
+        # All the queries are independent of each other so run them concurrently and
+        # only then combine their results, in order, into the state
         eth_accounts = self.accounts.eth
-        eth_usd_price = Inquirer().find_usd_price(A_ETH)
-        balances = self.ethereum.get_multieth_balance(eth_accounts)
+        queries: Dict[str, Callable[[], Any]] = {
+            'eth_usd_price': lambda: Inquirer().find_usd_price(A_ETH),
+            'eth_balances': lambda: self.ethereum.get_multieth_balance(eth_accounts),
+            'defi_balances': self.query_defi_balances,
+            'tokens_result': lambda: self._query_token_balances(
+                accounts=eth_accounts,
+                force_detection=force_token_detection,
+            ),
+        }
+        dsr_module = self.makerdao_dsr
+        if dsr_module is not None:
+            queries['current_dsr_report'] = dsr_module.get_current_dsr
+        vaults_module = self.makerdao_vaults
+        if vaults_module is not None:
+            queries['vault_balances'] = vaults_module.get_normalized_balances
+        results = run_concurrently(queries)
+
+        # Update the ETH balances
+        eth_usd_price = results['eth_usd_price']
+        balances = results['eth_balances']
         eth_total = FVal(0)
         for account, balance in balances.items():
             eth_total += balance
@@ -811,10 +871,11 @@ class ChainManager(CacheableObject, LockableQueryObject):
 
         self.totals[A_ETH] = Balance(amount=eth_total, usd_value=eth_total * eth_usd_price)
 
-        self.query_defi_balances()
-        self.query_ethereum_tokens(force_token_detection)
-        vaults_module = self.makerdao_vaults
+        self.query_ethereum_tokens(
+            force_detection=force_token_detection,
+            tokens_result=results['tokens_result'],
+            current_dsr_report=results.get('current_dsr_report', None),
+        )
         if vaults_module is not None:
-            normalized_balances = vaults_module.get_normalized_balances()
-            for asset, normalized_vault_balance in normalized_balances.items():
+            for asset, normalized_vault_balance in results['vault_balances'].items():
                 self.totals[asset] += normalized_vault_balance
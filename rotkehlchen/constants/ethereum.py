@@ -107,6 +107,7 @@ MAKERDAO_CAT = EthereumConstants().contract('MAKERDAO_CAT')
 MAKERDAO_JUG = EthereumConstants().contract('MAKERDAO_JUG')
 
 ETH_SCAN = EthereumConstants().contract('ETH_SCAN')
+MULTICALL = EthereumConstants().contract('MULTICALL')
 
 
 AAVE_LENDING_POOL = EthereumConstants().contract('AAVE_LENDING_POOL')
@@ -5,9 +5,11 @@ import os
 import re
 import shutil
 import tempfile
+import time
 from json.decoder import JSONDecodeError
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Set, Tuple, Union, cast
+from sqlite3 import Cursor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Union, cast
 
 from eth_utils import is_checksum_address
 from pysqlcipher3 import dbapi2 as sqlcipher
@@ -19,7 +21,14 @@ from rotkehlchen.balances.manual import ManuallyTrackedBalance
 from rotkehlchen.chain.ethereum.structures import AaveEvent
 from rotkehlchen.constants.assets import A_USD, S_BTC, S_ETH
 from rotkehlchen.datatyping import BalancesData
-from rotkehlchen.db.schema import DB_SCRIPT_CREATE_TABLES
+from rotkehlchen.db.filtering import (
+    ASSET_MOVEMENTS_ORDER_BY_COLUMNS,
+    ETHEREUM_TRANSACTIONS_ORDER_BY_COLUMNS,
+    TRADES_ORDER_BY_COLUMNS,
+    DBSelectQuery,
+    order_by_attribute,
+)
+from rotkehlchen.db.schema import DB_SCRIPT_CREATE_INDEXES, DB_SCRIPT_CREATE_TABLES
 from rotkehlchen.db.settings import (
     DEFAULT_PREMIUM_SHOULD_SYNC,
     ROTKEHLCHEN_DB_VERSION,
@@ -33,10 +42,10 @@ from rotkehlchen.db.utils import (
     BlockchainAccounts,
     DBStartupAction,
     LocationData,
+    QueryTiming,
     SingleAssetBalance,
     Tag,
     deserialize_tags_from_db,
-    form_query_to_filter_timestamps,
     insert_tag_mappings,
     str_to_bool,
 )
@@ -71,6 +80,7 @@ from rotkehlchen.typing import (
     ApiCredentials,
     ApiKey,
     ApiSecret,
+    AssetMovementCategory,
     BlockchainAccountData,
     ChecksumEthAddress,
     EthereumTransaction,
@@ -81,9 +91,11 @@ from rotkehlchen.typing import (
     Location,
     SupportedBlockchain,
     Timestamp,
+    TradePair,
+    TradeType,
 )
 from rotkehlchen.user_messages import MessagesAggregator
-from rotkehlchen.utils.misc import ts_now
+from rotkehlchen.utils.misc import get_chunks, ts_now
 from rotkehlchen.utils.serialization import rlk_jsondumps, rlk_jsonloads_dict
 
 logger = logging.getLogger(__name__)
@@ -91,8 +103,21 @@ log = RotkehlchenLogsAdapter(logger)
 
 KDF_ITER = 64000
 DBINFO_FILENAME = 'dbinfo.json'
+# Number of prepared statements sqlite keeps per connection. Should be more than
+# the number of distinct read queries so that none of them is ever re-parsed
+DB_CACHED_STATEMENTS = 256
+# Read queries slower than this many seconds are logged
+SLOW_DB_QUERY_SECONDS = 0.5
+# Number of rows read from the DB at once by the streaming readers
+DB_FETCH_BATCH_SIZE = 1000
 
 DBTupleType = Literal['trade', 'asset_movement', 'margin_position', 'ethereum_transaction']
+DB_TUPLE_TYPE_NAMES: Dict[DBTupleType, str] = {
+    'trade': 'trades',
+    'asset_movement': 'deposits/withdrawals',
+    'margin_position': 'margin positions',
+    'ethereum_transaction': 'ethereum transactions',
+}
 
 
 def _protect_password_sqlcipher(password: str) -> str:
@@ -118,39 +143,6 @@ def detect_sqlcipher_version() -> int:
     return sqlcipher_version
 
 
-def db_tuple_to_str(
-        data: Tuple[Any, ...],
-        tuple_type: DBTupleType,
-) -> str:
-    """Turns a tuple DB entry for trade, or asset_movement into a user readable string
-
-    This is only intended for error messages.
-
-    TODO: Add some unit tests
-    """
-    if tuple_type == 'trade':
-        return (
-            f'{deserialize_trade_type_from_db(data[4])} trade with id {data[0]} '
-            f'in {deserialize_location_from_db(data[2])} and pair {data[3]} '
-            f'at timestamp {data[1]}'
-        )
-    elif tuple_type == 'asset_movement':
-        return (
-            f'{deserialize_asset_movement_category_from_db(data[2])} of '
-            f' {data[4]} with id {data[0]} '
-            f'in {deserialize_location_from_db(data[1])} at timestamp {data[3]}'
-        )
-    elif tuple_type == 'margin_position':
-        return (
-            f'Margin position with id {data[0]} in  {deserialize_location_from_db(data[1])} '
-            f'for {data[5]} closed at timestamp {data[3]}'
-        )
-    elif tuple_type == 'ethereum_transaction':
-        return f'Ethereum transaction with hash "{data[0].hex()}"'
-
-    raise AssertionError('db_tuple_to_str() called with invalid tuple_type {tuple_type}')
-
-
 # https://stackoverflow.com/questions/4814167/storing-time-series-data-relational-or-non
 # http://www.sql-join.com/sql-join-types
 class DBHandler:
@@ -173,6 +165,7 @@ class DBHandler:
         self.user_data_dir = user_data_dir
         self.sqlcipher_version = detect_sqlcipher_version()
         self.last_write_ts: Optional[Timestamp] = None
+        self.query_timings: Dict[str, QueryTiming] = {}
         action = self.read_info_at_start()
         if action == DBStartupAction.UPGRADE_3_4:
             result, msg = self.upgrade_db_sqlcipher_3_to_4(password)
@@ -217,6 +210,7 @@ class DBHandler:
         Such as:
             - Create tables that are missing
             - DB Upgrades
+            - Create indexes that are missing
 
         May raise:
         - AuthenticationError if a wrong password is given or if the DB is corrupt
@@ -241,6 +235,7 @@ class DBHandler:
 
         # Run upgrades if needed
         DBUpgradeManager(self).run_upgrades()
+        self.conn.executescript(DB_SCRIPT_CREATE_INDEXES)
 
     def get_md5hash(self) -> str:
         """Get the md5hash of the DB
@@ -311,11 +306,9 @@ class DBHandler:
         raise ValueError('Unexpected values at dbinfo.json')
 
     def get_version(self) -> int:
-        cursor = self.conn.cursor()
-        query = cursor.execute(
+        query = self._select(
             'SELECT value FROM settings WHERE name=?;', ('version',),
         )
-        query = query.fetchall()
         # If setting is not set, it's the latest version
         if len(query) == 0:
             return ROTKEHLCHEN_DB_VERSION
@@ -339,7 +332,10 @@ class DBHandler:
         """
         fullpath = self.user_data_dir / 'rotkehlchen.db'
         try:
-            self.conn = sqlcipher.connect(str(fullpath))  # pylint: disable=no-member
+            self.conn = sqlcipher.connect(  # pylint: disable=no-member
+                str(fullpath),
+                cached_statements=DB_CACHED_STATEMENTS,
+            )
         except sqlcipher.OperationalError:  # pylint: disable=no-member
             raise SystemPermissionError(
                 f'Could not open database file: {fullpath}. Permission errors?',
@@ -353,6 +349,86 @@ class DBHandler:
         self.conn.executescript(script)
         self.conn.execute('PRAGMA foreign_keys=ON')
 
+    def _record_query_timing(self, sql: str, duration: float, rows: int) -> None:
+        timing = self.query_timings.get(sql)
+        if timing is None:
+            self.query_timings[sql] = QueryTiming(
+                calls=1,
+                total_seconds=duration,
+                max_seconds=duration,
+            )
+        else:
+            self.query_timings[sql] = QueryTiming(
+                calls=timing.calls + 1,
+                total_seconds=timing.total_seconds + duration,
+                max_seconds=max(timing.max_seconds, duration),
+            )
+        if duration > SLOW_DB_QUERY_SECONDS:
+            log.debug('Slow DB query', query=sql, rows=rows, seconds=duration)
+
+    def _select(
+            self,
+            query: Union[str, DBSelectQuery],
+            bindings: Sequence[Any] = (),
+    ) -> List[Tuple[Any, ...]]:
+        """Runs a read query and returns all of its rows
+
+        All the readers of the DB should go through here or through _iter_select().
+        Values should only be given as bindings and never be formatted into the
+        query so that sqlite reuses the statement it already prepared for it.
+        The time each query takes is recorded in query_timings.
+        """
+        if isinstance(query, DBSelectQuery):
+            sql, bindings = query.prepare()
+        else:
+            sql = query
+
+        start = time.perf_counter()
+        cursor = self.conn.cursor()
+        rows = cursor.execute(sql, bindings).fetchall()
+        self._record_query_timing(sql, time.perf_counter() - start, len(rows))
+        return rows
+
+    def _iter_select(
+            self,
+            query: Union[str, DBSelectQuery],
+            bindings: Sequence[Any] = (),
+    ) -> Iterator[Tuple[Any, ...]]:
+        """Like _select() but yields the rows, reading them in batches of
+        DB_FETCH_BATCH_SIZE as they get consumed
+
+        Only the time spent in the DB counts towards the query's timing and not
+        the time the caller spends between the rows.
+
+        The cursor lives on the connection shared by all greenlets. So the rows
+        should be consumed right away and never across a greenlet switch, for
+        example while a response is being sent, since by then another greenlet
+        may have committed to or closed the connection.
+        """
+        if isinstance(query, DBSelectQuery):
+            sql, bindings = query.prepare()
+        else:
+            sql = query
+
+        start = time.perf_counter()
+        cursor = self.conn.cursor()
+        cursor.execute(sql, bindings)
+        duration = time.perf_counter() - start
+        rows_num = 0
+        try:
+            while True:
+                start = time.perf_counter()
+                rows = cursor.fetchmany(DB_FETCH_BATCH_SIZE)
+                duration += time.perf_counter() - start
+                if len(rows) == 0:
+                    break
+
+                rows_num += len(rows)
+                yield from rows
+        finally:
+            cursor.close()
+            self._record_query_timing(sql, duration, rows_num)
+
     def change_password(self, new_password: str) -> bool:
         """Changes the password for the currently logged in user
         """
@@ -453,11 +529,9 @@ class DBHandler:
         self.conn.commit()
 
     def get_last_write_ts(self) -> Timestamp:
-        cursor = self.conn.cursor()
-        query = cursor.execute(
+        query = self._select(
             'SELECT value FROM settings where name=?;', ('last_write_ts',),
         )
-        query = query.fetchall()
         # If setting is not set, it's 0 by default
         if len(query) == 0:
             ts = 0
@@ -475,11 +549,9 @@ class DBHandler:
         self.update_last_write()
 
     def get_last_data_upload_ts(self) -> Timestamp:
-        cursor = self.conn.cursor()
-        query = cursor.execute(
+        query = self._select(
             'SELECT value FROM settings where name=?;', ('last_data_upload_ts',),
         )
-        query = query.fetchall()
         # If setting is not set, it's 0 by default
         if len(query) == 0:
             ts = 0
@@ -497,11 +569,9 @@ class DBHandler:
         self.update_last_write()
 
     def get_premium_sync(self) -> bool:
-        cursor = self.conn.cursor()
-        query = cursor.execute(
+        query = self._select(
             'SELECT value FROM settings where name=?;', ('premium_should_sync',),
         )
-        query = query.fetchall()
         # If setting is not set, return default
         if len(query) == 0:
             return DEFAULT_PREMIUM_SHOULD_SYNC
@@ -509,11 +579,9 @@ class DBHandler:
 
     def get_settings(self, have_premium: bool = False) -> DBSettings:
         """Aggregates settings from DB and from the given args and returns the settings object"""
-        cursor = self.conn.cursor()
-        query = cursor.execute(
+        query = self._select(
             'SELECT name, value FROM settings;',
         )
-        query = query.fetchall()
 
         settings_dict = {}
         for q in query:
@@ -525,11 +593,9 @@ class DBHandler:
         return db_settings_from_dict(settings_dict, self.msg_aggregator)
 
     def get_main_currency(self) -> Asset:
-        cursor = self.conn.cursor()
-        query = cursor.execute(
+        query = self._select(
             'SELECT value FROM settings WHERE name="main_currency";',
         )
-        query = query.fetchall()
         if len(query) == 0:
             return A_USD
 
@@ -568,8 +634,7 @@ class DBHandler:
 
     def get_all_external_service_credentials(self) -> List[ExternalServiceApiCredentials]:
         """Returns a list with all the external service credentials saved in the DB"""
-        cursor = self.conn.cursor()
-        query = cursor.execute('SELECT name, api_key from external_service_credentials;')
+        query = self._select('SELECT name, api_key from external_service_credentials;')
 
         result = []
         for q in query:
@@ -589,12 +654,10 @@ class DBHandler:
             service_name: ExternalService,
     ) -> Optional[ExternalServiceApiCredentials]:
         """If existing it returns the external service credentials for the given service"""
-        cursor = self.conn.cursor()
-        query = cursor.execute(
+        query = self._select(
             'SELECT api_key from external_service_credentials WHERE name=?;',
             (service_name.name.lower(),),
         )
-        query = query.fetchall()
         if len(query) == 0:
             return None
 
@@ -619,11 +682,10 @@ class DBHandler:
         self.conn.commit()
 
     def get_ignored_assets(self) -> List[Asset]:
-        cursor = self.conn.cursor()
-        cursor.execute(
+        query = self._select(
             'SELECT value FROM multisettings WHERE name="ignored_asset";',
         )
-        return [Asset(q[0]) for q in cursor]
+        return [Asset(q[0]) for q in query]
 
     def add_multiple_balances(self, balances: List[AssetBalance]) -> None:
         """Execute addition of multiple balances in the DB"""
@@ -672,8 +734,7 @@ class DBHandler:
             address: ChecksumEthAddress,
             atoken: EthereumToken,
     ) -> List[AaveEvent]:
-        cursor = self.conn.cursor()
-        query = cursor.execute(
+        query = self._select(
             'SELECT event_type, amount, usd_value, block_number, timestamp, tx_hash, log_index '
             'from aave_events WHERE address=? AND asset=?',
             (address, atoken.identifier),
@@ -707,11 +768,10 @@ class DBHandler:
         - {exchange_name}_margins
         - {exchange_name}_asset_movements
         """
-        cursor = self.conn.cursor()
-        query = cursor.execute(
-            f'SELECT start_ts, end_ts from used_query_ranges WHERE name="{name}";',
+        query = self._select(
+            'SELECT start_ts, end_ts from used_query_ranges WHERE name=?;',
+            (name,),
         )
-        query = query.fetchall()
         if len(query) == 0 or query[0][0] is None:
             return None
 
@@ -759,12 +819,137 @@ class DBHandler:
     def update_used_block_query_range(self, name: str, from_block: int, to_block: int) -> None:
         self.update_used_query_range(name, from_block, to_block)  # type: ignore
 
-    def get_last_balance_save_time(self) -> Timestamp:
+    def get_ethereum_logs_range(self, query_key: str) -> Optional[Tuple[int, int]]:
+        """Get the block range for which the logs of the given logs query are cached"""
+        return self.get_used_query_range(f'ethereum_logs_{query_key}')
+
+    def add_ethereum_logs(
+            self,
+            query_key: str,
+            logs: List[Dict[str, Any]],
+            from_block: int,
+            to_block: int,
+    ) -> None:
+        """Caches the logs of the given logs query and sets the block range the
+        cache now covers to from_block - to_block
+
+        The logs should all be in the newly covered part of the range
+        """
+        cursor = self.conn.cursor()
+        cursor.executemany(
+            'INSERT INTO ethereum_logs(query_key, block_number, log_data) VALUES (?, ?, ?)',
+            [(query_key, entry['blockNumber'], json.dumps(entry)) for entry in logs],
+        )
+        cursor.execute(
+            'INSERT OR REPLACE INTO used_query_ranges(name, start_ts, end_ts) VALUES (?, ?, ?)',
+            (f'ethereum_logs_{query_key}', str(from_block), str(to_block)),
+        )
+        self.conn.commit()
+        self.update_last_write()
+
+    def get_ethereum_logs(
+            self,
+            query_key: str,
+            from_block: int,
+            to_block: int,
+    ) -> List[Dict[str, Any]]:
+        """Get the cached logs of the given logs query between from_block and to_block
+
+        The logs are returned in the order they happened
+        """
+        query = self._select(
+            'SELECT log_data FROM ethereum_logs WHERE query_key=? AND '
+            'block_number >= ? AND block_number <= ? ORDER BY block_number ASC, rowid ASC',
+            (query_key, from_block, to_block),
+        )
+        return [json.loads(entry[0]) for entry in query]
+
+    def add_block_timestamps(self, block_timestamps: Dict[int, Timestamp]) -> None:
         cursor = self.conn.cursor()
-        query = cursor.execute(
+        cursor.executemany(
+            'INSERT OR IGNORE INTO ethereum_block_timestamps(block_number, timestamp) '
+            'VALUES (?, ?)',
+            list(block_timestamps.items()),
+        )
+        self.conn.commit()
+        self.update_last_write()
+
+    def get_block_timestamps(self, block_numbers: List[int]) -> Dict[int, Timestamp]:
+        """Get the timestamps of those of the given blocks that are in the DB"""
+        result = {}
+        # Query in chunks to stay below sqlite's limit of variables per statement
+        for chunk in get_chunks(block_numbers, n=500):
+            query = self._select(
+                f'SELECT block_number, timestamp FROM ethereum_block_timestamps '
+                f'WHERE block_number IN ({",".join(["?"] * len(chunk))})',
+                chunk,
+            )
+            for entry in query:
+                result[entry[0]] = Timestamp(entry[1])
+
+        return result
+
+    def get_accounting_checkpoint_hashes(self, settings_hash: str) -> Dict[int, str]:
+        """Get the actions hash of all accounting checkpoints taken with the given
+        settings hash, keyed by the number of actions processed at each checkpoint"""
+        query = self._select(
+            'SELECT actions_processed, actions_hash FROM accounting_checkpoints '
+            'WHERE settings_hash=?;',
+            (settings_hash,),
+        )
+        return {int(result[0]): result[1] for result in query}
+
+    def get_accounting_checkpoint_state(
+            self,
+            settings_hash: str,
+            actions_processed: int,
+    ) -> Optional[bytes]:
+        query = self._select(
+            'SELECT state FROM accounting_checkpoints '
+            'WHERE settings_hash=? AND actions_processed=?;',
+            (settings_hash, actions_processed),
+        )
+        if len(query) == 0:
+            return None
+
+        return bytes(query[0][0])
+
+    def update_accounting_checkpoints(
+            self,
+            settings_hash: str,
+            valid_actions: int,
+            checkpoints: List[Tuple[int, str, bytes]],
+    ) -> None:
+        """Stores the given (actions_processed, actions_hash, state) accounting checkpoints
+
+        All checkpoints taken with another settings hash or after the first
+        `valid_actions` actions are no longer valid and are deleted.
+        """
+        cursor = self.conn.cursor()
+        cursor.execute(
+            'DELETE FROM accounting_checkpoints WHERE settings_hash!=? OR actions_processed>?;',
+            (settings_hash, valid_actions),
+        )
+        cursor.executemany(
+            'INSERT OR REPLACE INTO accounting_checkpoints('
+            'settings_hash, actions_processed, actions_hash, state) VALUES (?, ?, ?, ?)',
+            [(settings_hash, *checkpoint) for checkpoint in checkpoints],
+        )
+        # Checkpoints are only a cache of processing results so this does not
+        # count as a user write via update_last_write()
+        self.conn.commit()
+
+    def delete_accounting_checkpoints(self) -> None:
+        """Deletes all accounting checkpoints. Should be called whenever something
+        that processing the history depends on, like a cached price, changes"""
+        cursor = self.conn.cursor()
+        cursor.execute('DELETE FROM accounting_checkpoints;')
+        self.conn.commit()
+
+    def get_last_balance_save_time(self) -> Timestamp:
+        query = self._select(
             'SELECT MAX(time) from timed_location_data',
         )
-        query = query.fetchall()
         if len(query) == 0 or query[0][0] is None:
             return Timestamp(0)
 
@@ -899,12 +1084,10 @@ class DBHandler:
 
         If not, or if there is no saved entry, return None
         """
-        cursor = self.conn.cursor()
-        query = cursor.execute(
+        result = self._select(
             'SELECT tokens_list, time FROM ethereum_accounts_details WHERE account = ?',
             (address,),
         )
-        result = query.fetchall()
         if len(result) == 0:
             return None  # no saved entry
         if current_time - result[0][1] > 86400:
@@ -947,11 +1130,9 @@ class DBHandler:
 
     def get_blockchain_accounts(self) -> BlockchainAccounts:
         """Returns a Blockchain accounts instance containing all blockchain account addresses"""
-        cursor = self.conn.cursor()
-        query = cursor.execute(
+        query = self._select(
             'SELECT blockchain, account FROM blockchain_accounts;',
         )
-        query = query.fetchall()
 
         eth_list = []
         btc_list = []
@@ -984,8 +1165,7 @@ class DBHandler:
 
         Each account entry contains address and potentially label and tags
         """
-        cursor = self.conn.cursor()
-        query = cursor.execute(
+        query = self._select(
             'SELECT A.account, A.label, group_concat(B.tag_name,",") '
             'FROM blockchain_accounts AS A '
             'LEFT OUTER JOIN tag_mappings AS B ON B.object_reference = A.account '
@@ -1006,8 +1186,7 @@ class DBHandler:
 
     def get_manually_tracked_balances(self) -> List[ManuallyTrackedBalance]:
         """Returns the manually tracked balances from the DB"""
-        cursor = self.conn.cursor()
-        query = cursor.execute(
+        query = self._select(
             'SELECT A.asset, A.label, A.amount, A.location, group_concat(B.tag_name,",") '
             'FROM manually_tracked_balances as A '
             'LEFT OUTER JOIN tag_mappings as B on B.object_reference = A.label GROUP BY label;',
@@ -1200,11 +1379,9 @@ class DBHandler:
         self.update_last_write()
 
     def get_exchange_credentials(self) -> Dict[str, ApiCredentials]:
-        cursor = self.conn.cursor()
-        result = cursor.execute(
+        result = self._select(
             'SELECT name, api_key, api_secret, passphrase FROM user_credentials;',
         )
-        result = result.fetchall()
         credentials = {}
 
         for entry in result:
@@ -1227,74 +1404,75 @@ class DBHandler:
             tuples: List[Tuple[Any, ...]],
             **kwargs: Any,
     ) -> None:
-        cursor = self.conn.cursor()
-        try:
-            cursor.executemany(query, tuples)
-        except sqlcipher.IntegrityError:  # pylint: disable=no-member
-            # That means that one of the tuples hit a constraint, most probably
-            # already existing in the DB, in which case we resort to writing them
-            # one by one to only reject the duplicates
+        """Writes the tuples to the DB in bulk with the given INSERT OR IGNORE query
 
-            nonces_set: Set[int] = set()
+        Tuples that already exist in the DB are skipped by sqlite. They are only
+        counted and reported to the user in a single message.
+
+        Internal ethereum transactions from etherscan, which have a nonce of -1,
+        are written by _write_internal_ethereum_transactions() instead since they
+        are not skipped if they already exist.
+        """
+        cursor = self.conn.cursor()
+        tuples_num = len(tuples)
+        skipped = 0
+        if tuple_type == 'ethereum_transaction' and kwargs.get('from_etherscan') is True:
+            internal_tuples = [t for t in tuples if t[10] == -1]
+            tuples = [t for t in tuples if t[10] != -1]
+            skipped += self._write_internal_ethereum_transactions(cursor, query, internal_tuples)
+
+        cursor.executemany(query, tuples)
+        # rowcount adds up the number of rows each tuple changed and a skipped tuple
+        # changes none. Same as summing sqlite's changes() after each insert.
+        skipped += len(tuples) - cursor.rowcount
+
+        if skipped != 0:
+            message = (
+                f'{skipped} out of {tuples_num} {DB_TUPLE_TYPE_NAMES[tuple_type]} were '
+                f'not added to the DB since they already exist.'
+            )
             if tuple_type == 'ethereum_transaction':
-                nonces_set = set(range(len([t for t in tuples if t[10] == -1])))
-
-            for entry in tuples:
-                try:
-                    cursor.execute(query, entry)
-                except sqlcipher.IntegrityError:  # pylint: disable=no-member
-                    if tuple_type == 'ethereum_transaction':
-                        nonce = entry[10]
-                        # If it's not an internal transaction with the same hash
-                        # ignore it. That is since it's indeed a duplicate because
-                        # when we query etherscan we get all transactions where
-                        # the given address is either the from or the to.
-                        if nonce != -1:
-                            continue
-
-                        if 'from_etherscan' in kwargs and kwargs['from_etherscan'] is True:
-                            # If it's an internal transaction with the same hash then
-                            # still input it as there is no way to distinguish between
-                            # multiple etherscan internal transactions with the same
-                            # original transaction hash. Here we trust the data source.
-                            # To differentiate between them in Rotkehlchen we use a
-                            # more negative nonce
-                            entry_list = list(entry)
-                            # Make sure that the internal etherscan transaction nonce
-                            # is increasingly negative (> -1)
-                            # If a key error is thrown here due to popping from an empty
-                            # set then something is really wrong so not catching it
-                            entry_list[10] = -1 - nonces_set.pop() - 1
-                            entry = tuple(entry_list)
-                            try:
-                                cursor.execute(query, entry)
-                                # Success so just go to the next entry
-                                continue
-                            except sqlcipher.IntegrityError:  # pylint: disable=no-member
-                                # the error is logged right below
-                                pass
-
-                        # if we reach here it means the transaction is already in the DB
-                        # But this can't be avoided with the way we query etherscan
-                        # right now since we don't query transactions in a specific
-                        # time range, so duplicate addition attempts can happen.
-                        string_repr = db_tuple_to_str(entry, tuple_type)
-                        logger.debug(
-                            f'Did not add "{string_repr}" to the DB since'
-                            f'it already exists.',
-                        )
-                        continue
-
-                    string_repr = db_tuple_to_str(entry, tuple_type)
-                    self.msg_aggregator.add_warning(
-                        f'Failed to add "{string_repr}" to the DB. It already exists.',
-                    )
-                except sqlcipher.InterfaceError:  # pylint: disable=no-member
-                    log.critical(f'Interface error with tuple: {entry}')
+                # This can't be avoided with the way we query etherscan right now since
+                # we don't query transactions in a specific time range and we get all
+                # transactions where the given address is either the from or the to.
+                log.debug(message)
+            else:
+                self.msg_aggregator.add_warning(message)
 
         self.conn.commit()
         self.update_last_write()
 
+    @staticmethod
+    def _write_internal_ethereum_transactions(
+            cursor: Cursor,
+            query: str,
+            tuples: List[Tuple[Any, ...]],
+    ) -> int:
+        """Writes internal ethereum transactions from etherscan and returns how
+        many of them were skipped
+
+        There is no way to distinguish between multiple etherscan internal
+        transactions with the same original transaction hash since they all get
+        a nonce of -1. Here we trust the data source, so if one already exists
+        it is written again with an increasingly negative nonce (< -1). Only if
+        that also exists is the transaction skipped.
+        """
+        skipped = 0
+        next_nonce = -2
+        for entry in tuples:
+            cursor.execute(query, entry)
+            if cursor.rowcount != 0:
+                continue
+
+            entry_list = list(entry)
+            entry_list[10] = next_nonce
+            next_nonce -= 1
+            cursor.execute(query, tuple(entry_list))
+            if cursor.rowcount == 0:
+                skipped += 1
+
+        return skipped
+
     def add_margin_positions(self, margin_positions: List[MarginPosition]) -> None:
         margin_tuples: List[Tuple[Any, ...]] = []
         for margin in margin_positions:
@@ -1313,7 +1491,7 @@ class DBHandler:
             ))
 
         query = """
-            INSERT INTO margin_positions(
+            INSERT OR IGNORE INTO margin_positions(
               id,
               location,
               open_time,
@@ -1328,19 +1506,20 @@ class DBHandler:
         """
         self.write_tuples(tuple_type='margin_position', query=query, tuples=margin_tuples)
 
-    def get_margin_positions(
+    def iter_margin_positions(
             self,
             from_ts: Optional[Timestamp] = None,
             to_ts: Optional[Timestamp] = None,
-            location: Optional[str] = None,
-    ) -> List[MarginPosition]:
-        """Returns a list of margin positions optionally filtered by time and location
+            location: Optional[Location] = None,
+    ) -> Iterator[MarginPosition]:
+        """Yields margin positions optionally filtered by time and location
 
-        The returned list is ordered from oldest to newest
+        They are yielded from oldest to newest. The rows are read from the DB in
+        batches as the iterator gets consumed.
         """
-        cursor = self.conn.cursor()
-        query = (
-            'SELECT id,'
+        query = DBSelectQuery(
+            table='margin_positions',
+            columns='id,'
             '  location,'
             '  open_time,'
             '  close_time,'
@@ -1349,14 +1528,13 @@ class DBHandler:
             '  fee,'
             '  fee_currency,'
             '  link,'
-            '  notes FROM margin_positions '
+            '  notes',
         )
         if location is not None:
-            query += f'WHERE location="{location}" '
-        query, bindings = form_query_to_filter_timestamps(query, 'close_time', from_ts, to_ts)
-        results = cursor.execute(query, bindings)
+            query.where('location=?', location.serialize_for_db())
+        query.where_in_time_range('close_time', from_ts, to_ts)
+        results = self._iter_select(query.order('close_time ASC'))
 
-        margin_positions = []
         for result in results:
             try:
                 if result[2] == '0':
@@ -1386,9 +1564,19 @@ class DBHandler:
                     f'Unknown asset {e.asset_name} found',
                 )
                 continue
-            margin_positions.append(margin)
+            yield margin
 
-        return margin_positions
+    def get_margin_positions(
+            self,
+            from_ts: Optional[Timestamp] = None,
+            to_ts: Optional[Timestamp] = None,
+            location: Optional[Location] = None,
+    ) -> List[MarginPosition]:
+        """Returns a list of margin positions optionally filtered by time and location
+
+        The returned list is ordered from oldest to newest
+        """
+        return list(self.iter_margin_positions(from_ts=from_ts, to_ts=to_ts, location=location))
 
     def add_asset_movements(self, asset_movements: List[AssetMovement]) -> None:
         movement_tuples: List[Tuple[Any, ...]] = []
@@ -1406,7 +1594,7 @@ class DBHandler:
             ))
 
         query = """
-            INSERT INTO asset_movements(
+            INSERT OR IGNORE INTO asset_movements(
               id,
               location,
               category,
@@ -1420,19 +1608,17 @@ class DBHandler:
         """
         self.write_tuples(tuple_type='asset_movement', query=query, tuples=movement_tuples)
 
-    def get_asset_movements(
-            self,
-            from_ts: Optional[Timestamp] = None,
-            to_ts: Optional[Timestamp] = None,
-            location: Optional[str] = None,
-    ) -> List[AssetMovement]:
-        """Returns a list of asset movements optionally filtered by time and location
-
-        The returned list is ordered from oldest to newest
-        """
-        cursor = self.conn.cursor()
-        query = (
-            'SELECT id,'
+    @staticmethod
+    def _asset_movements_query(
+            from_ts: Optional[Timestamp],
+            to_ts: Optional[Timestamp],
+            location: Optional[Location],
+            category: Optional[AssetMovementCategory],
+            asset: Optional[Asset],
+    ) -> DBSelectQuery:
+        query = DBSelectQuery(
+            table='asset_movements',
+            columns='id,'
             '  location,'
             '  category,'
             '  time,'
@@ -1440,14 +1626,45 @@ class DBHandler:
             '  amount,'
             '  fee_asset,'
             '  fee,'
-            '  link FROM asset_movements '
+            '  link',
         )
         if location is not None:
-            query += f'WHERE location="{location}" '
-        query, bindings = form_query_to_filter_timestamps(query, 'time', from_ts, to_ts)
-        results = cursor.execute(query, bindings)
+            query.where('location=?', location.serialize_for_db())
+        if category is not None:
+            query.where('category=?', category.serialize_for_db())
+        if asset is not None:
+            query.where('asset=?', asset.identifier)
+        return query.where_in_time_range('time', from_ts, to_ts)
+
+    def iter_asset_movements(
+            self,
+            from_ts: Optional[Timestamp] = None,
+            to_ts: Optional[Timestamp] = None,
+            location: Optional[Location] = None,
+            category: Optional[AssetMovementCategory] = None,
+            asset: Optional[Asset] = None,
+            order_by: str = 'timestamp',
+            ascending: bool = True,
+            limit: Optional[int] = None,
+            offset: int = 0,
+    ) -> Iterator[AssetMovement]:
+        """Yields asset movements optionally filtered by time, location, category and asset
+
+        By default they are yielded from oldest to newest. order_by should be one of
+        the keys of ASSET_MOVEMENTS_ORDER_BY_COLUMNS. At most limit movements are
+        yielded after skipping the first offset ones. The rows are read from the DB
+        in batches as the iterator gets consumed.
+        """
+        query = self._asset_movements_query(
+            from_ts=from_ts,
+            to_ts=to_ts,
+            location=location,
+            category=category,
+            asset=asset,
+        )
+        query.order(order_by_attribute(ASSET_MOVEMENTS_ORDER_BY_COLUMNS, order_by, ascending))
+        results = self._iter_select(query.paginate(limit=limit, offset=offset))
 
-        asset_movements = []
         for result in results:
             try:
                 movement = AssetMovement(
@@ -1472,9 +1689,55 @@ class DBHandler:
                     f'Unknown asset {e.asset_name} found',
                 )
                 continue
-            asset_movements.append(movement)
+            yield movement
+
+    def get_asset_movements(
+            self,
+            from_ts: Optional[Timestamp] = None,
+            to_ts: Optional[Timestamp] = None,
+            location: Optional[Location] = None,
+            category: Optional[AssetMovementCategory] = None,
+            asset: Optional[Asset] = None,
+            order_by: str = 'timestamp',
+            ascending: bool = True,
+            limit: Optional[int] = None,
+            offset: int = 0,
+    ) -> List[AssetMovement]:
+        """Returns a list of asset movements optionally filtered by time, location,
+        category and asset
 
-        return asset_movements
+        By default the returned list is ordered from oldest to newest.
+        Check iter_asset_movements() for the ordering and the pagination.
+        """
+        return list(self.iter_asset_movements(
+            from_ts=from_ts,
+            to_ts=to_ts,
+            location=location,
+            category=category,
+            asset=asset,
+            order_by=order_by,
+            ascending=ascending,
+            limit=limit,
+            offset=offset,
+        ))
+
+    def count_asset_movements(
+            self,
+            from_ts: Optional[Timestamp] = None,
+            to_ts: Optional[Timestamp] = None,
+            location: Optional[Location] = None,
+            category: Optional[AssetMovementCategory] = None,
+            asset: Optional[Asset] = None,
+    ) -> int:
+        """Returns how many asset movements match the given filters"""
+        query = self._asset_movements_query(
+            from_ts=from_ts,
+            to_ts=to_ts,
+            location=location,
+            category=category,
+            asset=asset,
+        )
+        return self._select(*query.prepare_count())[0][0]
 
     def add_ethereum_transactions(
             self,
@@ -1505,7 +1768,7 @@ class DBHandler:
             ))
 
         query = """
-            INSERT INTO ethereum_transactions(
+            INSERT OR IGNORE INTO ethereum_transactions(
               tx_hash,
               timestamp,
               block_number,
@@ -1526,19 +1789,15 @@ class DBHandler:
             from_etherscan=from_etherscan,
         )
 
-    def get_ethereum_transactions(
-            self,
-            from_ts: Optional[Timestamp] = None,
-            to_ts: Optional[Timestamp] = None,
-            address: Optional[ChecksumEthAddress] = None,
-    ) -> List[EthereumTransaction]:
-        """Returns a list of ethereum transactions optionally filtered by time and/or from address
-
-        The returned list is ordered from oldest to newest
-        """
-        cursor = self.conn.cursor()
-        query = """
-            SELECT tx_hash,
+    @staticmethod
+    def _ethereum_transactions_query(
+            from_ts: Optional[Timestamp],
+            to_ts: Optional[Timestamp],
+            address: Optional[ChecksumEthAddress],
+    ) -> DBSelectQuery:
+        query = DBSelectQuery(
+            table='ethereum_transactions',
+            columns="""tx_hash,
               timestamp,
               block_number,
               from_address,
@@ -1548,14 +1807,36 @@ class DBHandler:
               gas_price,
               gas_used,
               input_data,
-              nonce FROM ethereum_transactions
+              nonce""",
+        )
+        query.where_equal('from_address', address)
+        return query.where_in_time_range('timestamp', from_ts, to_ts)
+
+    def iter_ethereum_transactions(
+            self,
+            from_ts: Optional[Timestamp] = None,
+            to_ts: Optional[Timestamp] = None,
+            address: Optional[ChecksumEthAddress] = None,
+            order_by: str = 'timestamp',
+            ascending: bool = True,
+            limit: Optional[int] = None,
+            offset: int = 0,
+    ) -> Iterator[EthereumTransaction]:
+        """Yields ethereum transactions optionally filtered by time and/or from address
+
+        By default they are yielded from oldest to newest. order_by should be one of
+        the keys of ETHEREUM_TRANSACTIONS_ORDER_BY_COLUMNS. At most limit transactions
+        are yielded after skipping the first offset ones. The rows are read from the DB
+        in batches as the iterator gets consumed.
         """
-        if address is not None:
-            query += f'WHERE from_address="{address}" '
-        query, bindings = form_query_to_filter_timestamps(query, 'timestamp', from_ts, to_ts)
-        results = cursor.execute(query, bindings)
+        query = self._ethereum_transactions_query(from_ts=from_ts, to_ts=to_ts, address=address)
+        query.order(order_by_attribute(
+            columns=ETHEREUM_TRANSACTIONS_ORDER_BY_COLUMNS,
+            attribute=order_by,
+            ascending=ascending,
+        ))
+        results = self._iter_select(query.paginate(limit=limit, offset=offset))
 
-        ethereum_transactions = []
         for result in results:
             try:
                 tx = EthereumTransaction(
@@ -1578,9 +1859,52 @@ class DBHandler:
                 )
                 continue
 
-            ethereum_transactions.append(tx)
+            yield tx
+
+    def get_ethereum_transactions(
+            self,
+            from_ts: Optional[Timestamp] = None,
+            to_ts: Optional[Timestamp] = None,
+            address: Optional[ChecksumEthAddress] = None,
+            order_by: str = 'timestamp',
+            ascending: bool = True,
+            limit: Optional[int] = None,
+            offset: int = 0,
+    ) -> List[EthereumTransaction]:
+        """Returns a list of ethereum transactions optionally filtered by time and/or from address
+
+        By default the returned list is ordered from oldest to newest.
+        Check iter_ethereum_transactions() for the ordering and the pagination.
+        """
+        return list(self.iter_ethereum_transactions(
+            from_ts=from_ts,
+            to_ts=to_ts,
+            address=address,
+            order_by=order_by,
+            ascending=ascending,
+            limit=limit,
+            offset=offset,
+        ))
+
+    def count_ethereum_transactions(
+            self,
+            from_ts: Optional[Timestamp] = None,
+            to_ts: Optional[Timestamp] = None,
+            address: Optional[ChecksumEthAddress] = None,
+    ) -> int:
+        """Returns how many ethereum transactions match the given filters"""
+        query = self._ethereum_transactions_query(from_ts=from_ts, to_ts=to_ts, address=address)
+        return self._select(*query.prepare_count())[0][0]
 
-        return ethereum_transactions
+    def has_ethereum_transactions(
+            self,
+            from_ts: Optional[Timestamp] = None,
+            to_ts: Optional[Timestamp] = None,
+            address: Optional[ChecksumEthAddress] = None,
+    ) -> bool:
+        """Returns whether any ethereum transaction matches the given filters"""
+        query = self._ethereum_transactions_query(from_ts=from_ts, to_ts=to_ts, address=address)
+        return len(self._select(*query.prepare_exists())) != 0
 
     def add_trades(self, trades: List[Trade]) -> None:
         trade_tuples: List[Tuple[Any, ...]] = []
@@ -1600,7 +1924,7 @@ class DBHandler:
             ))
 
         query = """
-            INSERT INTO trades(
+            INSERT OR IGNORE INTO trades(
               id,
               time,
               location,
@@ -1657,19 +1981,17 @@ class DBHandler:
         self.conn.commit()
         return True, ''
 
-    def get_trades(
-            self,
-            from_ts: Optional[Timestamp] = None,
-            to_ts: Optional[Timestamp] = None,
-            location: Optional[Location] = None,
-    ) -> List[Trade]:
-        """Returns a list of trades optionally filtered by time and location
-
-        The returned list is ordered from oldest to newest
-        """
-        cursor = self.conn.cursor()
-        query = (
-            'SELECT id,'
+    @staticmethod
+    def _trades_query(
+            from_ts: Optional[Timestamp],
+            to_ts: Optional[Timestamp],
+            location: Optional[Location],
+            pair: Optional[TradePair],
+            trade_type: Optional[TradeType],
+    ) -> DBSelectQuery:
+        query = DBSelectQuery(
+            table='trades',
+            columns='id,'
             '  time,'
             '  location,'
             '  pair,'
@@ -1679,14 +2001,50 @@ class DBHandler:
             '  fee,'
             '  fee_currency,'
             '  link,'
-            '  notes FROM trades '
+            '  notes',
         )
         if location is not None:
-            query += f'WHERE location="{location.serialize_for_db()}" '
-        query, bindings = form_query_to_filter_timestamps(query, 'time', from_ts, to_ts)
-        results = cursor.execute(query, bindings)
+            query.where('location=?', location.serialize_for_db())
+        query.where_equal('pair', pair)
+        if trade_type is not None:
+            query.where('type=?', trade_type.serialize_for_db())
+        return query.where_in_time_range('time', from_ts, to_ts)
+
+    def iter_trades(
+            self,
+            from_ts: Optional[Timestamp] = None,
+            to_ts: Optional[Timestamp] = None,
+            location: Optional[Location] = None,
+            pair: Optional[TradePair] = None,
+            trade_type: Optional[TradeType] = None,
+            order_by: str = 'timestamp',
+            ascending: bool = True,
+            limit: Optional[int] = None,
+            offset: int = 0,
+    ) -> Iterator[Trade]:
+        """Yields trades optionally filtered by time, location, pair and type
+
+        By default they are yielded from oldest to newest. order_by should be one of
+        the keys of TRADES_ORDER_BY_COLUMNS. At most limit trades are yielded after
+        skipping the first offset ones. The rows are read from the DB in batches as
+        the iterator gets consumed.
+        """
+        query = self._trades_query(
+            from_ts=from_ts,
+            to_ts=to_ts,
+            location=location,
+            pair=pair,
+            trade_type=trade_type,
+        )
+        query.order(order_by_attribute(TRADES_ORDER_BY_COLUMNS, order_by, ascending))
+        results = self._iter_select(query.paginate(limit=limit, offset=offset))
+        yield from self._deserialize_trades(results)
 
-        trades = []
+    def _deserialize_trades(self, results: Iterable[Tuple[Any, ...]]) -> Iterator[Trade]:
+        """Turns trades rows of the DB into trades, skipping and reporting the invalid ones
+
+        Any columns after the trade's own ones are ignored
+        """
         for result in results:
             try:
                 trade = Trade(
@@ -1712,9 +2070,92 @@ class DBHandler:
                     f'Unknown asset {e.asset_name} found',
                 )
                 continue
-            trades.append(trade)
+            yield trade
 
-        return trades
+    def get_trades(
+            self,
+            from_ts: Optional[Timestamp] = None,
+            to_ts: Optional[Timestamp] = None,
+            location: Optional[Location] = None,
+            pair: Optional[TradePair] = None,
+            trade_type: Optional[TradeType] = None,
+            order_by: str = 'timestamp',
+            ascending: bool = True,
+            limit: Optional[int] = None,
+            offset: int = 0,
+    ) -> List[Trade]:
+        """Returns a list of trades optionally filtered by time, location, pair and type
+
+        By default the returned list is ordered from oldest to newest.
+        Check iter_trades() for the ordering and the pagination.
+        """
+        return list(self.iter_trades(
+            from_ts=from_ts,
+            to_ts=to_ts,
+            location=location,
+            pair=pair,
+            trade_type=trade_type,
+            order_by=order_by,
+            ascending=ascending,
+            limit=limit,
+            offset=offset,
+        ))
+
+    def count_trades(
+            self,
+            from_ts: Optional[Timestamp] = None,
+            to_ts: Optional[Timestamp] = None,
+            location: Optional[Location] = None,
+            pair: Optional[TradePair] = None,
+            trade_type: Optional[TradeType] = None,
+    ) -> int:
+        """Returns how many trades match the given filters"""
+        query = self._trades_query(
+            from_ts=from_ts,
+            to_ts=to_ts,
+            location=location,
+            pair=pair,
+            trade_type=trade_type,
+        )
+        return self._select(*query.prepare_count())[0][0]
+
+    def get_trades_page(
+            self,
+            from_ts: Optional[Timestamp] = None,
+            to_ts: Optional[Timestamp] = None,
+            location: Optional[Location] = None,
+            pair: Optional[TradePair] = None,
+            trade_type: Optional[TradeType] = None,
+            order_by: str = 'timestamp',
+            ascending: bool = True,
+            limit: Optional[int] = None,
+            offset: int = 0,
+    ) -> Tuple[List[Trade], int]:
+        """Returns a page of the trades matching the given filters, like get_trades(),
+        along with the number of all the trades matching them
+
+        The number is counted by the same statement that reads the page, so the two
+        always agree even if trades get written in between two queries.
+        """
+        query = self._trades_query(
+            from_ts=from_ts,
+            to_ts=to_ts,
+            location=location,
+            pair=pair,
+            trade_type=trade_type,
+        )
+        query.order(order_by_attribute(TRADES_ORDER_BY_COLUMNS, order_by, ascending))
+        results = self._select(query.paginate(limit=limit, offset=offset).with_total_count())
+        if len(results) != 0:
+            entries_found = results[-1][-1]
+        elif offset == 0:
+            entries_found = 0
+        else:
+            # Past the last page no row carries the count, so it has to be counted
+            # on its own. There are no trades to disagree with in that case.
+            entries_found = self._select(*query.prepare_count())[0][0]
+
+        return list(self._deserialize_trades(results)), entries_found
 
     def delete_trade(self, trade_id: str) -> Tuple[bool, str]:
         cursor = self.conn.cursor()
@@ -1753,11 +2194,9 @@ class DBHandler:
         return True
 
     def get_rotkehlchen_premium(self) -> Optional[PremiumCredentials]:
-        cursor = self.conn.cursor()
-        result = cursor.execute(
+        result = self._select(
             'SELECT api_key, api_secret FROM user_credentials where name="rotkehlchen";',
         )
-        result = result.fetchall()
         if len(result) == 1:
             try:
                 credentials = PremiumCredentials(
@@ -1776,9 +2215,8 @@ class DBHandler:
 
     def get_netvalue_data(self) -> Tuple[List[str], List[str]]:
         """Get all entries of net value data from the DB"""
-        cursor = self.conn.cursor()
         # Get the total location ("H") entries in ascending time
-        query = cursor.execute(
+        query = self._select(
             'SELECT time, usd_value FROM timed_location_data '
             'WHERE location="H" ORDER BY time ASC;',
         )
@@ -1803,13 +2241,12 @@ class DBHandler:
         if to_ts is None:
             to_ts = ts_now()
 
-        cursor = self.conn.cursor()
-        results = cursor.execute(
-            f'SELECT time, amount, usd_value FROM timed_balances '
-            f'WHERE time BETWEEN {from_ts} AND {to_ts} AND currency="{asset.identifier}" '
-            f'ORDER BY time ASC;',
+        results = self._select(
+            'SELECT time, amount, usd_value FROM timed_balances '
+            'WHERE time BETWEEN ? AND ? AND currency=? '
+            'ORDER BY time ASC;',
+            (from_ts, to_ts, asset.identifier),
         )
-        results = results.fetchall()
         balances = []
         for result in results:
             balances.append(
@@ -1824,8 +2261,7 @@ class DBHandler:
 
     def query_owned_assets(self) -> List[Asset]:
         """Query the DB for a list of all assets ever owned"""
-        cursor = self.conn.cursor()
-        query = cursor.execute(
+        query = self._select(
             'SELECT DISTINCT currency FROM timed_balances ORDER BY time ASC;',
         )
 
@@ -1854,12 +2290,10 @@ class DBHandler:
         Returns a list of `LocationData` all at the latest timestamp.
         Essentially this returns the distribution of netvalue across all locations
         """
-        cursor = self.conn.cursor()
-        results = cursor.execute(
+        results = self._select(
             'SELECT time, location, usd_value FROM timed_location_data WHERE '
             'time=(SELECT MAX(time) FROM timed_location_data);',
         )
-        results = results.fetchall()
 
         locations = []
         for result in results:
@@ -1881,13 +2315,11 @@ class DBHandler:
 
         The list is sorted by usd value going from higher to lower
         """
-        cursor = self.conn.cursor()
-        results = cursor.execute(
+        results = self._select(
             'SELECT time, currency, amount, usd_value FROM timed_balances WHERE '
             'time=(SELECT MAX(time) from timed_balances) ORDER BY '
             'CAST(usd_value AS REAL) DESC;',
         )
-        results = results.fetchall()
         assets = []
         for result in results:
             assets.append(
@@ -1902,8 +2334,7 @@ class DBHandler:
         return assets
 
     def get_tags(self) -> Dict[str, Tag]:
-        cursor = self.conn.cursor()
-        results = cursor.execute(
+        results = self._select(
             'SELECT name, description, background_color, foreground_color FROM tags;',
         )
         tags_mapping: Dict[str, Tag] = {}
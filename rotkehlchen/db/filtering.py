@@ -0,0 +1,141 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from rotkehlchen.typing import Timestamp
+
+# The attributes by which each history table can be ordered mapped to their column
+TRADES_ORDER_BY_COLUMNS = {
+    'timestamp': 'time',
+    'location': 'location',
+    'pair': 'pair',
+    'trade_type': 'type',
+}
+ASSET_MOVEMENTS_ORDER_BY_COLUMNS = {
+    'timestamp': 'time',
+    'location': 'location',
+    'category': 'category',
+    'asset': 'asset',
+}
+ETHEREUM_TRANSACTIONS_ORDER_BY_COLUMNS = {
+    'timestamp': 'timestamp',
+    'block_number': 'block_number',
+    'from_address': 'from_address',
+}
+
+
+def order_by_attribute(columns: Dict[str, str], attribute: str, ascending: bool) -> str:
+    """Returns the ORDER BY clause ordering a history table by the given attribute
+
+    Rows with the same value are ordered by their rowid so that the order, and with it
+    the pages of the results, stays the same between two queries.
+
+    May raise:
+    - KeyError if the attribute is not one of the columns mapping
+    """
+    direction = 'ASC' if ascending else 'DESC'
+    return f'{columns[attribute]} {direction}, rowid {direction}'
+
+
+class DBSelectQuery():
+    """Builds a SELECT statement out of filters whose values are bound parameters
+
+    Values are never formatted into the SQL. The SQL text of a query only depends
+    on which filters were used and not on their values, so sqlite can reuse the
+    statement it prepared the last time the same kind of query ran.
+
+    Table names, column names and the order are given by the code and are not user input.
+    """
+
+    def __init__(self, table: str, columns: str) -> None:
+        self.table = table
+        self.columns = columns
+        self.conditions: List[str] = []
+        self.bindings: List[Any] = []
+        self.order_by: Optional[str] = None
+        self.limit: Optional[int] = None
+        self.offset = 0
+        self.total_count = False
+
+    def where(self, condition: str, *bindings: Any) -> 'DBSelectQuery':
+        """Adds a condition with `?` placeholders for the given bindings"""
+        self.conditions.append(condition)
+        self.bindings.extend(bindings)
+        return self
+
+    def where_equal(self, column: str, value: Optional[Any]) -> 'DBSelectQuery':
+        """Filters for the column being equal to value, unless value is None"""
+        if value is not None:
+            self.where(f'{column}=?', value)
+        return self
+
+    def where_in_time_range(
+            self,
+            column: str,
+            from_ts: Optional[Timestamp],
+            to_ts: Optional[Timestamp],
+    ) -> 'DBSelectQuery':
+        """Filters for the column being within the given inclusive time range
+
+        Any missing edge of the range is not filtered for
+        """
+        if from_ts is not None:
+            self.where(f'{column} >= ?', from_ts)
+        if to_ts is not None:
+            self.where(f'{column} <= ?', to_ts)
+        return self
+
+    def order(self, order_by: str) -> 'DBSelectQuery':
+        self.order_by = order_by
+        return self
+
+    def paginate(self, limit: Optional[int], offset: int = 0) -> 'DBSelectQuery':
+        """Only returns `limit` rows after skipping the first `offset` of them
+
+        A limit of None returns all the rows after the offset. Paginating only
+        makes sense for an ordered query.
+        """
+        self.limit = limit
+        self.offset = offset
+        return self
+
+    def with_total_count(self) -> 'DBSelectQuery':
+        """Adds a last column to every row with the number of all the rows matching
+        the filters, ignoring the pagination
+
+        Since it comes from the same statement as the rows it always agrees with them.
+        """
+        self.total_count = True
+        return self
+
+    def _where_clause(self) -> str:
+        if len(self.conditions) == 0:
+            return ''
+        return ' WHERE ' + ' AND '.join(self.conditions)
+
+    def prepare(self) -> Tuple[str, Tuple[Any, ...]]:
+        """Returns the SQL of the query and its bindings"""
+        columns = self.columns
+        if self.total_count:
+            columns += ', COUNT(*) OVER ()'
+        query = f'SELECT {columns} FROM {self.table}' + self._where_clause()
+        bindings = list(self.bindings)
+        if self.order_by is not None:
+            query += f' ORDER BY {self.order_by}'
+        if self.limit is not None or self.offset != 0:
+            # a negative limit means no limit for sqlite
+            query += ' LIMIT ? OFFSET ?'
+            bindings.extend((-1 if self.limit is None else self.limit, self.offset))
+        return query + ';', tuple(bindings)
+
+    def prepare_count(self) -> Tuple[str, Tuple[Any, ...]]:
+        """Returns the SQL counting all the rows matching the filters of the query
+        and its bindings. The order and the pagination are ignored.
+        """
+        query = f'SELECT COUNT(*) FROM {self.table}' + self._where_clause()
+        return query + ';', tuple(self.bindings)
+
+    def prepare_exists(self) -> Tuple[str, Tuple[Any, ...]]:
+        """Returns the SQL giving a single row if any row matches the filters of
+        the query and its bindings. The order and the pagination are ignored.
+        """
+        query = f'SELECT 1 FROM {self.table}' + self._where_clause()
+        return query + ' LIMIT 1;', tuple(self.bindings)
@@ -239,6 +239,34 @@ CREATE TABLE IF NOT EXISTS used_query_ranges (
 );
 """
 
+# Cache of the logs returned by eth_getLogs. query_key identifies the contract and
+# topics filter of the query. The block range covered for each query_key is kept
+# in used_query_ranges under the name ethereum_logs_{query_key}
+DB_CREATE_ETHEREUM_LOGS = """
+CREATE TABLE IF NOT EXISTS ethereum_logs (
+    query_key VARCHAR[64] NOT NULL,
+    block_number INTEGER NOT NULL,
+    log_data TEXT NOT NULL
+);
+"""
+
+DB_CREATE_ETHEREUM_BLOCK_TIMESTAMPS = """
+CREATE TABLE IF NOT EXISTS ethereum_block_timestamps (
+    block_number INTEGER NOT NULL PRIMARY KEY,
+    timestamp INTEGER NOT NULL
+);
+"""
+
+DB_CREATE_ACCOUNTING_CHECKPOINTS = """
+CREATE TABLE IF NOT EXISTS accounting_checkpoints (
+    settings_hash VARCHAR[64] NOT NULL,
+    actions_processed INTEGER NOT NULL,
+    actions_hash VARCHAR[64] NOT NULL,
+    state BLOB NOT NULL,
+    PRIMARY KEY (settings_hash, actions_processed)
+);
+"""
+
 DB_CREATE_SETTINGS = """
 CREATE TABLE IF NOT EXISTS settings (
     name VARCHAR[24] NOT NULL PRIMARY KEY,
@@ -246,10 +274,30 @@ CREATE TABLE IF NOT EXISTS settings (
 );
 """
 
+# Indexes are created after the DB upgrades run since an old DB may not yet
+# have all the columns they refer to
+DB_SCRIPT_CREATE_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_trades_time ON trades(time);
+CREATE INDEX IF NOT EXISTS idx_trades_location_time ON trades(location, time);
+CREATE INDEX IF NOT EXISTS idx_asset_movements_time ON asset_movements(time);
+CREATE INDEX IF NOT EXISTS idx_asset_movements_location_time ON asset_movements(location, time);
+CREATE INDEX IF NOT EXISTS idx_margin_positions_close_time ON margin_positions(close_time);
+CREATE INDEX IF NOT EXISTS idx_margin_positions_location_close_time
+    ON margin_positions(location, close_time);
+CREATE INDEX IF NOT EXISTS idx_ethereum_transactions_timestamp ON ethereum_transactions(timestamp);
+CREATE INDEX IF NOT EXISTS idx_ethereum_transactions_from_address_timestamp
+    ON ethereum_transactions(from_address, timestamp);
+/* covering index so that the balances of an asset are read without touching the table */
+CREATE INDEX IF NOT EXISTS idx_timed_balances_currency_time
+    ON timed_balances(currency, time, amount, usd_value);
+CREATE INDEX IF NOT EXISTS idx_ethereum_logs_query_key_block_number
+    ON ethereum_logs(query_key, block_number);
+"""
+
 DB_SCRIPT_CREATE_TABLES = """
 PRAGMA foreign_keys=off;
 BEGIN TRANSACTION;
-{}{}{}{}{}{}{}{}{}{}{}{}{}{}{}{}{}{}{}{}
+{}{}{}{}{}{}{}{}{}{}{}{}{}{}{}{}{}{}{}{}{}{}{}
 COMMIT;
 PRAGMA foreign_keys=on;
 """.format(
@@ -273,4 +321,7 @@ PRAGMA foreign_keys=on;
     DB_CREATE_TAGS_TABLE,
     DB_CREATE_TAG_MAPPINGS,
     DB_CREATE_AAVE_EVENTS,
+    DB_CREATE_ACCOUNTING_CHECKPOINTS,
+    DB_CREATE_ETHEREUM_LOGS,
+    DB_CREATE_ETHEREUM_BLOCK_TIMESTAMPS,
 )
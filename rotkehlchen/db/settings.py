@@ -1,6 +1,7 @@
 import json
 from typing import Any, Dict, List, NamedTuple, Optional, Union
 
+from rotkehlchen.accounting.cost_basis import CostBasisMethod
 from rotkehlchen.assets.asset import Asset
 from rotkehlchen.constants.assets import A_USD
 from rotkehlchen.constants.timing import YEAR_IN_SECONDS
@@ -10,7 +11,7 @@ from rotkehlchen.exchanges.kraken import KrakenAccountType
 from rotkehlchen.typing import Timestamp
 from rotkehlchen.user_messages import MessagesAggregator
 
-ROTKEHLCHEN_DB_VERSION = 13
+ROTKEHLCHEN_DB_VERSION = 14
 DEFAULT_TAXFREE_AFTER_PERIOD = YEAR_IN_SECONDS
 DEFAULT_INCLUDE_CRYPTO2CRYPTO = True
 DEFAULT_INCLUDE_GAS_COSTS = True
@@ -27,6 +28,7 @@ DEFAULT_CURRENCY_LOCATION = 'after'
 DEFAULT_SUBMIT_USAGE_ANALYTICS = True
 DEFAULT_KRAKEN_ACCOUNT_TYPE = KrakenAccountType.STARTER
 DEFAULT_ACTIVE_MODULES = ['makerdao_dsr', 'makerdao_vaults', 'aave']
+DEFAULT_COST_BASIS_METHOD = CostBasisMethod.FIFO
 
 
 class DBSettings(NamedTuple):
@@ -53,6 +55,7 @@ class DBSettings(NamedTuple):
     kraken_account_type: KrakenAccountType = DEFAULT_KRAKEN_ACCOUNT_TYPE
     active_modules: List[str] = DEFAULT_ACTIVE_MODULES
     frontend_settings: str = ''
+    cost_basis_method: CostBasisMethod = DEFAULT_COST_BASIS_METHOD
 
 
 class ModifiableDBSettings(NamedTuple):
@@ -74,6 +77,7 @@ class ModifiableDBSettings(NamedTuple):
     kraken_account_type: Optional[KrakenAccountType] = None
     active_modules: Optional[List[str]] = None
     frontend_settings: Optional[str] = None
+    cost_basis_method: Optional[CostBasisMethod] = None
 
     def serialize(self) -> Dict[str, Any]:
         settings_dict = {}
@@ -89,7 +93,7 @@ class ModifiableDBSettings(NamedTuple):
                 # taxfree_after_period of -1 by the user means disable the setting
                 elif setting == 'taxfree_after_period' and value == -1:
                     value = None
-                elif setting == 'kraken_account_type':
+                elif setting in ('kraken_account_type', 'cost_basis_method'):
                     value = value.serialize()
                 elif setting == 'active_modules':
                     value = json.dumps(value)
@@ -178,6 +182,8 @@ def db_settings_from_dict(
             specified_args[key] = json.loads(value)
         elif key == 'frontend_settings':
             specified_args[key] = str(value)
+        elif key == 'cost_basis_method':
+            specified_args[key] = CostBasisMethod.deserialize(value)
         else:
             msg_aggregator.add_warning(
                 f'Unknown DB setting {key} given. Ignoring it. Should not '
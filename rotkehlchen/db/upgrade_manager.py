@@ -15,6 +15,7 @@ from rotkehlchen.db.upgrades.v8_v9 import upgrade_v8_to_v9
 from rotkehlchen.db.upgrades.v10_v11 import upgrade_v10_to_v11
 from rotkehlchen.db.upgrades.v11_v12 import upgrade_v11_to_v12
 from rotkehlchen.db.upgrades.v12_v13 import upgrade_v12_to_v13
+from rotkehlchen.db.upgrades.v13_v14 import upgrade_v13_to_v14
 from rotkehlchen.errors import DBUpgradeError
 from rotkehlchen.logging import RotkehlchenLogsAdapter
 
@@ -118,6 +119,10 @@ UPGRADES_LIST = [
         from_version=12,
         function=upgrade_v12_to_v13,
     ),
+    UpgradeRecord(
+        from_version=13,
+        function=upgrade_v13_to_v14,
+    ),
 ]
 
 
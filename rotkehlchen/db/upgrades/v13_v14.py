@@ -0,0 +1,30 @@
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from rotkehlchen.db.dbhandler import DBHandler
+
+
+def upgrade_v13_to_v14(db: 'DBHandler') -> None:
+    """Upgrades the DB from v13 to v14
+
+    - Adds indexes on the time, location, address and currency columns of the
+    history tables so that filtering them no longer needs a full table scan
+    """
+    cursor = db.conn.cursor()
+    cursor.executescript("""
+    CREATE INDEX IF NOT EXISTS idx_trades_time ON trades(time);
+    CREATE INDEX IF NOT EXISTS idx_trades_location_time ON trades(location, time);
+    CREATE INDEX IF NOT EXISTS idx_asset_movements_time ON asset_movements(time);
+    CREATE INDEX IF NOT EXISTS idx_asset_movements_location_time
+        ON asset_movements(location, time);
+    CREATE INDEX IF NOT EXISTS idx_margin_positions_close_time ON margin_positions(close_time);
+    CREATE INDEX IF NOT EXISTS idx_margin_positions_location_close_time
+        ON margin_positions(location, close_time);
+    CREATE INDEX IF NOT EXISTS idx_ethereum_transactions_timestamp
+        ON ethereum_transactions(timestamp);
+    CREATE INDEX IF NOT EXISTS idx_ethereum_transactions_from_address_timestamp
+        ON ethereum_transactions(from_address, timestamp);
+    CREATE INDEX IF NOT EXISTS idx_timed_balances_currency_time
+        ON timed_balances(currency, time, amount, usd_value);
+    """)
+    db.conn.commit()
@@ -1,6 +1,6 @@
 from enum import Enum
 from sqlite3 import Cursor
-from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+from typing import Dict, List, NamedTuple, Optional, Union
 
 from typing_extensions import Literal
 
@@ -57,6 +57,13 @@ class Tag(NamedTuple):
         return self._asdict()  # pylint: disable=no-member
 
 
+class QueryTiming(NamedTuple):
+    """How many times a read query ran and how long it took"""
+    calls: int
+    total_seconds: float
+    max_seconds: float
+
+
 class DBStartupAction(Enum):
     NOTHING = 1
     UPGRADE_3_4 = 2
@@ -67,36 +74,6 @@ def str_to_bool(s: str) -> bool:
     return True if s == 'True' else False
 
 
-def form_query_to_filter_timestamps(
-        query: str,
-        timestamp_attribute: str,
-        from_ts: Optional[Timestamp],
-        to_ts: Optional[Timestamp],
-) -> Tuple[str, Union[Tuple, Tuple[Timestamp], Tuple[Timestamp, Timestamp]]]:
-    """Formulates the query string and its bindings to filter for timestamps"""
-    bindings: Union[Tuple, Tuple[Timestamp], Tuple[Timestamp, Timestamp]] = ()
-    got_from_ts = from_ts is not None
-    got_to_ts = to_ts is not None
-    if (got_from_ts or got_to_ts):
-        if 'WHERE' not in query:
-            query += 'WHERE '
-        else:
-            query += 'AND '
-
-    if got_from_ts:
-        query += f'{timestamp_attribute} >= ? '
-        bindings = (from_ts,)
-        if got_to_ts:
-            query += f'AND {timestamp_attribute} <= ? '
-            bindings = (from_ts, to_ts)
-    elif got_to_ts:
-        query += f'AND {timestamp_attribute} <= ? '
-        bindings = (to_ts,)
-
-    query += f'ORDER BY {timestamp_attribute} ASC;'
-    return query, bindings
-
-
 def deserialize_tags_from_db(val: Optional[str]) -> Optional[List[str]]:
     """Read tags from the DB and turn it into a List of tags"""
     if val is None:
@@ -1,4 +1,4 @@
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Tuple
 
 if TYPE_CHECKING:
     from rotkehlchen.assets.asset import Asset
@@ -47,9 +47,14 @@ class RemoteError(Exception):
 
 class PriceQueryUnknownFromAsset(Exception):
     def __init__(self, from_asset: 'Asset') -> None:
+        self.from_asset = from_asset
         super().__init__(
             f'Unable to query historical price for unknown asset: "{from_asset.identifier}"')
 
+    def __reduce__(self) -> Tuple[type, Tuple['Asset']]:
+        # Can be pickled so that it can be raised in the history processing worker
+        return self.__class__, (self.from_asset,)
+
 
 class UnprocessableTradePair(Exception):
     def __init__(self, pair: str) -> None:
@@ -80,12 +85,19 @@ class DeserializationError(Exception):
 
 class NoPriceForGivenTimestamp(Exception):
     def __init__(self, from_asset: 'Asset', to_asset: 'Asset', date: str) -> None:
+        self.from_asset = from_asset
+        self.to_asset = to_asset
+        self.date = date
         super(NoPriceForGivenTimestamp, self).__init__(
             'Unable to query a historical price for "{}" to "{}" at {}'.format(
                 from_asset.identifier, to_asset.identifier, date,
             ),
         )
 
+    def __reduce__(self) -> Tuple[type, Tuple['Asset', 'Asset', str]]:
+        # Can be pickled so that it can be raised in the history processing worker
+        return self.__class__, (self.from_asset, self.to_asset, self.date)
+
 
 class ConversionError(Exception):
     pass
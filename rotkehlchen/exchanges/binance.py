@@ -21,6 +21,7 @@ from rotkehlchen.exchanges.data_structures import (
 )
 from rotkehlchen.exchanges.exchange import ExchangeInterface
 from rotkehlchen.fval import FVal
+from rotkehlchen.greenlets import current_task_progress
 from rotkehlchen.inquirer import Inquirer
 from rotkehlchen.logging import RotkehlchenLogsAdapter
 from rotkehlchen.serialization.deserialize import (
@@ -381,6 +382,8 @@ class Binance(ExchangeInterface):
         raw_data = []
         # Limit of results to return. 1000 is max limit according to docs
         limit = 1000
+        progress = current_task_progress()
+        progress.set_stage('Querying binance trades', total=len(iter_markets))
         for symbol in iter_markets:
             last_trade_id = 0
             len_result = limit
@@ -406,6 +409,7 @@ class Binance(ExchangeInterface):
                 raw_data.extend(result)
 
             raw_data.sort(key=lambda x: x['time'])
+            progress.advance()
 
         trades = []
         for raw_trade in raw_data:
@@ -1,4 +1,4 @@
-from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from typing import TYPE_CHECKING, Any, Dict, List, NamedTuple, Optional, Tuple
 
 from dataclasses import dataclass
 
@@ -30,6 +30,9 @@ from rotkehlchen.typing import (
 )
 from rotkehlchen.user_messages import MessagesAggregator
 
+if TYPE_CHECKING:
+    from rotkehlchen.accounting.cost_basis import LotStore
+
 
 def hash_id(hashable: str) -> TradeID:
     id_bytes = sha3(hashable.encode())
@@ -44,6 +47,14 @@ class BuyEvent:
     # Fee rate in profit currency which we paid for each unit of the buying asset
     fee_rate: FVal
 
+    def serialize(self) -> Dict[str, Any]:
+        return {
+            'timestamp': self.timestamp,
+            'amount': str(self.amount),
+            'rate': str(self.rate),
+            'fee_rate': str(self.fee_rate),
+        }
+
 
 @dataclass(init=True, repr=True, eq=True, order=False, unsafe_hash=False, frozen=False)
 class SellEvent:
@@ -53,9 +64,18 @@ class SellEvent:
     fee_rate: FVal  # Fee rate in 'profit_currency' which we paid for each unit of the sold asset
     gain: FVal  # Gain in profit currency for this trade. Fees are not counted here.
 
+    def serialize(self) -> Dict[str, Any]:
+        return {
+            'timestamp': self.timestamp,
+            'amount': str(self.amount),
+            'rate': str(self.rate),
+            'fee_rate': str(self.fee_rate),
+            'gain': str(self.gain),
+        }
+
 
 class Events(NamedTuple):
-    buys: List[BuyEvent]
+    buys: 'LotStore'
     sells: List[SellEvent]
 
 
@@ -286,6 +306,27 @@ def deserialize_trade(data: Dict[str, Any]) -> Trade:
     )
 
 
+def deserialize_buy_event(data: Dict[str, Any]) -> BuyEvent:
+    """Takes a dict created by BuyEvent.serialize() and turns it back into the BuyEvent"""
+    return BuyEvent(
+        timestamp=Timestamp(data['timestamp']),
+        amount=FVal(data['amount']),
+        rate=FVal(data['rate']),
+        fee_rate=FVal(data['fee_rate']),
+    )
+
+
+def deserialize_sell_event(data: Dict[str, Any]) -> SellEvent:
+    """Takes a dict created by SellEvent.serialize() and turns it back into the SellEvent"""
+    return SellEvent(
+        timestamp=Timestamp(data['timestamp']),
+        amount=FVal(data['amount']),
+        rate=FVal(data['rate']),
+        fee_rate=FVal(data['fee_rate']),
+        gain=FVal(data['gain']),
+    )
+
+
 def trades_from_dictlist(
         given_trades: List[Dict[str, Any]],
         start_ts: Timestamp,
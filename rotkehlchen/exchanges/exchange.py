@@ -1,5 +1,5 @@
 import logging
-from typing import TYPE_CHECKING, Any, Callable, List, Optional, Tuple
+from typing import TYPE_CHECKING, Any, Callable, List, NamedTuple, Optional, Tuple
 
 import requests
 
@@ -25,6 +25,13 @@ ExchangeHistorySuccessCallback = Callable[
 ExchangeHistoryFailCallback = Callable[[str], None]
 
 
+class ExchangeHistory(NamedTuple):
+    trades: List[Trade]
+    margin_positions: List[MarginPosition]
+    asset_movements: List[AssetMovement]
+    exchange_specific_data: Any
+
+
 class ExchangeInterface(CacheableObject, LockableQueryObject):
 
     def __init__(
@@ -212,7 +219,7 @@ class ExchangeInterface(CacheableObject, LockableQueryObject):
         margin_positions = self.db.get_margin_positions(
             from_ts=start_ts,
             to_ts=end_ts,
-            location=self.name,
+            location=deserialize_location(self.name),
         )
         ranges_to_query = self.get_online_query_ranges('_margins', start_ts, end_ts)
 
@@ -245,7 +252,7 @@ class ExchangeInterface(CacheableObject, LockableQueryObject):
         asset_movements = self.db.get_asset_movements(
             from_ts=start_ts,
             to_ts=end_ts,
-            location=self.name,
+            location=deserialize_location(self.name),
         )
         ranges_to_query = self.get_online_query_ranges('_asset_movements', start_ts, end_ts)
 
@@ -263,6 +270,35 @@ class ExchangeInterface(CacheableObject, LockableQueryObject):
 
         return asset_movements
 
+    def query_history(self, start_ts: Timestamp, end_ts: Timestamp) -> ExchangeHistory:
+        """Queries all the historical event endpoints for this exchange
+
+        May raise:
+        - RemoteError if any of the queries to the exchange fails
+        """
+        trades_history = self.query_trade_history(
+            start_ts=start_ts,
+            end_ts=end_ts,
+        )
+        margin_history = self.query_margin_history(
+            start_ts=start_ts,
+            end_ts=end_ts,
+        )
+        asset_movements = self.query_deposits_withdrawals(
+            start_ts=start_ts,
+            end_ts=end_ts,
+        )
+        exchange_specific_data = self.query_exchange_specific_history(
+            start_ts=start_ts,
+            end_ts=end_ts,
+        )
+        return ExchangeHistory(
+            trades=trades_history,
+            margin_positions=margin_history,
+            asset_movements=asset_movements,
+            exchange_specific_data=exchange_specific_data,
+        )
+
     def query_history_with_callbacks(
             self,
             start_ts: Timestamp,
@@ -276,28 +312,14 @@ class ExchangeInterface(CacheableObject, LockableQueryObject):
         In case of failure passes the error to failure_callback
         """
         try:
-            trades_history = self.query_trade_history(
-                start_ts=start_ts,
-                end_ts=end_ts,
-            )
-            margin_history = self.query_margin_history(
-                start_ts=start_ts,
-                end_ts=end_ts,
-            )
-            asset_movements = self.query_deposits_withdrawals(
-                start_ts=start_ts,
-                end_ts=end_ts,
-            )
-            exchange_specific_data = self.query_exchange_specific_history(
-                start_ts=start_ts,
-                end_ts=end_ts,
-            )
-            success_callback(
-                trades_history,
-                margin_history,
-                asset_movements,
-                exchange_specific_data,
-            )
-
+            history = self.query_history(start_ts=start_ts, end_ts=end_ts)
         except RemoteError as e:
             fail_callback(str(e))
+            return
+
+        success_callback(
+            history.trades,
+            history.margin_positions,
+            history.asset_movements,
+            history.exchange_specific_data,
+        )
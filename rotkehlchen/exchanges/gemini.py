@@ -23,6 +23,7 @@ from rotkehlchen.errors import (
 )
 from rotkehlchen.exchanges.data_structures import AssetMovement, Trade
 from rotkehlchen.exchanges.exchange import ExchangeInterface
+from rotkehlchen.greenlets import current_task_progress
 from rotkehlchen.inquirer import Inquirer
 from rotkehlchen.logging import RotkehlchenLogsAdapter
 from rotkehlchen.serialization.deserialize import (
@@ -409,12 +410,16 @@ class Gemini(ExchangeInterface):
         log.debug('Query gemini trade history', start_ts=start_ts, end_ts=end_ts)
         trades = []
         gemini_trades = []
-        for symbol in self.symbols:
+        symbols = self.symbols
+        progress = current_task_progress()
+        progress.set_stage('Querying gemini trades', total=len(symbols))
+        for symbol in symbols:
             gemini_trades = self._get_trades_for_symbol(
                 symbol=symbol,
                 start_ts=start_ts,
                 end_ts=end_ts,
             )
+            progress.advance()
             for entry in gemini_trades:
                 try:
                     timestamp = deserialize_timestamp(entry['timestamp'])
@@ -33,6 +33,7 @@ from rotkehlchen.exchanges.data_structures import (
 )
 from rotkehlchen.exchanges.exchange import ExchangeInterface
 from rotkehlchen.fval import FVal
+from rotkehlchen.greenlets import current_task_progress
 from rotkehlchen.inquirer import Inquirer
 from rotkehlchen.logging import RotkehlchenLogsAdapter
 from rotkehlchen.serialization.deserialize import (
@@ -581,6 +582,9 @@ class Kraken(ExchangeInterface):
         count = response['count']
         offset = len(response[keyname])
         result.extend(response[keyname].values())
+        progress = current_task_progress()
+        progress.set_stage(f'Querying kraken {keyname}', total=count)
+        progress.advance(offset)
 
         log.debug(f'Kraken {endpoint} Query Response with count:{count}')
 
@@ -614,6 +618,7 @@ class Kraken(ExchangeInterface):
                 break
 
             result.extend(response[keyname].values())
+            progress.advance(response_length)
 
         return result
 
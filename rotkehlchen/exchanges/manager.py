@@ -1,8 +1,15 @@
 import logging
+from collections import defaultdict
 from importlib import import_module
-from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+from typing import TYPE_CHECKING, Any, Callable, DefaultDict, Dict, List, Optional, Tuple, TypeVar
 
+import gevent
+from gevent.lock import BoundedSemaphore
+from gevent.pool import Pool
+
+from rotkehlchen.errors import RemoteError
 from rotkehlchen.exchanges.exchange import ExchangeInterface
+from rotkehlchen.greenlets import current_task_progress
 from rotkehlchen.logging import RotkehlchenLogsAdapter
 from rotkehlchen.typing import ApiCredentials, ApiKey, ApiSecret
 from rotkehlchen.user_messages import MessagesAggregator
@@ -24,12 +31,26 @@ SUPPORTED_EXCHANGES = [
     'gemini',
 ]
 
+# Maximum number of exchanges queried at the same time
+EXCHANGES_QUERY_POOL_SIZE = len(SUPPORTED_EXCHANGES)
+# Maximum number of queries that can run at the same time for a single exchange
+EXCHANGE_MAX_CONCURRENT_QUERIES = 2
+# Seconds after which a query of all balances of an exchange is abandoned
+EXCHANGE_BALANCES_QUERY_TIMEOUT = 180
+# Seconds after which a query of the full history of an exchange is abandoned
+EXCHANGE_HISTORY_QUERY_TIMEOUT = 1800
+
+T = TypeVar('T')
+
 
 class ExchangeManager():
 
     def __init__(self, msg_aggregator: MessagesAggregator) -> None:
         self.connected_exchanges: Dict[str, ExchangeInterface] = {}
         self.msg_aggregator = msg_aggregator
+        self.query_semaphores: DefaultDict[str, BoundedSemaphore] = defaultdict(
+            lambda: BoundedSemaphore(EXCHANGE_MAX_CONCURRENT_QUERIES),
+        )
 
     def has_exchange(self, name: str, database: Optional['DBHandler'] = None) -> bool:
         """Check if an exchange is registered.
@@ -62,6 +83,71 @@ class ExchangeManager():
     def get(self, name: str) -> Optional[ExchangeInterface]:
         return self.connected_exchanges.get(name, None)
 
+    def _query_exchange(
+            self,
+            exchange: ExchangeInterface,
+            query: Callable[[ExchangeInterface], T],
+            timeout: float,
+    ) -> Tuple[Optional[T], Optional[str]]:
+        """Runs the query for a single exchange and returns its result or error"""
+        query_timeout = gevent.Timeout(timeout)
+        query_timeout.start()
+        try:
+            with self.query_semaphores[exchange.name]:
+                return query(exchange), None
+        except gevent.Timeout as e:
+            if e is not query_timeout:
+                raise
+            return None, f'{exchange.name} query timed out after {timeout} seconds'
+        except RemoteError as e:
+            return None, str(e)
+        finally:
+            query_timeout.close()
+
+    def query_exchanges(
+            self,
+            query: Callable[[ExchangeInterface], T],
+            timeout: float,
+    ) -> Tuple[Dict[str, T], Dict[str, str]]:
+        """Runs the given query for all connected exchanges concurrently
+
+        Each exchange is queried in its own greenlet and can run only a limited number
+        of queries at the same time. A query that does not finish within `timeout`
+        seconds is abandoned. The progress of the current task is advanced for each
+        exchange that finishes, so callers can set a stage with the exchanges as total.
+        The exchange queries run concurrently so they don't report their own stages to
+        the current task. If the calling greenlet is killed while waiting the exchange
+        queries are killed as well.
+
+        Returns the results of the exchanges whose query succeeded and the errors of
+        the exchanges whose query raised a RemoteError or timed out, each keyed by
+        exchange name and ordered like the connected exchanges. Any other exception
+        is propagated.
+        """
+        pool = Pool(EXCHANGES_QUERY_POOL_SIZE)
+        progress = current_task_progress()
+        greenlets = {}
+        for name, exchange in self.connected_exchanges.items():
+            greenlet = pool.spawn(self._query_exchange, exchange, query, timeout)
+            greenlet.link(lambda _: progress.advance())
+            greenlets[name] = greenlet
+        try:
+            pool.join()
+        finally:
+            pool.kill()
+
+        results = {}
+        errors = {}
+        for name, greenlet in greenlets.items():
+            result, error = greenlet.get()
+            if error is not None:
+                log.error(f'Query of {name} exchange failed', error=error)
+                errors[name] = error
+            else:
+                results[name] = result
+
+        return results, errors
+
     def setup_exchange(
             self,
             name: str,
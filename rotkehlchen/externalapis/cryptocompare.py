@@ -1,13 +1,15 @@
-import glob
 import logging
 import os
-import re
+import time
+from collections import defaultdict
 from json.decoder import JSONDecodeError
 from pathlib import Path
-from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, NewType, Optional
+from typing import Any, Dict, Iterable, Iterator, List, NewType, Optional, Tuple
 
 import gevent
 import requests
+from gevent.lock import BoundedSemaphore, Semaphore
+from gevent.pool import Pool
 from typing_extensions import Literal
 
 from rotkehlchen.assets.asset import Asset
@@ -15,18 +17,28 @@ from rotkehlchen.constants import ZERO
 from rotkehlchen.constants.assets import A_BTC, A_DAI, A_USD
 from rotkehlchen.constants.cryptocompare import KNOWN_TO_MISS_FROM_CRYPTOCOMPARE
 from rotkehlchen.db.dbhandler import DBHandler
-from rotkehlchen.errors import NoPriceForGivenTimestamp, PriceQueryUnknownFromAsset, RemoteError
+from rotkehlchen.errors import (
+    NoPriceForGivenTimestamp,
+    PriceQueryUnknownFromAsset,
+    RemoteError,
+    UnsupportedAsset,
+)
 from rotkehlchen.externalapis.interface import ExternalServiceWithApiKey
+from rotkehlchen.externalapis.price_history_store import (
+    PRICE_HISTORY_PREFIX,
+    PRICE_HISTORY_SUFFIX,
+    PriceHistory,
+    append_price_history,
+    migrate_json_price_histories,
+    price_history_filepath,
+    write_price_history,
+)
 from rotkehlchen.fval import FVal
+from rotkehlchen.greenlets import current_task_progress
 from rotkehlchen.history import PriceHistorian
 from rotkehlchen.logging import RotkehlchenLogsAdapter
 from rotkehlchen.typing import ExternalService, Price, Timestamp
-from rotkehlchen.utils.misc import (
-    convert_to_int,
-    timestamp_to_date,
-    ts_now,
-    write_history_data_in_file,
-)
+from rotkehlchen.utils.misc import timestamp_to_date, ts_now
 from rotkehlchen.utils.serialization import rlk_jsondumps, rlk_jsonloads_dict
 
 logger = logging.getLogger(__name__)
@@ -38,6 +50,10 @@ PairCacheKey = NewType('PairCacheKey', T_PairCacheKey)
 
 RATE_LIMIT_MSG = 'You are over your rate limit please upgrade your account!'
 CRYPTOCOMPARE_QUERY_RETRY_TIMES = 10
+# How many cryptocompare queries can be in flight at the same time
+CRYPTOCOMPARE_MAX_CONCURRENT_QUERIES = 4
+# How many pair histories are queried concurrently when warming up the price caches
+CRYPTOCOMPARE_HISTORY_POOL_SIZE = 4
 # No special case needed for cETH. Cryptocompare maps it correctly
 CRYPTOCOMPARE_SPECIAL_CASES_MAPPING = {
     Asset('cDAI'): A_DAI,
@@ -64,38 +80,6 @@ CRYPTOCOMPARE_SPECIAL_CASES_MAPPING = {
 CRYPTOCOMPARE_SPECIAL_CASES = CRYPTOCOMPARE_SPECIAL_CASES_MAPPING.keys()
 
 
-class PriceHistoryEntry(NamedTuple):
-    time: Timestamp
-    low: Price
-    high: Price
-
-
-class PriceHistoryData(NamedTuple):
-    data: List[PriceHistoryEntry]
-    start_time: Timestamp
-    end_time: Timestamp
-
-
-def _dict_history_to_entries(data: List[Dict[str, Any]]) -> List[PriceHistoryEntry]:
-    """Turns a list of dict of history entries to a list of proper objects"""
-    return [
-        PriceHistoryEntry(
-            time=Timestamp(entry['time']),
-            low=Price(FVal(entry['low'])),
-            high=Price(FVal(entry['high'])),
-        ) for entry in data
-    ]
-
-
-def _dict_history_to_data(data: Dict[str, Any]) -> PriceHistoryData:
-    """Turns a price history data dict entry into a proper object"""
-    return PriceHistoryData(
-        data=_dict_history_to_entries(data['data']),
-        start_time=Timestamp(data['start_time']),
-        end_time=Timestamp(data['end_time']),
-    )
-
-
 def _multiply_str_nums(a: str, b: str) -> str:
     """Multiples two string numbers and returns the result as a string"""
     return str(FVal(a) * FVal(b))
@@ -130,27 +114,55 @@ def _check_hourly_data_sanity(
         index += 2
 
 
+def _adjust_price_with_usd_prices(
+        price: Price,
+        from_asset: Asset,
+        to_asset: Asset,
+        from_asset_usd: Price,
+        to_asset_usd: Price,
+) -> Price:
+    """Returns the USD adjusted price if the given price is too far off from it.
+    Check _adjust_to_cryptocompare_price_incosistencies() for details"""
+    usd_invert_conversion = Price(from_asset_usd / to_asset_usd)
+    abs_diff = abs(usd_invert_conversion - price)
+    relative_difference = abs_diff / max(price, usd_invert_conversion)
+    if relative_difference >= FVal('0.1'):
+        log.warning(
+            'Cryptocompare historical price data are incosistent.'
+            'Taking USD adjusted price. Check github issue #221',
+            from_asset=from_asset,
+            to_asset=to_asset,
+            incosistent_price=price,
+            usd_price=from_asset_usd,
+            adjusted_price=usd_invert_conversion,
+        )
+        return usd_invert_conversion
+    return price
+
+
 class Cryptocompare(ExternalServiceWithApiKey):
     def __init__(self, data_directory: Path, database: Optional[DBHandler]) -> None:
         super().__init__(database=database, service_name=ExternalService.CRYPTOCOMPARE)
         self.data_directory = data_directory
-        self.price_history: Dict[PairCacheKey, PriceHistoryData] = {}
+        self.price_history: Dict[PairCacheKey, PriceHistory] = {}
         self.price_history_file: Dict[PairCacheKey, Path] = {}
+        # Only one greenlet at a time may query and replace the history of a pair
+        self.price_history_locks: Dict[PairCacheKey, Semaphore] = defaultdict(Semaphore)
         self.session = requests.session()
         self.session.headers.update({'User-Agent': 'rotkehlchen'})
-
-        # Check the data folder and remember the filenames of any cached history
-        prefix = os.path.join(str(self.data_directory), 'price_history_')
-        prefix = prefix.replace('\\', '\\\\')
-        regex = re.compile(prefix + r'(.*)\.json')
-        files_list = glob.glob(prefix + '*.json')
-
-        for file_ in files_list:
-            file_ = file_.replace('\\\\', '\\')
-            match = regex.match(file_)
-            assert match
-            cache_key = PairCacheKey(match.group(1))
-            self.price_history_file[cache_key] = Path(file_)
+        # Shared by all greenlets querying cryptocompare so that when one of them
+        # gets rate limited all of them back off
+        self.query_semaphore = BoundedSemaphore(CRYPTOCOMPARE_MAX_CONCURRENT_QUERIES)
+        self.rate_limited_until = 0.0
+
+        # Convert any json caches left from older versions and then remember the
+        # filenames of all cached histories. They are only opened when first needed.
+        migrate_json_price_histories(self.data_directory)
+        for file_ in self.data_directory.glob(f'{PRICE_HISTORY_PREFIX}*{PRICE_HISTORY_SUFFIX}'):
+            cache_key = PairCacheKey(
+                file_.name[len(PRICE_HISTORY_PREFIX):-len(PRICE_HISTORY_SUFFIX)],
+            )
+            self.price_history_file[cache_key] = file_
 
     def set_database(self, database: DBHandler) -> None:
         """If the cryptocompare instance was initialized without a DB this sets its DB"""
@@ -180,8 +192,12 @@ class Cryptocompare(ExternalServiceWithApiKey):
 
         tries = CRYPTOCOMPARE_QUERY_RETRY_TIMES
         while tries >= 0:
+            backoff_left = self.rate_limited_until - time.time()
+            if backoff_left > 0:
+                gevent.sleep(backoff_left)
             try:
-                response = self.session.get(querystr)
+                with self.query_semaphore:
+                    response = self.session.get(querystr)
             except requests.exceptions.ConnectionError as e:
                 raise RemoteError(f'Cryptocompare API request failed due to {str(e)}')
 
@@ -198,7 +214,10 @@ class Cryptocompare(ExternalServiceWithApiKey):
                             f'Got rate limited by cryptocompare. '
                             f'Backing off for {backoff_seconds}',
                         )
-                        gevent.sleep(backoff_seconds)
+                        self.rate_limited_until = max(
+                            self.rate_limited_until,
+                            time.time() + backoff_seconds,
+                        )
                         tries -= 1
                         continue
                     else:
@@ -405,10 +424,15 @@ class Cryptocompare(ExternalServiceWithApiKey):
         if cache_key in self.price_history_file:
             if cache_key not in self.price_history:
                 try:
-                    with open(self.price_history_file[cache_key], 'r') as f:
-                        data = rlk_jsonloads_dict(f.read())
-                        self.price_history[cache_key] = _dict_history_to_data(data)
-                except (OSError, JSONDecodeError):
+                    self.price_history[cache_key] = PriceHistory(
+                        self.price_history_file[cache_key],
+                    )
+                except (OSError, ValueError) as e:
+                    log.warning(
+                        'Could not read cached price history',
+                        cache_key=cache_key,
+                        error=str(e),
+                    )
                     return False
 
             in_range = (
@@ -421,41 +445,24 @@ class Cryptocompare(ExternalServiceWithApiKey):
 
         return False
 
-    def get_historical_data(
+    def _query_hourly_history(
             self,
             from_asset: Asset,
             to_asset: Asset,
-            timestamp: Timestamp,
-            historical_data_start: Timestamp,
-    ) -> List[PriceHistoryEntry]:
-        """
-        Get historical price data from cryptocompare
+            start_ts: Timestamp,
+            now_ts: Timestamp,
+    ) -> List[Dict[str, Any]]:
+        """Queries cryptocompare's histohour in chunks from start_ts until now_ts
 
-        Returns a sorted list of price entries.
+        Returns the list of hourly entries starting from start_ts.
 
         - May raise RemoteError if there is a problem reaching the cryptocompare server
         or with reading the response returned by the server
         """
-        log.debug(
-            'Retrieving historical price data from cryptocompare',
-            from_asset=from_asset,
-            to_asset=to_asset,
-            timestamp=timestamp,
-        )
-
-        cache_key = PairCacheKey(from_asset.identifier + '_' + to_asset.identifier)
-        got_cached_value = self._got_cached_price(cache_key, timestamp)
-        if got_cached_value:
-            return self.price_history[cache_key].data
-
-        now_ts = ts_now()
         cryptocompare_hourquerylimit = 2000
         calculated_history: List[Dict[str, Any]] = []
 
-        if historical_data_start <= timestamp:
-            end_date = historical_data_start
-        else:
-            end_date = timestamp
+        end_date = start_ts
         while True:
             pr_end_date = end_date
             end_date = Timestamp(end_date + (cryptocompare_hourquerylimit) * 3600)
@@ -520,33 +527,176 @@ class Cryptocompare(ExternalServiceWithApiKey):
             if end_date >= now_ts:
                 break
 
+        return calculated_history
+
+    def _append_to_cached_history(
+            self,
+            cache_key: PairCacheKey,
+            from_asset: Asset,
+            to_asset: Asset,
+            now_ts: Timestamp,
+    ) -> PriceHistory:
+        """Queries only the hourly prices after the last cached entry of the pair
+        and appends them to the cached history
+
+        Should only be called with the pair's lock held.
+
+        - May raise RemoteError if there is a problem reaching the cryptocompare server
+        or with reading the response returned by the server
+        """
+        history = self.price_history[cache_key]
+        new_history = self._query_hourly_history(
+            from_asset=from_asset,
+            to_asset=to_asset,
+            start_ts=history.time_at(len(history) - 1),
+            now_ts=now_ts,
+        )
+        # Other greenlets ran while we waited on the network so take the current
+        # history of the pair and not the one we started with
+        history = self.price_history[cache_key]
+        last_entry_ts = history.time_at(len(history) - 1)
+        # The first returned entry should be the last one we already have
+        new_history = [x for x in new_history if x['time'] > last_entry_ts]
+        # The cached data have already been checked, so only check the seam and on
+        _check_hourly_data_sanity(
+            [{'time': last_entry_ts}] + new_history,
+            from_asset,
+            to_asset,
+        )
+        log.info(
+            'Appending to price history cache',
+            filename=history.filepath,
+            from_asset=from_asset,
+            to_asset=to_asset,
+            new_entries=len(new_history),
+        )
+        # Takes care of closing the old mapping before replacing its file
+        self.price_history[cache_key] = append_price_history(
+            history=history,
+            data=new_history,
+            end_time=now_ts,
+        )
+        return self.price_history[cache_key]
+
+    def get_historical_data(
+            self,
+            from_asset: Asset,
+            to_asset: Asset,
+            timestamp: Timestamp,
+            historical_data_start: Timestamp,
+    ) -> PriceHistory:
+        """
+        Get historical price data from cryptocompare
+
+        Returns a sorted sequence of price entries.
+
+        If the pair is cached and the cache covers the timestamp's start but has
+        become outdated, only the missing tail of the history is queried.
+
+        The returned history gets closed when the pair is next refreshed, so it
+        should be used right away and not kept across a greenlet switch.
+
+        - May raise RemoteError if there is a problem reaching the cryptocompare server
+        or with reading the response returned by the server
+        """
+        log.debug(
+            'Retrieving historical price data from cryptocompare',
+            from_asset=from_asset,
+            to_asset=to_asset,
+            timestamp=timestamp,
+        )
+
+        cache_key = PairCacheKey(from_asset.identifier + '_' + to_asset.identifier)
+        got_cached_value = self._got_cached_price(cache_key, timestamp)
+        if got_cached_value:
+            return self.price_history[cache_key]
+
+        # If another greenlet is already refreshing the pair wait for it and use
+        # its history if that covers the timestamp
+        with self.price_history_locks[cache_key]:
+            if self._got_cached_price(cache_key, timestamp):
+                return self.price_history[cache_key]
+
+            return self._refresh_historical_data(
+                cache_key=cache_key,
+                from_asset=from_asset,
+                to_asset=to_asset,
+                timestamp=timestamp,
+                historical_data_start=historical_data_start,
+            )
+
+    def _refresh_historical_data(
+            self,
+            cache_key: PairCacheKey,
+            from_asset: Asset,
+            to_asset: Asset,
+            timestamp: Timestamp,
+            historical_data_start: Timestamp,
+    ) -> PriceHistory:
+        """Queries the pair's history, or only its missing tail, and caches it
+
+        Should only be called with the pair's lock held.
+
+        - May raise RemoteError if there is a problem reaching the cryptocompare server
+        or with reading the response returned by the server
+        """
+        now_ts = ts_now()
+        cached_history = self.price_history.get(cache_key, None)
+        can_append = (
+            cached_history is not None and
+            len(cached_history) != 0 and
+            cached_history.start_time <= timestamp
+        )
+        if can_append:
+            return self._append_to_cached_history(
+                cache_key=cache_key,
+                from_asset=from_asset,
+                to_asset=to_asset,
+                now_ts=now_ts,
+            )
+
+        if historical_data_start <= timestamp:
+            start_ts = historical_data_start
+        else:
+            start_ts = timestamp
+        calculated_history = self._query_hourly_history(
+            from_asset=from_asset,
+            to_asset=to_asset,
+            start_ts=start_ts,
+            now_ts=now_ts,
+        )
+
         # Let's always check for data sanity for the hourly prices.
         _check_hourly_data_sanity(calculated_history, from_asset, to_asset)
         # and now since we actually queried the data let's also cache them
-        filename = self.data_directory / ('price_history_' + cache_key + '.json')
+        filename = price_history_filepath(self.data_directory, cache_key)
         log.info(
             'Updating price history cache',
             filename=filename,
             from_asset=from_asset,
             to_asset=to_asset,
         )
-        write_history_data_in_file(
-            data=calculated_history,
+        if cache_key in self.price_history_file and self.db is not None:
+            # Prices of the replaced history may have been used by accounting checkpoints
+            self.db.delete_accounting_checkpoints()
+        # An open mapping of the old file would not let us replace it on all platforms.
+        # Closing it is safe since we hold the pair's lock, so no other greenlet is
+        # refreshing it, and readers never keep a history across a greenlet switch.
+        old_history = self.price_history.pop(cache_key, None)
+        if old_history is not None:
+            old_history.close()
+        write_price_history(
             filepath=filename,
-            start_ts=historical_data_start,
-            end_ts=now_ts,
+            data=calculated_history,
+            start_time=historical_data_start,
+            end_time=now_ts,
         )
 
-        # Finally save the objects in memory and return them
-        data_including_time = {
-            'data': calculated_history,
-            'start_time': historical_data_start,
-            'end_time': end_date,
-        }
+        # Finally map the new file and return it
         self.price_history_file[cache_key] = filename
-        self.price_history[cache_key] = _dict_history_to_data(data_including_time)
+        self.price_history[cache_key] = PriceHistory(filename)
 
-        return self.price_history[cache_key].data
+        return self.price_history[cache_key]
 
     def query_historical_price(
             self,
@@ -578,21 +728,10 @@ class Cryptocompare(ExternalServiceWithApiKey):
 
         # all data are sorted and timestamps are always increasing by 1 hour
         # find the closest entry to the provided timestamp
-        if timestamp >= data[0].time:
-            # convert_to_int can't raise here due to its input
-            index = convert_to_int((timestamp - data[0].time) / 3600, accept_only_exact=False)
-            # print("timestamp: {} index: {} data_length: {}".format(timestamp, index, len(data)))
-            diff = abs(data[index].time - timestamp)
-            if index + 1 <= len(data) - 1:
-                diff_p1 = abs(data[index + 1].time - timestamp)
-                if diff_p1 < diff:
-                    index = index + 1
-
-            if data[index].high is None or data[index].low is None:
-                # If we get some None in the hourly set price to 0 so that we check alternatives
-                price = Price(ZERO)
-            else:
-                price = Price((data[index].high + data[index].low) / 2)
+        index = data.closest_indices([timestamp])[0]
+        if index is not None:
+            # If we get a zero price in the hourly set we check alternatives
+            price = data.mid_price(index)
         else:
             # no price found in the historical data from/to asset, try alternatives
             price = Price(ZERO)
@@ -652,6 +791,205 @@ class Cryptocompare(ExternalServiceWithApiKey):
 
         return price
 
+    def _warm_price_history(
+            self,
+            from_asset: Asset,
+            to_asset: Asset,
+            timestamp: Timestamp,
+            historical_data_start: Timestamp,
+    ) -> None:
+        try:
+            self.get_historical_data(
+                from_asset=from_asset,
+                to_asset=to_asset,
+                timestamp=timestamp,
+                historical_data_start=historical_data_start,
+            )
+        except (RemoteError, UnsupportedAsset) as e:
+            # Will be retried and reported when the price is actually needed
+            log.warning(
+                'Could not warm up price history',
+                from_asset=from_asset,
+                to_asset=to_asset,
+                error=str(e),
+            )
+
+    def _warm_price_histories_concurrently(
+            self,
+            pairs: Dict[Tuple[Asset, Asset], Timestamp],
+            historical_data_start: Timestamp,
+    ) -> None:
+        pool = Pool(CRYPTOCOMPARE_HISTORY_POOL_SIZE)
+        progress = current_task_progress()
+        progress.set_stage('Querying price histories', total=len(pairs))
+        for (from_asset, to_asset), timestamp in pairs.items():
+            if from_asset in KNOWN_TO_MISS_FROM_CRYPTOCOMPARE:
+                progress.advance()
+                continue
+            greenlet = pool.spawn(
+                self._warm_price_history,
+                from_asset=from_asset,
+                to_asset=to_asset,
+                timestamp=timestamp,
+                historical_data_start=historical_data_start,
+            )
+            greenlet.link(lambda _: progress.advance())
+        pool.join()
+
+    def _timestamps_without_hourly_price(
+            self,
+            from_asset: Asset,
+            to_asset: Asset,
+            timestamps: List[Timestamp],
+    ) -> List[Timestamp]:
+        """Returns the timestamps for which the cached hourly history has no price"""
+        cache_key = PairCacheKey(from_asset.identifier + '_' + to_asset.identifier)
+        data = self.price_history.get(cache_key, None)
+        if data is None:
+            return timestamps
+
+        return [
+            timestamp for timestamp, index
+            in zip(timestamps, data.closest_indices(timestamps))
+            if index is None or not data.has_price(index)
+        ]
+
+    def warm_price_histories(
+            self,
+            timestamps_per_pair: Dict[Tuple[Asset, Asset], List[Timestamp]],
+            historical_data_start: Timestamp,
+    ) -> None:
+        """Makes sure that the hourly histories needed to find the prices of all the
+        given pairs at the given timestamps are cached and up to date.
+
+        The histories are queried concurrently on a bounded pool of greenlets. All
+        queries share the same rate limit backoff. First the pairs themselves and the
+        USD pairs needed to double check non-USD fiat prices are queried. Then the BTC
+        bridge pairs for any timestamps that turned out to have no price.
+        """
+        direct_pairs: Dict[Tuple[Asset, Asset], Timestamp] = {}
+        for (from_asset, to_asset), timestamps in timestamps_per_pair.items():
+            if len(timestamps) == 0:
+                continue
+            last_ts = max(timestamps)
+            needed = [(from_asset, to_asset)]
+            comparison_to_nonusd_fiat = (
+                (to_asset.is_fiat() and to_asset != A_USD) or
+                (from_asset.is_fiat() and from_asset != A_USD)
+            )
+            if comparison_to_nonusd_fiat:
+                needed.extend([(from_asset, A_USD), (to_asset, A_USD)])
+            for pair in needed:
+                if pair[0] == pair[1] or (pair[0].is_fiat() and pair[1].is_fiat()):
+                    continue  # same asset or forex which are not queried from here
+                direct_pairs[pair] = max(direct_pairs.get(pair, last_ts), last_ts)
+
+        log.debug('Warming up price histories', number_of_pairs=len(direct_pairs))
+        self._warm_price_histories_concurrently(direct_pairs, historical_data_start)
+
+        bridge_pairs: Dict[Tuple[Asset, Asset], Timestamp] = {}
+        for (from_asset, to_asset), timestamps in timestamps_per_pair.items():
+            if A_BTC in (from_asset, to_asset) or (from_asset, to_asset) not in direct_pairs:
+                continue
+            without_price = self._timestamps_without_hourly_price(
+                from_asset=from_asset,
+                to_asset=to_asset,
+                timestamps=timestamps,
+            )
+            if len(without_price) == 0:
+                continue
+            last_ts = max(without_price)
+            for pair in ((from_asset, A_BTC), (A_BTC, to_asset)):
+                bridge_pairs[pair] = max(bridge_pairs.get(pair, last_ts), last_ts)
+
+        if len(bridge_pairs) != 0:
+            log.debug('Warming up BTC bridge price histories', number_of_pairs=len(bridge_pairs))
+            self._warm_price_histories_concurrently(bridge_pairs, historical_data_start)
+
+    def query_historical_prices(
+            self,
+            from_asset: Asset,
+            to_asset: Asset,
+            timestamps: List[Timestamp],
+            historical_data_start: Timestamp,
+    ) -> Dict[Timestamp, Price]:
+        """Query the historical prices of `from_asset` in `to_asset` for many timestamps
+
+        The pair's history is retrieved once and the hourly entries of all the
+        timestamps are resolved in one pass. Prices that would need the BTC bridge
+        are also resolved in batch.
+
+        Returns the prices it managed to find. Timestamps for which no price could be
+        found here, for example due to a remote error or because only a daily price
+        exists, are omitted. Querying them with query_historical_price() gives either
+        the price or the proper error.
+        """
+        if from_asset in KNOWN_TO_MISS_FROM_CRYPTOCOMPARE or len(timestamps) == 0:
+            return {}
+
+        try:
+            data = self.get_historical_data(
+                from_asset=from_asset,
+                to_asset=to_asset,
+                timestamp=max(timestamps),
+                historical_data_start=historical_data_start,
+            )
+        except (RemoteError, UnsupportedAsset) as e:
+            log.warning(
+                'Could not batch query historical prices',
+                from_asset=from_asset,
+                to_asset=to_asset,
+                error=str(e),
+            )
+            return {}
+
+        prices: Dict[Timestamp, Price] = {}
+        without_price = []
+        for timestamp, index in zip(timestamps, data.closest_indices(timestamps)):
+            price = Price(ZERO) if index is None else data.mid_price(index)
+            if price == ZERO:
+                without_price.append(timestamp)
+            else:
+                prices[timestamp] = price
+
+        if len(without_price) != 0 and from_asset != A_BTC and to_asset != A_BTC:
+            btc_prices = PriceHistorian().query_historical_prices(
+                [(from_asset, A_BTC, ts) for ts in without_price] +
+                [(A_BTC, to_asset, ts) for ts in without_price],
+            )
+            for timestamp in without_price:
+                asset_btc_price = btc_prices.get((from_asset, A_BTC, timestamp), None)
+                btc_to_asset_price = btc_prices.get((A_BTC, to_asset, timestamp), None)
+                if asset_btc_price is not None and btc_to_asset_price is not None:
+                    prices[timestamp] = Price(asset_btc_price * btc_to_asset_price)
+
+        comparison_to_nonusd_fiat = (
+            (to_asset.is_fiat() and to_asset != A_USD) or
+            (from_asset.is_fiat() and from_asset != A_USD)
+        )
+        if not comparison_to_nonusd_fiat:
+            return prices
+
+        usd_prices = PriceHistorian().query_historical_prices(
+            [(from_asset, A_USD, ts) for ts in prices] +
+            [(to_asset, A_USD, ts) for ts in prices],
+        )
+        adjusted_prices = {}
+        for timestamp, price in prices.items():
+            from_asset_usd = usd_prices.get((from_asset, A_USD, timestamp), None)
+            to_asset_usd = usd_prices.get((to_asset, A_USD, timestamp), None)
+            if from_asset_usd is None or to_asset_usd is None:
+                continue
+            adjusted_prices[timestamp] = _adjust_price_with_usd_prices(
+                price=price,
+                from_asset=from_asset,
+                to_asset=to_asset,
+                from_asset_usd=from_asset_usd,
+                to_asset_usd=to_asset_usd,
+            )
+
+        return adjusted_prices
+
     @staticmethod
     def _adjust_to_cryptocompare_price_incosistencies(
             price: Price,
@@ -687,21 +1025,13 @@ class Cryptocompare(ExternalServiceWithApiKey):
             timestamp=timestamp,
         )
 
-        usd_invert_conversion = Price(from_asset_usd / to_asset_usd)
-        abs_diff = abs(usd_invert_conversion - price)
-        relative_difference = abs_diff / max(price, usd_invert_conversion)
-        if relative_difference >= FVal('0.1'):
-            log.warning(
-                'Cryptocompare historical price data are incosistent.'
-                'Taking USD adjusted price. Check github issue #221',
-                from_asset=from_asset,
-                to_asset=to_asset,
-                incosistent_price=price,
-                usd_price=from_asset_usd,
-                adjusted_price=usd_invert_conversion,
-            )
-            return usd_invert_conversion
-        return price
+        return _adjust_price_with_usd_prices(
+            price=price,
+            from_asset=from_asset,
+            to_asset=to_asset,
+            from_asset_usd=from_asset_usd,
+            to_asset_usd=to_asset_usd,
+        )
 
     def all_coins(self) -> Dict[str, Any]:
         """
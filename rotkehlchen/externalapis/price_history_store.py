@@ -0,0 +1,358 @@
+"""Compact on-disk storage for the hourly price histories we get from cryptocompare
+
+Each pair is stored in its own file as a fixed size header followed by three
+columns of equal length: the timestamps (int64), the high prices (float64) and
+the low prices (float64). The files are memory mapped so that opening a history
+costs nothing and a lookup is simple index arithmetic. Only entries that are
+actually read are turned into FVal.
+
+The prices are stored as doubles since that is exactly the precision with which
+cryptocompare returns them and with which the old json caches were read back.
+"""
+import logging
+import mmap
+import os
+import struct
+import sys
+from array import array
+from json.decoder import JSONDecodeError
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from rotkehlchen.fval import FVal
+from rotkehlchen.logging import RotkehlchenLogsAdapter
+from rotkehlchen.typing import Price, Timestamp
+from rotkehlchen.utils.serialization import rlk_jsonloads_dict
+
+logger = logging.getLogger(__name__)
+log = RotkehlchenLogsAdapter(logger)
+
+PRICE_HISTORY_PREFIX = 'price_history_'
+PRICE_HISTORY_SUFFIX = '.bin'
+# The inquirer keeps its own forex cache with the same prefix but a different format
+JSON_CACHES_TO_SKIP = ('price_history_forex.json',)
+
+_MAGIC = b'RPHS'
+_VERSION = 1
+# magic, version, reserved, start_time, end_time, number of entries
+_HEADER = struct.Struct('<4sHHqqQ')
+_ENTRY_SIZE = 8
+_NATIVE_LITTLE_ENDIAN = sys.byteorder == 'little'
+
+
+class PriceHistoryEntry(NamedTuple):
+    time: Timestamp
+    low: Price
+    high: Price
+
+
+def price_history_filepath(data_directory: Path, cache_key: str) -> Path:
+    return data_directory / f'{PRICE_HISTORY_PREFIX}{cache_key}{PRICE_HISTORY_SUFFIX}'
+
+
+def _to_float(value: Union[FVal, float, int, str, None]) -> float:
+    """Turns a price as given by cryptocompare or as read from the json cache into a double
+
+    A missing price is stored as zero which the price query logic handles in the same
+    way as a missing entry, by checking the alternatives.
+    """
+    if value is None:
+        return 0.0
+    return float(value)
+
+
+def _write_columns(
+        filepath: Path,
+        times: array,
+        highs: array,
+        lows: array,
+        start_time: Timestamp,
+        end_time: Timestamp,
+) -> None:
+    """Writes the given native order columns at filepath
+
+    The file is first written to a temporary path and then moved in place so that
+    a crash can never leave a half-written history behind.
+
+    May raise:
+    - OSError if the file can't be written
+    """
+    if not _NATIVE_LITTLE_ENDIAN:
+        times.byteswap()
+        highs.byteswap()
+        lows.byteswap()
+
+    tmp_filepath = filepath.with_suffix('.tmp')
+    with open(tmp_filepath, 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, 0, start_time, end_time, len(times)))
+        f.write(times.tobytes())
+        f.write(highs.tobytes())
+        f.write(lows.tobytes())
+    os.replace(tmp_filepath, filepath)
+
+
+def _entries_to_columns(data: List[Dict[str, Any]]) -> Tuple[array, array, array]:
+    """May raise KeyError/ValueError/TypeError if the entries are not in the expected format"""
+    times = array('q', (int(entry['time']) for entry in data))
+    highs = array('d', (_to_float(entry['high']) for entry in data))
+    lows = array('d', (_to_float(entry['low']) for entry in data))
+    return times, highs, lows
+
+
+def write_price_history(
+        filepath: Path,
+        data: List[Dict[str, Any]],
+        start_time: Timestamp,
+        end_time: Timestamp,
+) -> None:
+    """Writes the given hourly history entries in the binary format at filepath
+
+    May raise:
+    - OSError if the file can't be written
+    - KeyError/ValueError/TypeError if the given entries are not in the expected format
+    """
+    log.info(
+        'Writing price history file',
+        filepath=filepath,
+        start_time=start_time,
+        end_time=end_time,
+    )
+    times, highs, lows = _entries_to_columns(data)
+    _write_columns(
+        filepath=filepath,
+        times=times,
+        highs=highs,
+        lows=lows,
+        start_time=start_time,
+        end_time=end_time,
+    )
+
+
+def append_price_history(
+        history: 'PriceHistory',
+        data: List[Dict[str, Any]],
+        end_time: Timestamp,
+) -> 'PriceHistory':
+    """Appends the given entries, which should come after the history's last entry,
+    to the history's file and sets its end time.
+
+    The given history is closed and the newly mapped history is returned. The file
+    is replaced atomically so either the old or the new history is always on disk.
+
+    May raise:
+    - OSError if the file can't be written
+    - KeyError/ValueError/TypeError if the given entries are not in the expected format
+    """
+    log.info(
+        'Appending to price history file',
+        filepath=history.filepath,
+        new_entries=len(data),
+        end_time=end_time,
+    )
+    new_times, new_highs, new_lows = _entries_to_columns(data)
+    times, highs, lows = history.columns()
+    times.extend(new_times)
+    highs.extend(new_highs)
+    lows.extend(new_lows)
+    filepath = history.filepath
+    start_time = history.start_time
+    history.close()
+    _write_columns(
+        filepath=filepath,
+        times=times,
+        highs=highs,
+        lows=lows,
+        start_time=start_time,
+        end_time=end_time,
+    )
+    return PriceHistory(filepath)
+
+
+class PriceHistory():
+    """A read only, memory mapped view of a pair's hourly price history
+
+    Behaves as a sequence of PriceHistoryEntry sorted by time, so it can be used
+    wherever a list of entries was used before. Remember to close() it before
+    overwriting its file.
+    """
+
+    __slots__ = (
+        'filepath',
+        'start_time',
+        'end_time',
+        '_length',
+        '_mmap',
+        '_view',
+        '_times',
+        '_highs',
+        '_lows',
+    )
+
+    def __init__(self, filepath: Path) -> None:
+        """Opens and maps the price history at filepath
+
+        May raise:
+        - OSError if the file can't be read
+        - ValueError if the file is not a valid price history
+        """
+        self.filepath = filepath
+        self._mmap: Optional[mmap.mmap] = None
+        self._view: Optional[memoryview] = None
+        with open(filepath, 'rb') as f:
+            header = f.read(_HEADER.size)
+            if len(header) != _HEADER.size:
+                raise ValueError(f'Price history file {filepath} is too small')
+            magic, version, _, start_time, end_time, length = _HEADER.unpack(header)
+            if magic != _MAGIC or version != _VERSION:
+                raise ValueError(f'Price history file {filepath} has an unknown format')
+            expected_size = _HEADER.size + 3 * _ENTRY_SIZE * length
+            if os.fstat(f.fileno()).st_size != expected_size:
+                raise ValueError(f'Price history file {filepath} has an unexpected size')
+
+            self.start_time = Timestamp(start_time)
+            self.end_time = Timestamp(end_time)
+            self._length = length
+            if _NATIVE_LITTLE_ENDIAN:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self._view = memoryview(self._mmap)  # type: ignore
+                columns_start = _HEADER.size
+                column_size = _ENTRY_SIZE * length
+                self._times: Any = self._view[
+                    columns_start:columns_start + column_size
+                ].cast('q')
+                self._highs: Any = self._view[
+                    columns_start + column_size:columns_start + 2 * column_size
+                ].cast('d')
+                self._lows: Any = self._view[
+                    columns_start + 2 * column_size:columns_start + 3 * column_size
+                ].cast('d')
+            else:
+                # No zero-copy view possible for big-endian hosts. Read and swap.
+                self._times = array('q')
+                self._times.fromfile(f, length)
+                self._highs = array('d')
+                self._highs.fromfile(f, length)
+                self._lows = array('d')
+                self._lows.fromfile(f, length)
+                self._times.byteswap()
+                self._highs.byteswap()
+                self._lows.byteswap()
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index: int) -> PriceHistoryEntry:
+        if index < 0:
+            index += self._length
+        if index < 0 or index >= self._length:
+            raise IndexError(f'Price history index {index} out of range')
+        return PriceHistoryEntry(
+            time=Timestamp(self._times[index]),
+            low=Price(FVal(self._lows[index])),
+            high=Price(FVal(self._highs[index])),
+        )
+
+    def columns(self) -> Tuple[array, array, array]:
+        """Returns native order copies of the times, highs and lows columns"""
+        times, highs, lows = array('q'), array('d'), array('d')
+        times.frombytes(self._times.tobytes())
+        highs.frombytes(self._highs.tobytes())
+        lows.frombytes(self._lows.tobytes())
+        return times, highs, lows
+
+    def time_at(self, index: int) -> Timestamp:
+        """Returns the timestamp of the entry at index without creating any FVal"""
+        return Timestamp(self._times[index])
+
+    def has_price(self, index: int) -> bool:
+        """Returns whether the entry at index has a non zero price without creating any FVal"""
+        return self._highs[index] + self._lows[index] != 0
+
+    def mid_price(self, index: int) -> Price:
+        """Returns the average of the high and low price of the entry at index"""
+        entry = self[index]
+        return Price((entry.high + entry.low) / 2)
+
+    def closest_indices(self, timestamps: Sequence[Timestamp]) -> List[Optional[int]]:
+        """Returns for each of the given timestamps the index of the closest hourly entry
+
+        For timestamps before the first entry None is returned. Timestamps after
+        the last entry get the last entry. The entries are always one hour apart so
+        the indices are found by arithmetic.
+        """
+        if self._length == 0:
+            return [None] * len(timestamps)
+
+        first_ts = self._times[0]
+        last_index = self._length - 1
+        result: List[Optional[int]] = []
+        for timestamp in timestamps:
+            if timestamp < first_ts:
+                result.append(None)
+                continue
+
+            index = min((timestamp - first_ts) // 3600, last_index)
+            if index != last_index:
+                diff = abs(self._times[index] - timestamp)
+                if abs(self._times[index + 1] - timestamp) < diff:
+                    index += 1
+            result.append(index)
+
+        return result
+
+    def close(self) -> None:
+        """Releases the memory mapping. The object should not be used afterwards"""
+        if self._mmap is None:
+            return
+
+        for column in (self._times, self._highs, self._lows):
+            column.release()
+        assert self._view is not None, 'view should exist if mmap exists'
+        self._view.release()
+        self._mmap.close()
+        self._mmap = None
+        self._view = None
+
+
+def migrate_json_price_histories(data_directory: Path) -> int:
+    """Converts all the old price_history_<PAIR>.json caches in the directory to the
+    binary format and deletes them. Returns the number of migrated files.
+
+    Json caches that can't be read are deleted since they would be requeried anyway.
+    """
+    migrated = 0
+    for json_path in sorted(data_directory.glob(f'{PRICE_HISTORY_PREFIX}*.json')):
+        if json_path.name in JSON_CACHES_TO_SKIP:
+            continue
+
+        cache_key = json_path.name[len(PRICE_HISTORY_PREFIX):-len('.json')]
+        try:
+            with open(json_path, 'r') as f:
+                data = rlk_jsonloads_dict(f.read())
+            write_price_history(
+                filepath=price_history_filepath(data_directory, cache_key),
+                data=data['data'],
+                start_time=Timestamp(data['start_time']),
+                end_time=Timestamp(data['end_time']),
+            )
+        except (OSError, JSONDecodeError, AssertionError, KeyError, TypeError, ValueError) as e:
+            log.warning(
+                'Could not migrate json price history cache. Deleting it',
+                filepath=json_path,
+                error=str(e),
+            )
+        else:
+            migrated += 1
+
+        try:
+            json_path.unlink()
+        except OSError as e:
+            log.error(
+                'Could not delete json price history cache',
+                filepath=json_path,
+                error=str(e),
+            )
+
+    if migrated != 0:
+        log.info('Migrated json price history caches', count=migrated)
+    return migrated
@@ -1,4 +1,5 @@
 from decimal import Decimal, InvalidOperation
+from functools import lru_cache
 from typing import Any, Union
 
 from rotkehlchen.errors import ConversionError
@@ -23,7 +24,11 @@ class FVal():
     def __init__(self, data: AcceptableFValInitInput = 0):
 
         try:
-            if isinstance(data, float):
+            data_type = type(data)
+            # Fast path for the most common types. The generic checks follow
+            if data_type is str or data_type is int or data_type is Decimal:
+                self.num = Decimal(data)  # type: ignore
+            elif isinstance(data, float):
                 self.num = Decimal(str(data))
             elif isinstance(data, bytes):
                 # assume it's an ascii string and try to decode the bytes to one
@@ -52,76 +57,82 @@ class FVal():
         return 'FVal({})'.format(str(self.num))
 
     def __gt__(self, other: AcceptableFValOtherInput) -> bool:
-        evaluated_other = evaluate_input(other)
-        return self.num.compare_signal(evaluated_other) == Decimal('1')
+        if isinstance(other, FVal):
+            return self.num > other.num
+        return self.num > evaluate_input(other)
 
     def __lt__(self, other: AcceptableFValOtherInput) -> bool:
-        evaluated_other = evaluate_input(other)
-        return self.num.compare_signal(evaluated_other) == Decimal('-1')
+        if isinstance(other, FVal):
+            return self.num < other.num
+        return self.num < evaluate_input(other)
 
     def __le__(self, other: AcceptableFValOtherInput) -> bool:
-        evaluated_other = evaluate_input(other)
-        return self.num.compare_signal(evaluated_other) in (Decimal('-1'), Decimal('0'))
+        if isinstance(other, FVal):
+            return self.num <= other.num
+        return self.num <= evaluate_input(other)
 
     def __ge__(self, other: AcceptableFValOtherInput) -> bool:
-        evaluated_other = evaluate_input(other)
-        return self.num.compare_signal(evaluated_other) in (Decimal('1'), Decimal('0'))
+        if isinstance(other, FVal):
+            return self.num >= other.num
+        return self.num >= evaluate_input(other)
 
     def __eq__(self, other: object) -> bool:
-        evaluated_other = evaluate_input(other)
-        return self.num.compare_signal(evaluated_other) == Decimal('0')
+        if isinstance(other, FVal):
+            return self.num == other.num
+        return self.num == evaluate_input(other)
 
     def __add__(self, other: AcceptableFValOtherInput) -> 'FVal':
-        evaluated_other = evaluate_input(other)
-        return FVal(self.num.__add__(evaluated_other))
+        if isinstance(other, FVal):
+            return _fval_from_decimal(self.num + other.num)
+        return _fval_from_decimal(self.num + evaluate_input(other))
 
     def __sub__(self, other: AcceptableFValOtherInput) -> 'FVal':
-        evaluated_other = evaluate_input(other)
-        return FVal(self.num.__sub__(evaluated_other))
+        if isinstance(other, FVal):
+            return _fval_from_decimal(self.num - other.num)
+        return _fval_from_decimal(self.num - evaluate_input(other))
 
     def __mul__(self, other: AcceptableFValOtherInput) -> 'FVal':
-        evaluated_other = evaluate_input(other)
-        return FVal(self.num.__mul__(evaluated_other))
+        if isinstance(other, FVal):
+            return _fval_from_decimal(self.num * other.num)
+        return _fval_from_decimal(self.num * evaluate_input(other))
 
     def __truediv__(self, other: AcceptableFValOtherInput) -> 'FVal':
-        evaluated_other = evaluate_input(other)
-        return FVal(self.num.__truediv__(evaluated_other))
+        if isinstance(other, FVal):
+            return _fval_from_decimal(self.num / other.num)
+        return _fval_from_decimal(self.num / evaluate_input(other))
 
     def __floordiv__(self, other: AcceptableFValOtherInput) -> 'FVal':
-        evaluated_other = evaluate_input(other)
-        return FVal(self.num.__floordiv__(evaluated_other))
+        if isinstance(other, FVal):
+            return _fval_from_decimal(self.num // other.num)
+        return _fval_from_decimal(self.num // evaluate_input(other))
 
     def __pow__(self, other: AcceptableFValOtherInput) -> 'FVal':
-        evaluated_other = evaluate_input(other)
-        return FVal(self.num.__pow__(evaluated_other))
+        if isinstance(other, FVal):
+            return _fval_from_decimal(self.num ** other.num)
+        return _fval_from_decimal(self.num ** evaluate_input(other))
 
     def __radd__(self, other: AcceptableFValOtherInput) -> 'FVal':
-        evaluated_other = evaluate_input(other)
-        return FVal(self.num.__radd__(evaluated_other))
+        return _fval_from_decimal(evaluate_input(other) + self.num)
 
     def __rsub__(self, other: AcceptableFValOtherInput) -> 'FVal':
-        evaluated_other = evaluate_input(other)
-        return FVal(self.num.__rsub__(evaluated_other))
+        return _fval_from_decimal(evaluate_input(other) - self.num)
 
     def __rmul__(self, other: AcceptableFValOtherInput) -> 'FVal':
-        evaluated_other = evaluate_input(other)
-        return FVal(self.num.__rmul__(evaluated_other))
+        return _fval_from_decimal(evaluate_input(other) * self.num)
 
     def __rtruediv__(self, other: AcceptableFValOtherInput) -> 'FVal':
-        evaluated_other = evaluate_input(other)
-        return FVal(self.num.__rtruediv__(evaluated_other))
+        return _fval_from_decimal(evaluate_input(other) / self.num)
 
     def __rfloordiv__(self, other: AcceptableFValOtherInput) -> 'FVal':
-        evaluated_other = evaluate_input(other)
-        return FVal(self.num.__rfloordiv__(evaluated_other))
+        return _fval_from_decimal(evaluate_input(other) // self.num)
 
     def __mod__(self, other: AcceptableFValOtherInput) -> 'FVal':
-        evaluated_other = evaluate_input(other)
-        return FVal(self.num.__mod__(evaluated_other))
+        if isinstance(other, FVal):
+            return _fval_from_decimal(self.num % other.num)
+        return _fval_from_decimal(self.num % evaluate_input(other))
 
     def __rmod__(self, other: AcceptableFValOtherInput) -> 'FVal':
-        evaluated_other = evaluate_input(other)
-        return FVal(self.num.__rmod__(evaluated_other))
+        return _fval_from_decimal(evaluate_input(other) % self.num)
 
     def __float__(self) -> float:
         return float(self.num)
@@ -129,10 +140,10 @@ class FVal():
     # --- Unary operands
 
     def __neg__(self) -> 'FVal':
-        return FVal(self.num.__neg__())
+        return _fval_from_decimal(-self.num)
 
     def __abs__(self) -> 'FVal':
-        return FVal(self.num.copy_abs())
+        return _fval_from_decimal(self.num.copy_abs())
 
     # --- Other operations
 
@@ -143,7 +154,7 @@ class FVal():
         """
         evaluated_other = evaluate_input(other)
         evaluated_third = evaluate_input(third)
-        return FVal(self.num.fma(evaluated_other, evaluated_third))
+        return _fval_from_decimal(self.num.fma(evaluated_other, evaluated_third))
 
     def to_percentage(self, precision: int = 4) -> str:
         return '{:.{}%}'.format(self.num, precision)
@@ -160,6 +171,42 @@ class FVal():
             raise ConversionError(f'Tried to ask for exact int from {self.num}')
         return int(self.num)
 
+    @staticmethod
+    def from_scaled_int(value: int, decimals: int) -> 'FVal':
+        """
+        Creates an FVal out of an integer amount of the smallest unit of a fixed
+        precision amount. For example out of wei with 18 decimals or out of the
+        base units of a token with its decimals.
+        """
+        return _fval_from_decimal(value / _decimal_power_of_ten(decimals))
+
+    def to_scaled_int(self, decimals: int) -> int:
+        """
+        The inverse of from_scaled_int(). Returns the amount in the smallest unit
+        of a fixed precision amount with the given decimals.
+
+        Raises:
+            ConversionError: If the FVal has more decimal digits than `decimals`
+        """
+        sign, digits, exponent = self.num.as_tuple()
+        if not isinstance(exponent, int):
+            raise ConversionError(f'Tried to ask for scaled int from {self.num}')
+
+        value = 0
+        for digit in digits:
+            value = value * 10 + digit
+        exponent += decimals
+        if exponent >= 0:
+            value *= 10 ** exponent
+        else:
+            value, remainder = divmod(value, 10 ** -exponent)
+            if remainder != 0:
+                raise ConversionError(
+                    f'Tried to ask for scaled int with {decimals} decimals from {self.num}',
+                )
+
+        return -value if sign else value
+
     def is_close(self, other: AcceptableFValInitInput, max_diff: str = "1e-6") -> bool:
         evaluated_max_diff = FVal(max_diff)
 
@@ -170,6 +217,18 @@ class FVal():
         return diff_num <= evaluated_max_diff.num
 
 
+def _fval_from_decimal(num: Decimal) -> FVal:
+    """Creates an FVal out of the result of a Decimal operation skipping the constructor checks"""
+    result = object.__new__(FVal)
+    result.num = num
+    return result
+
+
+@lru_cache(maxsize=None)
+def _decimal_power_of_ten(exponent: int) -> Decimal:
+    return Decimal(10 ** exponent)
+
+
 def evaluate_input(other: Any) -> Union[Decimal, int]:
     """Evaluate 'other' and return its Decimal representation"""
     if isinstance(other, FVal):
@@ -1,13 +1,113 @@
 import logging
+import time
 import traceback
-from typing import Any, Callable, List
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
 
 import gevent
+from gevent.pool import Pool
 
 from rotkehlchen.user_messages import MessagesAggregator
 
 log = logging.getLogger(__name__)
 
+K = TypeVar('K')
+
+
+class TaskProgress():
+    """The progress of a long running task as reported by the code the task runs
+
+    A task goes through one or more stages. For each stage the number of processed
+    items and, if known, the total number of items is kept so that the percentage
+    done, the throughput and the remaining time can be estimated.
+    """
+
+    def __init__(self) -> None:
+        self.started_at = time.monotonic()
+        self.stage = ''
+        self.stage_started_at = self.started_at
+        self.processed = 0
+        self.total: Optional[int] = None
+
+    def set_stage(self, stage: str, total: Optional[int] = None) -> None:
+        self.stage = stage
+        self.stage_started_at = time.monotonic()
+        self.processed = 0
+        self.total = total
+
+    def advance(self, items: int = 1) -> None:
+        self.processed += items
+
+    def serialize(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        stage_elapsed = now - self.stage_started_at
+        items_per_second = self.processed / stage_elapsed if stage_elapsed > 0 else None
+        percent = None
+        eta_seconds = None
+        if self.total is not None and self.total > 0:
+            percent = min(100.0, 100.0 * self.processed / self.total)
+            if items_per_second:
+                eta_seconds = max(0, self.total - self.processed) / items_per_second
+
+        return {
+            'stage': self.stage,
+            'processed': self.processed,
+            'total': self.total,
+            'percent': percent,
+            'items_per_second': items_per_second,
+            'elapsed_seconds': now - self.started_at,
+            'eta_seconds': eta_seconds,
+        }
+
+
+def current_task_progress() -> TaskProgress:
+    """Returns the progress of the task that runs in the current greenlet
+
+    Long running code reports its progress here. If the current greenlet is not
+    a task whose progress is tracked the returned progress is simply discarded.
+    """
+    progress = getattr(gevent.getcurrent(), 'task_progress', None)
+    if progress is None:
+        return TaskProgress()
+
+    return progress
+
+
+def _call_and_capture(method: Callable[[], Any]) -> Tuple[Any, Optional[Exception]]:
+    try:
+        return method(), None
+    except Exception as e:  # pylint: disable=broad-except
+        return None, e
+
+
+def run_concurrently(
+        methods: Dict[K, Callable[[], Any]],
+        pool_size: Optional[int] = None,
+) -> Dict[K, Any]:
+    """Runs each of the given independent methods in its own greenlet and waits for all
+
+    If a pool size is given then at most that many of the methods run at the same time.
+
+    Returns the result of each method by key. If any of the methods raised, then
+    after all of them are done the exception of the first one that did, in the
+    order of the given mapping, is raised. If the calling greenlet is killed while
+    waiting the methods are killed too.
+    """
+    spawn = gevent.spawn if pool_size is None else Pool(pool_size).spawn
+    greenlets = {key: spawn(_call_and_capture, method) for key, method in methods.items()}
+    try:
+        gevent.joinall(list(greenlets.values()))
+    finally:
+        gevent.killall([x for x in greenlets.values() if not x.dead])
+
+    results = {}
+    for key, greenlet in greenlets.items():
+        result, exception = greenlet.value
+        if exception is not None:
+            raise exception
+        results[key] = result
+
+    return results
+
 
 class GreenletManager():
     """A class to collect and manage greenlets spawned by various sources"""
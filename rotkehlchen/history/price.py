@@ -1,10 +1,11 @@
 import logging
+from collections import defaultdict
 from pathlib import Path
-from typing import TYPE_CHECKING, Optional
+from typing import TYPE_CHECKING, DefaultDict, Dict, Iterable, List, Optional, Tuple
 
 from rotkehlchen.assets.asset import Asset
 from rotkehlchen.constants.assets import A_USD
-from rotkehlchen.constants.misc import ZERO
+from rotkehlchen.constants.misc import ONE, ZERO
 from rotkehlchen.errors import RemoteError
 from rotkehlchen.fval import FVal
 from rotkehlchen.inquirer import Inquirer
@@ -19,6 +20,8 @@ if TYPE_CHECKING:
 logger = logging.getLogger(__name__)
 log = RotkehlchenLogsAdapter(logger)
 
+PriceQuery = Tuple[Asset, Asset, Timestamp]
+
 
 def query_usd_price_or_use_default(
         asset: Asset,
@@ -120,7 +123,7 @@ class PriceHistorian():
         )
 
         if from_asset == to_asset:
-            return Price(FVal('1'))
+            return Price(ONE)
 
         if from_asset.is_fiat() and to_asset.is_fiat():
             # if we are querying historical forex data then try something other than cryptocompare
@@ -140,3 +143,85 @@ class PriceHistorian():
             timestamp=timestamp,
             historical_data_start=instance._historical_data_start,
         )
+
+    @staticmethod
+    def warm_price_histories(queries: Iterable[PriceQuery]) -> None:
+        """
+        Makes sure the price histories needed to answer the given queries are cached,
+        querying all the missing or outdated ones concurrently.
+
+        This never raises. Histories that fail to be queried here are queried again,
+        and any errors are reported, when the prices are actually needed.
+        """
+        timestamps_per_pair: DefaultDict[Tuple[Asset, Asset], List[Timestamp]] = (
+            defaultdict(list)
+        )
+        for from_asset, to_asset, timestamp in queries:
+            timestamps_per_pair[(from_asset, to_asset)].append(timestamp)
+
+        instance = PriceHistorian()
+        instance._cryptocompare.warm_price_histories(
+            timestamps_per_pair=timestamps_per_pair,
+            historical_data_start=instance._historical_data_start,
+        )
+
+    @staticmethod
+    def query_historical_prices(queries: Iterable[PriceQuery]) -> Dict[PriceQuery, Price]:
+        """
+        Query many historical prices at once. Each query is a tuple of
+        (from_asset, to_asset, timestamp) as in query_historical_price().
+
+        The queries are grouped by pair and each pair's history is looked up once
+        for all of its timestamps.
+
+        Returns a mapping of each query to its price for all the queries whose
+        price could be found. Queries that are missing from the result should be
+        repeated with query_historical_price() which will either find the price
+        through slower means or raise the appropriate error.
+        """
+        timestamps_per_pair: DefaultDict[Tuple[Asset, Asset], List[Timestamp]] = (
+            defaultdict(list)
+        )
+        for from_asset, to_asset, timestamp in queries:
+            timestamps_per_pair[(from_asset, to_asset)].append(timestamp)
+
+        instance = PriceHistorian()
+        result: Dict[PriceQuery, Price] = {}
+        for (from_asset, to_asset), pair_timestamps in timestamps_per_pair.items():
+            timestamps = sorted(set(pair_timestamps))
+            log.debug(
+                'Querying historical prices in batch',
+                from_asset=from_asset,
+                to_asset=to_asset,
+                number_of_timestamps=len(timestamps),
+            )
+            if from_asset == to_asset:
+                for timestamp in timestamps:
+                    result[(from_asset, to_asset, timestamp)] = Price(ONE)
+                continue
+
+            if from_asset.is_fiat() and to_asset.is_fiat():
+                # forex data are cached per day by the inquirer
+                for timestamp in timestamps:
+                    try:
+                        price = Inquirer().query_historical_fiat_exchange_rates(
+                            from_fiat_currency=from_asset,
+                            to_fiat_currency=to_asset,
+                            timestamp=timestamp,
+                        )
+                    except RemoteError:
+                        price = None
+                    if price is not None:
+                        result[(from_asset, to_asset, timestamp)] = price
+                continue
+
+            prices = instance._cryptocompare.query_historical_prices(
+                from_asset=from_asset,
+                to_asset=to_asset,
+                timestamps=timestamps,
+                historical_data_start=instance._historical_data_start,
+            )
+            for timestamp, price in prices.items():
+                result[(from_asset, to_asset, timestamp)] = price
+
+        return result
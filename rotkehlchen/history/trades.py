@@ -9,9 +9,10 @@ from rotkehlchen.constants.assets import A_DAI, A_USD
 from rotkehlchen.constants.misc import ZERO
 from rotkehlchen.errors import RemoteError
 from rotkehlchen.exchanges.data_structures import AssetMovement, Loan, MarginPosition, Trade
-from rotkehlchen.exchanges.manager import ExchangeManager
+from rotkehlchen.exchanges.manager import EXCHANGE_HISTORY_QUERY_TIMEOUT, ExchangeManager
 from rotkehlchen.exchanges.poloniex import process_polo_loans
 from rotkehlchen.fval import FVal
+from rotkehlchen.greenlets import current_task_progress
 from rotkehlchen.logging import RotkehlchenLogsAdapter
 from rotkehlchen.transactions import query_ethereum_transactions
 from rotkehlchen.typing import EthereumTransaction, Location, Timestamp
@@ -122,14 +123,19 @@ class TradesHistorian():
             nonlocal empty_or_error
             empty_or_error += '\n' + error_msg
 
-        for _, exchange in self.exchange_manager.connected_exchanges.items():
-            exchange.query_history_with_callbacks(
-                # We need to have full history of exchanges available
-                start_ts=Timestamp(0),
-                end_ts=now,
-                success_callback=populate_history_cb,
-                fail_callback=fail_history_cb,
-            )
+        current_task_progress().set_stage(
+            'Querying exchanges history',
+            total=len(self.exchange_manager.connected_exchanges),
+        )
+        exchange_histories, exchange_errors = self.exchange_manager.query_exchanges(
+            # We need to have full history of exchanges available
+            query=lambda exchange: exchange.query_history(start_ts=Timestamp(0), end_ts=now),
+            timeout=EXCHANGE_HISTORY_QUERY_TIMEOUT,
+        )
+        for exchange_history in exchange_histories.values():
+            populate_history_cb(*exchange_history)
+        for error_msg in exchange_errors.values():
+            fail_history_cb(error_msg)
 
         try:
             eth_transactions = query_ethereum_transactions(
@@ -149,13 +155,12 @@ class TradesHistorian():
             empty_or_error += '\n' + msg
 
         # Include the external trades in the history
-        external_trades = self.db.get_trades(
+        history.extend(self.db.iter_trades(
             # We need to have full history of trades available
             from_ts=Timestamp(0),
             to_ts=now,
             location=Location.EXTERNAL,
-        )
-        history.extend(external_trades)
+        ))
 
         # Include makerdao DSR gains
         defi_events = []
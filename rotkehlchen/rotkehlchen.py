@@ -30,11 +30,11 @@ from rotkehlchen.errors import (
     RemoteError,
     SystemPermissionError,
 )
-from rotkehlchen.exchanges.manager import ExchangeManager
+from rotkehlchen.exchanges.manager import EXCHANGE_BALANCES_QUERY_TIMEOUT, ExchangeManager
 from rotkehlchen.externalapis.cryptocompare import Cryptocompare
 from rotkehlchen.externalapis.etherscan import Etherscan
 from rotkehlchen.fval import FVal
-from rotkehlchen.greenlets import GreenletManager
+from rotkehlchen.greenlets import GreenletManager, current_task_progress
 from rotkehlchen.history import PriceHistorian, TradesHistorian
 from rotkehlchen.inquirer import Inquirer
 from rotkehlchen.logging import (
@@ -200,6 +200,7 @@ class Rotkehlchen():
             msg_aggregator=self.msg_aggregator,
             greenlet_manager=self.greenlet_manager,
             connect_at_start=ETHEREUM_NODES_TO_CONNECT_AT_START,
+            database=self.data.db,
         )
         self.chain_manager = ChainManager(
             blockchain_accounts=self.data.db.get_blockchain_accounts(),
@@ -405,6 +406,7 @@ class Rotkehlchen():
             start_ts: Timestamp,
             end_ts: Timestamp,
     ) -> Tuple[Dict[str, Any], str]:
+        current_task_progress().set_stage('Querying history')
         (
             error_or_empty,
             history,
@@ -450,14 +452,26 @@ class Rotkehlchen():
 
         balances = {}
         problem_free = True
-        for _, exchange in self.exchange_manager.connected_exchanges.items():
-            exchange_balances, _ = exchange.query_balances(ignore_cache=ignore_cache)
+        progress = current_task_progress()
+        progress.set_stage(
+            'Querying exchange balances',
+            total=len(self.exchange_manager.connected_exchanges),
+        )
+        exchange_results, exchange_errors = self.exchange_manager.query_exchanges(
+            query=lambda exchange: exchange.query_balances(ignore_cache=ignore_cache),
+            timeout=EXCHANGE_BALANCES_QUERY_TIMEOUT,
+        )
+        for name, (exchange_balances, _) in exchange_results.items():
             # If we got an error, disregard that exchange but make sure we don't save data
             if not isinstance(exchange_balances, dict):
                 problem_free = False
             else:
-                balances[exchange.name] = exchange_balances
+                balances[name] = exchange_balances
+        for name, error in exchange_errors.items():
+            problem_free = False
+            self.msg_aggregator.add_error(f'Querying {name} balances failed: {error}')
 
+        progress.set_stage('Querying blockchain balances')
         try:
             blockchain_result = self.chain_manager.query_balances(
                 blockchain=None,
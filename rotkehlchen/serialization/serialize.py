@@ -2,6 +2,7 @@ from typing import Any, Dict, List, Union
 
 from hexbytes import HexBytes
 
+from rotkehlchen.accounting.cost_basis import CostBasisMethod
 from rotkehlchen.accounting.structures import Balance
 from rotkehlchen.assets.asset import Asset
 from rotkehlchen.balances.manual import ManuallyTrackedBalanceWithValue
@@ -95,7 +96,14 @@ def _process_entry(entry: Any) -> Union[str, List[Any], Dict[str, Any], Any]:
         raise ValueError('Query results should not contain plain tuples')
     elif isinstance(entry, Asset):
         return entry.identifier
-    elif isinstance(entry, (TradeType, Location, KrakenAccountType, Location, VaultEventType)):
+    elif isinstance(entry, (
+            TradeType,
+            Location,
+            KrakenAccountType,
+            Location,
+            VaultEventType,
+            CostBasisMethod,
+    )):
         return str(entry)
     else:
         return entry
@@ -5,6 +5,7 @@ import gevent
 import pytest
 import requests
 
+from rotkehlchen.api.task_results import TaskResultStore
 from rotkehlchen.tests.utils.api import (
     api_url_for,
     assert_error_response,
@@ -65,7 +66,11 @@ def test_query_async_tasks(rotkehlchen_api_server_with_exchanges):
     assert_proper_response(response)
     json_data = response.json()
     assert json_data['message'] == 'The task with id 0 is still pending'
-    assert json_data['result'] == {'status': 'pending', 'outcome': None}
+    assert json_data['result']['status'] == 'pending'
+    assert json_data['result']['outcome'] is None
+    progress = json_data['result']['progress']
+    assert progress['processed'] >= 0
+    assert progress['elapsed_seconds'] >= 0
 
     while True:
         # and now query for the task result and assert on it
@@ -154,3 +159,111 @@ def test_query_async_task_that_died(rotkehlchen_api_server_with_exchanges):
     assert json_data['result']['outcome']['result'] is None
     msg = 'The backend query task died unexpectedly: BOOM!'
     assert json_data['result']['outcome']['message'] == msg
+
+
+@pytest.mark.parametrize('added_exchanges', [('binance',)])
+@pytest.mark.parametrize('should_mock_current_price_queries', [False])
+def test_cancel_async_task(rotkehlchen_api_server_with_exchanges):
+    """Test that a pending async task can be cancelled and its outcome is discarded"""
+    server = rotkehlchen_api_server_with_exchanges
+    binance = server.rest_api.rotkehlchen.exchange_manager.connected_exchanges['binance']
+
+    def mock_binance_asset_return(url):  # pylint: disable=unused-argument
+        gevent.sleep(10)
+        return MockResponse(200, BINANCE_BALANCES_RESPONSE)
+
+    binance_patch = patch.object(binance.session, 'get', side_effect=mock_binance_asset_return)
+    with binance_patch:
+        response = requests.get(api_url_for(
+            server,
+            "named_exchanges_balances_resource",
+            name='binance',
+        ), json={'async_query': True})
+        task_id = assert_ok_async_response(response)
+
+        response = requests.delete(
+            api_url_for(server, "specific_async_tasks_resource", task_id=task_id),
+        )
+        assert_proper_response(response)
+        assert response.json() == {'result': True, 'message': ''}
+
+    # the task should be gone
+    response = requests.get(api_url_for(server, "asynctasksresource"))
+    assert_proper_response(response)
+    assert response.json()['result'] == []
+    response = requests.get(
+        api_url_for(server, "specific_async_tasks_resource", task_id=task_id),
+    )
+    assert_error_response(
+        response=response,
+        contained_in_msg=f'No task with id {task_id} found',
+        status_code=HTTPStatus.NOT_FOUND,
+        result_exists=True,
+    )
+
+    # cancelling it again or cancelling an unknown task should fail
+    for unknown_id in (task_id, 568):
+        response = requests.delete(
+            api_url_for(server, "specific_async_tasks_resource", task_id=unknown_id),
+        )
+        assert_error_response(
+            response=response,
+            contained_in_msg=f'No task with id {unknown_id} found',
+            status_code=HTTPStatus.NOT_FOUND,
+        )
+
+
+@pytest.mark.parametrize('added_exchanges', [('binance',)])
+def test_query_async_task_spilled_outcome(rotkehlchen_api_server_with_exchanges, tmpdir):
+    """Test that a task outcome kept in a file is returned and the file deleted after it"""
+    server = rotkehlchen_api_server_with_exchanges
+    server.rest_api.task_results = TaskResultStore(spill_threshold=10, spill_directory=tmpdir)
+    binance = server.rest_api.rotkehlchen.exchange_manager.connected_exchanges['binance']
+
+    def mock_binance_asset_return(url):  # pylint: disable=unused-argument
+        return MockResponse(200, BINANCE_BALANCES_RESPONSE)
+
+    binance_patch = patch.object(binance.session, 'get', side_effect=mock_binance_asset_return)
+    with binance_patch:
+        response = requests.get(api_url_for(
+            server,
+            "named_exchanges_balances_resource",
+            name='binance',
+        ), json={'async_query': True})
+        task_id = assert_ok_async_response(response)
+
+        while True:
+            response = requests.get(api_url_for(server, "asynctasksmetricsresource"))
+            assert_proper_response(response)
+            metrics = response.json()['result']
+            if metrics['stored_results'] == 1:
+                break
+            gevent.sleep(0.1)
+
+    assert metrics['memory_bytes'] == 0
+    assert metrics['disk_bytes'] > 0
+    assert metrics['evicted_results'] == 0
+    assert len(tmpdir.listdir()) == 1
+
+    response = requests.get(
+        api_url_for(server, "specific_async_tasks_resource", task_id=task_id),
+    )
+    assert_proper_response(response)
+    json_data = response.json()
+    assert json_data['result']['status'] == 'completed'
+    assert json_data['result']['outcome']['result']['BTC']['amount'] == '4723846.89208129'
+
+    # the file is deleted once the response is closed
+    for _ in range(50):
+        if len(tmpdir.listdir()) == 0:
+            break
+        gevent.sleep(0.1)
+    assert len(tmpdir.listdir()) == 0
+    response = requests.get(api_url_for(server, "asynctasksmetricsresource"))
+    assert_proper_response(response)
+    assert response.json()['result'] == {
+        'stored_results': 0,
+        'memory_bytes': 0,
+        'disk_bytes': 0,
+        'evicted_results': 0,
+    }
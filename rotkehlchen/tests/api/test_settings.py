@@ -5,6 +5,7 @@ from unittest.mock import patch
 import pytest
 import requests
 
+from rotkehlchen.accounting.cost_basis import CostBasisMethod
 from rotkehlchen.constants.assets import A_JPY
 from rotkehlchen.db.settings import DEFAULT_KRAKEN_ACCOUNT_TYPE, ROTKEHLCHEN_DB_VERSION, DBSettings
 from rotkehlchen.exchanges.kraken import KrakenAccountType
@@ -93,6 +94,10 @@ def test_set_settings(rotkehlchen_api_server):
             value = str(KrakenAccountType.PRO)
         elif setting == 'active_modules':
             value = ['makerdao_vaults']
+        elif setting == 'cost_basis_method':
+            # Change the cost basis method to anything other than default
+            assert value != str(CostBasisMethod.HIFO)
+            value = str(CostBasisMethod.HIFO)
         elif setting == 'frontend_settings':
             value = ''
         else:
@@ -509,6 +514,17 @@ def test_set_settings_errors(rotkehlchen_api_server):
         status_code=HTTPStatus.BAD_REQUEST,
     )
 
+    # invalid value cost_basis_method
+    data = {
+        'settings': {'cost_basis_method': 'random'},
+    }
+    response = requests.put(api_url_for(rotkehlchen_api_server, "settingsresource"), json=data)
+    assert_error_response(
+        response=response,
+        contained_in_msg='is not a valid cost basis method',
+        status_code=HTTPStatus.BAD_REQUEST,
+    )
+
     # invalid type for active modules
     data = {
         'settings': {'active_modules': 55},
@@ -4,13 +4,16 @@ from typing import Any, Dict
 import pytest
 import requests
 
+from rotkehlchen.constants.assets import A_EUR
 from rotkehlchen.exchanges.data_structures import Trade
+from rotkehlchen.fval import FVal
 from rotkehlchen.tests.utils.api import api_url_for, assert_error_response, assert_proper_response
 from rotkehlchen.tests.utils.history import (
     assert_binance_trades_result,
     assert_poloniex_trades_result,
     mock_history_processing_and_exchanges,
 )
+from rotkehlchen.typing import Fee, Location, TradeType
 
 
 @pytest.mark.parametrize('added_exchanges', [('binance', 'poloniex')])
@@ -35,17 +38,21 @@ def test_query_trades(rotkehlchen_api_server_with_exchanges):
     assert_proper_response(response)
     data = response.json()
     assert data['message'] == ''
-    assert len(data['result']) == 5  # 3 polo and 2 binance trades
-    assert_binance_trades_result([t for t in data['result'] if t['location'] == 'binance'])
-    assert_poloniex_trades_result([t for t in data['result'] if t['location'] == 'poloniex'])
+    trades = data['result']['entries']
+    assert len(trades) == 5  # 3 polo and 2 binance trades
+    assert data['result']['entries_found'] == 5
+    assert_binance_trades_result([t for t in trades if t['location'] == 'binance'])
+    assert_poloniex_trades_result([t for t in trades if t['location'] == 'poloniex'])
 
     def assert_okay(response):
         """Helper function to run next query and its assertion twice"""
         assert_proper_response(response)
         data = response.json()
         assert data['message'] == ''
-        assert len(data['result']) == 2  # only 2 binance trades
-        assert_binance_trades_result([t for t in data['result'] if t['location'] == 'binance'])
+        trades = data['result']['entries']
+        assert len(trades) == 2  # only 2 binance trades
+        assert data['result']['entries_found'] == 2
+        assert_binance_trades_result([t for t in trades if t['location'] == 'binance'])
 
     # Now filter by location with json body
     response = requests.get(
@@ -74,13 +81,13 @@ def test_query_trades(rotkehlchen_api_server_with_exchanges):
     assert_proper_response(response)
     data = response.json()
     assert data['message'] == ''
-    assert len(data['result']) == 3  # 1 binance trade and 2 poloniex trades
+    assert len(data['result']['entries']) == 3  # 1 binance trade and 2 poloniex trades
     assert_binance_trades_result(
-        trades=[t for t in data['result'] if t['location'] == 'binance'],
+        trades=[t for t in data['result']['entries'] if t['location'] == 'binance'],
         trades_to_check=(1,),
     )
     assert_poloniex_trades_result(
-        trades=[t for t in data['result'] if t['location'] == 'poloniex'],
+        trades=[t for t in data['result']['entries'] if t['location'] == 'poloniex'],
         trades_to_check=(0, 1),
     )
 
@@ -94,9 +101,9 @@ def test_query_trades(rotkehlchen_api_server_with_exchanges):
     assert_proper_response(response)
     data = response.json()
     assert data['message'] == ''
-    assert len(data['result']) == 2  # only 2/3 poloniex trades
+    assert len(data['result']['entries']) == 2  # only 2/3 poloniex trades
     assert_poloniex_trades_result(
-        trades=[t for t in data['result'] if t['location'] == 'poloniex'],
+        trades=[t for t in data['result']['entries'] if t['location'] == 'poloniex'],
         trades_to_check=(0, 1),
     )
 
@@ -151,6 +158,105 @@ def test_query_trades_errors(rotkehlchen_api_server_with_exchanges):
         contained_in_msg='Failed to deserialize location symbol. Unknown symbol foo for location',
         status_code=HTTPStatus.BAD_REQUEST,
     )
+    # Test that an invalid trade type is handled
+    response = requests.get(
+        api_url_for(
+            rotkehlchen_api_server_with_exchanges,
+            "tradesresource",
+        ), json={'trade_type': 'foo'},
+    )
+    assert_error_response(
+        response=response,
+        contained_in_msg='Failed to deserialize trade type symbol',
+        status_code=HTTPStatus.BAD_REQUEST,
+    )
+    # Test that ordering by an unknown attribute is handled
+    response = requests.get(
+        api_url_for(
+            rotkehlchen_api_server_with_exchanges,
+            "tradesresource",
+        ), json={'order_by': 'amount'},
+    )
+    assert_error_response(
+        response=response,
+        contained_in_msg='Must be one of: timestamp, location, pair, trade_type',
+        status_code=HTTPStatus.BAD_REQUEST,
+    )
+    # Test that an invalid limit and offset are handled
+    response = requests.get(
+        api_url_for(
+            rotkehlchen_api_server_with_exchanges,
+            "tradesresource",
+        ), json={'limit': 0},
+    )
+    assert_error_response(
+        response=response,
+        contained_in_msg='The limit of trades should be >= 1',
+        status_code=HTTPStatus.BAD_REQUEST,
+    )
+    response = requests.get(
+        api_url_for(
+            rotkehlchen_api_server_with_exchanges,
+            "tradesresource",
+        ), json={'offset': -1},
+    )
+    assert_error_response(
+        response=response,
+        contained_in_msg='The offset of trades should be >= 0',
+        status_code=HTTPStatus.BAD_REQUEST,
+    )
+
+
+def test_query_trades_pagination(rotkehlchen_api_server):
+    """Test that trades can be filtered, ordered and paginated by the trades endpoint"""
+    rotki = rotkehlchen_api_server.rest_api.rotkehlchen
+    trades = [Trade(
+        timestamp=1575640208 + idx,
+        location=Location.EXTERNAL,
+        pair='BTC_EUR' if idx % 2 == 0 else 'ETH_EUR',
+        trade_type=TradeType.BUY,
+        amount=FVal('0.5'),
+        rate=FVal('8422.1'),
+        fee=Fee(FVal('0.55')),
+        fee_currency=A_EUR,
+        link=str(idx),
+        notes='',
+    ) for idx in range(5)]
+    rotki.data.db.add_trades(trades)
+
+    response = requests.get(
+        api_url_for(
+            rotkehlchen_api_server,
+            "tradesresource",
+        ), json={'limit': 2, 'offset': 1},
+    )
+    assert_proper_response(response)
+    result = response.json()['result']
+    assert [t['trade_id'] for t in result['entries']] == [t.identifier for t in trades[1:3]]
+    assert result['entries_found'] == 5
+
+    # Now filter by pair and order from newest to oldest with query params
+    response = requests.get(
+        api_url_for(
+            rotkehlchen_api_server,
+            "tradesresource",
+        ) + '?pair=BTC_EUR&ascending=false&limit=2',
+    )
+    assert_proper_response(response)
+    result = response.json()['result']
+    expected_trades = [trades[4], trades[2]]
+    assert [t['trade_id'] for t in result['entries']] == [t.identifier for t in expected_trades]
+    assert result['entries_found'] == 3
+
+    # A page past the end of the trades has no entries but still the total
+    response = requests.get(
+        api_url_for(
+            rotkehlchen_api_server,
+            "tradesresource",
+        ), json={'trade_type': 'buy', 'offset': 10},
+    )
+    assert_proper_response(response)
+    assert response.json()['result'] == {'entries': [], 'entries_found': 5}
 
 
 def test_add_trades(rotkehlchen_api_server):
@@ -191,7 +297,7 @@ def test_add_trades(rotkehlchen_api_server):
     assert_proper_response(response)
     data = response.json()
     assert data['message'] == ''
-    assert data['result'] == [new_trade]
+    assert data['result'] == {'entries': [new_trade], 'entries_found': 1}
 
 
 def assert_all_missing_fields_are_handled(correct_trade, server):
@@ -515,7 +621,8 @@ def test_edit_trades(rotkehlchen_api_server_with_exchanges):
     data = response.json()
 
     # get the binance trades
-    original_binance_trades = [t for t in data['result'] if t['location'] == 'binance']
+    trades = data['result']['entries']
+    original_binance_trades = [t for t in trades if t['location'] == 'binance']
 
     for trade in original_binance_trades:
         # edit two fields of each binance trade
@@ -543,8 +650,8 @@ def test_edit_trades(rotkehlchen_api_server_with_exchanges):
     assert_proper_response(response)
     data = response.json()
     assert data['message'] == ''
-    assert len(data['result']) == 2  # only 2 binance trades
-    for idx, trade in enumerate(data['result']):
+    assert len(data['result']['entries']) == 2  # only 2 binance trades
+    for idx, trade in enumerate(data['result']['entries']):
         _check_trade_is_edited(original_trade=original_binance_trades[idx], result_trade=trade)
 
 
@@ -625,7 +732,8 @@ def test_delete_trades(rotkehlchen_api_server_with_exchanges):
     data = response.json()
 
     # get the poloniex trade ids
-    poloniex_trade_ids = [t['trade_id'] for t in data['result'] if t['location'] == 'poloniex']
+    trades = data['result']['entries']
+    poloniex_trade_ids = [t['trade_id'] for t in trades if t['location'] == 'poloniex']
 
     for trade_id in poloniex_trade_ids:
         # delete all poloniex trades
@@ -650,7 +758,7 @@ def test_delete_trades(rotkehlchen_api_server_with_exchanges):
     assert_proper_response(response)
     data = response.json()
     assert data['message'] == ''
-    assert len(data['result']) == 0
+    assert len(data['result']['entries']) == 0
 
 
 def test_delete_trades_trades_errors(rotkehlchen_api_server):
@@ -17,6 +17,7 @@ from rotkehlchen.db.settings import (
     DEFAULT_ACTIVE_MODULES,
     DEFAULT_ANONYMIZED_LOGS,
     DEFAULT_BALANCE_SAVE_FREQUENCY,
+    DEFAULT_COST_BASIS_METHOD,
     DEFAULT_DATE_DISPLAY_FORMAT,
     DEFAULT_THOUSAND_SEPARATOR,
     DEFAULT_DECIMAL_SEPARATOR,
@@ -68,6 +69,7 @@ from rotkehlchen.utils.serialization import rlk_jsondumps
 
 TABLES_AT_INIT = [
     'aave_events',
+    'accounting_checkpoints',
     'timed_balances',
     'timed_location_data',
     'asset_movement_category',
@@ -78,6 +80,8 @@ TABLES_AT_INIT = [
     'multisettings',
     'trades',
     'ethereum_transactions',
+    'ethereum_logs',
+    'ethereum_block_timestamps',
     'manually_tracked_balances',
     'trade_type',
     'location',
@@ -272,6 +276,7 @@ def test_writing_fetching_data(data_dir, username):
         'kraken_account_type': DEFAULT_KRAKEN_ACCOUNT_TYPE,
         'active_modules': DEFAULT_ACTIVE_MODULES,
         'frontend_settings': '',
+        'cost_basis_method': DEFAULT_COST_BASIS_METHOD,
     }
     assert len(expected_dict) == len(DBSettings()), 'One or more settings are missing'
 
@@ -665,10 +670,125 @@ def test_add_trades(data_dir, username):
     errors = msg_aggregator.consume_errors()
     warnings = msg_aggregator.consume_warnings()
     assert len(errors) == 0
-    assert len(warnings) == 1
+    assert warnings == ['1 out of 2 trades were not added to the DB since they already exist.']
     returned_trades = data.db.get_trades()
     assert returned_trades == [trade1, trade2, trade3]
 
+    # Adding them all again should only show a single warning for all of them
+    data.db.add_trades([trade1, trade2, trade3])
+    errors = msg_aggregator.consume_errors()
+    warnings = msg_aggregator.consume_warnings()
+    assert len(errors) == 0
+    assert warnings == ['3 out of 3 trades were not added to the DB since they already exist.']
+    assert data.db.get_trades() == [trade1, trade2, trade3]
+
+
+def test_read_queries_bind_their_values(database):
+    """Test that the readers never format values into the SQL so that statements are reused"""
+    trade = Trade(
+        timestamp=1451606400,
+        location=Location.KRAKEN,
+        pair='ETH_EUR',
+        trade_type=TradeType.BUY,
+        amount=FVal('1.1'),
+        rate=FVal('10'),
+        fee=Fee(FVal('0.01')),
+        fee_currency=A_EUR,
+        link='',
+        notes='',
+    )
+    database.add_trades([trade])
+    database.query_timings.clear()
+    assert database.get_trades(location=Location.KRAKEN) == [trade]
+    assert database.get_trades(location=Location.BINANCE) == []
+    assert database.get_trades(from_ts=1451606401, location=Location.KRAKEN) == []
+    # Same filters with different values are the same statement
+    assert len(database.query_timings) == 2
+    timings = [x for x in database.query_timings.items() if 'time >= ?' not in x[0]]
+    assert len(timings) == 1
+    sql, timing = timings[0]
+    assert 'location=?' in sql
+    assert timing.calls == 2
+    assert timing.max_seconds <= timing.total_seconds
+
+    # Values that would have broken out of a formatted query are just values
+    database.update_used_query_range('kraken_trades', Timestamp(0), Timestamp(10))
+    assert database.get_used_query_range('kraken_trades') == (0, 10)
+    assert database.get_used_query_range('foo" OR name="kraken_trades') is None
+
+
+def test_iter_trades(database):
+    """Test that trades are read from the DB lazily and in batches"""
+    trades = [Trade(
+        timestamp=1451606400 + idx,
+        location=Location.KRAKEN,
+        pair='ETH_EUR',
+        trade_type=TradeType.BUY,
+        amount=FVal('1.1'),
+        rate=FVal('10'),
+        fee=Fee(FVal('0.01')),
+        fee_currency=A_EUR,
+        link=str(idx),
+        notes='',
+    ) for idx in range(5)]
+    database.add_trades(trades)
+    database.query_timings.clear()
+
+    with patch('rotkehlchen.db.dbhandler.DB_FETCH_BATCH_SIZE', new=2):
+        iterator = database.iter_trades(from_ts=1451606401)
+        # Nothing is queried before the iterator is consumed
+        assert database.query_timings == {}
+        assert next(iterator) == trades[1]
+        assert list(iterator) == trades[2:]
+
+    timings = list(database.query_timings.values())
+    assert len(timings) == 1
+    assert timings[0].calls == 1
+    assert database.get_trades(from_ts=1451606401) == trades[1:]
+
+
+def test_get_trades_filtering_and_pagination(database):
+    """Test that trades are filtered, ordered and paginated in the DB query"""
+    trades = [Trade(
+        timestamp=1451606400 + idx,
+        location=Location.KRAKEN if idx % 2 == 0 else Location.EXTERNAL,
+        pair='ETH_EUR' if idx < 3 else 'BTC_EUR',
+        trade_type=TradeType.BUY if idx != 2 else TradeType.SELL,
+        amount=FVal('1.1'),
+        rate=FVal('10'),
+        fee=Fee(FVal('0.01')),
+        fee_currency=A_EUR,
+        link=str(idx),
+        notes='',
+    ) for idx in range(5)]
+    database.add_trades(trades)
+
+    assert database.get_trades(limit=2, offset=1) == trades[1:3]
+    assert database.get_trades(offset=3) == trades[3:]
+    assert database.get_trades(ascending=False, limit=2) == [trades[4], trades[3]]
+    assert database.get_trades(pair='BTC_EUR') == trades[3:]
+    assert database.get_trades(trade_type=TradeType.SELL) == [trades[2]]
+    assert database.get_trades(
+        location=Location.KRAKEN,
+        pair='ETH_EUR',
+        order_by='timestamp',
+        ascending=False,
+    ) == [trades[2], trades[0]]
+    # Trades with the same pair keep the order in which they were added
+    assert database.get_trades(order_by='pair') == trades[3:] + trades[:3]
+
+    assert database.count_trades() == 5
+    assert database.count_trades(location=Location.EXTERNAL) == 2
+    assert database.count_trades(from_ts=1451606402, pair='ETH_EUR') == 1
+
+    # A page and the count of all matching trades come from a single query
+    database.query_timings.clear()
+    assert database.get_trades_page(pair='ETH_EUR', limit=2, offset=1) == (trades[1:3], 3)
+    assert len(database.query_timings) == 1
+    assert database.get_trades_page(location=Location.EXTERNAL) == ([trades[1], trades[3]], 2)
+    assert database.get_trades_page(pair='BTC_EUR', offset=5) == ([], 2)
+    assert database.get_trades_page(pair='LTC_EUR') == ([], 0)
+
 
 def test_add_margin_positions(data_dir, username):
     """Test that adding and retrieving margin positions from the DB works fine.
@@ -731,6 +851,16 @@ def test_add_margin_positions(data_dir, username):
     assert len(warnings) == 1
     returned_margins = data.db.get_margin_positions()
     assert returned_margins == [margin1, margin2, margin3]
+    returned_margins = data.db.get_margin_positions(location=Location.BITMEX)
+    assert returned_margins == [margin1, margin2]
+    returned_margins = data.db.get_margin_positions(
+        from_ts=1451616500,
+        to_ts=1451636500,
+        location=Location.BITMEX,
+    )
+    assert returned_margins == [margin1, margin2]
+    returned_margins = data.db.get_margin_positions(to_ts=1451616500)
+    assert returned_margins == [margin1]
 
 
 def test_add_asset_movements(data_dir, username):
@@ -791,6 +921,23 @@ def test_add_asset_movements(data_dir, username):
     assert len(warnings) == 1
     returned_movements = data.db.get_asset_movements()
     assert returned_movements == [movement1, movement2, movement3]
+    returned_movements = data.db.get_asset_movements(location=Location.POLONIEX)
+    assert returned_movements == [movement2]
+    returned_movements = data.db.get_asset_movements(from_ts=1451608501)
+    assert returned_movements == [movement2, movement3]
+    returned_movements = data.db.get_asset_movements(to_ts=1451608501)
+    assert returned_movements == [movement1, movement2]
+    returned_movements = data.db.get_asset_movements(
+        category=AssetMovementCategory.WITHDRAWAL,
+        asset=A_ETH,
+        order_by='timestamp',
+        ascending=False,
+    )
+    assert returned_movements == [movement3, movement2]
+    returned_movements = data.db.get_asset_movements(limit=1, offset=1)
+    assert returned_movements == [movement2]
+    assert data.db.count_asset_movements() == 3
+    assert data.db.count_asset_movements(category=AssetMovementCategory.DEPOSIT) == 1
 
 
 def test_add_ethereum_transactions(data_dir, username):
@@ -860,6 +1007,49 @@ def test_add_ethereum_transactions(data_dir, username):
     assert len(warnings) == 0
     returned_transactions = data.db.get_ethereum_transactions()
     assert returned_transactions == [tx1, tx2, tx3]
+    returned_transactions = data.db.get_ethereum_transactions(
+        order_by='block_number',
+        ascending=False,
+        limit=2,
+    )
+    assert returned_transactions == [tx3, tx2]
+    returned_transactions = data.db.get_ethereum_transactions(offset=2)
+    assert returned_transactions == [tx3]
+    assert data.db.count_ethereum_transactions() == 3
+    assert data.db.count_ethereum_transactions(address=ETH_ADDRESS2) == 1
+    assert data.db.has_ethereum_transactions(address=ETH_ADDRESS2)
+    assert not data.db.has_ethereum_transactions(from_ts=1452806401)
+
+
+def test_add_internal_ethereum_transactions(database):
+    """Test that internal etherscan transactions with the same hash are all kept
+
+    Etherscan gives them all the nonce -1 so those with the same hash as an existing
+    one are stored with an increasingly negative nonce instead of being skipped
+    """
+    internal_tx = EthereumTransaction(
+        tx_hash=b'1',
+        timestamp=Timestamp(1451606400),
+        block_number=1,
+        from_address=ETH_ADDRESS1,
+        to_address=ETH_ADDRESS2,
+        value=FVal('2000000'),
+        gas=FVal('0'),
+        gas_price=FVal('0'),
+        gas_used=FVal('0'),
+        input_data=b'',
+        nonce=-1,
+    )
+    database.add_ethereum_transactions([internal_tx, internal_tx], from_etherscan=True)
+    assert [tx.nonce for tx in database.get_ethereum_transactions()] == [-1, -2]
+
+    # Adding one again gets the next nonce of its batch which already exists
+    database.add_ethereum_transactions([internal_tx], from_etherscan=True)
+    assert [tx.nonce for tx in database.get_ethereum_transactions()] == [-1, -2]
+    # And if the transactions do not come from etherscan they are simply skipped
+    database.add_ethereum_transactions([internal_tx], from_etherscan=False)
+    assert database.count_ethereum_transactions() == 2
+    assert len(database.msg_aggregator.consume_warnings()) == 0
 
 
 @pytest.mark.parametrize('ethereum_accounts', [[]])
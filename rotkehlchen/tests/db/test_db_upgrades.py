@@ -12,6 +12,7 @@ from rotkehlchen.constants.assets import A_ETH
 from rotkehlchen.data_handler import DataHandler
 from rotkehlchen.db.dbhandler import DBHandler
 from rotkehlchen.db.old_create import OLD_DB_SCRIPT_CREATE_TABLES
+from rotkehlchen.db.schema import DB_SCRIPT_CREATE_INDEXES
 from rotkehlchen.db.settings import ROTKEHLCHEN_DB_VERSION
 from rotkehlchen.db.upgrade_manager import UPGRADES_LIST
 from rotkehlchen.db.upgrades.v6_v7 import (
@@ -29,16 +30,18 @@ from rotkehlchen.tests.utils.constants import A_BCH, A_BSV, A_RDN
 from rotkehlchen.typing import Timestamp
 from rotkehlchen.user_messages import MessagesAggregator
 
-creation_patch = patch(
-    'rotkehlchen.db.dbhandler.DB_SCRIPT_CREATE_TABLES',
-    new=OLD_DB_SCRIPT_CREATE_TABLES,
+creation_patch = patch.multiple(
+    'rotkehlchen.db.dbhandler',
+    DB_SCRIPT_CREATE_TABLES=OLD_DB_SCRIPT_CREATE_TABLES,
+    DB_SCRIPT_CREATE_INDEXES='',
 )
 
 
 @contextmanager
 def target_patch(target_version: int):
     """Patches the upgrades to stop at target_version and also sets
-    ROTKEHLCHEN_DB_VERSION to the target_version"""
+    ROTKEHLCHEN_DB_VERSION to the target_version. Indexes that got introduced
+    after the target_version are not created."""
     a = patch(
         'rotkehlchen.db.upgrade_manager.ROTKEHLCHEN_DB_VERSION',
         new=target_version,
@@ -56,8 +59,13 @@ def target_patch(target_version: int):
         new=new_upgrades_list,
     )
 
-    with a, b, c:
-        yield (a, b, c)
+    d = patch(
+        'rotkehlchen.db.dbhandler.DB_SCRIPT_CREATE_INDEXES',
+        new=DB_SCRIPT_CREATE_INDEXES if target_version >= 14 else '',
+    )
+
+    with a, b, c, d:
+        yield (a, b, c, d)
 
 
 def _init_db_with_target_version(
@@ -884,6 +892,59 @@ def test_upgrade_db_12_to_13(user_data_dir):
     assert db.get_version() == 13
 
 
+def test_upgrade_db_13_to_14(user_data_dir):
+    """Test upgrading the DB from version 13 to version 14. Adding the history indexes"""
+    msg_aggregator = MessagesAggregator()
+    _use_prepared_db(user_data_dir, 'v12_rotkehlchen.db')
+    db = _init_db_with_target_version(
+        target_version=13,
+        user_data_dir=user_data_dir,
+        msg_aggregator=msg_aggregator,
+    )
+    cursor = db.conn.cursor()
+    query = cursor.execute(
+        'SELECT COUNT(*) FROM sqlite_master WHERE type="index" AND name="idx_trades_time";',
+    )
+    assert query.fetchone()[0] == 0
+    del db
+
+    db = _init_db_with_target_version(
+        target_version=14,
+        user_data_dir=user_data_dir,
+        msg_aggregator=msg_aggregator,
+    )
+    cursor = db.conn.cursor()
+    query = cursor.execute(
+        'SELECT name, tbl_name FROM sqlite_master WHERE type="index" AND name LIKE "idx_%";',
+    )
+    assert set(query.fetchall()) == {
+        ('idx_trades_time', 'trades'),
+        ('idx_trades_location_time', 'trades'),
+        ('idx_asset_movements_time', 'asset_movements'),
+        ('idx_asset_movements_location_time', 'asset_movements'),
+        ('idx_margin_positions_close_time', 'margin_positions'),
+        ('idx_margin_positions_location_close_time', 'margin_positions'),
+        ('idx_ethereum_transactions_timestamp', 'ethereum_transactions'),
+        ('idx_ethereum_transactions_from_address_timestamp', 'ethereum_transactions'),
+        ('idx_timed_balances_currency_time', 'timed_balances'),
+        ('idx_ethereum_logs_query_key_block_number', 'ethereum_logs'),
+    }
+    # The queries of the history getters should now use the indexes
+    query = cursor.execute(
+        'EXPLAIN QUERY PLAN SELECT time, amount, usd_value FROM timed_balances '
+        'WHERE time BETWEEN 0 AND 10 AND currency="ETH" ORDER BY time ASC;',
+    )
+    assert 'COVERING INDEX idx_timed_balances_currency_time' in query.fetchall()[0][-1]
+    query = cursor.execute(
+        'EXPLAIN QUERY PLAN SELECT id FROM trades WHERE location="B" '
+        'AND time >= 0 AND time <= 10 ORDER BY time ASC;',
+    )
+    assert 'INDEX idx_trades_location_time' in query.fetchall()[0][-1]
+
+    # Finally also make sure that we have updated to the target version
+    assert db.get_version() == 14
+
+
 def test_db_newer_than_software_raises_error(data_dir, username):
     """
     If the DB version is greater than the current known version in the
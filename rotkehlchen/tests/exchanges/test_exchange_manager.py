@@ -0,0 +1,113 @@
+import time
+from unittest.mock import MagicMock
+
+import gevent
+import pytest
+
+from rotkehlchen.errors import RemoteError
+from rotkehlchen.exchanges.manager import EXCHANGE_MAX_CONCURRENT_QUERIES, ExchangeManager
+from rotkehlchen.greenlets import TaskProgress, current_task_progress
+from rotkehlchen.user_messages import MessagesAggregator
+
+
+def _make_manager(names):
+    manager = ExchangeManager(msg_aggregator=MessagesAggregator())
+    for name in names:
+        exchange = MagicMock()
+        exchange.name = name
+        manager.connected_exchanges[name] = exchange
+    return manager
+
+
+def test_query_exchanges_concurrently():
+    manager = _make_manager(['kraken', 'binance', 'gemini'])
+
+    def query(exchange):
+        gevent.sleep(0.2)
+        return exchange.name.upper()
+
+    start = time.monotonic()
+    results, errors = manager.query_exchanges(query=query, timeout=5)
+    assert time.monotonic() - start < 0.5
+    assert errors == {}
+    # results are ordered like the connected exchanges, not by completion
+    assert list(results.items()) == [
+        ('kraken', 'KRAKEN'),
+        ('binance', 'BINANCE'),
+        ('gemini', 'GEMINI'),
+    ]
+
+
+def test_query_exchanges_partial_results():
+    manager = _make_manager(['kraken', 'binance', 'gemini'])
+
+    def query(exchange):
+        if exchange.name == 'kraken':
+            raise RemoteError('kraken is down')
+        if exchange.name == 'binance':
+            gevent.sleep(5)
+        return exchange.name
+
+    start = time.monotonic()
+    results, errors = manager.query_exchanges(query=query, timeout=0.2)
+    assert time.monotonic() - start < 1
+    assert results == {'gemini': 'gemini'}
+    assert errors == {
+        'kraken': 'kraken is down',
+        'binance': 'binance query timed out after 0.2 seconds',
+    }
+
+    def bad_query(exchange):
+        raise ValueError('BOOM')
+
+    with pytest.raises(ValueError):
+        manager.query_exchanges(query=bad_query, timeout=1)
+
+
+def test_query_exchanges_limits_queries_per_exchange():
+    manager = _make_manager(['kraken'])
+    running = 0
+    max_running = 0
+
+    def query(exchange):  # pylint: disable=unused-argument
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        gevent.sleep(0.05)
+        running -= 1
+
+    greenlets = [
+        gevent.spawn(manager.query_exchanges, query=query, timeout=5) for _ in range(5)
+    ]
+    gevent.joinall(greenlets, raise_error=True)
+    assert max_running == EXCHANGE_MAX_CONCURRENT_QUERIES
+
+
+def test_query_exchanges_reports_progress_and_stops_with_task():
+    manager = _make_manager(['kraken', 'binance'])
+    finished = []
+
+    def query(exchange):
+        # an exchange setting its own stage should not affect the task's stage
+        current_task_progress().set_stage(f'Querying {exchange.name} trades', total=100)
+        current_task_progress().advance(10)
+        gevent.sleep(0.1 if exchange.name == 'kraken' else 1)
+        finished.append(exchange.name)
+
+    def run_task():
+        current_task_progress().set_stage('Querying exchanges', total=2)
+        return manager.query_exchanges(query=query, timeout=10)
+
+    task = gevent.spawn(run_task)
+    task.task_progress = TaskProgress()
+    gevent.sleep(0.3)
+    # only the exchanges that finished advance the task's stage
+    assert finished == ['kraken']
+    assert task.task_progress.stage == 'Querying exchanges'
+    assert task.task_progress.total == 2
+    assert task.task_progress.processed == 1
+
+    task.kill()
+    # killing the task stops the exchange query that is still running
+    gevent.sleep(1)
+    assert finished == ['kraken']
@@ -1,14 +1,21 @@
 import os
+from pathlib import Path
 from unittest.mock import patch
 
+import gevent
 import pytest
 
 from rotkehlchen.assets.asset import Asset
-from rotkehlchen.constants.assets import A_BTC, A_USD
+from rotkehlchen.constants.assets import A_BTC, A_ETH, A_USD
 from rotkehlchen.errors import NoPriceForGivenTimestamp
-from rotkehlchen.externalapis.cryptocompare import Cryptocompare
+from rotkehlchen.externalapis.cryptocompare import Cryptocompare, PairCacheKey
+from rotkehlchen.externalapis.price_history_store import (
+    PriceHistory,
+    migrate_json_price_histories,
+    write_price_history,
+)
 from rotkehlchen.fval import FVal
-from rotkehlchen.tests.utils.constants import A_SNGLS
+from rotkehlchen.tests.utils.constants import A_SNGLS, A_XMR
 
 
 def test_cryptocompare_query_pricehistorical(cryptocompare):
@@ -53,6 +60,277 @@ def test_cryptocompare_historical_data_use_cached_price(data_dir, database):
     assert result[1].low == FVal(20)
     assert isinstance(result[1].high, FVal)
     assert result[1].high == FVal(20)
+    # and that the json cache got migrated to the binary format
+    assert not os.path.exists(os.path.join(data_dir, 'price_history_SNGLS_BTC.json'))
+    assert os.path.exists(os.path.join(data_dir, 'price_history_SNGLS_BTC.bin'))
+
+
+def test_price_history_store(tmpdir_factory):
+    """Test that the binary price history store roundtrips and the migration skips forex"""
+    data_dir = Path(tmpdir_factory.mktemp('test_data_dir'))
+    filepath = data_dir / 'price_history_ETH_USD.bin'
+    write_price_history(
+        filepath=filepath,
+        data=[
+            {'time': 1438387200, 'high': FVal('1.1'), 'low': FVal('0.9')},
+            {'time': 1438390800, 'high': FVal('250.123'), 'low': None},
+        ],
+        start_time=0,
+        end_time=1438390800,
+    )
+    history = PriceHistory(filepath)
+    assert len(history) == 2
+    assert history.start_time == 0
+    assert history.end_time == 1438390800
+    assert history[0].time == 1438387200
+    assert history[0].high == FVal('1.1')
+    assert history[0].low == FVal('0.9')
+    assert history[-1].high == FVal('250.123')
+    assert history[-1].low == FVal(0)
+    assert history.time_at(1) == 1438390800
+    with pytest.raises(IndexError):
+        history[2]  # pylint: disable=pointless-statement
+    history.close()
+
+    with open(data_dir / 'price_history_forex.json', 'w') as f:
+        f.write('{"EUR": {}}')
+    with open(data_dir / 'price_history_BTC_USD.json', 'w') as f:
+        f.write('{"start_time": 0, "end_time": 3600, "data": [{"time": 0, "high": 2, "low": 1}]}')
+    with open(data_dir / 'price_history_XMR_USD.json', 'w') as f:
+        f.write('{"garbage')
+
+    assert migrate_json_price_histories(data_dir) == 1
+    assert (data_dir / 'price_history_forex.json').exists()
+    assert not (data_dir / 'price_history_BTC_USD.json').exists()
+    assert not (data_dir / 'price_history_XMR_USD.json').exists()
+    assert not (data_dir / 'price_history_XMR_USD.bin').exists()
+    history = PriceHistory(data_dir / 'price_history_BTC_USD.bin')
+    assert len(history) == 1
+    assert history[0].high == FVal(2)
+    assert history[0].low == FVal(1)
+    history.close()
+
+
+def test_cryptocompare_historical_data_appends_to_outdated_cache(tmpdir_factory):
+    """Test that an outdated cache only queries and appends the missing tail"""
+    data_dir = Path(tmpdir_factory.mktemp('test_data_dir'))
+    write_price_history(
+        filepath=data_dir / 'price_history_SNGLS_BTC.bin',
+        data=[
+            {'time': 1438387200, 'high': FVal(10), 'low': FVal(10)},
+            {'time': 1438390800, 'high': FVal(20), 'low': FVal(20)},
+        ],
+        start_time=0,
+        end_time=1438390800,
+    )
+    now_ts = 1438390800 + 3 * 3600 + 5
+    tail = [
+        {'time': 1438390800 + x * 3600, 'high': FVal(20 + x), 'low': FVal(20 + x)}
+        for x in range(4)
+    ]
+    histohour_response = {
+        'Aggregated': False,
+        'TimeFrom': 1438390800,
+        'TimeTo': 1438390800 + 3 * 3600,
+        'Data': tail,
+    }
+
+    cc = Cryptocompare(data_directory=data_dir, database=None)
+    with patch('rotkehlchen.externalapis.cryptocompare.ts_now', return_value=now_ts):
+        with patch.object(
+            cc,
+            'query_endpoint_histohour',
+            return_value=histohour_response,
+        ) as histohour_mock:
+            result = cc.get_historical_data(
+                from_asset=A_SNGLS,
+                to_asset=A_BTC,
+                timestamp=1438390800 + 2 * 3600,
+                historical_data_start=0,
+            )
+            assert histohour_mock.call_count == 1
+            assert histohour_mock.call_args[1]['to_timestamp'] == 1438390800 + 2000 * 3600
+
+    assert len(result) == 5
+    assert result.start_time == 0
+    assert result.end_time == now_ts
+    assert [x.time for x in result] == [1438387200 + x * 3600 for x in range(5)]
+    assert result[4].high == FVal(23)
+    # and a re-read of the cache file gives the same data
+    result.close()
+    result = PriceHistory(data_dir / 'price_history_SNGLS_BTC.bin')
+    assert len(result) == 5
+    assert result[1].low == FVal(20)
+    result.close()
+
+
+@pytest.mark.parametrize('use_clean_caching_directory', [True])
+def test_cryptocompare_replacing_cached_history_deletes_checkpoints(data_dir, database):
+    """Test that replacing a cached price history invalidates the accounting checkpoints
+    since they may have been taken with the replaced prices"""
+    write_price_history(
+        filepath=data_dir / 'price_history_SNGLS_BTC.bin',
+        data=[{'time': 1438387200, 'high': FVal(10), 'low': FVal(10)}],
+        start_time=1438387200,
+        end_time=1438387200,
+    )
+    database.update_accounting_checkpoints(
+        settings_hash='foo',
+        valid_actions=0,
+        checkpoints=[(1, 'bar', b'{}')],
+    )
+    histohour_response = {
+        'TimeFrom': 1438380000,
+        'TimeTo': 1438387200,
+        'Data': [
+            {'time': 1438380000 + x * 3600, 'high': FVal(10), 'low': FVal(10)}
+            for x in range(3)
+        ],
+    }
+
+    cc = Cryptocompare(data_directory=data_dir, database=database)
+    with patch('rotkehlchen.externalapis.cryptocompare.ts_now', return_value=1438387200):
+        with patch.object(cc, 'query_endpoint_histohour', return_value=histohour_response):
+            result = cc.get_historical_data(
+                from_asset=A_SNGLS,
+                to_asset=A_BTC,
+                timestamp=1438380000,  # before the cached history so it is queried again
+                historical_data_start=1438380000,
+            )
+
+    assert result.start_time == 1438380000
+    assert database.get_accounting_checkpoint_hashes('foo') == {}
+
+
+def test_cryptocompare_concurrent_appends_to_same_pair(tmpdir_factory):
+    """Test that greenlets refreshing the same outdated pair at the same time
+    query it only once and all get the appended history"""
+    data_dir = Path(tmpdir_factory.mktemp('test_data_dir'))
+    write_price_history(
+        filepath=data_dir / 'price_history_SNGLS_BTC.bin',
+        data=[{'time': 1438387200, 'high': FVal(10), 'low': FVal(10)}],
+        start_time=0,
+        end_time=1438387200,
+    )
+    now_ts = 1438387200 + 2 * 3600
+
+    def mock_histohour(**kwargs):  # pylint: disable=unused-argument
+        gevent.sleep(0.1)
+        return {
+            'TimeFrom': 1438387200,
+            'TimeTo': now_ts,
+            'Data': [
+                {'time': 1438387200 + x * 3600, 'high': FVal(10), 'low': FVal(10)}
+                for x in range(3)
+            ],
+        }
+
+    cc = Cryptocompare(data_directory=data_dir, database=None)
+    with patch('rotkehlchen.externalapis.cryptocompare.ts_now', return_value=now_ts):
+        with patch.object(
+            cc,
+            'query_endpoint_histohour',
+            side_effect=mock_histohour,
+        ) as histohour_mock:
+            greenlets = [gevent.spawn(
+                cc.get_historical_data,
+                from_asset=A_SNGLS,
+                to_asset=A_BTC,
+                timestamp=1438387200 + 3600 + idx,
+                historical_data_start=0,
+            ) for idx in range(3)]
+            gevent.joinall(greenlets, raise_error=True)
+
+    assert histohour_mock.call_count == 1
+    for greenlet in greenlets:
+        assert [x.time for x in greenlet.value] == [1438387200 + x * 3600 for x in range(3)]
+
+
+@pytest.mark.parametrize('use_clean_caching_directory', [True])
+@pytest.mark.parametrize('should_mock_price_queries', [False])
+def test_query_historical_prices_in_batch(data_dir, cryptocompare, price_historian):
+    """Test that batched price queries give the same results as one by one queries"""
+    start_ts = 1438387200
+    filepath = data_dir / 'price_history_ETH_BTC.bin'
+    write_price_history(
+        filepath=filepath,
+        data=[
+            {'time': start_ts + x * 3600, 'high': FVal(x + 2), 'low': FVal(x + 1)}
+            for x in range(10)
+        ],
+        start_time=0,
+        end_time=start_ts + 10 * 3600,
+    )
+    cryptocompare.price_history_file[PairCacheKey('ETH_BTC')] = filepath
+    timestamps = [
+        start_ts + 1000,  # closest is the first entry
+        start_ts + 3000,  # closest is the second entry
+        start_ts + 9 * 3600 + 1801,  # after the last entry
+        start_ts - 10,  # before the first entry, needs the daily price query
+    ]
+    result = price_historian.query_historical_prices(
+        [(A_ETH, A_BTC, ts) for ts in timestamps] + [(A_BTC, A_BTC, start_ts)],
+    )
+    assert result == {
+        (A_ETH, A_BTC, timestamps[0]): FVal('1.5'),
+        (A_ETH, A_BTC, timestamps[1]): FVal('2.5'),
+        (A_ETH, A_BTC, timestamps[2]): FVal('10.5'),
+        (A_BTC, A_BTC, start_ts): FVal(1),
+    }
+    for timestamp in timestamps[:3]:
+        assert result[(A_ETH, A_BTC, timestamp)] == price_historian.query_historical_price(
+            from_asset=A_ETH,
+            to_asset=A_BTC,
+            timestamp=timestamp,
+        )
+
+
+@pytest.mark.parametrize('use_clean_caching_directory', [True])
+def test_warm_price_histories_concurrently(data_dir, database):
+    """Test that price histories, and needed BTC bridges, are queried concurrently"""
+    cc = Cryptocompare(data_directory=data_dir, database=database)
+    start_ts = 1438387200
+    queried_pairs = []
+    in_flight = []
+    peak_in_flight = 0
+
+    def mock_histohour(from_asset, to_asset, **kwargs):  # pylint: disable=unused-argument
+        nonlocal peak_in_flight
+        queried_pairs.append((from_asset.identifier, to_asset.identifier))
+        in_flight.append(from_asset)
+        peak_in_flight = max(peak_in_flight, len(in_flight))
+        gevent.sleep(0.1)
+        in_flight.remove(from_asset)
+        # XMR has no USD prices, so it needs to go through BTC
+        price = 0 if (from_asset, to_asset) == (A_XMR, A_USD) else 1
+        return {
+            'TimeFrom': start_ts,
+            'TimeTo': start_ts + 5 * 3600,
+            'Data': [
+                {'time': start_ts + x * 3600, 'high': price, 'low': price} for x in range(6)
+            ],
+        }
+
+    now_ts = start_ts + 5 * 3600
+    with patch('rotkehlchen.externalapis.cryptocompare.ts_now', return_value=now_ts):
+        with patch.object(cc, 'query_endpoint_histohour', side_effect=mock_histohour):
+            cc.warm_price_histories(
+                timestamps_per_pair={
+                    (A_ETH, A_USD): [start_ts + 3600, start_ts + 7200],
+                    (A_XMR, A_USD): [start_ts + 3600],
+                    (A_USD, A_USD): [start_ts],
+                },
+                historical_data_start=start_ts,
+            )
+
+    assert sorted(queried_pairs) == [
+        ('BTC', 'USD'), ('ETH', 'USD'), ('XMR', 'BTC'), ('XMR', 'USD'),
+    ]
+    # two rounds of concurrent queries, the direct pairs and then the BTC bridge,
+    # each with both of its pairs queried at the same time
+    assert peak_in_flight == 2
+    for cache_key in ('ETH_USD', 'XMR_USD', 'XMR_BTC', 'BTC_USD'):
+        assert len(cc.price_history[PairCacheKey(cache_key)]) == 6
 
 
 @pytest.mark.skip(
@@ -104,6 +104,7 @@ def etherscan(database, messages_aggregator):
 def ethereum_manager(
         ethrpc_port,
         etherscan,
+        database,
         messages_aggregator,
         ethrpc_endpoint,
         ethereum_manager_connect_at_start,
@@ -120,6 +121,7 @@ def ethereum_manager(
         msg_aggregator=messages_aggregator,
         greenlet_manager=greenlet_manager,
         connect_at_start=ethereum_manager_connect_at_start,
+        database=database,
     )
 
 
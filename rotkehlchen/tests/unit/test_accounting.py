@@ -1,6 +1,13 @@
+import multiprocessing
+import pickle
+from copy import deepcopy
+from unittest.mock import patch
+
+import gevent
 import pytest
 
 from rotkehlchen.constants.assets import A_BTC
+from rotkehlchen.errors import NoPriceForGivenTimestamp, PriceQueryUnknownFromAsset
 from rotkehlchen.exchanges.data_structures import MarginPosition
 from rotkehlchen.fval import FVal
 from rotkehlchen.tests.utils.accounting import accounting_history_process
@@ -498,3 +505,166 @@ def test_accounting_works_for_empty_history(accountant):
     )
     assert FVal(result['overview']['general_trade_profit_loss']).is_close('0')
     assert FVal(result['overview']['total_taxable_profit_loss']).is_close('0')
+
+
+@pytest.mark.parametrize('mocked_price_queries', [prices])
+def test_history_processing_resumes_from_checkpoint(accountant):
+    """Test that re-processing a history only processes the actions after the
+    latest checkpoint that is still valid and gives the same result"""
+    resumed_at = []
+    restore_checkpoint = accountant._restore_checkpoint
+
+    def spy_restore_checkpoint(*args, **kwargs):
+        result = restore_checkpoint(*args, **kwargs)
+        resumed_at.append(result[0])
+        return result
+
+    start_ts, end_ts = 1436979735, 1519693374
+    checkpoint_interval_patch = patch(
+        'rotkehlchen.accounting.accountant.CHECKPOINT_MIN_INTERVAL',
+        new=1,
+    )
+    restore_patch = patch.object(
+        accountant,
+        '_restore_checkpoint',
+        side_effect=spy_restore_checkpoint,
+    )
+    with checkpoint_interval_patch, restore_patch:
+        full_result = accounting_history_process(accountant, start_ts, end_ts, history5)
+        # A history that is a prefix of the checkpointed one needs no processing
+        prefix_result = accounting_history_process(accountant, start_ts, end_ts, history1)
+        # Only the newly added trade should be processed
+        resumed_result = accounting_history_process(accountant, start_ts, end_ts, history5)
+        # Changing a trade invalidates all checkpoints after it
+        changed_history = deepcopy(history5)
+        changed_history[2]['amount'] = 40.0
+        changed_result = accounting_history_process(
+            accountant,
+            start_ts,
+            end_ts,
+            changed_history,
+        )
+
+    assert resumed_at == [0, 4, 4, 2]
+    assert resumed_result == full_result
+    prefix_pl = FVal(prefix_result['overview']['general_trade_profit_loss'])
+    assert prefix_pl.is_close('557.5284549025')
+    assert len(prefix_result['all_events']) == len(full_result['all_events']) - 1
+    assert changed_result['overview'] != full_result['overview']
+
+    changed_full_result = accounting_history_process(
+        accountant,
+        start_ts + 1,  # different settings so no checkpoint can be used
+        end_ts,
+        changed_history,
+    )
+    assert changed_full_result['all_events'] == changed_result['all_events']
+
+
+@pytest.mark.parametrize('mocked_price_queries', [prices])
+def test_history_processing_checkpoint_gives_messages_again(accountant):
+    """Test that the messages given while processing the actions before a checkpoint
+    are given again when processing resumes from it"""
+    process_action = accountant.process_action
+
+    def mock_process_action(action, *args, **kwargs):
+        if action.timestamp == 1473505138:
+            raise PriceQueryUnknownFromAsset(A_DASH)
+        return process_action(action, *args, **kwargs)
+
+    checkpoint_interval_patch = patch(
+        'rotkehlchen.accounting.accountant.CHECKPOINT_MIN_INTERVAL',
+        new=1,
+    )
+    process_patch = patch.object(
+        accountant,
+        'process_action',
+        side_effect=mock_process_action,
+    )
+    with checkpoint_interval_patch, process_patch as process_mock:
+        full_result = accounting_history_process(accountant, 1436979735, 1495751688, history1)
+        errors = accountant.msg_aggregator.consume_errors()
+        assert len(errors) == 1
+        assert process_mock.call_count == len(history1)
+        resumed_result = accounting_history_process(
+            accountant,
+            1436979735,
+            1495751688,
+            history1,
+        )
+        assert process_mock.call_count == len(history1)
+
+    assert accountant.msg_aggregator.consume_errors() == errors
+    assert resumed_result == full_result
+
+
+@pytest.mark.parametrize('mocked_price_queries', [prices])
+def test_history_processing_in_worker_process(accountant):
+    """Test that processing the history in a worker process gives the same result
+    and checkpoints as in the API process while the API process stays responsive"""
+    start_ts, end_ts = 1436979735, 1519693374
+    checkpoint_interval_patch = patch(
+        'rotkehlchen.accounting.accountant.CHECKPOINT_MIN_INTERVAL',
+        new=2,
+    )
+    with checkpoint_interval_patch:
+        result = accounting_history_process(accountant, start_ts, end_ts, history5)
+        checkpoints = accountant.checkpoints
+        accountant.db.delete_accounting_checkpoints()
+
+        ticks = 0
+
+        def tick():
+            nonlocal ticks
+            while True:
+                gevent.sleep(0.01)
+                ticks += 1
+
+        ticker = gevent.spawn(tick)
+        worker_patch = patch(
+            'rotkehlchen.accounting.accountant.PROCESSING_WORKER_MIN_ACTIONS',
+            new=0,
+        )
+        # Without prefetched rates the worker asks the API process for each rate
+        prefetch_patch = patch.object(accountant.events, 'prefetch_rates_in_profit_currency')
+        with worker_patch, prefetch_patch:
+            worker_result = accounting_history_process(accountant, start_ts, end_ts, history5)
+        ticker.kill()
+
+    assert worker_result == result
+    assert accountant.general_trade_pl.is_close('265250.9620977')
+    assert accountant.checkpoints == checkpoints
+    assert accountant.progress.processed == len(history5)
+    assert ticks > 0
+
+
+@pytest.mark.parametrize('mocked_price_queries', [prices])
+def test_history_processing_worker_stops_with_task(accountant):
+    """Test that killing the greenlet that processes the history stops the worker process"""
+    worker_patch = patch(
+        'rotkehlchen.accounting.accountant.PROCESSING_WORKER_MIN_ACTIONS',
+        new=0,
+    )
+    with worker_patch:
+        greenlet = gevent.spawn(
+            accounting_history_process,
+            accountant,
+            1436979735,
+            1519693374,
+            history5,
+        )
+        while len(multiprocessing.active_children()) == 0:
+            gevent.sleep(0.01)
+        greenlet.kill()
+
+    assert multiprocessing.active_children() == []
+
+
+def test_price_query_errors_can_be_given_by_the_worker():
+    """Test that the errors of the rate queries the worker asks for can be pickled"""
+    error = pickle.loads(pickle.dumps(PriceQueryUnknownFromAsset(A_DASH)))
+    assert isinstance(error, PriceQueryUnknownFromAsset)
+    assert str(error) == 'Unable to query historical price for unknown asset: "DASH"'
+    error = pickle.loads(pickle.dumps(NoPriceForGivenTimestamp(A_DASH, A_BTC, '01/01/2018')))
+    assert isinstance(error, NoPriceForGivenTimestamp)
+    assert error.date == '01/01/2018'
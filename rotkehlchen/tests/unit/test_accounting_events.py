@@ -1,5 +1,6 @@
 import pytest
 
+from rotkehlchen.accounting.cost_basis import FIFOLotStore
 from rotkehlchen.exchanges.data_structures import BuyEvent, Events
 from rotkehlchen.fval import FVal
 
@@ -8,7 +9,7 @@ from rotkehlchen.fval import FVal
 def test_search_buys_calculate_profit_after_year(accountant):
     asset = 'BTC'
     events = accountant.events.events
-    events[asset] = Events([], [])
+    events[asset] = Events(FIFOLotStore(), [])
     events[asset].buys.append(
         BuyEvent(
             amount=FVal(5),
@@ -60,7 +61,7 @@ def test_search_buys_calculate_profit_1_buy_consumed_by_1_sell(accountant):
     """
     asset = 'BTC'
     events = accountant.events.events
-    events[asset] = Events([], [])
+    events[asset] = Events(FIFOLotStore(), [])
     events[asset].buys.append(
         BuyEvent(
             amount=FVal(5),
@@ -94,7 +95,7 @@ def test_search_buys_calculate_profit_1_buy_used_by_2_sells_taxable(accountant):
     """
     asset = 'BTC'
     events = accountant.events.events
-    events[asset] = Events([], [])
+    events[asset] = Events(FIFOLotStore(), [])
     events[asset].buys.append(
         BuyEvent(
             amount=FVal(5),
@@ -147,7 +148,7 @@ def test_search_buys_calculate_profit_1_buy_used_by_2_sells_taxfree(accountant):
     """
     asset = 'BTC'
     events = accountant.events.events
-    events[asset] = Events([], [])
+    events[asset] = Events(FIFOLotStore(), [])
     events[asset].buys.append(
         BuyEvent(
             amount=FVal(5),
@@ -195,7 +196,7 @@ def test_search_buys_calculate_profit_1_buy_used_by_2_sells_taxfree(accountant):
 def test_search_buys_calculate_profit_sell_more_than_bought_within_year(accountant):
     asset = 'BTC'
     events = accountant.events.events
-    events[asset] = Events([], [])
+    events[asset] = Events(FIFOLotStore(), [])
     events[asset].buys.append(
         BuyEvent(
             amount=FVal(1),
@@ -234,7 +235,7 @@ def test_search_buys_calculate_profit_sell_more_than_bought_within_year(accounta
 def test_search_buys_calculate_profit_sell_more_than_bought_after_year(accountant):
     asset = 'BTC'
     events = accountant.events.events
-    events[asset] = Events([], [])
+    events[asset] = Events(FIFOLotStore(), [])
     events[asset].buys.append(
         BuyEvent(
             amount=FVal(1),
@@ -272,7 +273,7 @@ def test_search_buys_calculate_profit_sell_more_than_bought_after_year(accountan
 def test_reduce_asset_amount(accountant):
     asset = 'BTC'
     events = accountant.events.events
-    events[asset] = Events([], [])
+    events[asset] = Events(FIFOLotStore(), [])
     events[asset].buys.append(
         BuyEvent(
             amount=FVal(1),
@@ -307,7 +308,7 @@ def test_reduce_asset_amount(accountant):
 def test_reduce_asset_amount_exact(accountant):
     asset = 'BTC'
     events = accountant.events.events
-    events[asset] = Events([], [])
+    events[asset] = Events(FIFOLotStore(), [])
     events[asset].buys.append(
         BuyEvent(
             amount=FVal(1),
@@ -337,7 +338,7 @@ def test_reduce_asset_amount_not_bought(accountant):
 def test_reduce_asset_amount_more_that_bought(accountant):
     asset = 'BTC'
     events = accountant.events.events
-    events[asset] = Events([], [])
+    events[asset] = Events(FIFOLotStore(), [])
     events[asset].buys.append(
         BuyEvent(
             amount=FVal(1),
@@ -357,3 +358,39 @@ def test_reduce_asset_amount_more_that_bought(accountant):
 
     assert not accountant.events.reduce_asset_amount(asset, FVal(3))
     assert (len(accountant.events.events[asset].buys)) == 0, 'all buys should be used'
+
+
+@pytest.mark.parametrize('accounting_initialize_parameters', [True])
+def test_search_buys_calculate_profit_many_buys(accountant):
+    """Test the FIFO buy matching loop over many buys and sells"""
+    asset = 'BTC'
+    events = accountant.events.events
+    events[asset] = Events(FIFOLotStore(), [])
+    buys_number = 200
+    for i in range(buys_number):
+        events[asset].buys.append(
+            BuyEvent(
+                amount=FVal('1.5'),
+                timestamp=1446979735 + i * 3600,
+                rate=FVal(f'{100 + i}.5'),
+                fee_rate=FVal('0.001'),
+            ),
+        )
+
+    total_taxable_amount = FVal(0)
+    total_bought_cost = FVal(0)
+    for _ in range(buys_number):
+        taxable_amount, taxable_bought_cost, taxfree_bought_cost = (
+            accountant.events.search_buys_calculate_profit(
+                selling_amount=FVal('1.4'),
+                selling_asset=asset,
+                timestamp=1446979735 + buys_number * 3600,
+            )
+        )
+        total_taxable_amount += taxable_amount
+        total_bought_cost += taxable_bought_cost + taxfree_bought_cost
+
+    assert total_taxable_amount == FVal('1.4') * buys_number
+    remaining_amount = sum((x.amount for x in events[asset].buys), FVal(0))
+    assert remaining_amount == FVal('0.1') * buys_number
+    assert total_bought_cost > 0
@@ -1,8 +1,23 @@
+import copy
+import json
+import os
+import pickle
+import shutil
+from dataclasses import FrozenInstanceError
+
 import pytest
 from eth_utils import is_checksum_address
 
 from rotkehlchen.assets.asset import Asset, EthereumToken
-from rotkehlchen.assets.resolver import AssetResolver, asset_type_mapping
+from rotkehlchen.assets.resolver import (
+    ASSETS_INDEX_FILENAME,
+    ASSETS_JSON_FILENAME,
+    AssetResolver,
+    _assets_data_directory,
+    asset_type_mapping,
+    load_assets,
+    write_assets_index,
+)
 from rotkehlchen.errors import DeserializationError, UnknownAsset
 from rotkehlchen.typing import AssetType
 
@@ -57,6 +72,35 @@ def test_ethereum_tokens():
         EthereumToken('BTC')
 
 
+def test_assets_are_interned():
+    """Test that the same identifier always gives back the same immutable instance"""
+    btc_asset = Asset('BTC')
+    assert Asset('BTC') is btc_asset
+    assert copy.copy(btc_asset) is btc_asset
+    assert copy.deepcopy(btc_asset) is btc_asset
+    assert pickle.loads(pickle.dumps(btc_asset)) is btc_asset
+    assert hash(btc_asset) == hash('BTC')
+
+    rdn_token = EthereumToken('RDN')
+    assert EthereumToken('RDN') is rdn_token
+    assert pickle.loads(pickle.dumps(rdn_token)) is rdn_token
+    # Different asset classes are interned separately but still compare equal
+    assert Asset('RDN') is not rdn_token
+    assert type(Asset('RDN')) is Asset  # pylint: disable=unidiomatic-typecheck
+    assert Asset('RDN') == rdn_token
+
+    with pytest.raises(FrozenInstanceError):
+        btc_asset.name = 'foo'
+    with pytest.raises(FrozenInstanceError):
+        del rdn_token.decimals
+    assert not hasattr(btc_asset, '__dict__')
+
+    # A failed construction should not leave anything behind in the cache
+    with pytest.raises(DeserializationError):
+        EthereumToken('BTC')
+    assert (EthereumToken, 'BTC') not in AssetResolver().interned_assets
+
+
 def test_tokens_address_is_checksummed():
     """Test that all ethereum saved token asset addresses are checksummed"""
     for _, asset_data in AssetResolver().assets.items():
@@ -69,3 +113,63 @@ def test_tokens_address_is_checksummed():
             f'is not checksummed {asset_data["ethereum_address"]}'
         )
         assert is_checksum_address(asset_data['ethereum_address']), msg
+
+
+def test_assets_index(tmp_path):
+    """Test that the precompiled assets index is used only while it matches the assets file"""
+    shutil.copy(_assets_data_directory() / ASSETS_JSON_FILENAME, tmp_path)
+    with open(tmp_path / ASSETS_JSON_FILENAME, 'r') as f:
+        expected_assets = json.loads(f.read())
+
+    # Without an index the assets file is parsed
+    assets, identifiers_per_type = load_assets(tmp_path)
+    assert assets == expected_assets
+    assert identifiers_per_type is None
+
+    write_assets_index(tmp_path)
+    assets, identifiers_per_type = load_assets(tmp_path)
+    assert assets == expected_assets
+    assert 'EUR' in identifiers_per_type[AssetType.FIAT]
+    assert 'RDN' in identifiers_per_type[AssetType.ETH_TOKEN]
+    assert sum(len(x) for x in identifiers_per_type.values()) == len(expected_assets)
+    for asset_type, identifiers in identifiers_per_type.items():
+        for identifier in identifiers:
+            assert asset_type_mapping[expected_assets[identifier]['type']] == asset_type
+
+    # Changing the assets file makes the index stale
+    expected_assets['NEWASSET'] = {'name': 'New asset', 'symbol': 'NEW', 'type': 'own chain'}
+    with open(tmp_path / ASSETS_JSON_FILENAME, 'w') as f:
+        f.write(json.dumps(expected_assets))
+    assets, identifiers_per_type = load_assets(tmp_path)
+    assert assets == expected_assets
+    assert identifiers_per_type is None
+
+    # and so does touching it
+    write_assets_index(tmp_path)
+    assert load_assets(tmp_path)[1] is not None
+    stat = (tmp_path / ASSETS_JSON_FILENAME).stat()
+    os.utime(tmp_path / ASSETS_JSON_FILENAME, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert load_assets(tmp_path)[1] is None
+
+    # and so does a corrupt index
+    write_assets_index(tmp_path)
+    assert load_assets(tmp_path)[1] is not None
+    with open(tmp_path / ASSETS_INDEX_FILENAME, 'wb') as f:
+        f.write(b'garbage')
+    assets, identifiers_per_type = load_assets(tmp_path)
+    assert assets == expected_assets
+    assert identifiers_per_type is None
+
+
+def test_get_identifiers_of_type():
+    fiat_identifiers = AssetResolver().get_identifiers_of_type(AssetType.FIAT)
+    assert 'EUR' in fiat_identifiers
+    assert 'BTC' not in fiat_identifiers
+    assert AssetResolver().get_identifiers_of_type(AssetType.EOS_TOKEN) == ['IQ']
+
+    # the tokens are given in the order of the assets file
+    token_identifiers = [x.identifier for x in AssetResolver().get_all_eth_token_info()]
+    assert token_identifiers == [
+        identifier for identifier, data in AssetResolver().assets.items()
+        if asset_type_mapping[data['type']] in (AssetType.ETH_TOKEN_AND_MORE, AssetType.ETH_TOKEN)
+    ]
@@ -0,0 +1,190 @@
+import json
+
+import pytest
+
+from rotkehlchen.accounting.cost_basis import (
+    LOT_STORES,
+    AverageCostLotStore,
+    CostBasisMethod,
+    FIFOLotStore,
+    HIFOLotStore,
+    LIFOLotStore,
+)
+from rotkehlchen.errors import DeserializationError
+from rotkehlchen.exchanges.data_structures import BuyEvent, Events
+from rotkehlchen.fval import FVal
+
+
+def _make_buys():
+    return [
+        BuyEvent(timestamp=1, amount=FVal('1.5'), rate=FVal('10'), fee_rate=FVal('0.1')),
+        BuyEvent(timestamp=2, amount=FVal('2'), rate=FVal('40'), fee_rate=FVal('0.1')),
+        BuyEvent(timestamp=3, amount=FVal('0.5'), rate=FVal('20'), fee_rate=FVal(0)),
+    ]
+
+
+def test_cost_basis_method_serialization():
+    for method in CostBasisMethod:
+        assert CostBasisMethod.deserialize(method.serialize()) == method
+        assert method in LOT_STORES
+
+    with pytest.raises(DeserializationError):
+        CostBasisMethod.deserialize('foo')
+
+
+def test_fifo_lot_store():
+    store = FIFOLotStore(_make_buys())
+    assert len(store) == 3
+    assert [x.timestamp for x in store] == [1, 2, 3]
+    assert store.total_amount == FVal('4')
+    assert store.total_cost == FVal('105')
+    assert store.amount_bought_before(3) == FVal('3.5')
+
+    store.reduce_next(FVal('0.5'))
+    assert store[0].amount == FVal(1)
+    assert store.total_amount == FVal('3.5')
+    assert store.total_cost == FVal('100')
+
+    assert store.pop_next().timestamp == 1
+    assert store.total_amount == FVal('2.5')
+    assert store.total_cost == FVal('90')
+    store.pop_next()
+    store.pop_next()
+    assert len(store) == 0
+    assert store.total_amount == FVal(0)
+    assert store.total_cost == FVal(0)
+    with pytest.raises(IndexError):
+        store.pop_next()
+
+
+def test_lifo_lot_store():
+    store = LIFOLotStore(_make_buys())
+    assert store.peek_next().timestamp == 3
+
+    store.reduce_next(FVal('0.25'))
+    assert store[-1].amount == FVal('0.25')
+    assert store.total_amount == FVal('3.75')
+    assert store.total_cost == FVal('100')
+
+    assert [store.pop_next().timestamp for _ in range(3)] == [3, 2, 1]
+    assert store.total_amount == FVal(0)
+    with pytest.raises(IndexError):
+        store.peek_next()
+
+
+def test_hifo_lot_store():
+    store = HIFOLotStore(_make_buys())
+    store.append(BuyEvent(timestamp=4, amount=FVal('1'), rate=FVal('40'), fee_rate=FVal(0)))
+    assert store.peek_next().timestamp == 2
+    assert store.amount_bought_before(3) == FVal('3.5')
+
+    store.reduce_next(FVal('1'))
+    assert store.peek_next().amount == FVal('1')
+    assert store.total_amount == FVal('4')
+    assert store.total_cost == FVal('105')
+
+    # equal rates are used up in the order they were bought
+    assert [store.pop_next().timestamp for _ in range(4)] == [2, 4, 3, 1]
+    assert store.total_amount == FVal(0)
+    assert store.total_cost == FVal(0)
+    with pytest.raises(IndexError):
+        store.pop_next()
+
+
+def test_average_cost_lot_store():
+    store = AverageCostLotStore(_make_buys())
+    assert len(store) == 1
+    lot = store.peek_next()
+    assert lot.timestamp == 3
+    assert lot.amount == FVal('4')
+    assert lot.rate == FVal('26.25')
+    assert lot.fee_rate == FVal('0.0875')
+    assert store.amount_bought_before(3) == FVal(0)
+    assert store.amount_bought_before(4) == FVal('4')
+
+    store.reduce_next(FVal('2'))
+    lot = store.peek_next()
+    assert lot.amount == FVal('2')
+    assert lot.rate == FVal('26.25')
+    assert store.total_cost == FVal('52.5')
+
+    # A new buy moves the average rate
+    store.append(BuyEvent(timestamp=5, amount=FVal('2'), rate=FVal('3.75'), fee_rate=FVal(0)))
+    lot = store.peek_next()
+    assert lot.timestamp == 5
+    assert lot.rate == FVal('15')
+
+    assert store.pop_next().amount == FVal('4')
+    assert len(store) == 0
+    assert list(store) == []
+    with pytest.raises(IndexError):
+        store.peek_next()
+
+
+@pytest.mark.parametrize('method', list(CostBasisMethod))
+def test_lot_store_serialization(method):
+    """Test that a deserialized lot store uses up its lots exactly like the original"""
+    store = LOT_STORES[method](_make_buys())
+    store.append(BuyEvent(timestamp=4, amount=FVal('1'), rate=FVal('40'), fee_rate=FVal(0)))
+    store.reduce_next(FVal('0.25'))
+    data = json.loads(json.dumps(store.serialize()))
+    restored = LOT_STORES[method].deserialize(data)
+
+    assert restored.total_amount == store.total_amount
+    assert restored.total_cost == store.total_cost
+    while len(store) != 0:
+        assert restored.pop_next() == store.pop_next()
+    assert len(restored) == 0
+
+
+@pytest.mark.parametrize('accounting_initialize_parameters', [True])
+@pytest.mark.parametrize('method, expected_cost', [
+    (CostBasisMethod.FIFO, FVal('35.2')),
+    (CostBasisMethod.LIFO, FVal('70.15')),
+    (CostBasisMethod.HIFO, FVal('80.2')),
+    (CostBasisMethod.ACB, FVal('52.675')),
+])
+def test_search_buys_with_cost_basis_methods(accountant, method, expected_cost):
+    asset = 'BTC'
+    accountant.events.cost_basis_method = method
+    accountant.events.events[asset] = Events(LOT_STORES[method](_make_buys()), [])
+
+    taxable_amount, taxable_bought_cost, taxfree_bought_cost = (
+        accountant.events.search_buys_calculate_profit(
+            selling_amount=FVal('2'),
+            selling_asset=asset,
+            timestamp=4,
+        )
+    )
+    assert taxable_amount == FVal('2')
+    assert taxfree_bought_cost == FVal(0)
+    assert taxable_bought_cost == expected_cost
+    assert accountant.events.events[asset].buys.total_amount == FVal('2')
+
+
+@pytest.mark.parametrize('accounting_initialize_parameters', [True])
+def test_cost_basis_methods_many_events(accountant):
+    """Test all cost basis methods on the same synthetic buy/sell history"""
+    asset = 'BTC'
+    events_number = 2000
+    for method in CostBasisMethod:
+        accountant.events.cost_basis_method = method
+        accountant.events.events[asset] = Events(LOT_STORES[method](), [])
+        for i in range(events_number):
+            timestamp = 1446979735 + i * 3600
+            if i % 2 == 0:
+                accountant.events.events[asset].buys.append(BuyEvent(
+                    amount=FVal('1.5'),
+                    timestamp=timestamp,
+                    rate=FVal(100 + (i * 7919) % 1000),
+                    fee_rate=FVal('0.001'),
+                ))
+            else:
+                accountant.events.search_buys_calculate_profit(
+                    selling_amount=FVal('1.4'),
+                    selling_asset=asset,
+                    timestamp=timestamp,
+                )
+
+        remaining = accountant.events.events[asset].buys.total_amount
+        assert remaining.is_close(FVal('0.1') * (events_number // 2))
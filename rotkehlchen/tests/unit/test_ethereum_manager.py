@@ -1,5 +1,12 @@
+from unittest.mock import MagicMock, patch
+
 import pytest
+from eth_utils.address import to_checksum_address
+from hexbytes import HexBytes
+from web3 import HTTPProvider, Web3
 
+from rotkehlchen.chain.ethereum.manager import LOGS_CACHE_CONFIRMATIONS, ContractCall, NodeName
+from rotkehlchen.constants.ethereum import MAKERDAO_POT, MAKERDAO_VAT, MULTICALL
 from rotkehlchen.tests.utils.ethereum import ETHEREUM_TEST_PARAMETERS
 
 
@@ -9,3 +16,178 @@ def test_get_block_by_number(ethereum_manager):
     assert block['timestamp'] == 1592686213
     assert block['number'] == 10304885
     assert block['hash'] == '0xe2217ba1639c6ca2183f40b0f800185b3901faece2462854b3162d4c5077752c'
+
+
+def _make_contract_calls():
+    ilk = b'ETH-A'.ljust(32, b'\0')
+    return [
+        ContractCall(MAKERDAO_POT.address, MAKERDAO_POT.abi, 'chi'),
+        ContractCall(MAKERDAO_VAT.address, MAKERDAO_VAT.abi, 'ilks', [ilk]),
+        ContractCall(MAKERDAO_POT.address, MAKERDAO_POT.abi, 'dsr'),
+    ]
+
+
+def test_multicall_aggregates_calls(ethereum_manager):
+    """Test that with an ethereum node all calls are done in a single eth_call
+    to the multicall contract and that each result is decoded"""
+    web3 = Web3()
+    multicall = web3.eth.contract(address=MULTICALL.address, abi=MULTICALL.abi)
+    calls = _make_contract_calls()
+    ilks_result = (1, 2, 3, 4, 5)
+    eth_calls = []
+
+    def mock_request_blocking(method, params):
+        assert method == 'eth_call'
+        eth_calls.append(params)
+        assert to_checksum_address(params[0]['to']) == MULTICALL.address
+        _, args = multicall.decode_function_input(params[0]['data'])
+        assert [x[0] for x in args['calls']] == [x.contract_address for x in calls]
+        return_data = [
+            web3.codec.encode_abi(['uint256'], [42]),
+            web3.codec.encode_abi(['uint256'] * 5, ilks_result),
+            web3.codec.encode_abi(['uint256'], [24]),
+        ]
+        return '0x' + web3.codec.encode_abi(['uint256', 'bytes[]'], [1, return_data]).hex()
+
+    ethereum_manager.web3_mapping[NodeName.OWN] = web3
+    with patch.object(web3.manager, 'request_blocking', side_effect=mock_request_blocking):
+        results = ethereum_manager.multicall(calls, call_order=(NodeName.OWN,))
+
+    assert len(eth_calls) == 1
+    assert results[0] == 42
+    assert tuple(results[1]) == ilks_result
+    assert results[2] == 24
+    assert ethereum_manager.multicall([]) == []
+
+
+def test_multicall_etherscan_is_sequential(ethereum_manager):
+    """Test that without an ethereum node each call is done via etherscan"""
+    calls = _make_contract_calls()
+    with patch.object(
+        ethereum_manager,
+        '_call_contract_etherscan',
+        side_effect=[42, (1, 2, 3, 4, 5), 24],
+    ) as etherscan_call:
+        results = ethereum_manager.multicall(calls, call_order=(NodeName.ETHERSCAN,))
+
+    assert results == [42, (1, 2, 3, 4, 5), 24]
+    assert [x[1]['method_name'] for x in etherscan_call.call_args_list] == ['chi', 'ilks', 'dsr']
+
+
+@pytest.mark.parametrize(*ETHEREUM_TEST_PARAMETERS)
+def test_multicall_same_as_call_contract(ethereum_manager):
+    calls = _make_contract_calls()
+    results = ethereum_manager.multicall(calls)
+    assert len(results) == len(calls)
+    # dsr does not change often so can be compared to a separate call
+    assert results[2] == ethereum_manager.call_contract(
+        contract_address=MAKERDAO_POT.address,
+        abi=MAKERDAO_POT.abi,
+        method_name='dsr',
+    )
+    assert len(results[1]) == 5
+
+
+def _make_log(block_number, log_index=0):
+    """Creates a log like the ones returned by web3"""
+    return {
+        'address': MAKERDAO_POT.address.lower(),
+        'topics': [HexBytes(b'\x01' * 32)],
+        'data': '0x',
+        'blockNumber': block_number,
+        'transactionHash': HexBytes(bytes([log_index]) * 32),
+        'transactionIndex': 0,
+        'logIndex': log_index,
+        'blockHash': HexBytes(b'\x02' * 32),
+    }
+
+
+def test_get_logs_cache(ethereum_manager):
+    """Test that the logs are cached and only the not yet covered blocks are queried"""
+    all_logs = [_make_log(x) for x in (100, 150, 150, 300, 500, 995)]
+    queried_ranges = []
+
+    def mock_get_logs(web3, from_block, to_block, **kwargs):  # pylint: disable=unused-argument
+        queried_ranges.append((from_block, to_block))
+        return [x for x in all_logs if from_block <= x['blockNumber'] <= to_block]
+
+    def get_logs(from_block, to_block):
+        return ethereum_manager.get_logs(
+            contract_address=MAKERDAO_POT.address,
+            abi=MAKERDAO_POT.abi,
+            event_name='LogNote',
+            argument_filters={'sig': '0x9f678cca'},
+            from_block=from_block,
+            to_block=to_block,
+        )
+
+    patch_get_logs = patch.object(ethereum_manager, '_get_logs', side_effect=mock_get_logs)
+    patch_latest_block = patch.object(
+        ethereum_manager,
+        'get_latest_block_number',
+        return_value=1000,
+    )
+    with patch_get_logs, patch_latest_block:
+        logs = get_logs(100, 400)
+        assert [x['blockNumber'] for x in logs] == [100, 150, 150, 300]
+        assert logs[0]['transactionHash'] == '0x' + '00' * 32
+        assert logs[0]['topics'] == ['0x' + '01' * 32]
+        assert logs[0]['address'] == MAKERDAO_POT.address
+        assert queried_ranges == [(100, 400)]
+
+        # Fully cached ranges are not queried again
+        assert get_logs(150, 300) == logs[1:]
+        assert queried_ranges == [(100, 400)]
+
+        # Only the gaps on each side are queried. Logs of the last blocks are not cached
+        logs = get_logs(50, 'latest')
+        assert [x['blockNumber'] for x in logs] == [100, 150, 150, 300, 500, 995]
+        assert queried_ranges == [(100, 400), (50, 99), (401, 1000)]
+
+        # A disjoint range is queried as a whole and not cached
+        queried_ranges.clear()
+        assert get_logs(10, 20) == []
+        assert get_logs(10, 20) == []
+        assert queried_ranges == [(10, 20), (10, 20)]
+
+        queried_ranges.clear()
+        logs = get_logs(50, 1000)
+        assert [x['blockNumber'] for x in logs] == [100, 150, 150, 300, 500, 995]
+        assert queried_ranges == [(1000 - LOGS_CACHE_CONFIRMATIONS + 1, 1000)]
+
+
+def test_get_blocks_timestamps(ethereum_manager, database):
+    """Test that unknown block timestamps are queried in one batch and are then
+    remembered both in memory and in the DB"""
+    ethereum_manager.web3_mapping[NodeName.OWN] = Web3(HTTPProvider('http://localhost:8545'))
+    batches = []
+
+    def mock_post(url, json, timeout):  # pylint: disable=unused-argument
+        batches.append([int(x['params'][0], 16) for x in json])
+        response = MagicMock()
+        response.json.return_value = [{
+            'jsonrpc': '2.0',
+            'id': x['id'],
+            'result': {'timestamp': hex(int(x['params'][0], 16) * 10)},
+        } for x in reversed(json)]
+        return response
+
+    with patch('rotkehlchen.chain.ethereum.manager.requests.post', side_effect=mock_post):
+        result = ethereum_manager.get_blocks_timestamps([5, 3, 5, 1], call_order=(NodeName.OWN,))
+        assert result == {5: 50, 3: 30, 1: 10}
+        assert batches == [[5, 3, 1]]
+        assert database.get_block_timestamps([1, 3, 5, 7]) == {5: 50, 3: 30, 1: 10}
+
+        assert ethereum_manager.get_event_timestamp({'blockNumber': 3}) == 30
+        result = ethereum_manager.get_blocks_timestamps([1, 7], call_order=(NodeName.OWN,))
+        assert result == {1: 10, 7: 70}
+        assert batches == [[5, 3, 1], [7]]
+
+        # forget the in-memory cache. The timestamps should come from the DB
+        ethereum_manager.block_timestamps.clear()
+        ethereum_manager.prefetch_event_timestamps([
+            {'blockNumber': 5},
+            {'blockNumber': 9, 'timeStamp': '0x5a'},
+        ])
+        assert batches == [[5, 3, 1], [7]]
+        assert list(ethereum_manager.block_timestamps.keys()) == [5]
@@ -1,3 +1,5 @@
+from decimal import Decimal
+
 import pytest
 
 from rotkehlchen.errors import ConversionError
@@ -182,3 +184,41 @@ def test_initialize_with_bool_fails():
     with pytest.raises(ValueError):
         FVal(True)
         FVal(False)
+
+
+def test_scaled_int_conversion():
+    assert FVal.from_scaled_int(1500000000000000000, 18) == FVal('1.5')
+    assert FVal.from_scaled_int(-25, 2) == FVal('-0.25')
+    assert FVal.from_scaled_int(15, 0) == FVal(15)
+    assert str(FVal.from_scaled_int(10 ** 18, 18)) == '1'
+
+    assert FVal('1.5').to_scaled_int(18) == 1500000000000000000
+    assert FVal('-0.25').to_scaled_int(2) == -25
+    assert FVal('1.5E+3').to_scaled_int(0) == 1500
+    assert FVal('1.50').to_scaled_int(1) == 15
+    # more digits than the precision of the decimal context should stay exact
+    assert FVal('123456789012345.123456789012345678').to_scaled_int(18) == (
+        123456789012345123456789012345678
+    )
+    with pytest.raises(ConversionError):
+        FVal('1.123').to_scaled_int(2)
+    with pytest.raises(ConversionError):
+        FVal('NaN').to_scaled_int(2)
+
+
+def test_fval_operations_match_decimal():
+    """Test that a workload using the FVal fast paths gives the result of the Decimal one"""
+    fvals = [FVal(f'{i}.{i}') for i in range(1, 1001)]
+    decimals = [Decimal(f'{i}.{i}') for i in range(1, 1001)]
+
+    def workload(values, zero):
+        total = zero
+        for i in range(1, len(values)):
+            a, b = values[i - 1], values[i]
+            if a < b and b >= a and a != b:
+                total += a * b - a / b
+            total = total.fma(a, b) if total > 100000 else total + 1
+
+        return total
+
+    assert workload(fvals, FVal(0)).num == workload(decimals, Decimal(0))
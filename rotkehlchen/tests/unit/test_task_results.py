@@ -0,0 +1,105 @@
+import json
+from unittest.mock import patch
+
+from rotkehlchen.api.task_results import TaskResultStore
+from rotkehlchen.fval import FVal
+
+
+def _read(stored_result):
+    return json.loads(b''.join(stored_result.iter_chunks()))
+
+
+def test_task_result_store_put_and_pop():
+    store = TaskResultStore(spill_threshold=None)
+    assert store.put(1, {'result': {'amount': FVal('1.5')}, 'message': ''}) == []
+    assert 1 in store
+    assert len(store) == 1
+    metrics = store.metrics()
+    assert metrics['stored_results'] == 1
+    assert metrics['memory_bytes'] > 0
+    assert metrics['disk_bytes'] == 0
+
+    stored_result = store.pop(1)
+    assert _read(stored_result) == {'result': {'amount': '1.5'}, 'message': ''}
+    assert store.pop(1) is None
+    assert store.metrics() == {
+        'stored_results': 0,
+        'memory_bytes': 0,
+        'disk_bytes': 0,
+        'evicted_results': 0,
+    }
+
+
+def test_task_result_store_evicts_expired_results():
+    store = TaskResultStore(ttl=60)
+    with patch('rotkehlchen.api.task_results.time.monotonic', return_value=1000):
+        store.put(1, {'result': 1, 'message': ''})
+    with patch('rotkehlchen.api.task_results.time.monotonic', return_value=1030):
+        store.put(2, {'result': 2, 'message': ''})
+    with patch('rotkehlchen.api.task_results.time.monotonic', return_value=1070):
+        assert store.evict() == [1]
+    assert 1 not in store
+    assert 2 in store
+    assert store.metrics()['evicted_results'] == 1
+
+
+def test_task_result_store_evicts_least_recent_results_over_the_cap():
+    result = {'result': 'a' * 100, 'message': ''}
+    size = len(json.dumps(result))
+    store = TaskResultStore(max_memory_bytes=size * 2, spill_threshold=None)
+    assert store.put(1, result) == []
+    assert store.put(2, result) == []
+    assert store.put(3, result) == [1]
+    assert store.metrics()['memory_bytes'] == size * 2
+    # a result that alone exceeds the cap can't be kept at all
+    assert store.put(4, {'result': 'a' * 500, 'message': ''}) == [2, 3, 4]
+    assert len(store) == 0
+
+
+def test_task_result_store_spills_big_results(tmpdir):
+    store = TaskResultStore(max_memory_bytes=50, spill_threshold=50, spill_directory=tmpdir)
+    result = {'result': ['a' * 100, 'b' * 100], 'message': ''}
+    assert store.put(1, result) == []
+    assert store.put(2, {'result': True, 'message': ''}) == []
+    assert len(tmpdir.listdir()) == 1
+    metrics = store.metrics()
+    assert metrics['disk_bytes'] == len(json.dumps(result))
+    assert metrics['memory_bytes'] == len(json.dumps({'result': True, 'message': ''}))
+
+    with patch('rotkehlchen.api.task_results.SPILLED_RESULT_CHUNK_SIZE', 16):
+        stored_result = store.pop(1)
+        chunks = list(stored_result.iter_chunks())
+    assert len(chunks) > 1
+    assert json.loads(b''.join(chunks)) == result
+    assert store.metrics()['disk_bytes'] == 0
+    # the file is deleted only once the caller is done with the result
+    assert len(tmpdir.listdir()) == 1
+    stored_result.remove_file()
+    assert len(tmpdir.listdir()) == 0
+
+    store.put(3, result)
+    assert len(tmpdir.listdir()) == 1
+    store.clear()
+    assert len(tmpdir.listdir()) == 0
+    assert len(store) == 0
+
+
+def test_task_result_store_evicts_least_recent_spilled_results_over_the_disk_cap(tmpdir):
+    result = {'result': 'a' * 100, 'message': ''}
+    size = len(json.dumps(result))
+    store = TaskResultStore(
+        max_memory_bytes=size,
+        max_disk_bytes=size * 2,
+        spill_threshold=50,
+        spill_directory=tmpdir,
+    )
+    assert store.put(1, result) == []
+    assert store.put(2, {'result': True, 'message': ''}) == []
+    assert store.put(3, result) == []
+    assert store.put(4, result) == [1]
+    assert len(tmpdir.listdir()) == 2
+    metrics = store.metrics()
+    assert metrics['disk_bytes'] == size * 2
+    assert metrics['stored_results'] == 3
+    # results in memory don't count against the disk cap
+    assert 2 in store
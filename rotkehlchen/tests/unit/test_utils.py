@@ -2,14 +2,19 @@ import json
 import time
 from unittest.mock import patch
 
+import gevent
 import pytest
 from hexbytes import HexBytes
 
+from rotkehlchen.accounting.structures import DefiEvent, DefiEventType
+from rotkehlchen.constants.assets import A_DAI
 from rotkehlchen.errors import ConversionError, UnprocessableTradePair
 from rotkehlchen.exchanges.data_structures import invert_pair
 from rotkehlchen.fval import FVal
+from rotkehlchen.greenlets import TaskProgress, current_task_progress, run_concurrently
 from rotkehlchen.serialization.serialize import process_result
 from rotkehlchen.tests.utils.mock import MockResponse
+from rotkehlchen.utils.accounting import merge_actions_by_timestamp, sort_actions_by_timestamp
 from rotkehlchen.utils.interfaces import CacheableObject, cache_response_timewise
 from rotkehlchen.utils.misc import (
     combine_dicts,
@@ -114,6 +119,22 @@ def test_combine_stat_dicts():
     }
 
 
+def test_combine_stat_dicts_many_locations():
+    """Test combining the balances of many locations"""
+    dicts = [
+        {
+            f'ASSET{i}': {'amount': FVal(f'{j}.{i}'), 'usd_value': FVal(f'{i}.{j}')}
+            for i in range(200)
+        }
+        for j in range(50)
+    ]
+
+    result = combine_stat_dicts(dicts)
+    assert len(result) == 200
+    assert result['ASSET1']['amount'] == sum((FVal(f'{j}.1') for j in range(50)), FVal(0))
+    assert result['ASSET3']['usd_value'] == sum((FVal(f'3.{j}') for j in range(50)), FVal(0))
+
+
 def test_check_if_version_up_to_date():
     def mock_github_return_current(url):  # pylint: disable=unused-argument
         contents = '{"tag_name": "v1.4.0", "html_url": "https://foo"}'
@@ -249,3 +270,114 @@ def test_convert_to_int():
     assert convert_to_int(b'5.44', accept_only_exact=False) == 5
     assert convert_to_int(b'5.65', accept_only_exact=False) == 5
     assert convert_to_int(b'4', accept_only_exact=False) == 4
+
+
+def test_merge_actions_by_timestamp():
+    def make_events(timestamps, amount):
+        return [
+            DefiEvent(
+                timestamp=ts,
+                event_type=DefiEventType.DSR_LOAN_GAIN,
+                asset=A_DAI,
+                amount=FVal(amount),
+            ) for ts in timestamps
+        ]
+
+    sorted_source = make_events([1, 3, 3, 7], 1)
+    unsorted_source = make_events([8, 2, 3], 2)
+    # An already sorted source should not be copied
+    assert sort_actions_by_timestamp(sorted_source) is sorted_source
+    sources = [sorted_source, sort_actions_by_timestamp(unsorted_source), []]
+    merged = list(merge_actions_by_timestamp(sources))
+    assert [(x.timestamp, x.amount) for x in merged] == [
+        (1, 1), (2, 2), (3, 1), (3, 1), (3, 2), (7, 1), (8, 2),
+    ]
+
+
+def test_task_progress():
+    progress = TaskProgress()
+    data = progress.serialize()
+    assert data['stage'] == ''
+    assert data['processed'] == 0
+    assert data['total'] is None
+    assert data['percent'] is None
+    assert data['eta_seconds'] is None
+
+    with patch('rotkehlchen.greenlets.time.monotonic', return_value=progress.started_at):
+        progress.set_stage('Querying history', total=200)
+    progress.advance(40)
+    progress.advance()
+    with patch('rotkehlchen.greenlets.time.monotonic', return_value=progress.started_at + 10):
+        data = progress.serialize()
+    assert data == {
+        'stage': 'Querying history',
+        'processed': 41,
+        'total': 200,
+        'percent': 20.5,
+        'items_per_second': 4.1,
+        'elapsed_seconds': 10,
+        'eta_seconds': 159 / 4.1,
+    }
+
+    # a new stage starts counting from scratch
+    progress.set_stage('Processing history')
+    data = progress.serialize()
+    assert data['processed'] == 0
+    assert data['total'] is None
+
+
+def test_current_task_progress():
+    progress = TaskProgress()
+
+    def task():
+        current_task_progress().advance(5)
+
+    greenlet = gevent.Greenlet(task)
+    greenlet.task_progress = progress
+    greenlet.start()
+    greenlet.join()
+    assert progress.processed == 5
+
+    # outside of a task the progress is just discarded
+    current_task_progress().advance(5)
+    assert current_task_progress().processed == 0
+
+
+def test_run_concurrently():
+    def query(name, seconds):
+        gevent.sleep(seconds)
+        return name
+
+    start = time.monotonic()
+    results = run_concurrently({
+        'a': lambda: query('a', 0.2),
+        'b': lambda: query('b', 0.1),
+        'c': lambda: query('c', 0.2),
+    })
+    assert time.monotonic() - start < 0.35
+    assert results == {'a': 'a', 'b': 'b', 'c': 'c'}
+
+    finished = []
+
+    def failing_query(seconds):
+        gevent.sleep(seconds)
+        finished.append(seconds)
+        raise ValueError(f'failed after {seconds}')
+
+    # all queries run to the end and the error of the first one given is raised
+    with pytest.raises(ValueError, match='failed after 0.1'):
+        run_concurrently({
+            'a': lambda: failing_query(0.1),
+            'b': lambda: failing_query(0.05),
+            'c': lambda: query('c', 0.15),
+        })
+    assert sorted(finished) == [0.05, 0.1]
+
+    # with a pool size only that many queries run at the same time
+    start = time.monotonic()
+    results = run_concurrently(
+        methods={x: lambda x=x: query(x, 0.1) for x in range(4)},
+        pool_size=2,
+    )
+    assert time.monotonic() - start >= 0.2
+    assert results == {0: 0, 1: 1, 2: 2, 3: 3}
@@ -1,9 +1,17 @@
 import warnings as test_warnings
+from unittest.mock import MagicMock
 
 import pytest
 
-from rotkehlchen.chain.ethereum.zerion import Zerion
+from rotkehlchen.chain.ethereum.zerion import (
+    ZERION_ADAPTER_ADDRESS,
+    ZERION_MAX_ACCOUNTS_PER_CALL,
+    Zerion,
+)
+from rotkehlchen.constants.ethereum import ZERION_ABI
+from rotkehlchen.errors import RemoteError
 from rotkehlchen.fval import FVal
+from rotkehlchen.tests.utils.factories import make_ethereum_address
 
 
 @pytest.mark.parametrize('mocked_current_prices', [{
@@ -36,3 +44,55 @@ def test_query_all_protocol_balances_for_account(
     assert len(errors) == 0
     warnings = function_scope_messages_aggregator.consume_warnings()
     assert len(warnings) == 0
+
+
+def _make_zerion_result(account_idx):
+    """Creates a raw getBalances() result with a DAI balance of account_idx + 1"""
+    protocol = ('Compound', 'Decentralized lending', 'compound.finance', 'compound.png', 1)
+    dai = ('0x6B175474E89094C44Da98b954EedeAC495271d0F', 'Dai Stablecoin', 'DAI', 18)
+    adapter_balance = (
+        ('0x1234567890123456789012345678901234567890', 'Asset'),
+        [((dai, (account_idx + 1) * 10**18), [])],
+    )
+    return [(protocol, [adapter_balance])]
+
+
+@pytest.mark.parametrize('mocked_current_prices', [{'DAI': FVal('1')}])
+def test_query_protocol_balances_for_many_accounts(
+        function_scope_messages_aggregator,
+        inquirer,  # pylint: disable=unused-argument
+):
+    """Test that many accounts are queried in batched multicalls and that a
+    failing batch is split and retried"""
+    accounts = [make_ethereum_address() for _ in range(ZERION_MAX_ACCOUNTS_PER_CALL * 2 + 1)]
+    ethereum = MagicMock()
+    zerion = Zerion(ethereum, function_scope_messages_aggregator, ZERION_ADAPTER_ADDRESS)
+    multicall_sizes = []
+
+    def mock_call_contract(contract_address, abi, method_name, arguments):
+        assert contract_address == ZERION_ADAPTER_ADDRESS
+        assert abi == ZERION_ABI
+        assert method_name == 'getBalances'
+        return _make_zerion_result(accounts.index(arguments[0]))
+
+    def mock_multicall(calls):
+        multicall_sizes.append(len(calls))
+        if len(calls) > 2:
+            raise RemoteError('out of gas')
+        return [mock_call_contract(*call) for call in calls]
+
+    ethereum.call_contract.side_effect = mock_call_contract
+    ethereum.multicall.side_effect = mock_multicall
+    balances = zerion.all_balances_for_accounts(accounts)
+    assert list(balances.keys()) == accounts
+    for idx, account in enumerate(accounts):
+        assert len(balances[account]) == 1
+        assert balances[account][0].protocol.name == 'Compound'
+        assert balances[account][0].base_balance.balance.amount == FVal(idx + 1)
+        assert balances[account][0].base_balance.balance.usd_value == FVal(idx + 1)
+        assert balances[account] == zerion.all_balances_for_account(account)
+
+    # two full chunks that got split in half, and the last single account queried directly
+    assert sorted(multicall_sizes) == [2, 2, 2, 2, 4, 4]
+    assert zerion.all_balances_for_accounts([]) == {}
+    assert len(function_scope_messages_aggregator.consume_errors()) == 0
@@ -920,4 +920,23 @@ def maybe_mock_historical_price_queries(
 
         return price
 
+    def mock_historical_prices_query(queries):
+        result = {}
+        for from_asset, to_asset, timestamp in queries:
+            try:
+                result[(from_asset, to_asset, timestamp)] = mock_historical_price_query(
+                    from_asset=from_asset,
+                    to_asset=to_asset,
+                    timestamp=timestamp,
+                )
+            except AssertionError:
+                # Missing from the batch result. Asked again one by one if needed
+                continue
+        return result
+
+    def mock_warm_price_histories(queries):  # pylint: disable=unused-argument
+        return
+
     historian.query_historical_price = mock_historical_price_query
+    historian.query_historical_prices = mock_historical_prices_query
+    historian.warm_price_histories = mock_warm_price_histories
@@ -30,11 +30,10 @@ def query_ethereum_transactions(
         # If we already have any transactions in the DB for this from_address
         # from to_ts and on then that means the range has already been queried
         if to_ts:
-            existing_txs = database.get_ethereum_transactions(from_ts=to_ts, address=address)
-            if len(existing_txs) > 0:
+            if database.has_ethereum_transactions(from_ts=to_ts, address=address):
                 # So just query the DB only here
                 transactions.extend(
-                    database.get_ethereum_transactions(
+                    database.iter_ethereum_transactions(
                         from_ts=from_ts, to_ts=to_ts, address=address,
                     ),
                 )
@@ -1,4 +1,5 @@
-from typing import Optional, Tuple, Union
+import heapq
+from typing import Iterable, Optional, Sequence, Tuple, Union
 
 from rotkehlchen.accounting.structures import DefiEvent
 from rotkehlchen.assets.asset import Asset
@@ -30,6 +31,33 @@ def action_get_timestamp(action: TaxableAction) -> Timestamp:
     raise AssertionError(f'TaxableAction of unknown type {type(action)} encountered')
 
 
+def sort_actions_by_timestamp(actions: Sequence[TaxableAction]) -> Sequence[TaxableAction]:
+    """Returns the given actions sorted by timestamp
+
+    Most action sources come already sorted from the DB or the exchanges and are
+    then returned as they are without being copied.
+    """
+    previous_ts: Optional[Timestamp] = None
+    for action in actions:
+        timestamp = action_get_timestamp(action)
+        if previous_ts is not None and timestamp < previous_ts:
+            return sorted(actions, key=action_get_timestamp)
+        previous_ts = timestamp
+
+    return actions
+
+
+def merge_actions_by_timestamp(
+        sources: Sequence[Sequence[TaxableAction]],
+) -> Iterable[TaxableAction]:
+    """Lazily merges the given action sources, each sorted by timestamp, into a
+    single stream of actions in timestamp order
+
+    Actions with the same timestamp come in the order of their sources.
+    """
+    return heapq.merge(*sources, key=action_get_timestamp)
+
+
 def action_get_type(action: TaxableAction) -> str:
     if isinstance(action, Trade):
         return 'trade'
@@ -7,7 +7,6 @@ import re
 import sys
 import time
 from http import HTTPStatus
-from pathlib import Path
 from typing import Any, Callable, Dict, Iterator, List, TypeVar, Union
 
 import gevent
@@ -26,7 +25,7 @@ from rotkehlchen.errors import (
 from rotkehlchen.fval import FVal
 from rotkehlchen.logging import RotkehlchenLogsAdapter
 from rotkehlchen.typing import ChecksumEthAddress, Fee, Timestamp, TimestampMS
-from rotkehlchen.utils.serialization import rlk_jsondumps, rlk_jsonloads
+from rotkehlchen.utils.serialization import rlk_jsonloads
 
 logger = logging.getLogger(__name__)
 log = RotkehlchenLogsAdapter(logger)
@@ -329,26 +328,6 @@ def get_system_spec() -> Dict[str, str]:
     return system_spec
 
 
-def write_history_data_in_file(
-        data: List[Dict[str, Any]],
-        filepath: Path,
-        start_ts: Timestamp,
-        end_ts: Timestamp,
-) -> None:
-    log.info(
-        'Writing history file',
-        filepath=filepath,
-        start_time=start_ts,
-        end_time=end_ts,
-    )
-    with open(filepath, 'w') as outfile:
-        history_dict: Dict[str, Any] = {}
-        history_dict['data'] = data
-        history_dict['start_time'] = start_ts
-        history_dict['end_time'] = end_ts
-        outfile.write(rlk_jsondumps(history_dict))
-
-
 def hex_or_bytes_to_int(value: Union[bytes, str]) -> int:
     """Turns a bytes/HexBytes or a hexstring into an int
 
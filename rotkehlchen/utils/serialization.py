@@ -1,4 +1,5 @@
 import json
+import re
 from typing import Any, Dict, List, Union
 
 from rotkehlchen.assets.asset import Asset
@@ -7,6 +8,8 @@ from rotkehlchen.typing import Location, TradeType
 
 DecodableValue = Union[Dict, List, float, bytes, str]
 DecodedValue = Union[Dict, FVal, List, bytes, str]
+# How str() represents an FVal
+FVAL_STR_RE = re.compile(r'-?[0-9]+(\.[0-9]*)?(E[+-]?[0-9]+)?')
 
 
 class RKLDecoder(json.JSONDecoder):
@@ -59,6 +62,27 @@ def rlk_jsonloads_list(data: str) -> List:
     return value
 
 
+def _decode_exact_value(val: Any) -> Any:
+    if isinstance(val, dict):
+        return {k: _decode_exact_value(v) for k, v in val.items()}
+    if isinstance(val, list):
+        return [_decode_exact_value(x) for x in val]
+    if isinstance(val, str) and FVAL_STR_RE.fullmatch(val) is not None:
+        return FVal(val)
+    return val
+
+
+def rlk_jsonloads_exact_dict(data: str) -> Dict[str, Any]:
+    """Like rlk_jsonloads_dict() but for data written by rlk_jsondumps() itself
+
+    The numbers are turned back into FVals from their string representation
+    instead of going through a float so that they keep their full precision.
+    """
+    value = _decode_exact_value(json.loads(data))
+    assert isinstance(value, dict)
+    return value
+
+
 def rlk_jsondumps(data: Union[Dict, List]) -> str:
     return json.dumps(data, cls=RKLEncoder)
 
@@ -33,7 +33,7 @@ setup(
     url='https://github.com/rotki/rotki',
     packages=find_packages('.'),
     package_data={
-        "rotkehlchen": ["data/*.json"],
+        "rotkehlchen": ["data/*.json", "data/*.index"],
     },
     install_requires=install_requirements,
     use_scm_version=True,
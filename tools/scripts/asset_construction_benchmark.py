@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+"""Times the construction of assets with and without the interned instances
+
+Constructs the same assets over and over, once clearing the interned assets
+before each construction and once reusing them.
+"""
+
+import argparse
+import time
+from typing import List
+
+from rotkehlchen.assets.asset import Asset
+from rotkehlchen.assets.resolver import AssetResolver
+
+IDENTIFIERS = ['BTC', 'ETH', 'EUR', 'USD', 'XMR', 'DAI', 'RDN', 'GNO']
+
+
+def _time_construction(identifiers: List[str], interned: bool) -> float:
+    interned_assets = AssetResolver().interned_assets
+    saved_assets = dict(interned_assets)
+    try:
+        start = time.perf_counter()
+        for identifier in identifiers:
+            if not interned:
+                interned_assets.clear()
+            Asset(identifier)
+        return time.perf_counter() - start
+    finally:
+        interned_assets.clear()
+        interned_assets.update(saved_assets)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description='Benchmark asset construction with and without interning',
+    )
+    parser.add_argument(
+        '--repetitions',
+        type=int,
+        default=10000,
+        help='Number of times to construct each of the benchmarked assets',
+    )
+    args = parser.parse_args()
+
+    identifiers = IDENTIFIERS * args.repetitions
+    uncached_duration = _time_construction(identifiers, interned=False)
+    interned_duration = _time_construction(identifiers, interned=True)
+    print(
+        f'Constructed {len(identifiers)} assets in {uncached_duration:.4f} secs without '
+        f'interning and in {interned_duration:.4f} secs with interning',
+    )
+
+
+if __name__ == '__main__':
+    main()
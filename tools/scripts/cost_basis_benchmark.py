@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+"""Times each of the cost basis methods on the same synthetic history
+
+The history alternates buys of varying rate and sells of a bit less than
+each buy's amount, so the lots of the buys keep piling up.
+"""
+
+import argparse
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from rotkehlchen.accounting.cost_basis import LOT_STORES, CostBasisMethod
+from rotkehlchen.accounting.events import TaxableEvents
+from rotkehlchen.constants.assets import A_BTC, A_EUR
+from rotkehlchen.constants.timing import YEAR_IN_SECONDS
+from rotkehlchen.csv_exporter import CSVExporter
+from rotkehlchen.exchanges.data_structures import BuyEvent, Events
+from rotkehlchen.fval import FVal
+from rotkehlchen.typing import Timestamp
+
+START_TS = 1446979735
+
+
+def _time_method(events: TaxableEvents, method: CostBasisMethod, events_number: int) -> float:
+    events.cost_basis_method = method
+    events.events[A_BTC] = Events(LOT_STORES[method](), [])
+    start = time.perf_counter()
+    for i in range(events_number):
+        timestamp = Timestamp(START_TS + i * 3600)
+        if i % 2 == 0:
+            events.events[A_BTC].buys.append(BuyEvent(
+                amount=FVal('1.5'),
+                timestamp=timestamp,
+                rate=FVal(100 + (i * 7919) % 1000),
+                fee_rate=FVal('0.001'),
+            ))
+        else:
+            events.search_buys_calculate_profit(
+                selling_amount=FVal('1.4'),
+                selling_asset=A_BTC,
+                timestamp=timestamp,
+            )
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description='Benchmark the cost basis methods on a synthetic history',
+    )
+    parser.add_argument(
+        '--events',
+        type=int,
+        default=20000,
+        help='Number of buys and sells in the history',
+    )
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as tmpdir:
+        events = TaxableEvents(
+            csv_exporter=CSVExporter(
+                profit_currency=A_EUR,
+                user_directory=Path(tmpdir),
+                create_csv=False,
+            ),
+            profit_currency=A_EUR,
+        )
+        events.taxfree_after_period = YEAR_IN_SECONDS
+        for method in CostBasisMethod:
+            duration = _time_method(events, method, args.events)
+            print(f'{method} processed {args.events} events in {duration:.4f} secs')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+"""Times the history queries of the DB with and without the history indexes
+
+Creates a synthetic user DB in a temporary directory, fills the history tables
+with the given number of rows each, runs the queries without any index, then
+creates the indexes and runs them again.
+"""
+
+import argparse
+import random
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Callable, Dict, List, Tuple
+
+from rotkehlchen.assets.asset import Asset
+from rotkehlchen.assets.resolver import AssetResolver
+from rotkehlchen.db.dbhandler import DBHandler
+from rotkehlchen.db.schema import DB_SCRIPT_CREATE_INDEXES
+from rotkehlchen.tests.utils.factories import make_ethereum_address
+from rotkehlchen.typing import ChecksumEthAddress, Location, Timestamp
+from rotkehlchen.user_messages import MessagesAggregator
+
+START_TS = 1451606400  # 01/01/2016
+LOCATIONS = [Location.KRAKEN, Location.POLONIEX, Location.BITTREX, Location.BINANCE]
+DAY = 24 * 3600
+
+
+def _populate(
+        db: DBHandler,
+        rows: int,
+        addresses: List[ChecksumEthAddress],
+        assets: List[str],
+) -> None:
+    cursor = db.conn.cursor()
+    step = 60
+    cursor.executemany(
+        'INSERT INTO trades(id, time, location, pair, type, amount, rate, fee, '
+        'fee_currency, link, notes) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        (
+            (
+                str(i), START_TS + i * step, random.choice(LOCATIONS).serialize_for_db(),
+                'ETH_BTC', 'A', '1', '0.02', '0.001', 'ETH', '', '',
+            ) for i in range(rows)
+        ),
+    )
+    cursor.executemany(
+        'INSERT INTO ethereum_transactions(tx_hash, timestamp, block_number, from_address, '
+        'to_address, value, gas, gas_price, gas_used, input_data, nonce) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        (
+            (
+                i.to_bytes(32, byteorder='big'), START_TS + i * step, i,
+                random.choice(addresses), addresses[0], '1', '21000', '1', '21000', b'', i,
+            ) for i in range(rows)
+        ),
+    )
+    cursor.executemany(
+        'INSERT INTO timed_balances(time, currency, amount, usd_value) VALUES (?, ?, ?, ?)',
+        (
+            (START_TS + (i // len(assets)) * 3600, assets[i % len(assets)], '1', '1')
+            for i in range(rows)
+        ),
+    )
+    db.conn.commit()
+
+
+def _drop_indexes(db: DBHandler) -> None:
+    cursor = db.conn.cursor()
+    query = cursor.execute(
+        'SELECT name FROM sqlite_master WHERE type="index" AND name LIKE "idx_%";',
+    )
+    for (name,) in query.fetchall():
+        cursor.execute(f'DROP INDEX {name};')
+    db.conn.commit()
+
+
+def _time_queries(
+        queries: Dict[str, Callable[[], List]],
+        repetitions: int,
+) -> Dict[str, float]:
+    timings = {}
+    for name, query in queries.items():
+        durations = []
+        for _ in range(repetitions):
+            start = time.perf_counter()
+            query()
+            durations.append(time.perf_counter() - start)
+        timings[name] = min(durations)
+    return timings
+
+
+def _run_benchmark(
+        db: DBHandler,
+        addresses: List[ChecksumEthAddress],
+        assets: List[str],
+        end_ts: Timestamp,
+        repetitions: int,
+) -> Tuple[Dict[str, float], Dict[str, float]]:
+    queries: Dict[str, Callable[[], List]] = {
+        'get_trades(1 day, location)': lambda: db.get_trades(
+            from_ts=Timestamp(end_ts - DAY),
+            to_ts=end_ts,
+            location=Location.KRAKEN,
+        ),
+        'get_ethereum_transactions(address)': lambda: db.get_ethereum_transactions(
+            address=addresses[1],
+        ),
+        'query_timed_balances(asset)': lambda: db.query_timed_balances(
+            from_ts=None,
+            to_ts=None,
+            asset=Asset(assets[1]),
+        ),
+        'get_latest_asset_value_distribution': db.get_latest_asset_value_distribution,
+    }
+    before = _time_queries(queries, repetitions)
+    start = time.perf_counter()
+    db.conn.executescript(DB_SCRIPT_CREATE_INDEXES)
+    print(f'Created the indexes in {time.perf_counter() - start:.2f} seconds')
+    after = _time_queries(queries, repetitions)
+    return before, after
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description='Benchmark the history queries of the DB with and without indexes',
+    )
+    parser.add_argument(
+        '--rows',
+        type=int,
+        default=1000000,
+        help='Number of rows to add to each of the history tables',
+    )
+    parser.add_argument(
+        '--repetitions',
+        type=int,
+        default=3,
+        help='Number of times to run each query. The fastest run is reported',
+    )
+    args = parser.parse_args()
+
+    random.seed(0)
+    addresses = [make_ethereum_address() for _ in range(1000)]
+    assets = list(AssetResolver().assets.keys())[:200]
+    with TemporaryDirectory() as tmpdir:
+        db = DBHandler(
+            user_data_dir=Path(tmpdir),
+            password='123',
+            msg_aggregator=MessagesAggregator(),
+            initial_settings=None,
+        )
+        _drop_indexes(db)
+        print(f'Populating the DB with {args.rows} rows per history table ...')
+        _populate(db, rows=args.rows, addresses=addresses, assets=assets)
+
+        before, after = _run_benchmark(
+            db=db,
+            addresses=addresses,
+            assets=assets,
+            end_ts=Timestamp(START_TS + args.rows * 60),
+            repetitions=args.repetitions,
+        )
+        # the DB should be torn down before its directory gets deleted
+        del db
+
+    print(f'{"query":<40}{"no indexes (s)":>16}{"indexes (s)":>16}')
+    for name in before:
+        print(f'{name:<40}{before[name]:>16.4f}{after[name]:>16.4f}')
+
+
+if __name__ == '__main__':
+    main()
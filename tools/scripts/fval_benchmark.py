@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+"""Times the FVal arithmetic and the hot paths of rotki that are built on it
+
+Compares a workload of FVal operations to the same workload on the underlying
+Decimal values, then times matching sells against buys and combining the
+balances of many locations.
+"""
+
+import argparse
+import time
+from decimal import Decimal
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Any, Callable, List, Tuple
+
+from rotkehlchen.accounting.cost_basis import FIFOLotStore
+from rotkehlchen.accounting.events import TaxableEvents
+from rotkehlchen.constants.assets import A_BTC, A_EUR
+from rotkehlchen.constants.timing import YEAR_IN_SECONDS
+from rotkehlchen.csv_exporter import CSVExporter
+from rotkehlchen.exchanges.data_structures import BuyEvent, Events
+from rotkehlchen.fval import FVal
+from rotkehlchen.typing import Timestamp
+from rotkehlchen.utils.misc import combine_stat_dicts
+
+START_TS = 1446979735
+
+
+def _fastest(method: Callable[[], Any], repetitions: int) -> Tuple[float, Any]:
+    durations = []
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        result = method()
+        durations.append(time.perf_counter() - start)
+    return min(durations), result
+
+
+def _operations_workload(values: List[Any], zero: Any) -> Any:
+    total = zero
+    for i in range(1, len(values)):
+        a, b = values[i - 1], values[i]
+        if a < b and b >= a and a != b:
+            total += a * b - a / b
+        total = total.fma(a, b) if total > 100000 else total + 1
+
+    return total
+
+
+def benchmark_operations(values_number: int, repetitions: int) -> None:
+    decimals = [Decimal(f'{i}.{i}') for i in range(1, values_number + 1)]
+    fvals = [FVal(f'{i}.{i}') for i in range(1, values_number + 1)]
+    decimal_duration, decimal_result = _fastest(
+        lambda: _operations_workload(decimals, Decimal(0)),
+        repetitions,
+    )
+    fval_duration, fval_result = _fastest(
+        lambda: _operations_workload(fvals, FVal(0)),
+        repetitions,
+    )
+    assert fval_result.num == decimal_result
+    print(
+        f'Decimal workload took {decimal_duration:.5f} secs and FVal workload took '
+        f'{fval_duration:.5f} secs ({fval_duration / decimal_duration:.1f}x)',
+    )
+
+
+def benchmark_buy_matching(buys_number: int, user_directory: Path) -> None:
+    events = TaxableEvents(
+        csv_exporter=CSVExporter(
+            profit_currency=A_EUR,
+            user_directory=user_directory,
+            create_csv=False,
+        ),
+        profit_currency=A_EUR,
+    )
+    events.taxfree_after_period = YEAR_IN_SECONDS
+    asset = A_BTC
+    events.events[asset] = Events(FIFOLotStore(), [])
+    for i in range(buys_number):
+        events.events[asset].buys.append(BuyEvent(
+            amount=FVal('1.5'),
+            timestamp=Timestamp(START_TS + i * 3600),
+            rate=FVal(f'{100 + i}.5'),
+            fee_rate=FVal('0.001'),
+        ))
+
+    start = time.perf_counter()
+    for _ in range(buys_number):
+        events.search_buys_calculate_profit(
+            selling_amount=FVal('1.4'),
+            selling_asset=asset,
+            timestamp=Timestamp(START_TS + buys_number * 3600),
+        )
+    duration = time.perf_counter() - start
+    print(f'Matching {buys_number} sells against {buys_number} buys took {duration:.4f} secs')
+
+
+def benchmark_combine_stat_dicts(locations_number: int, repetitions: int) -> None:
+    dicts = [
+        {
+            f'ASSET{i}': {'amount': FVal(f'{j}.{i}'), 'usd_value': FVal(f'{i}.{j}')}
+            for i in range(200)
+        }
+        for j in range(locations_number)
+    ]
+    duration, _ = _fastest(lambda: combine_stat_dicts(dicts), repetitions)
+    print(f'Combining {len(dicts)} balance dicts took {duration:.4f} secs')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description='Benchmark FVal arithmetic and the code paths built on it',
+    )
+    parser.add_argument(
+        '--values',
+        type=int,
+        default=1000,
+        help='Number of values in the FVal operations workload',
+    )
+    parser.add_argument(
+        '--buys',
+        type=int,
+        default=2000,
+        help='Number of buys and of sells matched against them',
+    )
+    parser.add_argument(
+        '--locations',
+        type=int,
+        default=50,
+        help='Number of location balances to combine',
+    )
+    parser.add_argument(
+        '--repetitions',
+        type=int,
+        default=5,
+        help='Number of times to run the repeatable workloads. The fastest run is reported',
+    )
+    args = parser.parse_args()
+
+    benchmark_operations(values_number=args.values, repetitions=args.repetitions)
+    with TemporaryDirectory() as tmpdir:
+        benchmark_buy_matching(buys_number=args.buys, user_directory=Path(tmpdir))
+    benchmark_combine_stat_dicts(locations_number=args.locations, repetitions=args.repetitions)
+
+
+if __name__ == '__main__':
+    main()